@@ -1,4 +1,3 @@
-import requests
 import re
 import sys
 import json
@@ -7,6 +6,7 @@ import datetime
 import os
 sys.path.insert(0, r"C:\Progetti\simulatore-calcio-backend")
 from config import db
+from page_cache import cached_get
 from bs4 import BeautifulSoup
 
 # --- CONFIGURAZIONE ---
@@ -182,7 +182,7 @@ def get_dates_from_current(url):
     """Scarica SOLO le date dalla stagione in corso."""
     print(f"📅 Cerco date su {url}...", end=" ")
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = cached_get(url, headers=HEADERS, timeout=10)
         if response.status_code != 200:
             print(f"❌ Err {response.status_code}")
             return None
@@ -206,7 +206,7 @@ def get_stats_from_past(url):
     """Scarica SOLO la media gol dalla stagione passata."""
     print(f"📊 Cerco statistiche su {url}...", end=" ")
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = cached_get(url, headers=HEADERS, timeout=10)
         if response.status_code != 200:
             print(f"❌ Err {response.status_code}")
             return None
@@ -84,6 +84,9 @@ except:
 
 _kill_orphan_chrome()
 
+from pymongo import UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError
+
 try:
     from config import db
     print(f"DB Connesso: {db.name}")
@@ -402,37 +405,73 @@ def parse_nowgoal_live_page(driver) -> List[Dict]:
     return nowgoal_matches
 
 
-def find_nowgoal_match(db_match, nowgoal_matches, team_docs):
-    """Cerca una partita del DB nella lista NowGoal usando alias matching."""
+# --- INDICI ALIAS (matching a lookup, niente scansione partite DB x righe NowGoal) ---
+
+# team_name -> (firma del team doc, alias): persiste tra i cicli, si ricalcola solo se il doc cambia
+_TEAM_ALIAS_INDEX: Dict[str, tuple] = {}
+
+
+def get_team_alias_set(team_name: str, team_doc: Optional[Dict] = None) -> frozenset:
+    """get_team_aliases con cache persistente (normalize_name costa, le squadre si ripetono ogni ciclo)."""
+    signature = (team_doc.get('name'), tuple(team_doc.get('aliases', []))) if team_doc else None
+    cached = _TEAM_ALIAS_INDEX.get(team_name)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    aliases = frozenset(get_team_aliases(team_name, team_doc))
+    _TEAM_ALIAS_INDEX[team_name] = (signature, aliases)
+    return aliases
+
+
+def _nowgoal_side_aliases(name: str, normalized: str) -> set:
+    """Alias di un lato della riga NowGoal: nome, normalizzato e parole singole (match parziale)."""
+    aliases = {name.lower(), normalized}
+    for word in name.lower().split():
+        if len(word) >= 4:
+            aliases.add(word)
+    return aliases
+
+
+def build_nowgoal_index(nowgoal_matches: List[Dict]) -> Dict:
+    """
+    Indice invertito alias -> posizioni delle righe NowGoal, separato casa/ospite.
+    Costruito UNA volta per ciclo dall'output di parse_nowgoal_live_page.
+    """
+    home_index: Dict[str, List[int]] = {}
+    away_index: Dict[str, List[int]] = {}
+    for i, ng in enumerate(nowgoal_matches):
+        for alias in _nowgoal_side_aliases(ng['home'], ng['home_normalized']):
+            home_index.setdefault(alias, []).append(i)
+        for alias in _nowgoal_side_aliases(ng['away'], ng['away_normalized']):
+            away_index.setdefault(alias, []).append(i)
+    return {"home": home_index, "away": away_index}
+
+
+def find_nowgoal_match(db_match, nowgoal_matches, team_docs, nowgoal_index=None):
+    """
+    Cerca una partita del DB nella lista NowGoal usando alias matching.
+    Con l'indice sono lookup sugli alias: vince la prima riga NowGoal (ordine pagina)
+    con almeno un alias in comune sia per la casa sia per l'ospite.
+    """
+    if nowgoal_index is None:
+        nowgoal_index = build_nowgoal_index(nowgoal_matches)
+
     home_name = db_match.get('home', '')
     away_name = db_match.get('away', '')
 
-    home_doc = team_docs.get(home_name)
-    away_doc = team_docs.get(away_name)
-
-    home_aliases = set(get_team_aliases(home_name, home_doc))
-    away_aliases = set(get_team_aliases(away_name, away_doc))
-
-    for ng in nowgoal_matches:
-        ng_home_aliases = {ng['home'].lower(), ng['home_normalized']}
-        ng_away_aliases = {ng['away'].lower(), ng['away_normalized']}
+    home_rows = set()
+    for alias in get_team_alias_set(home_name, team_docs.get(home_name)):
+        home_rows.update(nowgoal_index["home"].get(alias, ()))
+    if not home_rows:
+        return None
 
-        # Aggiungi parole singole del nome NowGoal (per match parziale)
-        for word in ng['home'].lower().split():
-            if len(word) >= 4:
-                ng_home_aliases.add(word)
-        for word in ng['away'].lower().split():
-            if len(word) >= 4:
-                ng_away_aliases.add(word)
+    away_rows = set()
+    for alias in get_team_alias_set(away_name, team_docs.get(away_name)):
+        away_rows.update(nowgoal_index["away"].get(alias, ()))
 
-        # Check intersezione alias
-        home_match = bool(home_aliases & ng_home_aliases)
-        away_match = bool(away_aliases & ng_away_aliases)
-
-        if home_match and away_match:
-            return ng
-
-    return None
+    common = home_rows & away_rows
+    if not common:
+        return None
+    return nowgoal_matches[min(common)]
 
 
 def run_cycle(driver):
@@ -442,6 +481,8 @@ def run_cycle(driver):
     print(f"CICLO LIVE: {cycle_start.strftime('%H:%M:%S')}")
     print(f"{'='*50}")
 
+    t0 = time.time()
+
     # 1. Carica partite di oggi dal DB (campionati + coppe)
     db_matches = get_today_matches_from_db()
     cup_matches = get_today_cup_matches_from_db()
@@ -459,6 +500,9 @@ def run_cycle(driver):
     team_docs = load_team_docs_batch(db_matches)
     print(f"   Team docs caricati: {len(team_docs)}")
 
+    t_db = time.time() - t0
+    t0 = time.time()
+
     # 3. Scrape NowGoal — refresh se già sulla pagina, altrimenti naviga
     try:
         current = driver.current_url or ''
@@ -519,6 +563,7 @@ def run_cycle(driver):
             _leagues_selected = True
 
     nowgoal_matches = parse_nowgoal_live_page(driver)
+    t_scrape = time.time() - t0
     live_count = sum(1 for m in nowgoal_matches if m['status'] == 'Live')
     ht_count = sum(1 for m in nowgoal_matches if m['status'] == 'HT')
     ft_count = sum(1 for m in nowgoal_matches if m['status'] == 'Finished')
@@ -532,9 +577,11 @@ def run_cycle(driver):
         print("   Nessuna partita attiva su NowGoal.")
         return
 
-    # 4. Matching e aggiornamento
-    updated_count = 0
+    # 4. Matching: le variazioni del ciclo vengono accumulate e scritte in blocco (5.)
+    t0 = time.time()
+    nowgoal_index = build_nowgoal_index(nowgoal_matches)
     matched_count = 0
+    changes = []
 
     for db_match in db_matches:
         # Le coppe non hanno _round_id, i campionati sì
@@ -542,7 +589,7 @@ def run_cycle(driver):
         if not is_cup and not db_match.get('_round_id'):
             continue
 
-        ng_match = find_nowgoal_match(db_match, nowgoal_matches, team_docs)
+        ng_match = find_nowgoal_match(db_match, nowgoal_matches, team_docs, nowgoal_index)
         if not ng_match:
             continue
 
@@ -560,64 +607,118 @@ def run_cycle(driver):
         if old_score == new_score and old_status == new_status and old_minute == new_minute:
             continue  # Nessun cambiamento
 
+        changes.append((db_match, is_cup, new_score, new_status, new_minute))
+    t_match = time.time() - t0
+
+    # 5. Scrittura: un bulk_write per collection invece di 3 round-trip per partita
+    t0 = time.time()
+    updated_count, n_bulk = flush_live_changes(changes)
+    t_write = time.time() - t0
+
+    print(f"\n   Matched: {matched_count} | Aggiornati: {updated_count}")
+
+    elapsed = (datetime.now() - cycle_start).total_seconds()
+    print(f"   Ciclo completato in {elapsed:.1f}s "
+          f"(DB {t_db:.1f}s | scrape {t_scrape:.1f}s | match {t_match:.2f}s | "
+          f"scrittura {t_write:.2f}s, {n_bulk} bulk_write)")
+
+
+def flush_live_changes(changes):
+    """
+    Scrive le variazioni live del ciclo con bulk_write per collection:
+    - h2h_by_round: un UpdateOne per partita con array_filters sull'elemento
+      (home, away, date_obj): aggiorna solo la partita del giorno, come il vecchio $ posizionale
+    - coppe: UpdateOne per _id sulla collection della coppa
+    - daily_predictions_unified / quote_anomale: UpdateMany di propagazione, solo per
+      le partite la cui scrittura sorgente è andata a buon fine
+    Ritorna (partite aggiornate secondo modified_count, numero di bulk_write eseguiti).
+    """
+    if not changes:
+        return 0, 0
+
+    # Sorgenti: collection -> [(indice in changes, op)]
+    sources: Dict[str, list] = {}
+
+    for i, (db_match, is_cup, new_score, new_status, new_minute) in enumerate(changes):
         home = db_match.get('home', '?')
         away = db_match.get('away', '?')
+        live_set = {"live_score": new_score, "live_status": new_status, "live_minute": new_minute}
 
         if is_cup:
             # Coppe — update diretto sul documento singolo
-            cup_update = {
-                "live_score": new_score,
-                "live_status": new_status,
-                "live_minute": new_minute
-            }
             # NON impostare result/status qui — lo fa il daemon risultati
             # da NowGoal coppe (fonte affidabile). Il live daemon scrive solo live_*
-
-            result = db[db_match['_collection']].update_one(
-                {"_id": db_match['_doc_id']},
-                {"$set": cup_update}
-            )
+            sources.setdefault(db_match['_collection'], []).append(
+                (i, UpdateOne({"_id": db_match['_doc_id']}, {"$set": live_set})))
         else:
-            # Campionati — update atomico con positional operator $
-            round_id = db_match.get('_round_id')
-            update_fields = {
-                "matches.$.live_score": new_score,
-                "matches.$.live_status": new_status,
-                "matches.$.live_minute": new_minute
-            }
+            # Campionati — elemento della partita nel round individuato da array_filters.
+            # array_filters aggiorna TUTTI gli elementi che corrispondono: la data tiene
+            # fuori un eventuale altro (home, away) nello stesso round (recuperi, doppioni)
             # NON impostare real_score/status qui — lo fa il daemon risultati
             # da BetExplorer (fonte affidabile). Il live daemon scrive solo live_*
+            element = {"m.home": home, "m.away": away}
+            if db_match.get('date_obj') is not None:
+                element["m.date_obj"] = db_match['date_obj']
+            sources.setdefault('h2h_by_round', []).append((i, UpdateOne(
+                {"_id": db_match.get('_round_id')},
+                {"$set": {f"matches.$[m].{k}": v for k, v in live_set.items()}},
+                array_filters=[element],
+            )))
+
+    # 1. Sorgenti (round/coppe): si tiene traccia delle op fallite via writeErrors
+    n_bulk = 0
+    updated_count = 0
+    written = []
+    for coll_name, indexed_ops in sources.items():
+        ops = [op for _, op in indexed_ops]
+        failed = set()
+        try:
+            result = db[coll_name].bulk_write(ops, ordered=False)
+            updated_count += result.modified_count
+            n_bulk += 1
+        except BulkWriteError as e:
+            details = e.details or {}
+            updated_count += details.get('nModified', 0)
+            failed = {err['index'] for err in details.get('writeErrors', [])}
+            n_bulk += 1
+            print(f"   Errore bulk_write {coll_name}: {len(failed)}/{len(ops)} scritture fallite")
+        except Exception as e:
+            failed = set(range(len(ops)))
+            print(f"   Errore bulk_write {coll_name}: {e}")
+        written += [i for j, (i, _) in enumerate(indexed_ops) if j not in failed]
+
+    # 2. Propagazioni, solo per le partite scritte nella sorgente
+    unified_ops = []
+    qa_ops = []
+    for i in sorted(written):
+        db_match, is_cup, new_score, new_status, new_minute = changes[i]
+        home = db_match.get('home', '?')
+        away = db_match.get('away', '?')
+        live_set = {"live_score": new_score, "live_status": new_status, "live_minute": new_minute}
 
-            result = db.h2h_by_round.update_one(
-                {"_id": round_id, "matches.home": home, "matches.away": away},
-                {"$set": update_fields}
-            )
-
-        if result.modified_count > 0:
-            updated_count += 1
-            cup_tag = " [CUP]" if is_cup else ""
-            print(f"   {new_status:8s} {new_minute:3d}' | {home} {new_score} {away}{cup_tag}")
-
-            # Propaga live_score/live_status/live_minute anche in daily_predictions_unified
-            if not is_cup:
-                db.daily_predictions_unified.update_many(
-                    {"home": home, "away": away},
-                    {"$set": {"live_score": new_score, "live_status": new_status, "live_minute": new_minute}}
-                )
-
-            # Propaga a quote_anomale: live sempre, real_score solo se Finished
-            qa_set = {"live_score": new_score, "live_status": new_status, "live_minute": new_minute}
-            if new_status == "Finished":
-                qa_set["real_score"] = new_score
-            db.quote_anomale.update_many(
-                {"home": home, "away": away},
-                {"$set": qa_set}
-            )
+        # Propaga live_score/live_status/live_minute anche in daily_predictions_unified
+        if not is_cup:
+            unified_ops.append(UpdateMany({"home": home, "away": away}, {"$set": live_set}))
 
-    print(f"\n   Matched: {matched_count} | Aggiornati: {updated_count}")
+        # Propaga a quote_anomale: live sempre, real_score solo se Finished
+        qa_set = dict(live_set)
+        if new_status == "Finished":
+            qa_set["real_score"] = new_score
+        qa_ops.append(UpdateMany({"home": home, "away": away}, {"$set": qa_set}))
 
-    elapsed = (datetime.now() - cycle_start).total_seconds()
-    print(f"   Ciclo completato in {elapsed:.1f}s")
+        cup_tag = " [CUP]" if is_cup else ""
+        print(f"   {new_status:8s} {new_minute:3d}' | {home} {new_score} {away}{cup_tag}")
+
+    for collection, ops in ((db.daily_predictions_unified, unified_ops), (db.quote_anomale, qa_ops)):
+        if not ops:
+            continue
+        try:
+            collection.bulk_write(ops, ordered=False)
+            n_bulk += 1
+        except Exception as e:
+            print(f"   Errore bulk_write {collection.name}: {e}")
+
+    return updated_count, n_bulk
 
 
 def is_in_operating_window():
@@ -0,0 +1,205 @@
+"""
+FBREF INGEST - Un solo passaggio su FBref per attaccanti, centrocampisti, difensori e portieri
+=============================================================================================
+I 4 scraper giocatori (fbref_scraper_att / _mid / _def, scraper_gk_fbref) scaricano
+ognuno le proprie pagine di lega: standard, passing, defense e misc venivano scaricate
+e parsate 2-3 volte per lega, con i 4 processi in parallelo a contendersi FBref.
+
+Qui, per ogni lega:
+  - ogni pagina viene scaricata una volta (9 pagine distinte invece di 14)
+  - ogni tabella viene estratta dall'HTML una volta
+  - le righe vengono smistate per ruolo (classify_role sulla colonna Pos) e passate
+    alle funzioni parse_* e build_bulk_ops dei 4 scraper, che restano l'unica fonte
+    della logica di metriche e rating
+  - un bulk_write per collection players_stats_fbref_* (att / mid / def / gk)
+
+I 4 scraper restano eseguibili da soli (stesso risultato, più pagine scaricate).
+
+Usage:
+    python fbref_ingest.py                          # tutte le leghe, tutti i ruoli
+    python fbref_ingest.py --leagues ITA1 ENG1      # solo alcune leghe (code)
+    python fbref_ingest.py --roles att gk           # solo alcuni ruoli
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+
+import fbref_scraper_att as att
+import fbref_scraper_mid as mid
+import fbref_scraper_def as dif
+import scraper_gk_fbref as gk
+
+PAGE_PAUSE = 4  # secondi dopo ogni pagina scaricata davvero (le pagine in cache non aspettano)
+
+
+class _LeaguePages:
+    """Pagine di una lega: URL scaricato una volta, tabella estratta una volta, righe smistate per ruolo."""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self._html = {}
+        self._tables = {}
+        self._routed = {}
+        self.downloaded = 0
+        self.cached = 0
+
+    def html(self, url):
+        if url not in self._html:
+            print(f"➡️  Scarico: {url}")
+            resp = self.scraper.get(url, timeout=40)
+            self._html[url] = resp.text if resp.status_code == 200 else None
+            if resp.status_code != 200:
+                print(f"   ⚠️ Status {resp.status_code}")
+            if getattr(resp, "from_cache", False):
+                self.cached += 1
+            else:
+                self.downloaded += 1
+                time.sleep(PAGE_PAUSE)
+        return self._html[url]
+
+    def table(self, url, id_regex):
+        key = (url, id_regex)
+        if key not in self._tables:
+            html = self.html(url)
+            self._tables[key] = att.extract_table_from_comments_or_dom(html, id_regex) if html else None
+        return self._tables[key]
+
+    def rows(self, url, id_regex, role):
+        """Righe <tr> della tabella per un ruolo (ATT / MID / DIF). Le righe senza Pos vanno a tutti."""
+        key = (url, id_regex)
+        if key not in self._routed:
+            by_role, shared = defaultdict(list), []
+            table = self.table(url, id_regex)
+            tbody = table.find("tbody") if table is not None else None
+            for r in (tbody.find_all("tr") if tbody is not None else []):
+                pos_cell = r.find("td", {"data-stat": "position"})
+                if pos_cell is None:
+                    shared.append(r)
+                else:
+                    by_role[att.classify_role(pos_cell.get_text(strip=True))].append(r)
+            self._routed[key] = (by_role, shared)
+        by_role, shared = self._routed[key]
+        return by_role.get(role, []) + shared
+
+
+# ================== RUOLI ==================
+
+def _collect_att(lg, pages):
+    atts = att.parse_standard_atts(pages.rows(lg["standard_url"], r"stats_standard", "ATT"))
+    if atts:
+        att.parse_shooting(pages.rows(lg["shooting_url"], r"stats_shooting", "ATT"), atts)
+        att.parse_possession(pages.rows(lg["possession_url"], r"stats_possession", "ATT"), atts)
+        att.parse_passing(pages.rows(lg["passing_url"], r"stats_passing", "ATT"), atts)
+        att.parse_misc(pages.rows(lg["misc_url"], r"stats_misc", "ATT"), atts)
+    return att.build_bulk_ops(lg, atts)
+
+
+def _collect_mid(lg, pages):
+    mids = mid.parse_standard_mids(pages.rows(lg["standard_url"], r"stats_standard", "MID"))
+    if mids:
+        mid.parse_passing(pages.rows(lg["passing_url"], r"stats_passing", "MID"), mids)
+        mid.parse_defense(pages.rows(lg["defense_url"], r"stats_defense", "MID"), mids)
+        mid.parse_misc(pages.rows(lg["misc_url"], r"stats_misc", "MID"), mids)
+    return mid.build_bulk_ops(lg, mids)
+
+
+def _collect_def(lg, pages):
+    defs = dif.parse_defense_defs(pages.rows(lg["defense_url"], r"stats_defense", "DIF"))
+    if defs:
+        dif.parse_misc(pages.rows(lg["misc_url"], r"stats_misc", "DIF"), defs)
+        dif.parse_playingtime(pages.rows(lg["playingtime_url"], r"stats_playing_time", "DIF"), defs)
+    return dif.build_bulk_ops(lg, defs)
+
+
+def _collect_gk(lg, pages):
+    # Tabelle portieri lette solo da qui: nessuno smistamento per ruolo
+    table_k = pages.table(lg["keepers_url"], r"stats_keeper")
+    if table_k is None:
+        return []
+    keepers_data = gk.scrape_keepers_table(table_k)
+    table_ka = pages.table(lg["keepersadv_url"], r"stats_keeper_adv")
+    keepersadv_data = gk.scrape_keepersadv_table(table_ka) if table_ka is not None else {}
+    return gk.build_bulk_ops(lg, keepers_data, keepersadv_data)
+
+
+# (modulo scraper, funzione di raccolta, etichetta)
+ROLES = {
+    "att": (att, _collect_att, "Attaccanti"),
+    "mid": (mid, _collect_mid, "Centrocampisti"),
+    "def": (dif, _collect_def, "Difensori"),
+    "gk": (gk, _collect_gk, "Portieri"),
+}
+
+
+# ================== MAIN ==================
+
+def _leagues_by_code(roles, league_codes=None):
+    """{code: {ruolo: config lega dello scraper di quel ruolo}} nell'ordine di LEAGUES."""
+    leagues = {}
+    for role in roles:
+        for lg in ROLES[role][0].LEAGUES:
+            if league_codes and lg["code"] not in league_codes:
+                continue
+            leagues.setdefault(lg["code"], {})[role] = lg
+    return leagues
+
+
+def run(roles=tuple(ROLES), league_codes=None):
+    leagues = _leagues_by_code(roles, league_codes)
+    scraper = att.create_scraper()
+    t0 = time.time()
+    written = defaultdict(int)
+    downloaded = cached = 0
+    errors = []
+
+    for code, by_role in leagues.items():
+        lg_name = next(iter(by_role.values()))["name"]
+        print("\n" + "=" * 40)
+        print(f"🏆 LEGA: {lg_name} ({code})")
+        print("=" * 40)
+        pages = _LeaguePages(scraper)
+
+        for role in roles:
+            lg = by_role.get(role)
+            if lg is None:
+                continue
+            module, collect, label = ROLES[role]
+            try:
+                bulk_ops = collect(lg, pages)
+                if not bulk_ops:
+                    print(f"   ⚠️ {label}: nessun giocatore da scrivere.")
+                    continue
+                result = module.get_collection(lg).bulk_write(bulk_ops, ordered=False)
+                written[role] += len(bulk_ops)
+                print(f"   💾 {label}: {len(bulk_ops)} documenti "
+                      f"(upserted: {result.upserted_count}, modified: {result.modified_count})")
+            except Exception as e:
+                errors.append(f"{code}/{role}: {e}")
+                print(f"   ❌ {label}: {e}")
+
+        downloaded += pages.downloaded
+        cached += pages.cached
+        print(f"   🌐 Pagine: {pages.downloaded} scaricate, {pages.cached} dalla cache")
+
+    print(f"\n📊 FBREF INGEST: {len(leagues)} leghe in {(time.time() - t0) / 60:.1f} min — "
+          f"{downloaded} pagine scaricate, {cached} dalla cache")
+    for role in roles:
+        print(f"   {ROLES[role][2]:<15} {written[role]:>6} documenti")
+    if errors:
+        print(f"\n❌ {len(errors)} errori:")
+        for err in errors:
+            print(f"   {err}")
+        return 1
+
+    print("\n✅ FBREF INGEST COMPLETATO.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stats giocatori FBref (ATT/MID/DEF/GK) in un solo passaggio")
+    parser.add_argument("--roles", nargs="+", choices=list(ROLES), default=list(ROLES))
+    parser.add_argument("--leagues", nargs="+", metavar="CODE", help="es. ITA1 ENG1 UCL")
+    args = parser.parse_args()
+    sys.exit(run(roles=tuple(args.roles), league_codes=set(args.leagues) if args.leagues else None))
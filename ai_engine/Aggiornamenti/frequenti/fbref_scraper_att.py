@@ -409,6 +409,19 @@ def extract_table_from_comments_or_dom(html: str, id_regex: str):
     return table
 
 
+def fetch_rows(scraper, url: str, id_regex: str) -> list:
+    """Scarica la pagina e restituisce le righe <tr> della tabella (lista vuota se non disponibile)."""
+    resp = scraper.get(url, timeout=40)
+    if resp.status_code != 200:
+        return []
+
+    table = extract_table_from_comments_or_dom(resp.text, id_regex)
+    if not table:
+        return []
+
+    return table.find("tbody").find_all("tr")
+
+
 def parse_float_safe(val: str | None):
     if val is None:
         return None
@@ -499,18 +512,12 @@ def compute_att_rating(
 # ================== SCRAPING 4 TABELLE ==================
 
 def scrape_standard_atts(scraper, url: str) -> Dict[tuple, Dict[str, Any]]:
-    """Estrae attaccanti dalla tabella STANDARD."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return {}
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_standard")
-    if not table:
-        return {}
+    """Scarica la pagina e applica parse_standard_atts."""
+    return parse_standard_atts(fetch_rows(scraper, url, r"stats_standard"))
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_standard_atts(rows: list) -> Dict[tuple, Dict[str, Any]]:
+    """Estrae attaccanti dalla tabella STANDARD. Righe <tr> già estratte dalla tabella."""
     atts: Dict[tuple, Dict[str, Any]] = {}
 
     for r in rows:
@@ -561,18 +568,12 @@ def scrape_standard_atts(scraper, url: str) -> Dict[tuple, Dict[str, Any]]:
 
 
 def scrape_shooting(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge SoT/90 e G/Sh."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_shooting")
-    if not table:
-        return
+    """Scarica la pagina e applica parse_shooting."""
+    return parse_shooting(fetch_rows(scraper, url, r"stats_shooting"), atts)
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_shooting(rows: list, atts: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge SoT/90 e G/Sh. Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -601,18 +602,12 @@ def scrape_shooting(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> Non
 
 
 def scrape_possession(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge Succ/90 (affronti riusciti)."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_possession")
-    if not table:
-        return
+    """Scarica la pagina e applica parse_possession."""
+    return parse_possession(fetch_rows(scraper, url, r"stats_possession"), atts)
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_possession(rows: list, atts: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge Succ/90 (affronti riusciti). Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -644,18 +639,12 @@ def scrape_possession(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> N
 
 
 def scrape_passing(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge KP/90 (passaggi chiave)."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_passing")
-    if not table:
-        return
+    """Scarica la pagina e applica parse_passing."""
+    return parse_passing(fetch_rows(scraper, url, r"stats_passing"), atts)
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_passing(rows: list, atts: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge KP/90 (passaggi chiave). Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -687,18 +676,12 @@ def scrape_passing(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> None
 
 
 def scrape_misc(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge Fld/90 (falli subiti)."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
+    """Scarica la pagina e applica parse_misc."""
+    return parse_misc(fetch_rows(scraper, url, r"stats_misc"), atts)
 
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_misc")
-    if not table:
-        return
-
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_misc(rows: list, atts: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge Fld/90 (falli subiti). Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -729,6 +712,83 @@ def scrape_misc(scraper, url: str, atts: Dict[tuple, Dict[str, Any]]) -> None:
         atts[key]["fld_per90"] = fld_per90
 
 
+# ================== MONGO ==================
+
+def get_collection(lg):
+    """Collezione dinamica in base al code (coppe europee separate)."""
+    if lg['code'] == 'UCL':
+        return db["players_stats_fbref_att_ucl"]
+    elif lg['code'] == 'UEL':
+        return db["players_stats_fbref_att_uel"]
+    return db["players_stats_fbref_att"]
+
+
+def build_bulk_ops(lg, atts: Dict[tuple, Dict[str, Any]]) -> list:
+    """Rating + upsert Mongo per i giocatori di una lega."""
+    bulk_ops = []
+
+    for (player_name, team_name), data in atts.items():
+        gls_per90       = data.get("gls_per90")
+        ga_per90        = data.get("ga_per90")
+        sot_per90       = data.get("sot_per90")
+        g_per_shot      = data.get("g_per_shot")
+        succ_per90      = data.get("succ_per90")
+        fld_per90       = data.get("fld_per90")
+        kp_per90        = data.get("kp_per90")
+        npxg_xag_per90  = data.get("npxg_xag_per90")
+
+        rating_puro = compute_att_rating(
+            gls_per90,
+            ga_per90,
+            sot_per90,
+            g_per_shot,
+            succ_per90,
+            fld_per90,
+            kp_per90,
+            npxg_xag_per90,
+        )
+
+        doc_filter = {
+            "season": SEASON,
+            "league_code": lg["code"],
+            "team_name_fbref": team_name,
+            "player_name_fbref": player_name,
+        }
+
+        att_stats = {
+            "gls_per90": gls_per90,
+            "ga_per90": ga_per90,
+            "sot_per90": sot_per90,
+            "g_per_shot": g_per_shot,
+            "succ_per90": succ_per90,
+            "fld_per90": fld_per90,
+            "kp_per90": kp_per90,
+            "npxg_xag_per90": npxg_xag_per90,
+        }
+
+        doc_update = {
+            "$set": {
+                "season": SEASON,
+                "league_code": lg["code"],
+                "league_name": lg["name"],
+                "team_name_fbref": team_name,
+                "player_name_fbref": player_name,
+                "pos_raw": data.get("pos_raw"),
+                "role": data.get("role"),
+                "minutes_90s": data.get("minutes_90s"),
+                "att_stats": att_stats,
+                "att_rating": {
+                    "rating_puro": rating_puro,
+                },
+                "source": "fbref",
+            }
+        }
+
+        bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+
+    return bulk_ops
+
+
 # ================== MAIN SCRAPER ==================
 
 def main():
@@ -739,13 +799,7 @@ def main():
         print(f"🏆 LEGA: {lg['name']} ({lg['code']})")
         print("=" * 40)
         
-        # ✅ Collezione dinamica in base al code
-        if lg['code'] == 'UCL':
-            collection = db["players_stats_fbref_att_ucl"]
-        elif lg['code'] == 'UEL':
-            collection = db["players_stats_fbref_att_uel"]
-        else:
-            collection = db["players_stats_fbref_att"]
+        collection = get_collection(lg)
 
         # --- STANDARD ---
         print(f"➡️  Scarico STANDARD: {lg['standard_url']}")
@@ -784,66 +838,7 @@ def main():
         print(f"   ➜ Dati MISC aggiunti")
 
         # --- Merge + calcolo rating + upsert Mongo ---
-        bulk_ops = []
-
-        for (player_name, team_name), data in atts.items():
-            gls_per90       = data.get("gls_per90")
-            ga_per90        = data.get("ga_per90")
-            sot_per90       = data.get("sot_per90")
-            g_per_shot      = data.get("g_per_shot")
-            succ_per90      = data.get("succ_per90")
-            fld_per90       = data.get("fld_per90")
-            kp_per90        = data.get("kp_per90")
-            npxg_xag_per90  = data.get("npxg_xag_per90")
-
-            rating_puro = compute_att_rating(
-                gls_per90,
-                ga_per90,
-                sot_per90,
-                g_per_shot,
-                succ_per90,
-                fld_per90,
-                kp_per90,
-                npxg_xag_per90,
-            )
-
-            doc_filter = {
-                "season": SEASON,
-                "league_code": lg["code"],
-                "team_name_fbref": team_name,
-                "player_name_fbref": player_name,
-            }
-
-            att_stats = {
-                "gls_per90": gls_per90,
-                "ga_per90": ga_per90,
-                "sot_per90": sot_per90,
-                "g_per_shot": g_per_shot,
-                "succ_per90": succ_per90,
-                "fld_per90": fld_per90,
-                "kp_per90": kp_per90,
-                "npxg_xag_per90": npxg_xag_per90,
-            }
-
-            doc_update = {
-                "$set": {
-                    "season": SEASON,
-                    "league_code": lg["code"],
-                    "league_name": lg["name"],
-                    "team_name_fbref": team_name,
-                    "player_name_fbref": player_name,
-                    "pos_raw": data.get("pos_raw"),
-                    "role": data.get("role"),
-                    "minutes_90s": data.get("minutes_90s"),
-                    "att_stats": att_stats,
-                    "att_rating": {
-                        "rating_puro": rating_puro,
-                    },
-                    "source": "fbref",
-                }
-            }
-
-            bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+        bulk_ops = build_bulk_ops(lg, atts)
 
         if bulk_ops:
             print(f"   💾 Scrivo {len(bulk_ops)} documenti in Mongo...")
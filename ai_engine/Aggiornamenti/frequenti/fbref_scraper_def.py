@@ -341,6 +341,19 @@ def extract_table_from_comments_or_dom(html: str, id_regex: str):
     return table
 
 
+def fetch_rows(scraper, url: str, id_regex: str) -> list:
+    """Scarica la pagina e restituisce le righe <tr> della tabella (lista vuota se non disponibile)."""
+    resp = scraper.get(url, timeout=40)
+    if resp.status_code != 200:
+        return []
+
+    table = extract_table_from_comments_or_dom(resp.text, id_regex)
+    if not table:
+        return []
+
+    return table.find("tbody").find_all("tr")
+
+
 def parse_float_safe(val: str | None):
     if val is None:
         return None
@@ -430,18 +443,12 @@ def compute_def_rating(
 # ================== SCRAPING 3 TABELLE ==================
 
 def scrape_defense_defs(scraper, url: str) -> Dict[tuple, Dict[str, Any]]:
-    """Estrae difensori dalla tabella DEFENSE."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return {}
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_defense")
-    if not table:
-        return {}
+    """Scarica la pagina e applica parse_defense_defs."""
+    return parse_defense_defs(fetch_rows(scraper, url, r"stats_defense"))
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_defense_defs(rows: list) -> Dict[tuple, Dict[str, Any]]:
+    """Estrae difensori dalla tabella DEFENSE. Righe <tr> già estratte dalla tabella."""
     defs: Dict[tuple, Dict[str, Any]] = {}
 
     for r in rows:
@@ -501,18 +508,12 @@ def scrape_defense_defs(scraper, url: str) -> Dict[tuple, Dict[str, Any]]:
 
 
 def scrape_misc(scraper, url: str, defs: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge TklW/90 e Aerials Won/90."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
+    """Scarica la pagina e applica parse_misc."""
+    return parse_misc(fetch_rows(scraper, url, r"stats_misc"), defs)
 
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_misc")
-    if not table:
-        return
-
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_misc(rows: list, defs: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge TklW/90 e Aerials Won/90. Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -550,18 +551,12 @@ def scrape_misc(scraper, url: str, defs: Dict[tuple, Dict[str, Any]]) -> None:
 
 
 def scrape_playingtime(scraper, url: str, defs: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge onGA/90 (gol subiti mentre in campo)."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_playing_time")
-    if not table:
-        return
+    """Scarica la pagina e applica parse_playingtime."""
+    return parse_playingtime(fetch_rows(scraper, url, r"stats_playing_time"), defs)
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_playingtime(rows: list, defs: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge onGA/90 (gol subiti mentre in campo). Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -592,6 +587,77 @@ def scrape_playingtime(scraper, url: str, defs: Dict[tuple, Dict[str, Any]]) ->
         defs[key]["on_ga_per90"] = on_ga_per90
 
 
+# ================== MONGO ==================
+
+def get_collection(lg):
+    """Collezione dinamica in base al code (coppe europee separate)."""
+    if lg['code'] == 'UCL':
+        return db["players_stats_fbref_def_ucl"]
+    elif lg['code'] == 'UEL':
+        return db["players_stats_fbref_def_uel"]
+    return db["players_stats_fbref_def"]
+
+
+def build_bulk_ops(lg, defs: Dict[tuple, Dict[str, Any]]) -> list:
+    """Rating + upsert Mongo per i giocatori di una lega."""
+    bulk_ops = []
+
+    for (player_name, team_name), data in defs.items():
+        tkl_def3rd_per90  = data.get("tkl_def3rd_per90")
+        tkl_int_per90     = data.get("tkl_int_per90")
+        tklw_per90        = data.get("tklw_per90")
+        aerials_won_per90 = data.get("aerials_won_per90")
+        on_ga_per90       = data.get("on_ga_per90")
+        clr_per90         = data.get("clr_per90")
+
+        rating_puro = compute_def_rating(
+            tkl_def3rd_per90,
+            tkl_int_per90,
+            tklw_per90,
+            aerials_won_per90,
+            on_ga_per90,
+            clr_per90,
+        )
+
+        doc_filter = {
+            "season": SEASON,
+            "league_code": lg["code"],
+            "team_name_fbref": team_name,
+            "player_name_fbref": player_name,
+        }
+
+        def_stats = {
+            "tkl_def3rd_per90": tkl_def3rd_per90,
+            "tkl_int_per90": tkl_int_per90,
+            "tklw_per90": tklw_per90,
+            "aerials_won_per90": aerials_won_per90,
+            "on_ga_per90": on_ga_per90,
+            "clr_per90": clr_per90,
+        }
+
+        doc_update = {
+            "$set": {
+                "season": SEASON,
+                "league_code": lg["code"],
+                "league_name": lg["name"],
+                "team_name_fbref": team_name,
+                "player_name_fbref": player_name,
+                "pos_raw": data.get("pos_raw"),
+                "role": data.get("role"),
+                "minutes_90s": data.get("minutes_90s"),
+                "def_stats": def_stats,
+                "def_rating": {
+                    "rating_puro": rating_puro,
+                },
+                "source": "fbref",
+            }
+        }
+
+        bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+
+    return bulk_ops
+
+
 # ================== MAIN SCRAPER ==================
 
 def main():
@@ -601,13 +667,7 @@ def main():
         print("\n" + "=" * 40)
         print(f"🏆 LEGA: {lg['name']} ({lg['code']})")
         print("=" * 40)
-        # ✅ Collezione dinamica in base al code
-        if lg['code'] == 'UCL':
-            collection = db["players_stats_fbref_def_ucl"]
-        elif lg['code'] == 'UEL':
-            collection = db["players_stats_fbref_def_uel"]
-        else:
-            collection = db["players_stats_fbref_def"]
+        collection = get_collection(lg)
 
         # --- DEFENSE ---
         print(f"➡️  Scarico DEFENSE: {lg['defense_url']}")
@@ -632,60 +692,7 @@ def main():
         print(f"   ➜ Dati PLAYINGTIME aggiunti")
 
         # --- Merge + calcolo rating + upsert Mongo ---
-        bulk_ops = []
-
-        for (player_name, team_name), data in defs.items():
-            tkl_def3rd_per90  = data.get("tkl_def3rd_per90")
-            tkl_int_per90     = data.get("tkl_int_per90")
-            tklw_per90        = data.get("tklw_per90")
-            aerials_won_per90 = data.get("aerials_won_per90")
-            on_ga_per90       = data.get("on_ga_per90")
-            clr_per90         = data.get("clr_per90")
-
-            rating_puro = compute_def_rating(
-                tkl_def3rd_per90,
-                tkl_int_per90,
-                tklw_per90,
-                aerials_won_per90,
-                on_ga_per90,
-                clr_per90,
-            )
-
-            doc_filter = {
-                "season": SEASON,
-                "league_code": lg["code"],
-                "team_name_fbref": team_name,
-                "player_name_fbref": player_name,
-            }
-
-            def_stats = {
-                "tkl_def3rd_per90": tkl_def3rd_per90,
-                "tkl_int_per90": tkl_int_per90,
-                "tklw_per90": tklw_per90,
-                "aerials_won_per90": aerials_won_per90,
-                "on_ga_per90": on_ga_per90,
-                "clr_per90": clr_per90,
-            }
-
-            doc_update = {
-                "$set": {
-                    "season": SEASON,
-                    "league_code": lg["code"],
-                    "league_name": lg["name"],
-                    "team_name_fbref": team_name,
-                    "player_name_fbref": player_name,
-                    "pos_raw": data.get("pos_raw"),
-                    "role": data.get("role"),
-                    "minutes_90s": data.get("minutes_90s"),
-                    "def_stats": def_stats,
-                    "def_rating": {
-                        "rating_puro": rating_puro,
-                    },
-                    "source": "fbref",
-                }
-            }
-
-            bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+        bulk_ops = build_bulk_ops(lg, defs)
 
         if bulk_ops:
             print(f"   💾 Scrivo {len(bulk_ops)} documenti in Mongo...")
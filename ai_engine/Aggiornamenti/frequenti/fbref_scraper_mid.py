@@ -374,6 +374,19 @@ def extract_table_from_comments_or_dom(html: str, id_regex: str):
     return table
 
 
+def fetch_rows(scraper, url: str, id_regex: str) -> list:
+    """Scarica la pagina e restituisce le righe <tr> della tabella (lista vuota se non disponibile)."""
+    resp = scraper.get(url, timeout=40)
+    if resp.status_code != 200:
+        return []
+
+    table = extract_table_from_comments_or_dom(resp.text, id_regex)
+    if not table:
+        return []
+
+    return table.find("tbody").find_all("tr")
+
+
 def parse_float_safe(val: str | None):
     if val is None:
         return None
@@ -462,18 +475,12 @@ def compute_mid_rating(
 # ================== SCRAPING 4 TABELLE ==================
 
 def scrape_standard_mids(scraper, url: str) -> Dict[tuple, Dict[str, Any]]:
-    """Estrae centrocampisti dalla tabella STANDARD."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return {}
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_standard")
-    if not table:
-        return {}
+    """Scarica la pagina e applica parse_standard_mids."""
+    return parse_standard_mids(fetch_rows(scraper, url, r"stats_standard"))
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_standard_mids(rows: list) -> Dict[tuple, Dict[str, Any]]:
+    """Estrae centrocampisti dalla tabella STANDARD. Righe <tr> già estratte dalla tabella."""
     mids: Dict[tuple, Dict[str, Any]] = {}
 
     for r in rows:
@@ -538,18 +545,12 @@ def scrape_standard_mids(scraper, url: str) -> Dict[tuple, Dict[str, Any]]:
 
 
 def scrape_passing(scraper, url: str, mids: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge Cmp% (passes_pct)."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
+    """Scarica la pagina e applica parse_passing."""
+    return parse_passing(fetch_rows(scraper, url, r"stats_passing"), mids)
 
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_passing")
-    if not table:
-        return
-
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_passing(rows: list, mids: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge Cmp% (passes_pct). Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -573,18 +574,12 @@ def scrape_passing(scraper, url: str, mids: Dict[tuple, Dict[str, Any]]) -> None
 
 
 def scrape_defense(scraper, url: str, mids: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge TklW/90."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
+    """Scarica la pagina e applica parse_defense."""
+    return parse_defense(fetch_rows(scraper, url, r"stats_defense"), mids)
 
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_defense")
-    if not table:
-        return
-
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_defense(rows: list, mids: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge TklW/90. Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -616,18 +611,12 @@ def scrape_defense(scraper, url: str, mids: Dict[tuple, Dict[str, Any]]) -> None
 
 
 def scrape_misc(scraper, url: str, mids: Dict[tuple, Dict[str, Any]]) -> None:
-    """Aggiunge Rec/90 e Aerials Won%."""
-    resp = scraper.get(url, timeout=40)
-    if resp.status_code != 200:
-        return
-
-    table = extract_table_from_comments_or_dom(resp.text, r"stats_misc")
-    if not table:
-        return
+    """Scarica la pagina e applica parse_misc."""
+    return parse_misc(fetch_rows(scraper, url, r"stats_misc"), mids)
 
-    tbody = table.find("tbody")
-    rows = tbody.find_all("tr")
 
+def parse_misc(rows: list, mids: Dict[tuple, Dict[str, Any]]) -> None:
+    """Aggiunge Rec/90 e Aerials Won%. Righe <tr> già estratte dalla tabella."""
     for r in rows:
         if "class" in r.attrs and ("thead" in " ".join(r["class"]) or "spacer" in " ".join(r["class"])):
             continue
@@ -662,6 +651,77 @@ def scrape_misc(scraper, url: str, mids: Dict[tuple, Dict[str, Any]]) -> None:
         mids[key]["aerials_won_pct"] = aerials_pct
 
 
+# ================== MONGO ==================
+
+def get_collection(lg):
+    """Collezione dinamica in base al code (coppe europee separate)."""
+    if lg['code'] == 'UCL':
+        return db["players_stats_fbref_mid_ucl"]
+    elif lg['code'] == 'UEL':
+        return db["players_stats_fbref_mid_uel"]
+    return db["players_stats_fbref_mid"]
+
+
+def build_bulk_ops(lg, mids: Dict[tuple, Dict[str, Any]]) -> list:
+    """Rating + upsert Mongo per i giocatori di una lega."""
+    bulk_ops = []
+
+    for (player_name, team_name), data in mids.items():
+        g_pk_per90      = data.get("g_pk_per90")
+        ast_per90       = data.get("ast_per90")
+        cmp_pct         = data.get("cmp_pct")
+        tklw_per90      = data.get("tklw_per90")
+        rec_per90       = data.get("rec_per90")
+        aerials_won_pct = data.get("aerials_won_pct")
+
+        rating_puro = compute_mid_rating(
+            g_pk_per90,
+            ast_per90,
+            cmp_pct,
+            tklw_per90,
+            rec_per90,
+            aerials_won_pct,
+        )
+
+        doc_filter = {
+            "season": SEASON,
+            "league_code": lg["code"],
+            "team_name_fbref": team_name,
+            "player_name_fbref": player_name,
+        }
+
+        mid_stats = {
+            "g_pk_per90": g_pk_per90,
+            "ast_per90": ast_per90,
+            "cmp_pct": cmp_pct,
+            "tklw_per90": tklw_per90,
+            "rec_per90": rec_per90,
+            "aerials_won_pct": aerials_won_pct,
+        }
+
+        doc_update = {
+            "$set": {
+                "season": SEASON,
+                "league_code": lg["code"],
+                "league_name": lg["name"],
+                "team_name_fbref": team_name,
+                "player_name_fbref": player_name,
+                "pos_raw": data.get("pos_raw"),
+                "role": data.get("role"),
+                "minutes_90s": data.get("minutes_90s"),
+                "mid_stats": mid_stats,
+                "mid_rating": {
+                    "rating_puro": rating_puro,
+                },
+                "source": "fbref",
+            }
+        }
+
+        bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+
+    return bulk_ops
+
+
 # ================== MAIN SCRAPER ==================
 
 def main():
@@ -672,13 +732,7 @@ def main():
         print(f"🏆 LEGA: {lg['name']} ({lg['code']})")
         print("=" * 40)
         
-        # ✅ Collezione dinamica in base al code
-        if lg['code'] == 'UCL':
-            collection = db["players_stats_fbref_mid_ucl"]
-        elif lg['code'] == 'UEL':
-            collection = db["players_stats_fbref_mid_uel"]
-        else:
-            collection = db["players_stats_fbref_mid"]
+        collection = get_collection(lg)
 
         # --- STANDARD ---
         print(f"➡️  Scarico STANDARD: {lg['standard_url']}")
@@ -710,60 +764,7 @@ def main():
         print(f"   ➜ Dati MISC aggiunti")
 
         # --- Merge + calcolo rating + upsert Mongo ---
-        bulk_ops = []
-
-        for (player_name, team_name), data in mids.items():
-            g_pk_per90      = data.get("g_pk_per90")
-            ast_per90       = data.get("ast_per90")
-            cmp_pct         = data.get("cmp_pct")
-            tklw_per90      = data.get("tklw_per90")
-            rec_per90       = data.get("rec_per90")
-            aerials_won_pct = data.get("aerials_won_pct")
-
-            rating_puro = compute_mid_rating(
-                g_pk_per90,
-                ast_per90,
-                cmp_pct,
-                tklw_per90,
-                rec_per90,
-                aerials_won_pct,
-            )
-
-            doc_filter = {
-                "season": SEASON,
-                "league_code": lg["code"],
-                "team_name_fbref": team_name,
-                "player_name_fbref": player_name,
-            }
-
-            mid_stats = {
-                "g_pk_per90": g_pk_per90,
-                "ast_per90": ast_per90,
-                "cmp_pct": cmp_pct,
-                "tklw_per90": tklw_per90,
-                "rec_per90": rec_per90,
-                "aerials_won_pct": aerials_won_pct,
-            }
-
-            doc_update = {
-                "$set": {
-                    "season": SEASON,
-                    "league_code": lg["code"],
-                    "league_name": lg["name"],
-                    "team_name_fbref": team_name,
-                    "player_name_fbref": player_name,
-                    "pos_raw": data.get("pos_raw"),
-                    "role": data.get("role"),
-                    "minutes_90s": data.get("minutes_90s"),
-                    "mid_stats": mid_stats,
-                    "mid_rating": {
-                        "rating_puro": rating_puro,
-                    },
-                    "source": "fbref",
-                }
-            }
-
-            bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+        bulk_ops = build_bulk_ops(lg, mids)
 
         if bulk_ops:
             print(f"   💾 Scrivo {len(bulk_ops)} documenti in Mongo...")
@@ -266,6 +266,7 @@ class BrowserIntelligente:
                         self.text = html_content
                         self.content = html_content.encode('utf-8')
                         self.status_code = 200
+                        self.from_cache = True  # nessuna navigazione: niente pausa anti-ban
                 return RispostaCache(cached_html)
         except Exception:
             pass
@@ -0,0 +1,362 @@
+"""
+HTTP FETCH - Download concorrente con rate limit per sito, retry e parsing in pipeline
+======================================================================================
+Strato comune per gli scraper requests + BeautifulSoup. Al posto di un
+requests.get bloccante per pagina con time.sleep fisso in mezzo:
+  - Session per thread con connection pool (keep-alive: niente handshake TLS a pagina)
+  - rate limit per sito a token bucket (richieste/secondo + burst), condiviso tra i thread
+  - concorrenza limitata (max_workers thread)
+  - retry con backoff esponenziale + jitter su errori di rete, 429 e 5xx (Retry-After rispettato)
+  - parsing nel thread che ha scaricato la pagina: mentre una pagina viene parsata
+    le altre sono già in download, e lo scraper consuma i risultati come stream
+  - opzionale: cache pagine condivisa (page_cache) con rivalidazione ETag/Last-Modified
+
+Il tempo totale diventa ~ n_pagine / rate invece di n_pagine × (latenza + sleep).
+
+Usage:
+    from http_fetch import Fetcher
+
+    fetcher = Fetcher(headers=HEADERS, rate=3.0, max_workers=4, cache=get_cache())
+    for page in fetcher.stream(urls, parse=parse_html, ordered=True):
+        if page.ok:
+            use(page.value)
+        else:
+            print(page.error)
+    fetcher.print_report()
+
+Test offline contro uno stand-in locale con pagine registrate:
+    HTTP_FETCH_RECORD_DIR=_http_pages python scraper_quote_betexplorer.py --dry-run   # registra
+    python http_fetch.py serve _http_pages --port 8765                                # stand-in
+    HTTP_FETCH_REDIRECT=http://127.0.0.1:8765 python scraper_quote_betexplorer.py --dry-run
+"""
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_RATE = 2.0                       # richieste/secondo per sito
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0                    # secondi al primo retry, poi ×2
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Stand-in locale: redirige tutte le richieste e/o registra le pagine scaricate
+REDIRECT_BASE = os.getenv('HTTP_FETCH_REDIRECT')
+RECORD_DIR = os.getenv('HTTP_FETCH_RECORD_DIR')
+
+
+class _TokenBucket:
+    """rate token/s, al massimo burst accumulati. acquire() prenota il prossimo slot e aspetta."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._t) * self.rate)
+            self._t = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class FetchResult:
+    __slots__ = ('url', 'key', 'status', 'value', 'error', 'attempts', 'elapsed', 'size')
+
+    def __init__(self, url, key):
+        self.url = url
+        self.key = key
+        self.status = None
+        self.value = None
+        self.error = None
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.size = 0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class FetchStats:
+    """Contatori per sito: richieste, esiti, retry, byte, attese del rate limit, tempo di rete."""
+
+    FIELDS = ('requests', 'ok', 'cached', 'failed', 'retries', 'bytes', 'wait_s', 'net_s', 'parse_s')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_host = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def add(self, host, **values):
+        with self._lock:
+            row = self.by_host[host]
+            for k, v in values.items():
+                row[k] += v
+
+    def print_report(self, file=None, wall=None):
+        file = file or sys.stdout
+        print("\n🌐 [HTTP] Riepilogo download" + (f" — {wall:.1f}s" if wall is not None else ""), file=file)
+        for host, row in sorted(self.by_host.items()):
+            print(f"   {host:<32} {row['requests']:>4} req  {row['ok']:>4} ok  {row['cached']:>4} cache  "
+                  f"{row['failed']:>3} ko  "
+                  f"{row['retries']:>3} retry  {row['bytes'] / 1e6:>6.1f}MB  "
+                  f"rete {row['net_s']:.1f}s  attesa rate {row['wait_s']:.1f}s  parse {row['parse_s']:.1f}s",
+                  file=file)
+
+
+def _page_path(base_dir, url):
+    """File di una pagina registrata: <dir>/<host>/<path>[__query]/index.html."""
+    parts = urlsplit(url)
+    path = parts.path.strip('/')
+    if parts.query:
+        path += '__' + re.sub(r'[^\w.=-]', '_', parts.query)
+    return os.path.join(base_dir, parts.netloc, *[p for p in path.split('/') if p], 'index.html')
+
+
+class Fetcher:
+    """
+    rate: richieste/secondo per sito (default per tutti); host_rates: {host: rate} specifici.
+    max_workers: download contemporanei (tutti i siti insieme).
+    cache: PageCache (page_cache.get_cache()) o None. Le pagine fresche non passano dal rate limit.
+    """
+
+    def __init__(self, headers=None, rate=DEFAULT_RATE, burst=None, host_rates=None,
+                 max_workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 timeout=20, retry_statuses=RETRY_STATUSES, cache=None):
+        self.headers = dict(headers or {})
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = dict(host_rates or {})
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.retry_statuses = set(retry_statuses)
+        self.cache = cache
+        self.stats = FetchStats()
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = time.time()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # DOWNLOAD SINGOLO
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _bucket(self, host):
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = _TokenBucket(self.host_rates.get(host, self.rate), self.burst)
+            return bucket
+
+    @staticmethod
+    def _target(url):
+        if not REDIRECT_BASE:
+            return url
+        parts = urlsplit(url)
+        return f"{REDIRECT_BASE.rstrip('/')}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF)
+        delay = min(self.backoff * (2 ** (attempt - 1)), MAX_BACKOFF)
+        return delay * random.uniform(0.75, 1.25)
+
+    def fetch(self, url, key=None, parse=None):
+        """Scarica (con rate limit e retry) ed eventualmente parsa. Non solleva: l'errore va in result.error."""
+        result = FetchResult(url, key if key is not None else url)
+        host = urlsplit(url).netloc
+        t_start = time.time()
+
+        cached = self.cache.lookup(url) if self.cache is not None else None
+        if cached is not None and cached.fresh:
+            self.cache.hit(cached)
+            self.stats.add(host, cached=1)
+            result.status = 200
+            return self._parse(result, host, cached.text, parse, t_start)
+
+        bucket = self._bucket(host)
+        session = self._session()
+        conditional = cached.validators() if cached is not None else {}
+        response = None
+
+        for attempt in range(1, self.retries + 2):
+            result.attempts = attempt
+            waited = bucket.acquire()
+            t_net = time.time()
+            try:
+                response = session.get(self._target(url), headers=conditional or None, timeout=self.timeout)
+                error = None
+            except requests.RequestException as e:
+                response, error = None, f"{type(e).__name__}: {e}"
+            self.stats.add(host, requests=1, wait_s=waited, net_s=time.time() - t_net)
+
+            if response is not None:
+                result.status = response.status_code
+                if response.status_code == 200 or (response.status_code == 304 and conditional):
+                    break
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in self.retry_statuses:
+                    break
+            if attempt > self.retries:
+                break
+            self.stats.add(host, retries=1)
+            time.sleep(self._retry_delay(attempt, response))
+
+        if response is not None and response.status_code == 304 and conditional:
+            self.cache.revalidated(cached, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            self.stats.add(host, cached=1)
+            return self._parse(result, host, cached.text, parse, t_start)
+
+        if response is None or response.status_code != 200:
+            result.error = error
+            result.elapsed = time.time() - t_start
+            self.stats.add(host, failed=1)
+            return result
+
+        text = response.text
+        result.size = len(response.content)
+        self.stats.add(host, ok=1, bytes=result.size)
+        if RECORD_DIR:
+            self._record(url, text)
+        if self.cache is not None:
+            self.cache.put(url, response.content, encoding=response.encoding,
+                           etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+        return self._parse(result, host, text, parse, t_start)
+
+    def _parse(self, result, host, text, parse, t_start):
+        if parse is None:
+            result.value = text
+        else:
+            t_parse = time.time()
+            try:
+                result.value = parse(text)
+            except Exception as e:
+                result.error = f"Parse {type(e).__name__}: {e}"
+            self.stats.add(host, parse_s=time.time() - t_parse)
+        result.elapsed = time.time() - t_start
+        return result
+
+    @staticmethod
+    def _record(url, text):
+        path = _page_path(RECORD_DIR, url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # BATCH IN STREAMING
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def stream(self, urls, parse=None, ordered=False):
+        """
+        Scarica un batch e restituisce i FetchResult man mano che arrivano.
+        urls: lista di url o di coppie (key, url). ordered=True: stesso ordine di urls
+        (le pagine successive continuano a scaricarsi mentre si consuma la prima).
+        """
+        items = [u if isinstance(u, tuple) else (u, u) for u in urls]
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch')
+        try:
+            futures = [pool.submit(self.fetch, url, key, parse) for key, url in items]
+            for future in (futures if ordered else as_completed(futures)):
+                yield future.result()
+        finally:
+            # Stream abbandonato a metà: le pagine non ancora partite non si scaricano
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def fetch_all(self, urls, parse=None):
+        """{key: FetchResult} per un batch intero."""
+        return {r.key: r for r in self.stream(urls, parse=parse)}
+
+    def print_report(self, file=None):
+        self.stats.print_report(file=file, wall=time.time() - self._t0)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# STAND-IN LOCALE (pagine registrate)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def serve(directory, port=8765, latency=0.0):
+    """
+    Serve le pagine registrate con HTTP_FETCH_RECORD_DIR: /<host>/<path> → file registrato.
+    latency: ritardo artificiale per risposta (simula la rete reale nei benchmark).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            host, _, rest = self.path.lstrip('/').partition('/')
+            path = _page_path(directory, f"http://{host}/{rest}")
+            if latency:
+                time.sleep(latency)
+            if not os.path.exists(path):
+                self.send_error(404, f"Pagina non registrata: {host}/{rest}")
+                return
+            with open(path, 'rb') as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+    print(f"🧪 Stand-in HTTP su http://127.0.0.1:{server.server_address[1]} (pagine da {directory})")
+    return server
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Stand-in HTTP locale per le pagine registrate")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_serve = sub.add_parser('serve', help="serve le pagine registrate con HTTP_FETCH_RECORD_DIR")
+    p_serve.add_argument('directory')
+    p_serve.add_argument('--port', type=int, default=8765)
+    p_serve.add_argument('--latency', type=float, default=0.0, help="secondi di ritardo per risposta")
+    args = parser.parse_args()
+
+    server = serve(args.directory, args.port, args.latency)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""
+PAGE CACHE - Cache pagine HTML condivisa da tutti gli scraper
+=============================================================
+Evoluzione di fbref_cache.py (HTML grezzo per URL per giorno, solo FBref):
+  - contenuto compresso (zlib) e indirizzato per hash: la stessa pagina rivalidata,
+    o URL diversi con lo stesso HTML, occupano un solo blob
+  - TTL per sorgente (SOURCE_TTL): "day" = valida fino a mezzanotte, altrimenti secondi
+  - rivalidazione condizionale (If-None-Match / If-Modified-Since) quando la sorgente
+    manda ETag / Last-Modified: un 304 rinfresca la voce senza riscaricare la pagina
+  - limite di spazio con eviction LRU (PAGE_CACHE_MAX_MB)
+  - statistiche hit / rivalidate / miss / byte risparmiati per sorgente
+
+Rilanciare nella stessa giornata uno step fallito dell'update_manager non riscarica
+le pagine ancora valide. Indice in SQLite (sicuro tra thread e tra gli step che
+girano in parallelo), blob in _cache_pages/blobs/<2 hex>/<sha256>.z
+
+Usage:
+    from page_cache import cached_get
+
+    resp = cached_get(url, headers=HEADERS, timeout=15)     # al posto di requests.get
+    if resp.status_code == 200:
+        soup = BeautifulSoup(resp.content, "html.parser")
+
+    from page_cache import get_cache
+    cache = get_cache()
+    html = cache.get(url)                 # None se assente o scaduta
+    cache.put(url, html)
+
+CLI:
+    python page_cache.py stats                         # voci, spazio e statistiche di oggi
+    python page_cache.py purge [--source fbref] [--days 2]
+
+Variabili d'ambiente:
+    PAGE_CACHE_DIR, PAGE_CACHE_MAX_MB (default 500), PAGE_CACHE_DISABLE=1,
+    PAGE_CACHE_TTL_<SORGENTE> (secondi o "day", es. PAGE_CACHE_TTL_BETEXPLORER=600)
+"""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+CACHE_DIR = os.getenv('PAGE_CACHE_DIR') or os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "_cache_pages")
+)
+MAX_BYTES = int(float(os.getenv('PAGE_CACHE_MAX_MB', '500')) * 1024 * 1024)
+DISABLED = os.getenv('PAGE_CACHE_DISABLE') == '1'
+MAX_AGE_DAYS = 3            # voci mai più rivalidate da N giorni: eliminate comunque
+EVICT_EVERY = 50            # controllo dello spazio ogni N scritture
+
+# Quanto resta valida una pagina senza tornare sul sito
+SOURCE_TTL = {
+    "fbref": "day",
+    "soccerstats": "day",
+    "transfermarkt": 21600,  # calendario + risultati: 6 ore
+    "clubelo": "day",
+    "nowgoal": 3600,
+    "betexplorer": 1200,    # quote in movimento: 20 minuti
+}
+DEFAULT_TTL = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    encoding TEXT,
+    size INTEGER NOT NULL,
+    csize INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    validated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_lru ON pages(accessed_at);
+CREATE INDEX IF NOT EXISTS pages_blob ON pages(blob);
+CREATE TABLE IF NOT EXISTS stats (
+    day TEXT NOT NULL,
+    source TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    revalidated INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    bytes_saved INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, source)
+);
+"""
+
+STAT_FIELDS = ('hits', 'revalidated', 'misses', 'bytes_saved')
+
+
+def source_of(url):
+    """Sorgente di una pagina dal dominio (chiave di SOURCE_TTL), altrimenti il dominio stesso."""
+    host = urlsplit(url).netloc.lower()
+    for source in SOURCE_TTL:
+        if source in host:
+            return source
+    return host
+
+
+def ttl_of(source):
+    env = os.getenv(f"PAGE_CACHE_TTL_{source.upper().replace('.', '_')}")
+    if env:
+        return env if env == "day" else float(env)
+    return SOURCE_TTL.get(source, DEFAULT_TTL)
+
+
+class CachedPage:
+    """Voce dell'indice. content/text caricati dal blob solo quando servono."""
+
+    __slots__ = ('url', 'source', 'blob', 'encoding', 'size', 'validated_at', 'etag', 'last_modified',
+                 'fresh', '_cache', '_content')
+
+    def __init__(self, cache, row, now):
+        (self.url, self.source, self.blob, self.encoding, self.size,
+         self.validated_at, self.etag, self.last_modified) = row
+        self._cache = cache
+        self._content = None
+        ttl = ttl_of(self.source)
+        if ttl == "day":
+            self.fresh = datetime.fromtimestamp(self.validated_at).date() == datetime.fromtimestamp(now).date()
+        else:
+            self.fresh = now - self.validated_at < ttl
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self._cache._read_blob(self.blob)
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def validators(self):
+        """Header per la richiesta condizionale (vuoto se la sorgente non manda ETag/Last-Modified)."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class CachedResponse:
+    """Quel che gli scraper usano di requests.Response, servito dalla cache."""
+
+    def __init__(self, page):
+        self.url = page.url
+        self.status_code = 200
+        self.ok = True
+        self.encoding = page.encoding
+        self.content = page.content
+        self.headers = {}
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class PageCache:
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(directory, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+        self._writes = 0
+        self._db().executescript(_SCHEMA)
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, source, **values):
+        with self._lock:
+            row = self._stats[source]
+            for k, v in values.items():
+                row[k] += v
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # BLOB COMPRESSI
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.z")
+
+    def _write_blob(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return digest, os.path.getsize(path)
+        data = zlib.compress(content, 6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return digest, len(data)
+
+    def _read_blob(self, digest):
+        with open(self._blob_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # LETTURA / SCRITTURA
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def lookup(self, url):
+        """Voce in cache (fresca o scaduta ma rivalidabile), None se assente o blob perso."""
+        if DISABLED:
+            return None
+        row = self._db().execute(
+            "SELECT url, source, blob, encoding, size, validated_at, etag, last_modified "
+            "FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        page = CachedPage(self, row, time.time())
+        if page.fresh or page.etag or page.last_modified:
+            try:
+                page.content
+            except (OSError, zlib.error):
+                # Blob eliminato da un altro processo (eviction) o corrotto: come assente
+                self._db().execute("DELETE FROM pages WHERE url = ?", (url,))
+                return None
+        return page
+
+    def hit(self, page):
+        """Pagina fresca servita dalla cache."""
+        self._db().execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), page.url))
+        self._count(page.source, hits=1, bytes_saved=page.size)
+
+    def revalidated(self, page, etag=None, last_modified=None):
+        """Il sito ha risposto 304: la copia in cache è ancora buona."""
+        now = time.time()
+        self._db().execute(
+            "UPDATE pages SET validated_at = ?, accessed_at = ?, etag = COALESCE(?, etag), "
+            "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+            (now, now, etag, last_modified, page.url))
+        self._count(page.source, revalidated=1, bytes_saved=page.size)
+
+    def get(self, url):
+        """Testo della pagina se fresca, altrimenti None."""
+        page = self.lookup(url)
+        if page is None or not page.fresh:
+            return None
+        self.hit(page)
+        return page.text
+
+    def put(self, url, content, encoding=None, etag=None, last_modified=None):
+        """Salva una pagina appena scaricata (str o bytes). Conta come miss."""
+        if DISABLED:
+            return
+        if isinstance(content, str):
+            content, encoding = content.encode('utf-8'), 'utf-8'
+        source = source_of(url)
+        try:
+            digest, csize = self._write_blob(content)
+            now = time.time()
+            self._db().execute(
+                "INSERT OR REPLACE INTO pages (url, source, blob, encoding, size, csize, fetched_at, "
+                "validated_at, accessed_at, etag, last_modified) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                (url, source, digest, encoding, len(content), csize, now, now, now, etag, last_modified))
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ [CACHE] Salvataggio fallito per {url}: {e}", file=sys.stderr)
+            return
+        self._count(source, misses=1)
+
+        with self._lock:
+            self._writes += 1
+            check = self._writes % EVICT_EVERY == 1
+        if check:
+            self.evict()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # SPAZIO: LRU + ETÀ MASSIMA
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def _disk_bytes(self, db):
+        row = db.execute("SELECT SUM(csize) FROM (SELECT MAX(csize) AS csize FROM pages GROUP BY blob)").fetchone()
+        return row[0] or 0
+
+    def _drop(self, db, urls):
+        """Elimina le voci e i blob non più referenziati da nessun URL."""
+        blobs = set()
+        for url in urls:
+            row = db.execute("SELECT blob FROM pages WHERE url = ?", (url,)).fetchone()
+            if row:
+                db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                blobs.add(row[0])
+        for digest in blobs:
+            if db.execute("SELECT 1 FROM pages WHERE blob = ? LIMIT 1", (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+        return len(urls)
+
+    def evict(self):
+        """Scarta le voci troppo vecchie, poi le meno usate finché lo spazio scende al 90% del limite."""
+        db = self._db()
+        cutoff = time.time() - MAX_AGE_DAYS * 86400
+        dropped = self._drop(db, [r[0] for r in db.execute(
+            "SELECT url FROM pages WHERE validated_at < ?", (cutoff,))])
+
+        total = self._disk_bytes(db)
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            victims = []
+            for url, csize in db.execute("SELECT url, csize FROM pages ORDER BY accessed_at"):
+                if total <= target:
+                    break
+                victims.append(url)
+                total -= csize
+            dropped += self._drop(db, victims)
+        return dropped
+
+    def purge(self, source=None, older_than_days=None):
+        """Svuota la cache (tutta, per sorgente e/o per età)."""
+        db = self._db()
+        query, params = "SELECT url FROM pages WHERE 1=1", []
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if older_than_days is not None:
+            query += " AND validated_at < ?"
+            params.append(time.time() - older_than_days * 86400)
+        return self._drop(db, [r[0] for r in db.execute(query, params)])
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # STATISTICHE
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def flush_stats(self):
+        """Somma le statistiche di questo processo a quelle di oggi nell'indice."""
+        with self._lock:
+            pending = {s: dict(v) for s, v in self._stats.items() if any(v.values())}
+            self._stats.clear()
+        if not pending:
+            return
+        day = datetime.now().strftime("%Y-%m-%d")
+        try:
+            db = self._db()
+            for source, v in pending.items():
+                db.execute(
+                    "INSERT INTO stats (day, source, hits, revalidated, misses, bytes_saved) VALUES (?,?,?,?,?,?) "
+                    "ON CONFLICT(day, source) DO UPDATE SET hits = hits + excluded.hits, "
+                    "revalidated = revalidated + excluded.revalidated, misses = misses + excluded.misses, "
+                    "bytes_saved = bytes_saved + excluded.bytes_saved",
+                    (day, source, v['hits'], v['revalidated'], v['misses'], v['bytes_saved']))
+        except sqlite3.Error:
+            pass
+
+    def print_stats(self, file=None):
+        file = file or sys.stdout
+        with self._lock:
+            rows = {s: dict(v) for s, v in self._stats.items() if any(v.values())}
+        if not rows:
+            return
+        print("\n💾 [CACHE] Pagine", file=file)
+        for source, v in sorted(rows.items()):
+            total = v['hits'] + v['revalidated'] + v['misses']
+            rate = (v['hits'] + v['revalidated']) / total * 100 if total else 0
+            print(f"   {source:<20} {v['hits']:>4} hit  {v['revalidated']:>4} rivalidate (304)  "
+                  f"{v['misses']:>4} miss  ({rate:.0f}% dalla cache, {v['bytes_saved'] / 1e6:.1f}MB risparmiati)",
+                  file=file)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _at_exit():
+    if _cache is not None:
+        _cache.print_stats()
+        _cache.flush_stats()
+
+
+def get_cache():
+    """Cache condivisa del processo (creata al primo uso)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+            atexit.register(_at_exit)
+        return _cache
+
+
+def cached_get(url, headers=None, timeout=20, session=None, cache=None):
+    """
+    requests.get con cache: pagina fresca → CachedResponse senza rete; scaduta ma con
+    ETag/Last-Modified → richiesta condizionale (304 → CachedResponse); altrimenti download
+    e salvataggio. Le risposte non-200 passano invariate e non vengono salvate.
+    """
+    import requests
+
+    cache = cache or get_cache()
+    page = cache.lookup(url)
+    if page is not None and page.fresh:
+        cache.hit(page)
+        return CachedResponse(page)
+
+    req_headers = dict(headers or {})
+    if page is not None:
+        req_headers.update(page.validators())
+    resp = (session or requests).get(url, headers=req_headers, timeout=timeout)
+
+    if resp.status_code == 304 and page is not None:
+        cache.revalidated(page, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+        return CachedResponse(page)
+    if resp.status_code == 200:
+        cache.put(url, resp.content, encoding=resp.encoding,
+                  etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+    return resp
+
+
+def _print_overview(cache):
+    db = cache._db()
+    print(f"💾 Cache pagine: {cache.directory}")
+    print(f"   {'Sorgente':<20} {'Voci':>6} {'Originale':>11} {'Su disco':>10}  TTL")
+    for source, n, size, csize in db.execute(
+            "SELECT source, COUNT(*), SUM(size), SUM(csize) FROM pages GROUP BY source ORDER BY source"):
+        print(f"   {source:<20} {n:>6} {size / 1e6:>9.1f}MB {csize / 1e6:>8.1f}MB  {ttl_of(source)}")
+    print(f"   Totale su disco (blob deduplicati): {cache._disk_bytes(db) / 1e6:.1f}MB / {cache.max_bytes / 1e6:.0f}MB")
+
+    day = datetime.now().strftime("%Y-%m-%d")
+    rows = db.execute("SELECT source, hits, revalidated, misses, bytes_saved FROM stats WHERE day = ? "
+                      "ORDER BY source", (day,)).fetchall()
+    if rows:
+        print(f"\n   Oggi ({day}):")
+        for source, hits, reval, misses, saved in rows:
+            print(f"   {source:<20} {hits:>5} hit  {reval:>4} 304  {misses:>5} miss  {saved / 1e6:.1f}MB risparmiati")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Cache pagine condivisa degli scraper")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('stats', help="voci, spazio occupato e statistiche di oggi")
+    p_purge = sub.add_parser('purge', help="svuota la cache")
+    p_purge.add_argument('--source', help="solo questa sorgente (es. fbref, betexplorer)")
+    p_purge.add_argument('--days', type=float, help="solo voci non rivalidate da più di N giorni")
+    args = parser.parse_args()
+
+    cache = PageCache()
+    if args.cmd == 'stats':
+        _print_overview(cache)
+    else:
+        n = cache.purge(source=args.source, older_than_days=args.days)
+        print(f"🧹 Eliminate {n} pagine dalla cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,5 @@
 import os
 import sys
-import time
-import requests
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
 
@@ -14,6 +12,8 @@ while not os.path.exists(os.path.join(current_path, 'config.py')):
 sys.path.append(current_path)
 
 from config import db
+from http_fetch import Fetcher
+from page_cache import get_cache
 
 # COLLEZIONE PARALLELA (Sandbox)
 safe_col = db['matches_history_betexplorer']
@@ -128,79 +128,83 @@ def get_odd(cell):
     if span: return clean_float(span['data-odd'])
     return None
 
+def parse_results_html(html):
+    """Righe della pagina results/ di BetExplorer → documenti partita (senza campo league)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = soup.select('.table-main tr')
+    docs = []
+
+    for row in rows:
+        try:
+            cells = row.find_all('td')
+            if len(cells) < 5: continue
+
+            # 1. SQUADRE
+            match_text = cells[0].text.strip()
+            if "-" not in match_text: continue
+            parts = match_text.split("-")
+            home = parts[0].strip()
+            away = parts[1].strip()
+
+            # 2. RISULTATO
+            score_text = cells[1].text.strip()
+            if ":" not in score_text: continue
+            score_parts = score_text.split(":")
+            gh = int(score_parts[0])
+            ga = int(score_parts[1])
+
+            # 3. QUOTE (da attributo data-odd)
+            o1 = get_odd(cells[2])
+            ox = get_odd(cells[3])
+            o2 = get_odd(cells[4])
+
+            # 4. DATA (Ultima cella)
+            date_text = cells[-1].text
+            formatted_date = parse_date_cell(date_text)
+
+            # Logica risultato 1X2
+            if gh > ga: res = '1'
+            elif ga > gh: res = '2'
+            else: res = 'X'
+
+            docs.append({
+                "date": formatted_date,
+                "homeTeam": home,
+                "awayTeam": away,
+                "homeGoals": gh,
+                "awayGoals": ga,
+                "result": res,
+                "odds_1": o1, "odds_x": ox, "odds_2": o2,
+                "source": "betexplorer",
+                "unique_id": f"{formatted_date}_{home}_{away}"
+            })
+
+        except:
+            continue
+    return docs
+
 def run_scraper():
     print("🚀 AVVIO SCRAPER V4 (BeautifulSoup - NO Selenium)...")
 
     ALL_MATCHES_BUFFER = []
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'}
 
-    for league in LEAGUES:
-        print(f"\n🌍 Scarico {league['name']}...")
-        try:
-            r = requests.get(league['url'], headers=headers, timeout=20)
-            if r.status_code != 200:
-                print(f"   ❌ HTTP {r.status_code}")
-                continue
-
-            soup = BeautifulSoup(r.text, 'html.parser')
-            rows = soup.select('.table-main tr')
-            league_count = 0
-
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) < 5: continue
-
-                    # 1. SQUADRE
-                    match_text = cells[0].text.strip()
-                    if "-" not in match_text: continue
-                    parts = match_text.split("-")
-                    home = parts[0].strip()
-                    away = parts[1].strip()
-
-                    # 2. RISULTATO
-                    score_text = cells[1].text.strip()
-                    if ":" not in score_text: continue
-                    score_parts = score_text.split(":")
-                    gh = int(score_parts[0])
-                    ga = int(score_parts[1])
-
-                    # 3. QUOTE (da attributo data-odd)
-                    o1 = get_odd(cells[2])
-                    ox = get_odd(cells[3])
-                    o2 = get_odd(cells[4])
-
-                    # 4. DATA (Ultima cella)
-                    date_text = cells[-1].text
-                    formatted_date = parse_date_cell(date_text)
-
-                    # Logica risultato 1X2
-                    if gh > ga: res = '1'
-                    elif ga > gh: res = '2'
-                    else: res = 'X'
-
-                    doc = {
-                        "league": league['name'],
-                        "date": formatted_date,
-                        "homeTeam": home,
-                        "awayTeam": away,
-                        "homeGoals": gh,
-                        "awayGoals": ga,
-                        "result": res,
-                        "odds_1": o1, "odds_x": ox, "odds_2": o2,
-                        "source": "betexplorer",
-                        "unique_id": f"{formatted_date}_{home}_{away}"
-                    }
-                    ALL_MATCHES_BUFFER.append(doc)
-                    league_count += 1
-
-                except:
-                    continue
-            print(f"   📦 Trovate: {league_count} partite.")
-            time.sleep(0.5)
-
-        except Exception as e:
-            print(f"   ❌ Errore: {e}")
+    # Download + parsing in parallel con rate limit su betexplorer.com (al posto di sleep(0.5) seriale)
+    fetcher = Fetcher(headers=headers, rate=2.0, max_workers=4, cache=get_cache())
+    pages = fetcher.stream([(league['name'], league['url']) for league in LEAGUES],
+                           parse=parse_results_html, ordered=True)
+
+    for page in pages:
+        print(f"\n🌍 Scarico {page.key}...")
+        if not page.ok:
+            print(f"   ❌ {page.error}")
+            continue
+
+        for doc in page.value:
+            ALL_MATCHES_BUFFER.append({"league": page.key, **doc})
+        print(f"   📦 Trovate: {len(page.value)} partite.")
+
+    fetcher.print_report()
 
     # SALVATAGGIO FINALE
     if len(ALL_MATCHES_BUFFER) > 50:
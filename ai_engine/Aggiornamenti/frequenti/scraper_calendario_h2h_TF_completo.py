@@ -5,7 +5,6 @@ import random
 import re
 from datetime import datetime
 from bs4 import BeautifulSoup
-import requests
 
 # --- FIX PERCORSI UNIVERSALE ---
 current_path = os.path.dirname(os.path.abspath(__file__))
@@ -17,6 +16,7 @@ while not os.path.exists(os.path.join(current_path, 'config.py')):
 sys.path.append(current_path)
 
 from config import db
+from page_cache import cached_get
 
 COLLECTION_NAME = "h2h_by_round"
 
@@ -101,8 +101,9 @@ def scrape_tm_calendar_v8():
             existing_docs_cache = {doc["_id"]: doc for doc in existing_docs}
             print(f"   📥 Cache: {len(existing_docs_cache)} round esistenti caricati")
 
-            time.sleep(random.uniform(3, 5))
-            resp = requests.get(league['url'], headers=HEADERS, timeout=15)
+            resp = cached_get(league['url'], headers=HEADERS, timeout=15)
+            if not getattr(resp, "from_cache", False):
+                time.sleep(random.uniform(3, 5))   # pausa anti-ban solo dopo un download vero
             soup = BeautifulSoup(resp.content, "html.parser")
 
             headers = soup.find_all("div", class_="content-box-headline")
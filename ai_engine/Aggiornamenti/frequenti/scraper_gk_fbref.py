@@ -407,6 +407,75 @@ def scrape_keepersadv_table(table) -> Dict[tuple, Dict[str, Any]]:
     return result
 
 
+# ================== MONGO ==================
+
+def get_collection(lg):
+    """Collezione dinamica in base al code (coppe europee separate)."""
+    if lg['code'] == 'UCL':
+        return db["players_stats_fbref_gk_ucl"]
+    elif lg['code'] == 'UEL':
+        return db["players_stats_fbref_gk_uel"]
+    return db["players_stats_fbref_gk"]
+
+
+def build_bulk_ops(lg, keepers_data: Dict[tuple, Dict[str, Any]],
+                   keepersadv_data: Dict[tuple, Dict[str, Any]]) -> list:
+    """Merge keepers + keepersadv, rating e upsert Mongo per i portieri di una lega."""
+    bulk_ops = []
+
+    for (player_name, team_name), base_row in keepers_data.items():
+        adv_row = keepersadv_data.get((player_name, team_name), {})
+
+        save_pct_all = parse_float_safe(base_row.get("gk_save_pct"))
+        save_pct_pk = parse_float_safe(base_row.get("gk_pens_save_pct"))
+        psxg_ga_per90 = parse_float_safe(adv_row.get("gk_psxg_net_per90"))
+        cross_stop_pct = parse_float_safe(adv_row.get("gk_crosses_stopped_pct"))
+
+        # ⭐ NUOVO: Estrai minutes_90s
+        minutes_90s = parse_float_safe(base_row.get("minutes_90s"))
+
+        rating_puro = compute_gk_rating(
+            save_pct_all,
+            save_pct_pk,
+            psxg_ga_per90,
+            cross_stop_pct,
+        )
+
+        doc_filter = {
+            "season": SEASON,
+            "league_code": lg["code"],
+            "team_name_fbref": team_name,
+            "player_name_fbref": player_name,
+        }
+
+        gk_stats = {
+            "gk_save_pct": save_pct_all,
+            "gk_pens_save_pct": save_pct_pk,
+            "gk_psxg_net_per90": psxg_ga_per90,
+            "gk_crosses_stopped_pct": cross_stop_pct,
+        }
+
+        doc_update = {
+            "$set": {
+                "season": SEASON,
+                "league_code": lg["code"],
+                "league_name": lg["name"],
+                "team_name_fbref": team_name,
+                "player_name_fbref": player_name,
+                "minutes_90s": minutes_90s,  # ⭐ NUOVO CAMPO
+                "gk_stats": gk_stats,
+                "gk_rating": {
+                    "rating_puro": rating_puro,
+                },
+                "source": "fbref",
+            }
+        }
+
+        bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+
+    return bulk_ops
+
+
 # ================== MAIN SCRAPER ==================
 
 def main():
@@ -417,13 +486,7 @@ def main():
         print(f"🏆 LEGA: {lg['name']} ({lg['code']})")
         print("=" * 40)
         
-        # ✅ Collezione dinamica in base al code
-        if lg['code'] == 'UCL':
-            collection = db["players_stats_fbref_gk_ucl"]
-        elif lg['code'] == 'UEL':
-            collection = db["players_stats_fbref_gk_uel"]
-        else:
-            collection = db["players_stats_fbref_gk"]
+        collection = get_collection(lg)
 
         # --- KEEPERS ---
         print(f"➡️  Scarico KEEPERS: {lg['keepers_url']}")
@@ -458,57 +521,7 @@ def main():
             keepersadv_data = {}
 
         # --- Merge + calcolo rating + upsert Mongo ---
-        bulk_ops = []
-
-        for (player_name, team_name), base_row in keepers_data.items():
-            adv_row = keepersadv_data.get((player_name, team_name), {})
-
-            save_pct_all = parse_float_safe(base_row.get("gk_save_pct"))
-            save_pct_pk = parse_float_safe(base_row.get("gk_pens_save_pct"))
-            psxg_ga_per90 = parse_float_safe(adv_row.get("gk_psxg_net_per90"))
-            cross_stop_pct = parse_float_safe(adv_row.get("gk_crosses_stopped_pct"))
-            
-            # ⭐ NUOVO: Estrai minutes_90s
-            minutes_90s = parse_float_safe(base_row.get("minutes_90s"))
-
-            rating_puro = compute_gk_rating(
-                save_pct_all,
-                save_pct_pk,
-                psxg_ga_per90,
-                cross_stop_pct,
-            )
-
-            doc_filter = {
-                "season": SEASON,
-                "league_code": lg["code"],
-                "team_name_fbref": team_name,
-                "player_name_fbref": player_name,
-            }
-
-            gk_stats = {
-                "gk_save_pct": save_pct_all,
-                "gk_pens_save_pct": save_pct_pk,
-                "gk_psxg_net_per90": psxg_ga_per90,
-                "gk_crosses_stopped_pct": cross_stop_pct,
-            }
-
-            doc_update = {
-                "$set": {
-                    "season": SEASON,
-                    "league_code": lg["code"],
-                    "league_name": lg["name"],
-                    "team_name_fbref": team_name,
-                    "player_name_fbref": player_name,
-                    "minutes_90s": minutes_90s,  # ⭐ NUOVO CAMPO
-                    "gk_stats": gk_stats,
-                    "gk_rating": {
-                        "rating_puro": rating_puro,
-                    },
-                    "source": "fbref",
-                }
-            }
-
-            bulk_ops.append(UpdateOne(doc_filter, doc_update, upsert=True))
+        bulk_ops = build_bulk_ops(lg, keepers_data, keepersadv_data)
 
         if bulk_ops:
             print(f"   💾 Scrivo {len(bulk_ops)} documenti in Mongo...")
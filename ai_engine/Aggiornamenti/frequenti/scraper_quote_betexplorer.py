@@ -24,6 +24,13 @@ from config import db
 import requests
 from bs4 import BeautifulSoup
 
+from http_fetch import Fetcher
+from page_cache import get_cache
+
+# BetExplorer: 72 pagine a run. Rate limit per sito al posto di sleep(0.3) seriale tra le richieste
+BE_RATE = 3.0          # richieste/secondo verso betexplorer.com
+BE_WORKERS = 4         # download contemporanei
+
 # ============================================================
 # CONFIGURAZIONE CAMPIONATI (36 campionati, 72 URL)
 # ============================================================
@@ -151,18 +158,23 @@ def parse_betexplorer_page(url):
     Scarica una pagina BetExplorer (results o fixtures) e restituisce un dict:
     { round_number: [ {home, away, odds_1, odds_x, odds_2}, ... ], ... }
     """
-    rounds_data = {}
-
     try:
         r = requests.get(url, headers=HEADERS, timeout=20)
         if r.status_code != 200:
             print(f"      ❌ HTTP {r.status_code} per {url}")
-            return rounds_data
+            return {}
     except Exception as e:
         print(f"      ❌ Errore richiesta {url}: {e}")
-        return rounds_data
+        return {}
+
+    return parse_betexplorer_html(r.text)
+
 
-    soup = BeautifulSoup(r.text, 'html.parser')
+def parse_betexplorer_html(html):
+    """Parsing di una pagina BetExplorer già scaricata (stesso formato di parse_betexplorer_page)."""
+    rounds_data = {}
+
+    soup = BeautifulSoup(html, 'html.parser')
     rows = soup.select('.table-main tr')
 
     current_round_num = None
@@ -391,9 +403,23 @@ def run_scraper(dry_run=False):
     debug_league = "Serie C - Girone A"  # Log dettagliato solo per questo campionato
     debug_lines = []
 
+    # Tutte le pagine results + fixtures in coda subito: si scaricano (e parsano) in parallelo
+    # mentre il loop lavora sul DB del campionato precedente. Ordine = LEAGUES_CONFIG.
+    fetcher = Fetcher(headers=HEADERS, rate=BE_RATE, max_workers=BE_WORKERS, cache=get_cache())
+    page_urls = []
+    for league in LEAGUES_CONFIG:
+        page_urls.append(f"{league['base']}/results/")
+        page_urls.append(f"{league['base']}/fixtures/")
+    pages = fetcher.stream(page_urls, parse=parse_betexplorer_html, ordered=True)
+
+    def _page_data(page):
+        if not page.ok:
+            print(f"      ❌ {page.error} per {page.url}")
+            return {}
+        return page.value
+
     for idx, league in enumerate(LEAGUES_CONFIG, 1):
         lname = league['name']
-        base_url = league['base']
         is_debug = (lname == debug_league)
         pct = int(idx / total_leagues * 100)
         bar = "█" * (pct // 5) + "░" * (20 - pct // 5)
@@ -407,6 +433,10 @@ def run_scraper(dry_run=False):
         league_repaired = 0
         league_postponed = 0
 
+        # Consumate sempre (anche se il campionato viene saltato) per restare allineati allo stream
+        results_page = next(pages)
+        fixtures_page = next(pages)
+
         try:
             # 1. Giornate target da DB
             rounds_to_process = get_target_rounds(lname)
@@ -422,14 +452,9 @@ def run_scraper(dry_run=False):
             for rd in rounds_to_process:
                 target_round_nums.add(get_round_number_from_text(rd.get('round_name', '0')))
 
-            # 2. Scarica pagine results + fixtures
-            url_results = f"{base_url}/results/"
-            url_fixtures = f"{base_url}/fixtures/"
-
-            results_data = parse_betexplorer_page(url_results)
-            time.sleep(0.3)
-            fixtures_data = parse_betexplorer_page(url_fixtures)
-            time.sleep(0.3)
+            # 2. Pagine results + fixtures (già scaricate e parsate dallo stream)
+            results_data = _page_data(results_page)
+            fixtures_data = _page_data(fixtures_page)
 
             if is_debug:
                 debug_lines.append(f"\n{'='*60}")
@@ -685,6 +710,8 @@ def run_scraper(dry_run=False):
             print(f"   ❌ {lname}: errore — {e}")
             league_stats.append({"name": lname, "updated": 0, "found": 0, "not_matched": 0, "time": 0, "error": str(e)})
 
+    fetcher.print_report()
+
     # RIEPILOGO
     total_elapsed = time.time() - scraper_start
 
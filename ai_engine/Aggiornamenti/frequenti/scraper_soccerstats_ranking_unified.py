@@ -1,7 +1,6 @@
 import os
 import sys
 import time
-import requests  # <--- QUESTO MANCAVA O ERA SPOSTATO
 from bs4 import BeautifulSoup
 
 # --- FIX PERCORSI PER TROVARE CONFIG.PY ---
@@ -26,6 +25,7 @@ while not os.path.exists(os.path.join(current_path, 'config.py')):
 sys.path.append(current_path)
 
 from config import db
+from page_cache import cached_get
 
 
 
@@ -93,7 +93,7 @@ def scrape_unified_ranking():
     for league in SOCCERSTATS_LEAGUES:
         print(f"\n🌍 Scarico dati per: {league['name']}...")
         try:
-            resp = requests.get(league['url'], headers=headers, timeout=15)
+            resp = cached_get(league['url'], headers=headers, timeout=15)
             soup = BeautifulSoup(resp.content, "html.parser")
 
             # --- LOGICA 1: GESTIONE TABELLE SEPARATE (Serie C) ---
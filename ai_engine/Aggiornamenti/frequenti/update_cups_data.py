@@ -12,7 +12,6 @@ Usage:
     python update_cups_data.py --competition UEL   # Solo Europa League
 """
 
-import requests
 from bs4 import BeautifulSoup
 import sys
 import os
@@ -63,6 +62,7 @@ sys.path.append(current_path)
 
 
 from config import db
+from page_cache import cached_get
 
 # ==================== CONFIGURAZIONE ====================
 
@@ -168,7 +168,7 @@ def update_transfermarkt_values(competition_code):
     headers = {"User-Agent": ua.random}
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = cached_get(url, headers=headers, timeout=30)
         
         if response.status_code != 200:
             print(f"   ❌ HTTP {response.status_code}")
@@ -305,7 +305,7 @@ def get_elo_ratings_today():
     print(f"   📡 Scaricando dati da: {url}\n")
     
     try:
-        response = requests.get(url, timeout=30)
+        response = cached_get(url, timeout=30)
         
         if response.status_code != 200:
             print(f"   ❌ HTTP {response.status_code}")
@@ -3,10 +3,12 @@ import os
 import json
 import math
 import re
+import hashlib
 from datetime import datetime, timedelta
 from tqdm import tqdm
 from colorama import Fore, Style, init
 import dateutil.parser
+from pymongo import UpdateOne
 
 # --- FIX PERCORSI UNIVERSALE ---
 current_path = os.path.dirname(os.path.abspath(__file__))
@@ -29,8 +31,18 @@ SOURCE_COLLECTION = "raw_h2h_data_v2"
 TARGET_COLLECTION = "h2h_by_round"
 DRY_RUN = False  # Se True, non scrive nel DB
 
-# NOTA: NON usare projection selettiva — lo script riscrive l'intero array
-# matches con $set, campi esclusi verrebbero cancellati (odds, mongo_id, ecc.)
+# Versione della formula: incrementarla quando cambia get_h2h_score_v2 / calculate_match_points,
+# così la modalità delta ricalcola tutte le partite al giro successivo
+H2H_FORMULA_VERSION = 1
+
+# Campi di get_h2h_score_v2 copiati anche al livello della partita (solo se "Calculated")
+MATCH_LEVEL_KEYS = ("home_score", "away_score", "avg_goals_home", "avg_goals_away", "history_summary")
+RESULT_KEYS = ("status", "home_score", "away_score", "avg_goals_home", "avg_goals_away", "avg_total_goals",
+               "history_summary", "total_matches", "h2h_weight", "details")
+
+# NOTA: nelle modalità complete (--full e singola lega) NON usare projection selettiva —
+# riscrivono l'intero array matches con $set, campi esclusi verrebbero cancellati (odds, mongo_id, ecc.).
+# La modalità delta invece scrive solo i campi cambiati con matches.$[m].<campo>, e lì la projection è sicura.
 
 def get_round_number_from_text(text):
     match = re.search(r'(\d+)', str(text))
@@ -214,7 +226,143 @@ def get_h2h_score_v2(match_payload, h2h_cache=None):
         "details": "V2 Pro (Goals + Delta Difficulty) [Bulk Integrated]"
     }
 
-def run_calculator(target_league=None):
+# ==================== MODALITÀ DELTA ====================
+
+def _pair_ids(match_payload):
+    """(tm_id casa, tm_id trasferta) come int, None se mancano o non sono numerici."""
+    try:
+        id_h, id_a = match_payload.get("home_tm_id"), match_payload.get("away_tm_id")
+        return (int(id_h), int(id_a)) if id_h and id_a else None
+    except (TypeError, ValueError):
+        return None
+
+def h2h_doc_version(doc):
+    """Versione del documento raw_h2h_data_v2: _id + last_updated (lo scraper H2H lo aggiorna a ogni scrittura)."""
+    if not doc:
+        return None
+    lu = doc.get("last_updated")
+    return f"{doc.get('_id')}@{lu.isoformat() if isinstance(lu, datetime) else lu}"
+
+def h2h_input_fingerprint(match_payload, h2h_doc):
+    """
+    Impronta degli input di get_h2h_score_v2 per una partita: tm_id e nomi delle squadre
+    (nomi usati in history_summary), versione del documento H2H (che contiene risultati e
+    posizioni storiche) e versione della formula. Se non cambia, il risultato non cambia.
+    """
+    key = [H2H_FORMULA_VERSION, match_payload.get("home_tm_id"), match_payload.get("away_tm_id"),
+           match_payload.get("home", ""), match_payload.get("away", ""), h2h_doc_version(h2h_doc)]
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()[:16]
+
+def load_h2h_cache(query=None, projection=None):
+    """{(tm_id_a, tm_id_b): doc} in entrambe le direzioni."""
+    h2h_cache = {}
+    n_docs = 0
+    for doc in db[SOURCE_COLLECTION].find(query or {}, projection):
+        n_docs += 1
+        id_a = doc.get("tm_id_a")
+        id_b = doc.get("tm_id_b")
+        if id_a and id_b:
+            h2h_cache[(id_a, id_b)] = doc
+            h2h_cache[(id_b, id_a)] = doc
+    return h2h_cache, n_docs
+
+def apply_h2h_result(m, res, h2h_doc):
+    """Applica il risultato alla partita (in memoria), come nelle modalità complete, e salva l'impronta."""
+    h2h_obj = m.get("h2h_data", {})
+    if not isinstance(h2h_obj, dict): h2h_obj = {}
+    h2h_obj.update(res)
+    h2h_obj["input_fp"] = h2h_input_fingerprint(m, h2h_doc)
+    m["h2h_data"] = h2h_obj
+    if res.get("status") == "Calculated":
+        for k in MATCH_LEVEL_KEYS:
+            m[k] = res[k]
+
+def delta_set_fields(m, res, fp):
+    """
+    $set con i soli campi cambiati della partita m (letta con projection ridotta),
+    nel formato matches.$[m].<campo> per l'UpdateOne con array_filters.
+    """
+    old_h2h = m.get("h2h_data")
+    if not isinstance(old_h2h, dict):
+        # h2h_data assente (o non documento): si crea intero, come farebbe h2h_obj.update(res)
+        fields = {"matches.$[m].h2h_data": dict(res, input_fp=fp)}
+    else:
+        fields = {f"matches.$[m].h2h_data.{k}": v for k, v in res.items() if old_h2h.get(k) != v}
+        fields["matches.$[m].h2h_data.input_fp"] = fp
+    if res.get("status") == "Calculated":
+        fields.update({f"matches.$[m].{k}": res[k] for k in MATCH_LEVEL_KEYS if m.get(k) != res[k]})
+    return fields
+
+def run_delta(target_ids):
+    """
+    Ricalcola solo le partite dei round target con impronta degli input cambiata.
+    - round letti con projection sui soli campi H2H (non l'intero array con quote ecc.)
+    - da raw_h2h_data_v2 prima solo _id/tm_id/last_updated delle coppie coinvolte,
+      poi i documenti completi solo per le partite da ricalcolare
+    - un unico bulk_write di UpdateOne con array_filters (home, away, date_obj) e i soli campi cambiati
+    Ritorna (partite totali, partite ricalcolate, operazioni scritte).
+    """
+    projection = {"matches.home": 1, "matches.away": 1, "matches.date_obj": 1,
+                  "matches.home_tm_id": 1, "matches.away_tm_id": 1, "matches.h2h_data.input_fp": 1}
+    projection.update({f"matches.h2h_data.{k}": 1 for k in RESULT_KEYS})
+    projection.update({f"matches.{k}": 1 for k in MATCH_LEVEL_KEYS})
+    rounds = list(db[TARGET_COLLECTION].find({"_id": {"$in": target_ids}}, projection))
+
+    # Versioni dei documenti H2H per le coppie dei round target (query leggera)
+    team_ids = set()
+    for r in rounds:
+        for m in r.get("matches", []):
+            pair = _pair_ids(m)
+            if pair: team_ids.update(pair)
+    versions, _ = load_h2h_cache({"tm_id_a": {"$in": list(team_ids)}, "tm_id_b": {"$in": list(team_ids)}},
+                                 {"_id": 1, "tm_id_a": 1, "tm_id_b": 1, "last_updated": 1})
+
+    # Partite con impronta cambiata (o mai calcolata)
+    pending = []
+    matches_total = 0
+    for r in rounds:
+        for m in r.get("matches", []):
+            matches_total += 1
+            pair = _pair_ids(m)
+            fp = h2h_input_fingerprint(m, versions.get(pair) if pair else None)
+            old_h2h = m.get("h2h_data")
+            if isinstance(old_h2h, dict) and old_h2h.get("input_fp") == fp:
+                continue
+            pending.append((r["_id"], m, pair, fp))
+    print(f"   🔎 {matches_total} partite nei round target → {len(pending)} con input cambiati")
+
+    # Documenti H2H completi solo per le coppie da ricalcolare
+    src_ids = list({versions[pair]["_id"] for _, _, pair, _ in pending if pair in versions})
+    h2h_cache, n_docs = load_h2h_cache({"_id": {"$in": src_ids}}) if src_ids else ({}, 0)
+    print(f"   📥 Cache: {n_docs} coppie H2H caricate")
+
+    ops = []
+    diff_count = 0
+    for round_id, m, pair, fp in pending:
+        res = get_h2h_score_v2(m, h2h_cache)
+        if DRY_RUN:
+            old_h2h = m.get("h2h_data") if isinstance(m.get("h2h_data"), dict) else {}
+            for k in ["home_score", "away_score", "avg_goals_home", "avg_goals_away"]:
+                old_v = old_h2h.get(k)
+                new_v = res.get(k)
+                if old_v is not None and new_v is not None and old_v != new_v:
+                    print(f"   ⚠️ {m.get('home','?')} vs {m.get('away','?')}: {k} {old_v}→{new_v}")
+                    diff_count += 1
+            continue
+        ops.append(UpdateOne(
+            {"_id": round_id},
+            {"$set": delta_set_fields(m, res, fp)},
+            # Come daemon_live_scores: la data tiene fuori un altro (home, away) nello stesso round
+            array_filters=[{"m.home": m.get("home"), "m.away": m.get("away"), "m.date_obj": m.get("date_obj")}],
+        ))
+
+    if ops:
+        db[TARGET_COLLECTION].bulk_write(ops, ordered=False)
+    if DRY_RUN:
+        print(f"   Differenze trovate: {diff_count}")
+    return matches_total, len(pending), len(ops)
+
+def run_calculator(target_league=None, full=False):
     leagues_in_db = sorted(db[TARGET_COLLECTION].distinct("league"))
     is_pipeline = target_league and target_league.lower() == "all"
 
@@ -236,23 +384,19 @@ def run_calculator(target_league=None):
             selected_leagues = [leagues_in_db[int(choice) - 1]]
 
     # --- CACHE H2H IN MEMORIA (evita ~677 find_one singoli) ---
-    print("   📥 Caricamento cache H2H in memoria...")
+    # La modalità delta carica solo le coppie che servono
     h2h_cache = {}
-    all_h2h = list(db[SOURCE_COLLECTION].find({}))
-    for doc in all_h2h:
-        id_a = doc.get("tm_id_a")
-        id_b = doc.get("tm_id_b")
-        if id_a and id_b:
-            h2h_cache[(id_a, id_b)] = doc
-            h2h_cache[(id_b, id_a)] = doc
-    print(f"   ✅ Cache: {len(all_h2h)} coppie H2H caricate ({len(h2h_cache)} lookup)")
+    if not (is_pipeline and not full):
+        print("   📥 Caricamento cache H2H in memoria...")
+        h2h_cache, n_docs = load_h2h_cache()
+        print(f"   ✅ Cache: {n_docs} coppie H2H caricate ({len(h2h_cache)} lookup)")
 
     _start_time = datetime.now()
     diff_count = 0
 
     # --- MODALITÀ MIRATA (pipeline) o COMPLETA (menu) ---
     if is_pipeline:
-        print(f"🤖 MODALITÀ AUTOMATICA MIRATA: Prec/Attuale/Succ {'(DRY RUN)' if DRY_RUN else ''}")
+        print(f"🤖 MODALITÀ AUTOMATICA MIRATA: Prec/Attuale/Succ {'(COMPLETA) ' if full else '(DELTA) '}{'(DRY RUN)' if DRY_RUN else ''}")
         print("   📥 Fase 1: selezione round (query leggera)...")
         light_docs = list(db[TARGET_COLLECTION].find({}, {"_id": 1, "league": 1, "matches.date": 1, "matches.date_obj": 1}))
         by_league = {}
@@ -264,6 +408,16 @@ def run_calculator(target_league=None):
         for lg_name, lg_docs in by_league.items():
             target = find_target_rounds(lg_docs, league_name=lg_name)
             target_ids.extend([d["_id"] for d in target])
+
+        if not full:
+            print(f"   📥 Fase 2: impronte input di {len(target_ids)} round...")
+            matches_total, recalculated, n_ops = run_delta(target_ids)
+            elapsed = (datetime.now() - _start_time).total_seconds()
+            print(f"✅ FINE. Giornate: {len(target_ids)}, Match: {matches_total}, "
+                  f"ricalcolati: {recalculated}, invariati: {matches_total - recalculated}, update: {n_ops}")
+            print(f"⏱️ Tempo: {elapsed:.1f}s")
+            return
+
         print(f"   📥 Fase 2: caricamento {len(target_ids)} round completi...")
         all_rounds = list(db[TARGET_COLLECTION].find({"_id": {"$in": target_ids}}))
         print(f"   📋 {len(by_league)} campionati, {len(light_docs)} docs → {len(all_rounds)} giornate mirate")
@@ -284,16 +438,8 @@ def run_calculator(target_league=None):
                             print(f"   ⚠️ {m.get('home','?')} vs {m.get('away','?')}: {k} {old_v}→{new_v}")
                             diff_count += 1
                 else:
-                    h2h_obj = m.get("h2h_data", {})
-                    if not isinstance(h2h_obj, dict): h2h_obj = {}
-                    h2h_obj.update(res)
-                    m["h2h_data"] = h2h_obj
-                    if res.get("status") == "Calculated":
-                        m["home_score"] = res["home_score"]
-                        m["away_score"] = res["away_score"]
-                        m["avg_goals_home"] = res["avg_goals_home"]
-                        m["avg_goals_away"] = res["avg_goals_away"]
-                        m["history_summary"] = res["history_summary"]
+                    pair = _pair_ids(m)
+                    apply_h2h_result(m, res, h2h_cache.get(pair) if pair else None)
                     matches_updated.append(m)
 
             if not DRY_RUN and matches_updated:
@@ -316,21 +462,18 @@ def run_calculator(target_league=None):
                 matches_updated = []
                 for m in r.get("matches", []):
                     res = get_h2h_score_v2(m, h2h_cache)
-                    h2h_obj = m.get("h2h_data", {})
-                    if not isinstance(h2h_obj, dict): h2h_obj = {}
-                    h2h_obj.update(res)
-                    m["h2h_data"] = h2h_obj
-                    if res.get("status") == "Calculated":
-                        m["home_score"] = res["home_score"]
-                        m["away_score"] = res["away_score"]
-                        m["avg_goals_home"] = res["avg_goals_home"]
-                        m["avg_goals_away"] = res["avg_goals_away"]
-                        m["history_summary"] = res["history_summary"]
+                    pair = _pair_ids(m)
+                    apply_h2h_result(m, res, h2h_cache.get(pair) if pair else None)
                     matches_updated.append(m)
                 db[TARGET_COLLECTION].update_one({"_id": r["_id"]}, {"$set": {"matches": matches_updated}})
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        run_calculator(sys.argv[1])
+    # Uso: calculate_h2h_v2.py [lega | all] [--full]
+    #   all        → round prec/attuale/succ di tutte le leghe, solo partite con input cambiati
+    #   all --full → stessi round, ricalcolo completo di tutte le partite
+    full = "--full" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--full"]
+    if args:
+        run_calculator(args[0], full=full)
     else:
-        run_calculator()
\ No newline at end of file
+        run_calculator(full=full)
\ No newline at end of file
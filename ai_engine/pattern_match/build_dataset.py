@@ -317,6 +317,15 @@ def build_dataset_to_mongo() -> dict:
 
     pbar.close()
 
+    # Allinea la cache mmap del dataset esteso (solo i documenti nuovi)
+    if inserted > 0:
+        try:
+            from ai_engine.pattern_match import dataset_cache
+            stats = dataset_cache.update_cache()
+            print(f"  Cache dataset: {stats['mode']} ({stats['rows']} partite)")
+        except Exception as e:
+            print(f"  WARN cache dataset non aggiornata: {e}")
+
     return {
         "inserted": inserted,
         "skipped_dup": skipped_dup,
@@ -16,6 +16,7 @@ PATTERN_MATCH_ROOT = Path(__file__).resolve().parent
 CACHE_ROOT = PATTERN_MATCH_ROOT / "_cache_pattern_match"
 CACHE_FOOTBALLDATA = CACHE_ROOT / "footballdata"
 CACHE_CLUBELO = CACHE_ROOT / "clubelo"
+CACHE_DATASET = CACHE_ROOT / "dataset"    # dataset esteso memory-mapped (dataset_cache.py)
 
 # MongoDB: stesso cluster e database di AI Simulator, collezioni con prefisso historical__
 # (Vedi History_System_Engine.md sezione 7).
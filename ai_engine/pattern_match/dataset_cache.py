@@ -0,0 +1,342 @@
+"""
+Cache su disco del dataset esteso del Pattern Match Engine.
+
+`load_dataset_extended` leggeva ogni volta tutta la collection
+`historical__matches_pattern` ed estraeva le feature estese in Python.
+Qui il risultato viene salvato in `_cache_pattern_match/dataset/`:
+- features_<gen>.npy  matrice float64 (righe = partite, colonne = feature
+                      numeriche di fv_extended, NaN = None), aperta in mmap
+- dataset_v<N>.meta.pkl  sidecar: colonne, metadati per riga (uid, data,
+                      esito...), fingerprint della collection
+
+Fingerprint = (numero documenti, _id massimo, updated_at/last_updated massimi)
++ firma dell'estrazione (CACHE_VERSION, LEAGUE_TEAMS_COUNT, LEAGUE_MATCHDAYS).
+Se la collection ha solo documenti nuovi (_id > ultimo visto) vengono letti ed
+estratti solo quelli; qualunque altra differenza → ricostruzione completa.
+Chi modifica documenti gia' inseriti deve impostare `updated_at` (datetime):
+e' l'unico segnale delle modifiche sul posto.
+
+Il dataset restituito (CachedDataset) non materializza le entry: lo scorer
+legge direttamente le colonne mmap (feature_matrix) e i dict si costruiscono
+solo per le righe lette (top-k del pool, campioni).
+
+Uso:
+    from ai_engine.pattern_match import dataset_cache
+    dataset = dataset_cache.load_dataset()        # come load_dataset_extended()
+    dataset_cache.update_cache()                  # dopo build_dataset_to_mongo()
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sys
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from ai_engine.pattern_match.config import CACHE_DATASET, MONGO_COLLECTION_MATCHES
+from ai_engine.pattern_match import match_engine as me
+from config import db
+
+
+# Incrementare se cambia il formato del file o la logica di extract_extended_features
+CACHE_VERSION = 1
+
+META_PATH = CACHE_DATASET / f"dataset_v{CACHE_VERSION}.meta.pkl"
+
+# Campi per riga (non feature) salvati nel sidecar
+ROW_FIELDS = ("match_uid", "lega", "stagione", "data", "home", "away",
+              "ft_score", "result", "goals_home", "goals_away")
+
+
+def _extraction_signature() -> str:
+    """Cambia se cambiano i parametri che determinano fasce/blocchi."""
+    raw = repr((CACHE_VERSION, sorted(me.LEAGUE_TEAMS_COUNT.items()), sorted(me.LEAGUE_MATCHDAYS.items())))
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def _max_field(coll, field: str):
+    doc = coll.find_one({field: {"$exists": True}}, {field: 1}, sort=[(field, -1)])
+    return doc.get(field) if doc else None
+
+
+def collection_fingerprint() -> dict:
+    """Fingerprint economico della collection: 4 query (count, ultimo _id, ultime modifiche)."""
+    coll = db[MONGO_COLLECTION_MATCHES]
+    last = coll.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return {
+        "count": coll.count_documents({}),
+        "last_id": last["_id"] if last else None,
+        "updated": (_max_field(coll, "updated_at"), _max_field(coll, "last_updated")),
+        "signature": _extraction_signature(),
+    }
+
+
+# ====================================================================
+# Conversione entry <-> colonne
+# ====================================================================
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+
+
+def _entries_to_columns(entries: list[dict], columns: list[str] | None = None,
+                        object_columns: list[str] | None = None):
+    """
+    Separa le feature di fv_extended in colonne numeriche (matrice) e
+    colonne non numeriche (liste nel sidecar, es. "lega").
+    """
+    if columns is None:
+        seen: dict[str, bool] = {}
+        for e in entries:
+            for k, v in e["fv_extended"].items():
+                if v is not None and not _is_number(v):
+                    seen[k] = False
+                else:
+                    seen.setdefault(k, True)
+        columns = [k for k, numeric in seen.items() if numeric]
+        object_columns = [k for k, numeric in seen.items() if not numeric]
+
+    matrix = np.full((len(entries), len(columns)), np.nan, dtype=np.float64)
+    for i, e in enumerate(entries):
+        fv = e["fv_extended"]
+        for j, k in enumerate(columns):
+            v = fv.get(k)
+            if v is not None:
+                matrix[i, j] = v
+    objects = {k: [e["fv_extended"].get(k) for e in entries] for k in object_columns}
+    rows = {f: [e[f] for e in entries] for f in ROW_FIELDS}
+    return matrix, columns, object_columns, objects, rows
+
+
+def _int_columns(entries: list[dict], columns: list[str]) -> set[str]:
+    """Colonne con soli interi: tornano int alla lettura (giornata, fasce, punti...)."""
+    out = set(columns)
+    for e in entries:
+        fv = e["fv_extended"]
+        for k in list(out):
+            v = fv.get(k)
+            if v is not None and not isinstance(v, (int, np.integer)):
+                out.discard(k)
+    return out
+
+
+class CachedDataset(Sequence):
+    """
+    Dataset esteso sopra la matrice mmap, con la stessa interfaccia della lista
+    di load_dataset_extended (len, indice, slice, iterazione, random.sample).
+    Ogni entry (dict) viene costruita solo quando si legge la sua riga;
+    compute_pool usa feature_matrix e costruisce i dict dei soli top-k.
+    """
+
+    def __init__(self, features: np.ndarray, meta: dict):
+        self._features = features
+        self._meta = meta
+        self._col_index = {k: j for j, k in enumerate(meta["columns"])}
+        self.feature_matrix = _matrix_from_columns(features, meta)
+
+    def __len__(self) -> int:
+        return self._features.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._entry(j) for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self._entry(i)
+
+    def _entry(self, i: int) -> dict:
+        meta = self._meta
+        values = self._features[i].tolist()
+        int_cols = meta["int_columns"]
+        fv = {}
+        for k in meta["key_order"]:
+            j = self._col_index.get(k)
+            if j is None:
+                fv[k] = meta["objects"][k][i]
+            else:
+                v = values[j]
+                fv[k] = None if v != v else (int(v) if k in int_cols else v)
+        entry = {f: meta["rows"][f][i] for f in ROW_FIELDS}
+        entry["fv_extended"] = fv
+        return entry
+
+
+def _matrix_from_columns(features: np.ndarray, meta: dict) -> dict:
+    """Matrice per compute_pool direttamente dalle colonne mmap (niente passaggio per i dict)."""
+    idx = {k: j for j, k in enumerate(meta["columns"])}
+
+    def col(k):
+        return features[:, idx[k]] if k in idx else np.full(features.shape[0], np.nan)
+
+    lega = meta["objects"].get("lega", [None] * features.shape[0])
+    return {
+        "n": features.shape[0],
+        "lega_ok": np.array([l in me.LEGHE_VALIDE for l in lega], dtype=bool),
+        "fascia": {f: np.nan_to_num(col(f), nan=0).astype(np.int32) for f in me.FASCIA_FEATURES},
+        "numeric": {f: np.asarray(col(f), dtype=np.float64) for f in me.NUMERIC_TOLERANCES},
+        "uid_index": {uid: i for i, uid in enumerate(meta["rows"]["match_uid"])},
+    }
+
+
+# ====================================================================
+# Lettura / scrittura
+# ====================================================================
+
+def _read_meta() -> dict | None:
+    if not META_PATH.exists():
+        return None
+    try:
+        with open(META_PATH, "rb") as f:
+            meta = pickle.load(f)
+    except Exception as e:
+        print(f"[cache] sidecar illeggibile ({e}), ricostruzione", file=sys.stderr)
+        return None
+    if not (CACHE_DATASET / meta["features_file"]).exists():
+        return None
+    return meta
+
+
+def _write(features: np.ndarray, meta: dict):
+    """
+    Scrive matrice + sidecar. La matrice ha un nome nuovo a ogni generazione:
+    su Windows un file aperto in mmap da un altro processo non si puo' sovrascrivere.
+    """
+    CACHE_DATASET.mkdir(parents=True, exist_ok=True)
+    gen = f"{int(time.time() * 1000)}_{os.getpid()}"
+    features_file = f"features_v{CACHE_VERSION}_{gen}.npy"
+    np.save(CACHE_DATASET / features_file, features)
+    meta["features_file"] = features_file
+
+    tmp = META_PATH.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, META_PATH)
+
+    # Pulizia generazioni precedenti (best effort: se mappate altrove restano)
+    for old in CACHE_DATASET.glob("features_v*.npy"):
+        if old.name != features_file:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def _full_build(fp: dict) -> tuple[np.ndarray, dict]:
+    coll = db[MONGO_COLLECTION_MATCHES]
+    entries = []
+    n_docs = 0
+    for doc in coll.find({}, me.DATASET_PROJECTION):
+        n_docs += 1
+        entry = me.doc_to_entry(doc)
+        if entry is not None:
+            entries.append(entry)
+
+    features, columns, object_columns, objects, rows = _entries_to_columns(entries)
+    meta = {
+        "version": CACHE_VERSION,
+        "fingerprint": fp,
+        "n_docs_seen": n_docs,
+        "columns": columns,
+        "int_columns": _int_columns(entries, columns),
+        "object_columns": object_columns,
+        "key_order": list(dict.fromkeys(k for e in entries for k in e["fv_extended"])),
+        "objects": objects,
+        "rows": rows,
+    }
+    _write(features, meta)
+    return features, meta
+
+
+def _incremental_build(meta: dict, features: np.ndarray, fp: dict) -> tuple[np.ndarray, dict] | None:
+    """Aggiunge solo i documenti con _id > ultimo visto. None se non applicabile."""
+    old_fp = meta["fingerprint"]
+    if old_fp.get("signature") != fp["signature"] or old_fp.get("last_id") is None:
+        return None
+    if old_fp.get("updated") != fp["updated"]:
+        return None  # documenti gia' visti modificati sul posto
+    if fp["count"] < old_fp["count"]:
+        return None  # cancellazioni: serve una ricostruzione
+
+    coll = db[MONGO_COLLECTION_MATCHES]
+    new_docs = list(coll.find({"_id": {"$gt": old_fp["last_id"]}}, me.DATASET_PROJECTION))
+    if meta["n_docs_seen"] + len(new_docs) != fp["count"]:
+        return None  # documenti modificati/rimossi in mezzo
+
+    entries = [e for e in (me.doc_to_entry(d) for d in new_docs) if e is not None]
+    new_feat, _, _, new_objects, new_rows = _entries_to_columns(
+        entries, meta["columns"], meta["object_columns"])
+
+    # Nuove colonne / tipi non previsti → ricostruzione completa (caso raro)
+    for e in entries:
+        for k, v in e["fv_extended"].items():
+            if k not in meta["columns"] and k not in meta["object_columns"]:
+                return None
+            if k in meta["int_columns"] and v is not None and not isinstance(v, (int, np.integer)):
+                return None
+
+    features = np.concatenate([np.asarray(features), new_feat]) if len(entries) else np.asarray(features)
+    for k in meta["object_columns"]:
+        meta["objects"][k] = meta["objects"][k] + new_objects[k]
+    for f in ROW_FIELDS:
+        meta["rows"][f] = meta["rows"][f] + new_rows[f]
+    if not meta["key_order"] and entries:
+        meta["key_order"] = list(dict.fromkeys(k for e in entries for k in e["fv_extended"]))
+    meta["n_docs_seen"] += len(new_docs)
+    meta["fingerprint"] = fp
+    _write(features, meta)
+    print(f"[cache] +{len(entries)} partite aggiunte (incrementale)", file=sys.stderr)
+    return features, meta
+
+
+def update_cache(force_full: bool = False) -> dict:
+    """
+    Allinea la cache alla collection. Ritorna statistiche
+    {"mode": "hit" | "incremental" | "full", "rows": int, "seconds": float}.
+    """
+    t0 = time.time()
+    fp = collection_fingerprint()
+    meta = None if force_full else _read_meta()
+
+    if meta is not None and meta["fingerprint"] == fp:
+        return {"mode": "hit", "rows": len(meta["rows"]["match_uid"]), "seconds": time.time() - t0}
+
+    if meta is not None:
+        features = np.load(CACHE_DATASET / meta["features_file"], mmap_mode="r")
+        result = _incremental_build(meta, features, fp)
+        del features
+        if result is not None:
+            return {"mode": "incremental", "rows": result[0].shape[0], "seconds": time.time() - t0}
+
+    features, meta = _full_build(fp)
+    return {"mode": "full", "rows": features.shape[0], "seconds": time.time() - t0}
+
+
+def load_dataset(refresh: bool = False) -> CachedDataset:
+    """
+    Dataset esteso dalla cache (aggiornata se la collection e' cambiata),
+    con la matrice colonnare per compute_pool letta dal file mmap.
+    """
+    stats = update_cache(force_full=refresh)
+    meta = _read_meta()
+    features = np.load(CACHE_DATASET / meta["features_file"], mmap_mode="r")
+
+    dataset = CachedDataset(features, meta)
+    print(f"[cache] dataset {stats['mode']}: {len(dataset)} partite in {stats['seconds']:.2f}s", file=sys.stderr)
+    return dataset
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Cache dataset Pattern Match (mmap)")
+    parser.add_argument("--rebuild", action="store_true", help="Ricostruzione completa da Mongo")
+    args = parser.parse_args()
+    print(update_cache(force_full=args.rebuild))
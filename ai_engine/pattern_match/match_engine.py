@@ -237,42 +237,145 @@ def compute_match_score(target_ext: dict, candidate_ext: dict) -> tuple[int, dic
 
 
 # ====================================================================
-# Caricamento dataset
+# Rappresentazione colonnare (NumPy) + scorer vettoriale
 # ====================================================================
+# Stessa semantica di compute_match_score, ma su tutte le partite in un colpo:
+# una colonna per feature (fasce int, 0 = sconosciuta; numeriche float, NaN = None).
+
+LEGHE_VALIDE = {l["fd_code"] for l in LEAGUES}
+
+
+def build_feature_matrix(dataset: list[dict]) -> dict:
+    """Colonne NumPy dei fv_extended del dataset (da costruire una volta, riusabili per ogni target)."""
+    fvs = [entry["fv_extended"] for entry in dataset]
+    fascia = {
+        f: np.array([fv.get(f, 0) or 0 for fv in fvs], dtype=np.int32)
+        for f in FASCIA_FEATURES
+    }
+    numeric = {
+        f: np.array([np.nan if fv.get(f) is None else fv[f] for fv in fvs], dtype=np.float64)
+        for f in NUMERIC_TOLERANCES
+    }
+    return {
+        "n": len(dataset),
+        "lega_ok": np.array([fv.get("lega") in LEGHE_VALIDE for fv in fvs], dtype=bool),
+        "fascia": fascia,
+        "numeric": numeric,
+        "uid_index": {entry["match_uid"]: i for i, entry in enumerate(dataset)},
+    }
+
+
+def compute_feature_matches(target_ext: dict, matrix: dict) -> dict:
+    """Per ogni feature, array bool: quali partite sono compatibili col target."""
+    out = {"lega": matrix["lega_ok"]}
+    for f in FASCIA_FEATURES:
+        t_val = target_ext.get(f, 0)
+        if t_val != 0:
+            out[f] = matrix["fascia"][f] == t_val
+    for f, tol in NUMERIC_TOLERANCES.items():
+        t_val = target_ext.get(f)
+        if t_val is not None:
+            # NaN (candidato senza valore) → confronto False, come il "continue" scalare
+            out[f] = np.abs(matrix["numeric"][f] - t_val) <= tol
+    return out
+
+
+def compute_scores_vectorized(target_ext: dict, matrix: dict) -> np.ndarray:
+    """Score 0..122 di tutte le partite del dataset in un passaggio."""
+    scores = np.zeros(matrix["n"], dtype=np.int32)
+    for f, ok in compute_feature_matches(target_ext, matrix).items():
+        scores += ok * FEATURE_WEIGHTS[f]
+    return scores
+
 
-def load_dataset_extended() -> list[dict]:
+def _top_k(scores: np.ndarray, idx: np.ndarray, k: int) -> np.ndarray:
     """
-    Carica tutte le partite con feature_vector esteso (campi derivati).
+    Indici dei top-k per score desc, a parità ordine del dataset (come sort stabile).
+    argpartition: niente sort completo dei candidati, si ordinano solo i k scelti.
     """
+    if k <= 0 or len(idx) == 0:
+        return idx[:0]
+    key = -scores[idx].astype(np.int64) * (len(scores) + 1) + idx
+    if len(idx) > k:
+        part = np.argpartition(key, k - 1)[:k]
+        idx, key = idx[part], key[part]
+    return idx[np.argsort(key)]
+
+
+# Matrice dell'ultimo dataset visto da compute_pool (le validazioni passano sempre la stessa lista)
+_MATRIX_CACHE: dict = {}
+
+
+def get_feature_matrix(dataset: list[dict]) -> dict:
+    """Matrice colonnare del dataset, costruita alla prima chiamata e poi riusata."""
+    # Dataset dalla cache su disco (dataset_cache.CachedDataset): colonne gia' pronte
+    matrix = getattr(dataset, "feature_matrix", None)
+    if matrix is not None:
+        return matrix
+    cached = _MATRIX_CACHE.get("entry")
+    if cached is not None and cached[0] is dataset and cached[1]["n"] == len(dataset):
+        return cached[1]
+    matrix = build_feature_matrix(dataset)
+    _MATRIX_CACHE["entry"] = (dataset, matrix)
+    return matrix
+
+
+# ====================================================================
+# Caricamento dataset
+# ====================================================================
+
+DATASET_PROJECTION = {
+    "match_uid": 1, "lega": 1, "stagione": 1, "data_partita": 1,
+    "home_team": 1, "away_team": 1,
+    "feature_vector": 1, "outcome": 1,
+}
+
+
+def doc_to_entry(doc: dict) -> dict | None:
+    """Doc Mongo -> entry del dataset esteso (None se manca Elo, ~160 partite)."""
+    fv = doc["feature_vector"]
+    if fv.get("elo_casa") is None or fv.get("elo_ospite") is None:
+        return None
+    ext = extract_extended_features(fv, doc["lega"])
+    return {
+        "match_uid": doc["match_uid"],
+        "lega": doc["lega"],
+        "stagione": doc.get("stagione"),
+        "data": doc["data_partita"],
+        "home": doc["home_team"],
+        "away": doc["away_team"],
+        "ft_score": doc["outcome"]["ft_score"],
+        "result": doc["outcome"]["result_1x2"],
+        "goals_home": doc["outcome"]["goals_home"],
+        "goals_away": doc["outcome"]["goals_away"],
+        "fv_extended": ext,
+    }
+
+
+def load_dataset_extended_from_mongo() -> list[dict]:
+    """Legge tutte le partite da Mongo ed estrae il feature_vector esteso (lento: rete + Python)."""
     coll = db[MONGO_COLLECTION_MATCHES]
     out = []
-    cursor = coll.find({}, {
-        "match_uid": 1, "lega": 1, "stagione": 1, "data_partita": 1,
-        "home_team": 1, "away_team": 1,
-        "feature_vector": 1, "outcome": 1,
-    })
-    for doc in cursor:
-        fv = doc["feature_vector"]
-        # Skip se manca Elo (squadre senza Elo, ~160 partite)
-        if fv.get("elo_casa") is None or fv.get("elo_ospite") is None:
-            continue
-        ext = extract_extended_features(fv, doc["lega"])
-        out.append({
-            "match_uid": doc["match_uid"],
-            "lega": doc["lega"],
-            "stagione": doc.get("stagione"),
-            "data": doc["data_partita"],
-            "home": doc["home_team"],
-            "away": doc["away_team"],
-            "ft_score": doc["outcome"]["ft_score"],
-            "result": doc["outcome"]["result_1x2"],
-            "goals_home": doc["outcome"]["goals_home"],
-            "goals_away": doc["outcome"]["goals_away"],
-            "fv_extended": ext,
-        })
+    for doc in coll.find({}, DATASET_PROJECTION):
+        entry = doc_to_entry(doc)
+        if entry is not None:
+            out.append(entry)
     return out
 
 
+def load_dataset_extended(use_cache: bool = True) -> list[dict]:
+    """
+    Carica tutte le partite con feature_vector esteso (campi derivati).
+    Di default dalla cache su disco (dataset_cache: array memory-mapped +
+    sidecar), aggiornata solo se la collection e' cambiata; le entry di
+    quel dataset si costruiscono solo quando vengono lette.
+    """
+    if not use_cache:
+        return load_dataset_extended_from_mongo()
+    from ai_engine.pattern_match import dataset_cache
+    return dataset_cache.load_dataset()
+
+
 # ====================================================================
 # Pool unico (top 50, soglia 60%)
 # ====================================================================
@@ -281,24 +384,23 @@ def compute_feature_frequency(target_ext: dict, pool: list[dict]) -> dict:
     """Per ogni feature, quante partite del pool sono compatibili."""
     if not pool:
         return {}
-    freq = {f: 0 for f in FEATURE_WEIGHTS}
-    for entry in pool:
-        _, detail = compute_match_score(target_ext, entry["fv_extended"])
-        for f in FEATURE_WEIGHTS:
-            if detail.get(f):
-                freq[f] += 1
-    return freq
+    matches = compute_feature_matches(target_ext, build_feature_matrix(pool))
+    return {f: int(np.count_nonzero(matches[f])) if f in matches else 0 for f in FEATURE_WEIGHTS}
 
 
 def compute_pool(target_ext: dict, dataset: list[dict],
                  exclude_uid: str | None = None,
                  pool_size: int = POOL_SIZE,
-                 min_score: int = MIN_SCORE_THRESHOLD) -> dict:
+                 min_score: int = MIN_SCORE_THRESHOLD,
+                 matrix: dict | None = None) -> dict:
     """
     Calcola il pool unico:
-    1. Score per ogni partita storica
+    1. Score per ogni partita storica (vettoriale sulla matrice colonnare)
     2. Filtro: score >= min_score
-    3. Top pool_size partite per score decrescente
+    3. Top pool_size partite per score decrescente (argpartition, no sort completo)
+
+    matrix: build_feature_matrix(dataset); se None viene costruita e tenuta
+    in cache per lo stesso dataset (chiamate ripetute con target diversi).
 
     Returns:
         {
@@ -310,19 +412,18 @@ def compute_pool(target_ext: dict, dataset: list[dict],
           "scartate_sotto_soglia": int,   # quante avevano score < min_score
         }
     """
-    scored = []
-    scartate = 0
-    for entry in dataset:
-        if exclude_uid and entry["match_uid"] == exclude_uid:
-            continue
-        score, _detail = compute_match_score(target_ext, entry["fv_extended"])
-        if score < min_score:
-            scartate += 1
-            continue
-        scored.append({**entry, "score": score})
-
-    scored.sort(key=lambda x: -x["score"])
-    pool = scored[:pool_size]
+    if matrix is None:
+        matrix = get_feature_matrix(dataset)
+    scores = compute_scores_vectorized(target_ext, matrix)
+
+    valid = np.ones(len(scores), dtype=bool)
+    if exclude_uid and exclude_uid in matrix["uid_index"]:
+        valid[matrix["uid_index"][exclude_uid]] = False
+    above = valid & (scores >= min_score)
+    scartate = int(np.count_nonzero(valid & ~above))
+
+    top = _top_k(scores, np.flatnonzero(above), pool_size)
+    pool = [{**dataset[i], "score": int(scores[i])} for i in top]
 
     if pool:
         score_medio = sum(p["score"] for p in pool) / len(pool)
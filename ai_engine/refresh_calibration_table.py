@@ -38,7 +38,7 @@ if PROJECT_ROOT not in sys.path:
 
 from config import db  # noqa: E402
 from ai_engine.source_classify import classify as classify_source  # noqa: E402
-from ai_engine.stake_kelly import BINS, BIN_LABELS, VALID_MERCATI  # noqa: E402
+from ai_engine.stake_kelly import BINS, BIN_LABELS, VALID_MERCATI, invalidate_cache  # noqa: E402
 
 
 def _bin_label(p):
@@ -156,6 +156,9 @@ def main():
 
     # --- Upsert ---
     db['calibration_table'].replace_one({'_id': 'current'}, doc_out, upsert=True)
+    # Chi usa kelly_unified in questo processo rilegge subito la tabella nuova
+    # (gli altri processi la vedono alla prossima rivalidazione, CACHE_TTL_SECONDS)
+    invalidate_cache()
     print(f"[calibration] salvato in MongoDB: "
           f"{len(cells)} celle + {len(fallback_mercato_bin)} fallback, "
           f"n_totale={total}, finestra={doc_out['finestra']['from']} -> {doc_out['finestra']['to']}")
@@ -0,0 +1,370 @@
+"""
+STAGE SCHEDULER - Pipeline notturna come DAG di stadi con esecuzione parallela
+=============================================================================
+Ogni stadio (uno script della SCRAPER_SEQUENCE) dichiara le collection che
+legge e quelle che scrive. Tra due stadi c'è una dipendenza solo se uno
+scrive qualcosa che l'altro legge o scrive (l'ordine resta quello della
+sequenza). Tutto ciò che è pronto parte insieme, fino a MAX worker, con
+un limite di processi contemporanei per sito (non martelliamo fbref/snai).
+
+Uno stadio senza dichiarazione fa da barriera: aspetta tutti quelli prima
+di lui e tutti quelli dopo aspettano lui (= comportamento sequenziale).
+
+Checkpoint: log/pipeline_checkpoint.json registra l'esito di ogni stadio.
+Con resume si rilanciano solo gli stadi falliti o mai partiti, più tutto
+ciò che dipende da loro (i loro input cambieranno).
+
+Usage:
+    from stage_scheduler import build_stages, build_dag, run_stages, critical_path
+
+    stages = build_stages(SCRAPER_SEQUENCE, STAGE_IO)
+    deps = build_dag(stages)
+    results = run_stages(stages, deps, workers=4, log_dir=log_dir, checkpoint=cp)
+    total, chain = critical_path(stages, deps, {i: r['duration'] for i, r in results.items()})
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_STAGE_SECONDS = 60.0      # Stima per stadi mai cronometrati (priorità e piano)
+CHROME_BASE_PORT = 9222           # Ogni processo riceve una CHROME_DEBUG_PORT libera
+POLL_SECONDS = 1.0
+SHARD_STAGGER_SECONDS = 5         # Sfasamento tra le istanze di uno stadio a shard
+LOG_TAIL_LINES = 30
+
+
+class Stage:
+    """Uno script della pipeline con le sue dichiarazioni di I/O."""
+    __slots__ = ('index', 'filename', 'desc', 'impact', 'folder',
+                 'reads', 'writes', 'hosts', 'args', 'shards', 'declared')
+
+    def __init__(self, index, filename, desc, impact, folder, io=None):
+        self.index = index
+        self.filename = filename
+        self.desc = desc
+        self.impact = impact
+        self.folder = folder
+        self.declared = io is not None
+        io = io or {}
+        self.reads = frozenset(io.get('reads', ()))
+        self.writes = frozenset(io.get('writes', ()))
+        self.hosts = tuple(io.get('hosts', ()))
+        self.args = tuple(io.get('args', ()))
+        self.shards = io.get('shards')          # (variabile d'ambiente, numero istanze)
+
+    @property
+    def weight(self):
+        """Slot worker occupati (uno per processo)."""
+        return self.shards[1] if self.shards else 1
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, self.filename)
+
+    def conflicts_with(self, other):
+        if not self.declared or not other.declared:
+            return True
+        return bool(self.writes & (other.reads | other.writes) or self.reads & other.writes)
+
+
+def build_stages(sequence, stage_io):
+    """SCRAPER_SEQUENCE (nome, titolo, impatto, cartella) + dichiarazioni → lista di Stage."""
+    return [Stage(i, filename, desc, impact, folder, stage_io.get(filename))
+            for i, (filename, desc, impact, folder) in enumerate(sequence)]
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# GRAFO
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_dag(stages):
+    """deps[i] = stadi che devono finire prima di i (sempre precedenti nella sequenza)."""
+    deps = {s.index: set() for s in stages}
+    for pos, stage in enumerate(stages):
+        for earlier in stages[:pos]:
+            if earlier.conflicts_with(stage):
+                deps[stage.index].add(earlier.index)
+    return deps
+
+
+def direct_deps(deps):
+    """Riduzione transitiva: solo le dipendenze non implicate da altre (per la stampa)."""
+    ancestors = {}
+    for i in sorted(deps):
+        ancestors[i] = set(deps[i])
+        for d in deps[i]:
+            ancestors[i] |= ancestors[d]
+    return {i: {d for d in ds if not any(d in ancestors[o] for o in ds if o != d)}
+            for i, ds in deps.items()}
+
+
+def descendants(deps, roots):
+    """roots e tutto ciò che (transitivamente) dipende da loro."""
+    out = set(roots)
+    for i in sorted(deps):
+        if deps[i] & out:
+            out.add(i)
+    return out
+
+
+def critical_path(stages, deps, durations):
+    """Catena di dipendenze più lunga: (secondi, [indici]). Durate mancanti = 0."""
+    finish, prev = {}, {}
+    for s in stages:
+        best = max(deps[s.index], key=lambda d: finish[d], default=None)
+        prev[s.index] = best
+        finish[s.index] = (finish[best] if best is not None else 0.0) + durations.get(s.index, 0.0)
+    if not finish:
+        return 0.0, []
+    end = max(finish, key=finish.get)
+    chain = []
+    while end is not None:
+        chain.append(end)
+        end = prev[end]
+    return finish[chain[0]], chain[::-1]
+
+
+def _tail_priority(stages, deps, estimates):
+    """Priorità = lunghezza stimata del percorso più lungo da qui alla fine (HLFET)."""
+    children = {s.index: [] for s in stages}
+    for i, ds in deps.items():
+        for d in ds:
+            children[d].append(i)
+    tail = {}
+    for s in reversed(stages):
+        tail[s.index] = estimates.get(s.index, DEFAULT_STAGE_SECONDS) + max(
+            (tail[c] for c in children[s.index]), default=0.0)
+    return tail
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# CHECKPOINT E STORICO DURATE
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """Esito per stadio della run corrente, salvato a ogni stadio concluso."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        data = _read_json(path, None) if resume else None
+        self.resumed = data is not None
+        self.data = data or {'started_at': datetime.now().isoformat(timespec='seconds'), 'stages': {}}
+
+    @property
+    def started_at(self):
+        return self.data.get('started_at')
+
+    def completed(self):
+        return {name for name, st in self.data['stages'].items() if st.get('status') == 'ok'}
+
+    def mark(self, stage, status, duration, error=None):
+        self.data['stages'][stage.filename] = {
+            'status': status, 'duration': round(duration, 1), 'error': error,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.data['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        _write_json(self.path, self.data)
+
+
+def load_durations(path):
+    """Ultima durata nota per script (secondi), dallo storico delle run precedenti."""
+    return _read_json(path, {})
+
+
+def save_durations(path, stages, results):
+    history = load_durations(path)
+    for s in stages:
+        r = results.get(s.index)
+        if r and r['status'] == 'ok':
+            history[s.filename] = round(r['duration'], 1)
+    _write_json(path, history)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# ESECUZIONE
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+class _RunningStage:
+    """Processi (uno o più shard) di uno stadio in corso, con il loro file di log."""
+
+    def __init__(self, stage, ports, log_dir):
+        self.stage = stage
+        self.ports = ports
+        self.start = time.time()
+        self.procs = []
+        self.log_paths = []
+        env = os.environ.copy()
+        env["PYTHONIOENCODING"] = "utf-8"
+        cmd = [sys.executable, stage.path, *stage.args]
+        n = stage.shards[1] if stage.shards else 1
+        for k in range(n):
+            proc_env = env.copy()
+            proc_env["CHROME_DEBUG_PORT"] = str(ports[k])
+            suffix = ''
+            if stage.shards:
+                proc_env[stage.shards[0]] = str(k)
+                suffix = f"_{k}"
+            log_path = os.path.join(log_dir, f"{stage.filename.replace('.py', '')}{suffix}.txt")
+            with open(log_path, 'w', encoding='utf-8') as lf:
+                self.procs.append(subprocess.Popen(cmd, env=proc_env, stdout=lf, stderr=subprocess.STDOUT))
+            self.log_paths.append(log_path)
+            if k < n - 1:
+                time.sleep(SHARD_STAGGER_SECONDS)
+
+    def poll(self):
+        """None finché almeno un processo è vivo, altrimenti la lista dei return code."""
+        codes = [p.poll() for p in self.procs]
+        return None if any(c is None for c in codes) else codes
+
+    def log_tail(self, lines=LOG_TAIL_LINES):
+        out = []
+        for path in self.log_paths:
+            try:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    out.extend(f.readlines()[-lines:])
+            except OSError:
+                pass
+        return out
+
+
+def run_stages(stages, deps, workers, log_dir, checkpoint=None, skip=(), host_limits=None, estimates=None):
+    """
+    Esegue il DAG: parte tutto ciò che ha le dipendenze concluse (anche se fallite,
+    come faceva la sequenza: meglio dati vecchi che nessun dato), in ordine di
+    percorso residuo più lungo, rispettando worker e limiti per sito.
+    Ritorna {indice: {'status': 'ok'|'ko'|'skip', 'duration', 'error', 'start', 'end'}}.
+    """
+    host_limits = host_limits or {}
+    priority = _tail_priority(stages, deps, estimates or {})
+    stage_log_dir = os.path.join(log_dir, 'stages')
+    os.makedirs(stage_log_dir, exist_ok=True)
+
+    results = {i: {'status': 'skip', 'duration': 0.0, 'error': None, 'start': None, 'end': None}
+               for i in skip}
+    done = set(skip)
+    pending = [s for s in stages if s.index not in done]
+    running = {}
+    free_ports = [CHROME_BASE_PORT + k for k in range(workers + max((s.weight for s in stages), default=1))]
+    t0 = time.time()
+
+    while pending or running:
+        # --- Avvio di tutto ciò che è pronto ---
+        used = sum(r.stage.weight for r in running.values())
+        host_use = Counter(h for r in running.values() for h in r.stage.hosts)
+        ready = sorted((s for s in pending if deps[s.index] <= done),
+                       key=lambda s: (-priority[s.index], s.index))
+        for stage in ready:
+            if not os.path.exists(stage.path):
+                print(f"\n❌ {stage.desc}: file non trovato in {stage.path}", flush=True)
+                results[stage.index] = {'status': 'ko', 'duration': 0.0, 'error': "File non trovato",
+                                        'start': None, 'end': None}
+                pending.remove(stage)
+                done.add(stage.index)
+                if checkpoint is not None:
+                    checkpoint.mark(stage, 'ko', 0.0, "File non trovato")
+                continue
+            need = min(stage.weight, workers)
+            if used + need > workers and running:
+                break   # lo slot resta prenotato per lo stadio più urgente
+            if any(host_use[h] >= host_limits.get(h, 1) for h in stage.hosts):
+                continue
+            ports, free_ports = free_ports[:stage.weight], free_ports[stage.weight:]
+            print(f"\n▶ {stage.desc}  [{stage.filename}]" +
+                  (f"  (x{stage.weight} istanze)" if stage.shards else ""), flush=True)
+            running[stage.index] = _RunningStage(stage, ports, stage_log_dir)
+            results[stage.index] = {'status': 'running', 'duration': 0.0, 'error': None,
+                                    'start': time.time() - t0, 'end': None}
+            pending.remove(stage)
+            used += need
+            host_use.update(stage.hosts)
+
+        if not running:
+            if not pending:
+                continue
+            # Nulla in corso e nulla avviabile: solo con un limite sito a 0
+            stage = pending.pop(0)
+            results[stage.index] = {'status': 'ko', 'duration': 0.0, 'start': None, 'end': None,
+                                    'error': 'Non avviabile (limiti sito)'}
+            done.add(stage.index)
+            continue
+
+        time.sleep(POLL_SECONDS)
+
+        # --- Raccolta stadi conclusi ---
+        for idx, run in list(running.items()):
+            codes = run.poll()
+            if codes is None:
+                continue
+            del running[idx]
+            free_ports.extend(run.ports)
+            stage = run.stage
+            elapsed = time.time() - run.start
+            ok = all(c == 0 for c in codes)
+            if ok:
+                error = None
+            elif len(codes) > 1:
+                error = f"Shard falliti: {[k for k, c in enumerate(codes) if c != 0]}"
+            else:
+                error = f"Exit code {codes[0]}"
+            results[idx].update(status='ok' if ok else 'ko', duration=elapsed, error=error,
+                                end=time.time() - t0)
+            done.add(idx)
+            print(f"   {'✅' if ok else '❌'} {stage.filename} completato in {elapsed / 60:.1f}min"
+                  f"  ({len(running)} in corso, {len(pending)} in attesa)", flush=True)
+            if not ok:
+                print(f"   ── ultime righe del log ({', '.join(run.log_paths)}) ──")
+                for line in run.log_tail():
+                    print(f"   │ {line.rstrip()}")
+            if checkpoint is not None:
+                checkpoint.mark(stage, 'ok' if ok else 'ko', elapsed, error)
+
+    return results
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# REPORT
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def print_plan(stages, deps, estimates, workers):
+    """Piano senza eseguire: dipendenze dirette e finestra stimata (seriale vs percorso critico)."""
+    direct = direct_deps(deps)
+    by_index = {s.index: s for s in stages}
+    print(f"\n🗺️  PIANO DAG — {len(stages)} stadi, max {workers} worker")
+    print("-" * 100)
+    for s in stages:
+        after = ', '.join(by_index[d].filename for d in sorted(direct[s.index])) or '—'
+        est = estimates.get(s.index)
+        est_str = f"{est / 60:.1f}min" if est is not None else "  n.d."
+        flag = '' if s.declared else '  ⚠️ senza I/O (barriera)'
+        print(f"{s.index + 1:<3} {s.filename:<45} {est_str:>8}  dopo: {after}{flag}")
+    print_critical_path(stages, deps, estimates, label="stimato")
+
+
+def print_critical_path(stages, deps, durations, label="reale", wall=None):
+    total, chain = critical_path(stages, deps, durations)
+    serial = sum(durations.get(s.index, 0.0) for s in stages)
+    by_index = {s.index: s for s in stages}
+    print(f"\n🧭 PERCORSO CRITICO ({label}): {total / 60:.1f}min su {serial / 60:.1f}min di lavoro seriale"
+          + (f" — durata effettiva {wall / 60:.1f}min" if wall is not None else ""))
+    for i in chain:
+        print(f"   → {by_index[i].filename:<45} {durations.get(i, 0.0) / 60:>6.1f}min")
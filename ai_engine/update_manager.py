@@ -1,9 +1,13 @@
 import os
 import sys
+import argparse
 import subprocess
 import time
 from datetime import datetime, timedelta
 
+from stage_scheduler import (build_stages, build_dag, descendants, run_stages, Checkpoint,
+                             load_durations, save_durations, print_plan, print_critical_path)
+
 # --- LOCK FILE per segnalare ai daemon che la pipeline è attiva ---
 LOCK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'log', 'pipeline_running.lock')
 def kill_chrome_zombies():
@@ -80,10 +84,13 @@ SCRAPER_SEQUENCE = [
 
       ("scraper_soccerstats_ranking_unified.py", "🏆 [5/22] Classifica & Gol", "Calcolo Forza Attacco/Difesa sballato", FREQUENT_DIR),
 
-      ("fbref_scraper_att.py", "⚽ [6/22] Stats Attaccanti", "Analisi attacco imprecisa", FREQUENT_DIR),
-      ("fbref_scraper_mid.py", "🧠 [7/22] Stats Centrocampisti", "Analisi centrocampo imprecisa", FREQUENT_DIR),
-      ("fbref_scraper_def.py", "🛡️ [8/22] Stats Difensori", "Analisi difesa imprecisa", FREQUENT_DIR),
-      ("scraper_gk_fbref.py", "🧤 [9/22] Stats Portieri", "Analisi portieri imprecisa", FREQUENT_DIR),
+      # ⭐ Un solo passaggio FBref per i 4 ruoli: ogni pagina di lega scaricata e parsata una volta
+      ("fbref_ingest.py", "⚽ [6-9/22] Stats Giocatori ATT/MID/DEF/GK (FBref)", "Analisi attacco/centrocampo/difesa/portieri imprecisa", FREQUENT_DIR),
+      # ❌ SOSTITUITI da fbref_ingest.py (restano eseguibili a mano, stesso risultato)
+      # ("fbref_scraper_att.py", "⚽ [6/22] Stats Attaccanti", "Analisi attacco imprecisa", FREQUENT_DIR),
+      # ("fbref_scraper_mid.py", "🧠 [7/22] Stats Centrocampisti", "Analisi centrocampo imprecisa", FREQUENT_DIR),
+      # ("fbref_scraper_def.py", "🛡️ [8/22] Stats Difensori", "Analisi difesa imprecisa", FREQUENT_DIR),
+      # ("scraper_gk_fbref.py", "🧤 [9/22] Stats Portieri", "Analisi portieri imprecisa", FREQUENT_DIR),
 
       # ⚠️ DISABILITATO (2026-02-09): impiega ~116 min e scrive solo in players_availability_tm
       # che al momento NON viene letta da nessun file di produzione (né calculators, né frontend).
@@ -212,63 +219,130 @@ SCRAPER_SEQUENCE = [
 ]
 
 
+# ------------------------------------------------------------------------------
+# DICHIARAZIONI I/O DEGLI STADI (per il DAG di stage_scheduler)
+# reads/writes: collection MongoDB lette/scritte; hosts: siti/API esterne (limite
+# processi contemporanei per sito in HOST_LIMITS); args: argomenti da riga di
+# comando; shards: (variabile d'ambiente, istanze parallele dello stesso script).
+# Due stadi restano in ordine solo se uno scrive ciò che l'altro legge o scrive.
+# ⚠️ Tutti gli scrittori di h2h_by_round riscrivono l'intero array "matches"
+#    ($set matches): vanno in serie tra loro, per questo la granularità è la collection.
+# Gli auto-alias ($addToSet su teams.aliases, es. BetExplorer) non contano come scrittura:
+#    aggiungono solo nomi alternativi, chi legge teams prima o dopo resta corretto.
+# Uno script assente da qui fa da barriera (aspetta tutto e tutti aspettano lui).
+# ------------------------------------------------------------------------------
+
+CUPS = ("matches_champions_league", "matches_europa_league", "teams_champions_league", "teams_europa_league")
+FBREF_ATT = ("players_stats_fbref_att", "players_stats_fbref_att_ucl", "players_stats_fbref_att_uel")
+FBREF_MID = ("players_stats_fbref_mid", "players_stats_fbref_mid_ucl", "players_stats_fbref_mid_uel")
+FBREF_DEF = ("players_stats_fbref_def", "players_stats_fbref_def_ucl", "players_stats_fbref_def_uel")
+FBREF_GK = ("players_stats_fbref_gk", "players_stats_fbref_gk_ucl", "players_stats_fbref_gk_uel")
+FBREF_ALL = FBREF_ATT + FBREF_MID + FBREF_DEF + FBREF_GK
+# Tutto ciò che i motori A/S/C leggono (anche tramite daily_snapshot e bulk_manager)
+ENGINE_INPUTS = ("h2h_by_round", "teams", "classifiche", "league_stats", "team_seasonal_stats",
+                 "raw_h2h_data_v2", "prediction_tuning_settings", "matches_history",
+                 "matches_history_betexplorer") + FBREF_ALL + CUPS
+
+STAGE_IO = {
+    "update_cups_data.py": dict(writes=CUPS, hosts=("transfermarkt.it", "nowgoal26.com", "clubelo.com")),
+    "aggiorna_media_gol_partita_tutti_campionati.py": dict(writes=("league_stats",), hosts=("soccerstats.com",)),
+    "scraper_results_fbref.py": dict(writes=("matches_history", "team_seasonal_stats"), hosts=("fbref.com",)),
+    "scrape_lucifero_betexplorer_safe.py": dict(writes=("matches_history_betexplorer",), hosts=("betexplorer.com",)),
+    "scraper_soccerstats_ranking_unified.py": dict(writes=("classifiche", "teams"), hosts=("soccerstats.com",)),
+    "fbref_ingest.py": dict(writes=FBREF_ALL, hosts=("fbref.com",)),
+    "scraper_calendario_h2h_TF_completo.py": dict(writes=("h2h_by_round",), hosts=("transfermarkt.it",)),
+    "scraper_date_orari_nowgoal.py": dict(reads=("h2h_by_round", "teams"), hosts=("nowgoal26.com",)),
+    # SBLOCCO AUTOMATICO: "all" salta il menu interattivo (modalità delta; "--full" per il ricalcolo completo)
+    "calculate_h2h_v2.py": dict(reads=("raw_h2h_data_v2",), writes=("h2h_by_round",), args=("all",)),
+    "scraper_quote_betexplorer.py": dict(writes=("h2h_by_round", "daily_predictions_unified"),
+                                         hosts=("betexplorer.com",)),
+    "cron_update_lucifero.py": dict(writes=("h2h_by_round",)),
+    "db_updater_bvs.py": dict(reads=("teams",), writes=("h2h_by_round",)),
+    "scraper_classifiche_standings.py": dict(reads=("teams",), writes=("classifiche",), hosts=("nowgoal26.com",)),
+    "run_all_injectors.py": dict(reads=("teams",) + FBREF_ALL, writes=("h2h_by_round",) + CUPS,
+                                 hosts=("sportradar.com",)),
+    "update_fattore_campo.py": dict(reads=("teams",), writes=("h2h_by_round",)),
+    "update_affidabilità.py": dict(reads=("matches_history_betexplorer",), writes=("h2h_by_round",)),
+    "calculate_motivazioni.py": dict(reads=("classifiche",), writes=("teams",)),
+    "per_agg_pianificato_update_results_only.py": dict(reads=("teams",), writes=("h2h_by_round",),
+                                                       hosts=("betexplorer.com",)),
+    # SNAI: 3 istanze parallele, ognuna processa 1/3 delle leghe
+    "scrape_snai_odds.py": dict(reads=("teams",), writes=("h2h_by_round", "daily_predictions",
+                                                    "daily_predictions_sandbox", "daily_predictions_unified") + CUPS,
+                                hosts=("snai.it",), shards=("SNAI_LEAGUE_GROUP", 3)),
+    "scrape_sportradar_h2h.py": dict(reads=("teams",), writes=CUPS, hosts=("sportradar.com",)),
+    "run_daily_predictions.py": dict(reads=ENGINE_INPUTS, writes=("daily_predictions", "daily_bombs")),
+    "run_daily_predictions_sandbox.py": dict(reads=ENGINE_INPUTS,
+                                             writes=("daily_predictions_sandbox", "daily_bombs_sandbox")),
+    "generate_track_record_report.py": dict(reads=("daily_predictions", "h2h_by_round")),
+    "run_daily_predictions_engine_c.py": dict(reads=ENGINE_INPUTS, writes=("daily_predictions_engine_c",)),
+    "orchestrate_experts.py": dict(reads=("daily_predictions", "daily_predictions_engine_c",
+                                          "daily_predictions_sandbox", "h2h_by_round"),
+                                   writes=("daily_predictions_unified", "prediction_versions", "re_quota_requests")),
+    "tag_elite.py": dict(writes=("daily_predictions_unified",)),
+    "tag_mixer.py": dict(writes=("daily_predictions_unified",)),
+    "tag_super_selection.py": dict(writes=("daily_predictions_unified",)),
+    "calculate_profit_loss.py": dict(reads=("h2h_by_round",) + CUPS,
+                                     writes=("daily_predictions", "daily_predictions_engine_c",
+                                             "daily_predictions_unified", "monthly_stats")),
+    "popola_pl_storico.py": dict(reads=("daily_predictions_unified", "h2h_by_round"), writes=("pl_storico",)),
+    "refresh_calibration_table.py": dict(reads=("daily_predictions_unified",), writes=("calibration_table",)),
+    "feedback_loop_analyzer.py": dict(reads=("daily_predictions_unified", "h2h_by_round"),
+                                      writes=("prediction_errors",), hosts=("api.mistral.ai",)),
+    "snapshot_nightly.py": dict(reads=("daily_predictions_unified", "h2h_by_round"), writes=("prediction_versions",)),
+    "scrape_snai_exact_score.py": dict(reads=("teams",), writes=("daily_predictions_unified", "re_quota_requests"),
+                                       hosts=("snai.it",)),
+    "generate_match_analysis.py": dict(writes=("daily_predictions_unified",)),
+    "update_ticket_esiti.py": dict(reads=("h2h_by_round",) + CUPS, writes=("bollette",)),
+    "generate_bollette_2.py": dict(reads=("daily_predictions_unified", "h2h_by_round", "classifiche", "teams"),
+                                   writes=("bollette",), hosts=("api.mistral.ai",)),
+    "scraper_quote_anomale_lucksport.py": dict(reads=("teams",), writes=("quote_anomale",), hosts=("lucksport.com",)),
+    "index_raw_to_vector.py": dict(writes=("raw_chunks", "raw_chunks_index"), hosts=("api.mistral.ai",)),
+    "index_wiki_to_vector.py": dict(writes=("wiki_chunks", "wiki_chunks_index"), hosts=("api.mistral.ai",)),
+    # Accredita i rimborsi tramite l'endpoint Node (scritture fuori da questa pipeline)
+    "process_shield_refunds.py": dict(reads=("h2h_by_round", "daily_predictions_unified") + CUPS,
+                                      writes=("shield_refunds",)),
+}
+
+# Processi contemporanei per sito (default 1). fbref: risultati + fbref_ingest (giocatori).
+HOST_LIMITS = {"fbref.com": 2, "api.mistral.ai": 2}
+
+# Stadi contemporanei (ogni istanza SNAI conta come uno)
+MAX_PARALLEL_STAGES = int(os.getenv("UPDATE_MAX_WORKERS", "4"))
+
+# In log/: esito per stadio della run (per --resume) e ultima durata nota per script
+CHECKPOINT_FILE = "pipeline_checkpoint.json"
+DURATIONS_FILE = "pipeline_durations.json"
+
+
 # ------------------------------------------------------------------------------
 # FUNZIONI DI SERVIZIO
 # ------------------------------------------------------------------------------
 
-def run_single_script(filename, description, folder_path):
-    # Costruiamo il path completo
-    full_path = os.path.join(folder_path, filename)
-    print("\n" + "-"*70)
-    print(f"▶ {description}")
-    
-    # Controllo esistenza file
-    if not os.path.exists(full_path):
-        print(f"❌ Errore: File non trovato in {full_path}")
-        return False, "File non trovato", 0.0
-
-    start_time = time.time()
-    
-    try:
-        # --- SETUP AMBIENTE UTF-8 ---
-        env = os.environ.copy()
-        env["PYTHONIOENCODING"] = "utf-8"
-        # ----------------------------
-
-        # Costruzione del comando base
-        cmd = [sys.executable, full_path]
-        
-        # SBLOCCO AUTOMATICO: Se è il calcolatore H2H, passiamo "all" per saltare il menu
-        if filename == "calculate_h2h_v2.py":
-            cmd.append("all")
-
-        # Esecuzione script
-        subprocess.run(
-            cmd, 
-            check=True, 
-            capture_output=False, 
-            text=True, 
-            encoding='utf-8', 
-            errors='replace',
-            env=env
-        )
-        
-        elapsed = time.time() - start_time
-        print(f"   ✅ COMPLETATO in {elapsed:.2f}s")
-        return True, None, elapsed
-        
-    except subprocess.CalledProcessError as e:
-        elapsed = time.time() - start_time
-        print("   🔴 ERRORE SCRIPT (Vedi output sopra)")
-        return False, "Script fallito (Exit Code != 0)", elapsed
-        
-    except Exception as e:
-        return False, str(e), 0.0
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline notturna di aggiornamento (DAG parallelo)")
+    parser.add_argument("--workers", type=int, default=MAX_PARALLEL_STAGES,
+                        help=f"stadi in parallelo (default {MAX_PARALLEL_STAGES}, 1 = sequenziale)")
+    parser.add_argument("--resume", action="store_true",
+                        help="riprende dall'ultimo checkpoint: solo stadi falliti/mai partiti e i loro dipendenti")
+    parser.add_argument("--plan", action="store_true",
+                        help="mostra dipendenze e percorso critico stimato senza eseguire nulla")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workers = max(1, args.workers)
 
+    if args.plan:
+        stages = build_stages(SCRAPER_SEQUENCE, STAGE_IO)
+        history = load_durations(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'log', DURATIONS_FILE))
+        print_plan(stages, build_dag(stages),
+                   {s.index: history[s.filename] for s in stages if s.filename in history}, workers)
+        return
 
-def main():
     print("\n" + "="*80)
-    print("🎩 DIRETTORE D'ORCHESTRA 3.3: CON CRONOMETRO & DIAGNOSTICA")
+    print("🎩 DIRETTORE D'ORCHESTRA 4.0: DAG PARALLELO, CHECKPOINT & PERCORSO CRITICO")
     print("="*80)
 
     # Cleanup Chrome zombie prima di iniziare
@@ -283,142 +357,50 @@ def main():
     except Exception as e:
         print(f"⚠️ Impossibile creare lock file: {e}")
 
-    report = []
-    total_start_time = time.time() # Start Cronometro Globale
-
-    # Script da eseguire in parallelo (stessa fonte fbref.com, indipendenti tra loro)
-    PARALLEL_FBREF = {"fbref_scraper_att.py", "fbref_scraper_mid.py", "fbref_scraper_def.py", "scraper_gk_fbref.py"}
-    # SNAI scraper: 3 istanze parallele, ognuna processa 1/3 delle leghe
-    PARALLEL_SNAI = "scrape_snai_odds.py"
-    SNAI_NUM_GROUPS = 3
-
     log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'log')
     os.makedirs(log_dir, exist_ok=True)
 
-    i = 0
-    while i < len(SCRAPER_SEQUENCE):
-        filename, desc, impact, folder = SCRAPER_SEQUENCE[i]
-
-        # --- GRUPPO PARALLELO FBREF ---
-        if filename in PARALLEL_FBREF:
-            parallel_tasks = []
-            while i < len(SCRAPER_SEQUENCE) and SCRAPER_SEQUENCE[i][0] in PARALLEL_FBREF:
-                parallel_tasks.append(SCRAPER_SEQUENCE[i])
-                i += 1
-
-            print(f"\n🔀 LANCIO PARALLELO: {len(parallel_tasks)} fbref scrapers contemporanei")
-
-            env = os.environ.copy()
-            env["PYTHONIOENCODING"] = "utf-8"
-            processes = []
-            log_files = []
-            base_port = 9222
-            for idx, (pf, pd, pi, pfolder) in enumerate(parallel_tasks):
-                full_path = os.path.join(pfolder, pf)
-                print(f"   🚀 Avvio: {pf} (porta Chrome: {base_port + idx})")
-                p_start = time.time()
-                proc_env = env.copy()
-                proc_env["CHROME_DEBUG_PORT"] = str(base_port + idx)
-                log_path = os.path.join(log_dir, f"fbref_{pf.replace('.py','')}.txt")
-                lf = open(log_path, 'w', encoding='utf-8')
-                log_files.append(lf)
-                proc = subprocess.Popen(
-                    [sys.executable, full_path],
-                    env=proc_env,
-                    stdout=lf,
-                    stderr=lf
-                )
-                processes.append((pf, pd, pi, pfolder, proc, p_start))
-
-            print(f"   ⏳ Attendo completamento di tutti e {len(processes)}...")
-            for pf, pd, pi, pfolder, proc, p_start in processes:
-                proc.wait()
-                elapsed = time.time() - p_start
-                ok = (proc.returncode == 0)
-                err_msg = None if ok else f"Exit code {proc.returncode}"
-                print(f"   {'✅' if ok else '❌'} {pf} completato in {elapsed/60:.1f}min")
-                report.append({
-                    "file": pf,
-                    "status": "✅ OK" if ok else "❌ KO",
-                    "error": err_msg,
-                    "impact": pi,
-                    "folder": pfolder,
-                    "duration": elapsed
-                })
-
-            for lf in log_files:
-                lf.close()
-            print(f"🔀 GRUPPO PARALLELO FBREF COMPLETATO")
-            time.sleep(2)
-
-        # --- GRUPPO PARALLELO SNAI (3 istanze, 1/3 leghe ciascuna) ---
-        elif filename == PARALLEL_SNAI:
-            i += 1
-            full_path = os.path.join(folder, filename)
-            print(f"\n🔀 LANCIO PARALLELO: {SNAI_NUM_GROUPS} istanze SNAI (8 leghe ciascuna)")
-
-            env = os.environ.copy()
-            env["PYTHONIOENCODING"] = "utf-8"
-            processes = []
-            log_files = []
-            group_start = time.time()
-
-            for grp in range(SNAI_NUM_GROUPS):
-                print(f"   🚀 Avvio: SNAI gruppo {grp}")
-                proc_env = env.copy()
-                proc_env["SNAI_LEAGUE_GROUP"] = str(grp)
-                log_path = os.path.join(log_dir, f"snai_group_{grp}.txt")
-                lf = open(log_path, 'w', encoding='utf-8')
-                log_files.append(lf)
-                proc = subprocess.Popen(
-                    [sys.executable, full_path],
-                    env=proc_env,
-                    stdout=lf,
-                    stderr=lf
-                )
-                processes.append((f"snai_group_{grp}", desc, impact, folder, proc, time.time()))
-                # Sfasa di 5s per non colpire snai.it simultaneamente
-                if grp < SNAI_NUM_GROUPS - 1:
-                    time.sleep(5)
-
-            print(f"   ⏳ Attendo completamento di tutti e {len(processes)} gruppi SNAI...")
-            for pf, pd, pi, pfolder, proc, p_start in processes:
-                proc.wait()
-                elapsed = time.time() - p_start
-                ok = (proc.returncode == 0)
-                err_msg = None if ok else f"Exit code {proc.returncode}"
-                print(f"   {'✅' if ok else '❌'} {pf} completato in {elapsed/60:.1f}min")
-
-            total_snai_elapsed = time.time() - group_start
-            # Un solo record nel report per l'intero gruppo SNAI
-            all_ok = all(proc.returncode == 0 for _, _, _, _, proc, _ in processes)
-            report.append({
-                "file": f"{filename} (x{SNAI_NUM_GROUPS} parallelo)",
-                "status": "✅ OK" if all_ok else "❌ KO",
-                "error": None if all_ok else "Uno o più gruppi falliti",
-                "impact": impact,
-                "folder": folder,
-                "duration": total_snai_elapsed
-            })
-
-            for lf in log_files:
-                lf.close()
-            print(f"🔀 GRUPPO PARALLELO SNAI COMPLETATO in {total_snai_elapsed/60:.1f}min")
-            time.sleep(2)
-
+    # --- DAG degli stadi: dipendenze dalle collection dichiarate in STAGE_IO ---
+    stages = build_stages(SCRAPER_SEQUENCE, STAGE_IO)
+    deps = build_dag(stages)
+    history = load_durations(os.path.join(log_dir, DURATIONS_FILE))
+    estimates = {s.index: history[s.filename] for s in stages if s.filename in history}
+    undeclared = [s.filename for s in stages if not s.declared]
+    if undeclared:
+        print(f"⚠️ Stadi senza dichiarazione I/O (eseguiti come barriera): {', '.join(undeclared)}")
+
+    checkpoint = Checkpoint(os.path.join(log_dir, CHECKPOINT_FILE), resume=args.resume)
+    skip = set()
+    if args.resume:
+        if checkpoint.resumed:
+            # Rilancia falliti/mai partiti + tutto ciò che dipende da loro
+            ok_names = checkpoint.completed()
+            redo = descendants(deps, {s.index for s in stages if s.filename not in ok_names})
+            skip = {s.index for s in stages if s.index not in redo}
+            print(f"♻️ RIPRESA dal checkpoint del {checkpoint.started_at}: "
+                  f"{len(skip)} stadi già completati, {len(stages) - len(skip)} da eseguire")
         else:
-            # Esecuzione sequenziale normale
-            ok, err_msg, duration = run_single_script(filename, desc, folder)
-            report.append({
-                "file": filename,
-                "status": "✅ OK" if ok else "❌ KO",
-                "error": err_msg,
-                "impact": impact,
-                "folder": folder,
-                "duration": duration
-            })
-            if ok: time.sleep(2)
-            i += 1
+            print("⚠️ Nessun checkpoint trovato: esecuzione completa")
+
+    print(f"\n🔀 Esecuzione DAG: {len(stages)} stadi, max {workers} in parallelo")
+    total_start_time = time.time() # Start Cronometro Globale
+
+    results = run_stages(stages, deps, workers, log_dir, checkpoint=checkpoint, skip=skip,
+                         host_limits=HOST_LIMITS, estimates=estimates)
+    save_durations(os.path.join(log_dir, DURATIONS_FILE), stages, results)
+
+    report = []
+    for stage in stages:
+        r = results[stage.index]
+        report.append({
+            "file": stage.filename + (f" (x{stage.weight} parallelo)" if stage.shards else ""),
+            "script": " ".join((stage.filename,) + stage.args),
+            "status": {"ok": "✅ OK", "ko": "❌ KO"}.get(r['status'], "⏩ SKIP"),
+            "error": r['error'],
+            "impact": stage.impact,
+            "folder": stage.folder,
+            "duration": r['duration']
+        })
 
     total_duration_sec = time.time() - total_start_time
     total_duration_str = str(timedelta(seconds=int(total_duration_sec))) # Converte in HH:MM:SS
@@ -438,6 +420,9 @@ def main():
         if item['status'] == "❌ KO":
             failures.append(item)
 
+    # --- PERCORSO CRITICO (la finestra minima con queste durate) ---
+    print_critical_path(stages, deps, {i: r['duration'] for i, r in results.items() if r['status'] != 'skip'},
+                        wall=total_duration_sec)
 
     # --- DETTAGLIO ERRORI E SOLUZIONI ---
     if failures:
@@ -446,9 +431,9 @@ def main():
         print("="*90)
         for fail in failures:
             try:
-                rel_path = os.path.relpath(os.path.join(fail['folder'], fail['file']), BASE_PROJECT_DIR)
+                rel_path = os.path.relpath(os.path.join(fail['folder'], fail['script']), BASE_PROJECT_DIR)
             except ValueError:
-                rel_path = os.path.join(fail['folder'], fail['file'])
+                rel_path = os.path.join(fail['folder'], fail['script'])
 
             print(f"🔴 {fail['file']}")
             print(f"   └─ Errore: {fail['error']}")
@@ -458,6 +443,7 @@ def main():
             print("-" * 60)
             
         print("\n❌ L'aggiornamento ha avuto dei problemi. Controlla i comandi sopra.")
+        print("   ♻️ Oppure riprendi dal checkpoint (solo falliti + dipendenti): python ai_engine/update_manager.py --resume")
     else:
         print(f"\n✨ SISTEMA PERFETTAMENTE AGGIORNATO IN {total_duration_str}!")
 
@@ -8,21 +8,34 @@ def get_sign(h, a):
     elif a > h: return "2"
     return "X"
 
+def score_counter(all_results):
+    """
+    Counter {"gh-ga": conteggio} delle simulazioni.
+    all_results: ScoreAccumulator (istogramma) o lista di stringhe tipo ['2-1', '1-1', ...]
+    """
+    if hasattr(all_results, 'score_counts'):
+        # Stesso ordine di prima comparsa di Counter(lista): stessi pareggi in most_common
+        return Counter(all_results.score_counts())
+    return Counter(all_results)
+
 def analyze_betting_data(all_results, bookmaker_odds=None):
     """
     Trasforma le simulazioni grezze in un report professionale.
-    all_results: lista di stringhe tipo ['2-1', '1-1', '0-2', ...]
+    all_results: ScoreAccumulator o lista di stringhe tipo ['2-1', '1-1', '0-2', ...]
     """
     if not all_results:
         return None
 
-    total_sims = len(all_results)
+    # Conteggi per risultato distinto: i cicli non vengono più scorsi uno per uno
+    counts = score_counter(all_results)
+    goals = {score: tuple(map(int, score.split("-"))) for score in counts}
+    total_sims = sum(counts.values())
     
     # --- 1. CALCOLO PROBABILITÀ 1X2 ---
     signs_count = {'1': 0, 'X': 0, '2': 0}
-    for score in all_results:
-        h, a = map(int, score.split("-"))
-        signs_count[get_sign(h, a)] += 1
+    for score, count in counts.items():
+        h, a = goals[score]
+        signs_count[get_sign(h, a)] += count
     
     prob_1x2 = {s: (count / total_sims) * 100 for s, count in signs_count.items()}
     
@@ -64,14 +77,14 @@ def analyze_betting_data(all_results, bookmaker_odds=None):
                 }
 
     # --- 4. UNDER/OVER & GOL/NOGOL ---
-    under_count = sum(1 for s in all_results if sum(map(int, s.split("-"))) <= 2.5)
-    gg_count = sum(1 for s in all_results if all(int(x) > 0 for x in s.split("-")))
+    under_count = sum(c for s, c in counts.items() if sum(goals[s]) <= 2.5)
+    gg_count = sum(c for s, c in counts.items() if all(x > 0 for x in goals[s]))
     
     prob_uo = {"U2.5": (under_count / total_sims) * 100, "O2.5": ((total_sims - under_count) / total_sims) * 100}
     prob_gg = {"GG": (gg_count / total_sims) * 100, "NG": ((total_sims - gg_count) / total_sims) * 100}
 
     # --- 5. TOP 5 RISULTATI ESATTI ---
-    top5_raw = Counter(all_results).most_common(5)
+    top5_raw = counts.most_common(5)
     top5_formatted = [
         {"score": s, "prob": round((count / total_sims) * 100, 1)} 
         for s, count in top5_raw
@@ -7,6 +7,10 @@ di una lega in una sola chiamata. L'originale bulk_manager.py resta intatto.
 Uso:
     league_cache = load_league_cache(all_team_names, league_name)
     bulk_cache = build_match_cache(league_cache, home, away)
+
+Con uno snapshot del giorno (daily_snapshot.get_snapshot) la cache lega
+e gli H2H per partita vengono dallo snapshot, senza query:
+    league_cache = load_league_cache(all_team_names, league_name, snapshot=snap)
 """
 import time
 import sys
@@ -64,7 +68,7 @@ def _normalize_league(league_name):
     return _LEAGUE_MAP.get(league_normalized, league_normalized)
 
 
-def load_league_cache(all_team_names, league_name):
+def load_league_cache(all_team_names, league_name, snapshot=None):
     """
     Carica TUTTI i dati pesanti per una lega in UNA sola chiamata.
     Chiamare UNA VOLTA per lega, poi usare build_match_cache() per ogni partita.
@@ -72,12 +76,20 @@ def load_league_cache(all_team_names, league_name):
     Args:
         all_team_names: lista di TUTTE le squadre della lega per quel giorno
         league_name: nome della lega
+        snapshot: DaySnapshot del giorno (opzionale); se copre la lega non fa query
     Returns:
         league_cache: dizionario con dati condivisi
     """
     t_start = time.time()
     league_normalized = _normalize_league(league_name)
 
+    if snapshot is not None:
+        cached = snapshot.league_cache(all_team_names, league_normalized)
+        if cached is not None:
+            print(f"♻️ [BULK-C] Cache lega da snapshot: {league_normalized} — Teams={len(cached['TEAMS'])}, "
+                  f"Rounds={len(cached['ALL_ROUNDS'])}", file=sys.stderr)
+            return cached
+
     print(f"🔍 [BULK-C] Caricamento lega: {league_name} -> {league_normalized}", file=sys.stderr)
     print(f"🔍 [BULK-C] Squadre: {len(all_team_names)} — {all_team_names}", file=sys.stderr)
 
@@ -203,9 +215,12 @@ def build_match_cache(league_cache, home_team, away_team):
         for alias in aliases:
             master_map[alias] = team_entry
 
-    # 2. H2H SPECIFICO (query leggera — aggregation su indice)
+    # 2. H2H SPECIFICO (dallo snapshot se presente, altrimenti aggregation su indice)
     h2h_match_data = {"h_score": 0, "a_score": 0, "msg": "Dati non trovati", "extra": {}, "quotes": {}}
 
+    snap_match = league_cache.get("_MATCH_H2H_INDEX", {}).get((home_team.lower(), away_team.lower()))
+    result = [{"match": snap_match}] if snap_match is not None else None
+
     pipeline = [
         {"$unwind": "$matches"},
         {"$match": {
@@ -221,7 +236,8 @@ def build_match_cache(league_cache, home_team, away_team):
         {"$project": {"match": "$matches"}}
     ]
 
-    result = list(db["h2h_by_round"].aggregate(pipeline))
+    if result is None:
+        result = list(db["h2h_by_round"].aggregate(pipeline))
     if result:
         match = result[0]["match"]
         h2h = match.get("h2h_data", {})
@@ -238,12 +254,17 @@ def build_match_cache(league_cache, home_team, away_team):
 
     # 3. H2H STORICO (query leggera — find_one)
     h2h_historical_stats = None
-    h2h_doc = db.raw_h2h_data_v2.find_one({
-        "$or": [
-            {"team_a": home_team, "team_b": away_team},
-            {"team_a": away_team, "team_b": home_team}
-        ]
-    })
+    snap_raw_h2h = league_cache.get("_RAW_H2H", {})
+    pair = tuple(sorted((home_team, away_team)))
+    if pair in snap_raw_h2h:
+        h2h_doc = snap_raw_h2h[pair]
+    else:
+        h2h_doc = db.raw_h2h_data_v2.find_one({
+            "$or": [
+                {"team_a": home_team, "team_b": away_team},
+                {"team_a": away_team, "team_b": home_team}
+            ]
+        })
 
     if h2h_doc and 'matches' in h2h_doc:
         matches = h2h_doc['matches']
@@ -0,0 +1,496 @@
+"""
+DAILY SNAPSHOT — Dati del giorno condivisi tra Sistema A, S e C
+================================================================
+Carica UNA volta tutte le leghe toccate dalle partite del giorno
+(teams, rose FBref, ultime giornate h2h_by_round, risultati della stagione,
+statistiche stagionali, league_stats, scontri diretti raw_h2h_data_v2) con
+poche query in blocco. I tre sistemi leggono da qui invece di ripetere le
+stesse query per partita.
+
+Ogni run dei sistemi ricostruisce lo snapshot (refresh=True, default): quote,
+h2h_data e teams cambiano tra un run e l'altro. Chi esegue A→S→C nello stesso
+ciclo (pre_match_update) costruisce uno snapshot e lo passa ai tre sistemi.
+Con refresh=False lo snapshot in memoria o su file (_cache_snapshot/) viene
+riusato solo se ha meno di SNAPSHOT_MAX_AGE_MINUTES e la stessa versione dati
+(data_version: impronta delle partite del giorno + conteggi/last_updated delle
+collection sorgente).
+
+Uso:
+    from calculators import daily_snapshot
+    snap = daily_snapshot.get_snapshot(target_date)   # None se non costruibile
+    doc = snap.team("Inter")
+    if doc is daily_snapshot.MISS:                    # chiave non coperta → query Mongo
+        ...
+
+Costruzione manuale (verifica dei tempi / debug):
+    python -m calculators.daily_snapshot --date 2026-10-18
+"""
+import os
+import sys
+import time
+import pickle
+import hashlib
+from datetime import datetime, timedelta
+
+# --- FIX PERCORSI (config.py è in ai_engine/) ---
+_ai_engine_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ai_engine_dir not in sys.path:
+    sys.path.append(_ai_engine_dir)
+
+from config import db
+
+
+SNAPSHOT_DIR = os.path.join(_ai_engine_dir, "_cache_snapshot")
+SNAPSHOT_MAX_AGE_MINUTES = 60    # Con refresh=False: oltre questa età lo snapshot viene ricostruito
+ROUNDS_PER_LEAGUE = 12           # Giornate complete per lega (le stesse di bulk_manager_c / Lucifero)
+
+# Collection sorgente (oltre a h2h_by_round) che entrano nella versione dati
+_VERSIONED_COLLECTIONS = ("teams", "raw_h2h_data_v2", "team_seasonal_stats", "league_stats",
+                          "players_stats_fbref_gk", "players_stats_fbref_def",
+                          "players_stats_fbref_mid", "players_stats_fbref_att")
+
+# Sentinella: la chiave richiesta non è coperta dallo snapshot → il chiamante usa Mongo
+MISS = object()
+
+_CURRENT = None                  # Ultimo snapshot in memoria (uno solo: limita la RAM)
+
+_ROLES = ("GK", "DEF", "MID", "ATT")
+
+
+def _as_list(value):
+    """aliases / aliases_transfermarkt possono essere stringa o lista."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return value
+    return []
+
+
+def _pair_key(a, b):
+    """Chiave non ordinata: (a, b) e (b, a) puntano allo stesso scontro diretto."""
+    return tuple(sorted((a, b)))
+
+
+class DaySnapshot:
+    """Dati del giorno indicizzati per le lookup dei tre sistemi."""
+
+    def __init__(self, date_str, data, built_at=None, version=None):
+        self.date_str = date_str
+        self.built_at = built_at or datetime.now()
+        self.version = version
+        self.leagues = set(data["leagues"])
+        self.team_names = set(data["team_names"])
+        self.h2h_pairs = set(data["h2h_pairs"])
+        self.tm_pairs = set(data["tm_pairs"])
+        self._data = data
+        self._index()
+
+    def _index(self):
+        d = self._data
+
+        # teams: primo doc (ordine naturale) per name / aliases / aliases_transfermarkt, come find_one
+        self._team_by_key = {}
+        for t in d["teams"]:
+            keys = [t.get("name")] + _as_list(t.get("aliases")) + _as_list(t.get("aliases_transfermarkt"))
+            for k in keys:
+                if k:
+                    self._team_by_key.setdefault(k, t)
+
+        # team_seasonal_stats: (team, league) e solo team
+        self._seasonal_names = set(d["seasonal_names"])
+        self._seasonal_by_team_league = {}
+        self._seasonal_by_team = {}
+        for s in d["seasonal_stats"]:
+            self._seasonal_by_team_league.setdefault((s.get("team"), s.get("league")), s)
+            self._seasonal_by_team.setdefault(s.get("team"), s)
+
+        self._league_stats = {doc["_id"]: doc for doc in d["league_stats"]}
+
+        # raw_h2h_data_v2: primo doc per coppia non ordinata (nomi e tm_id)
+        self._raw_h2h_by_names = {}
+        self._raw_h2h_by_tm = {}
+        for doc in d["raw_h2h"]:
+            if doc.get("team_a") is not None and doc.get("team_b") is not None:
+                self._raw_h2h_by_names.setdefault(_pair_key(doc["team_a"], doc["team_b"]), doc)
+            if doc.get("tm_id_a") is not None and doc.get("tm_id_b") is not None:
+                self._raw_h2h_by_tm.setdefault(_pair_key(doc["tm_id_a"], doc["tm_id_b"]), doc)
+
+        # h2h_by_round per lega: ultime giornate complete (last_updated desc)
+        # e risultati di tutta la stagione (solo home/away/real_score/date_obj)
+        self._rounds_by_league = {}
+        for r in d["rounds"]:
+            self._rounds_by_league.setdefault(r.get("league"), []).append(r)
+        self._results_by_league = {}
+        for r in d["results"]:
+            self._results_by_league.setdefault(r.get("league"), []).append(r)
+
+    # ==================== LOOKUP SISTEMA A / S ====================
+
+    def team(self, name):
+        """Come teams.find_one({$or: name / aliases / aliases_transfermarkt})."""
+        if name not in self.team_names:
+            return MISS
+        return self._team_by_key.get(name)
+
+    def seasonal_stats(self, team, league):
+        """Come get_seasonal_stats: prima (team, league), poi solo team."""
+        if team not in self._seasonal_names:
+            return MISS
+        return self._seasonal_by_team_league.get((team, league)) or self._seasonal_by_team.get(team)
+
+    def league_avg_goals(self, league):
+        """Doc league_stats della lega (None se assente), MISS se lega fuori snapshot."""
+        if league not in self.leagues:
+            return MISS
+        return self._league_stats.get(league)
+
+    def raw_h2h_by_tm_ids(self, tm_a, tm_b):
+        key = _pair_key(tm_a, tm_b)
+        if key not in self.tm_pairs:
+            return MISS
+        return self._raw_h2h_by_tm.get(key)
+
+    def raw_h2h_by_names(self, team_a, team_b):
+        key = _pair_key(team_a, team_b)
+        if key not in self.h2h_pairs:
+            return MISS
+        return self._raw_h2h_by_names.get(key)
+
+    def played_matches(self, league):
+        """
+        Partite con real_score della lega, più recenti prima
+        (stesso risultato della pipeline di build_streak_cache).
+        """
+        if league not in self.leagues:
+            return MISS
+        played = []
+        for r in self._results_by_league.get(league, []):
+            for m in r.get("matches", []):
+                if "real_score" not in m or m["real_score"] == "":
+                    continue
+                played.append({
+                    "home": m.get("home"),
+                    "away": m.get("away"),
+                    "real_score": m.get("real_score"),
+                    "date_obj": m.get("date_obj"),
+                })
+        # Mongo ordina i date_obj mancanti in fondo con sort -1
+        played.sort(key=lambda m: (m["date_obj"] is not None, m["date_obj"] or datetime.min), reverse=True)
+        return played
+
+    # ==================== LOOKUP SISTEMA C ====================
+
+    def league_cache(self, all_team_names, league_normalized, rounds_limit=12):
+        """
+        league_cache nel formato di bulk_manager_c.load_league_cache,
+        più gli indici H2H usati da build_match_cache. None se non coperto.
+        """
+        if league_normalized not in self.leagues or not set(all_team_names) <= self.team_names:
+            return None
+
+        names = set(all_team_names)
+        rose = {
+            role: [p for p in self._data["players"][role]
+                   if p.get("league_name") == league_normalized and p.get("team_name_fbref") in names]
+            for role in _ROLES
+        }
+
+        raw_teams = []
+        for t in self._data["teams"]:
+            if t.get("name") in names or any(a in names for a in _as_list(t.get("aliases"))):
+                raw_teams.append({k: v for k, v in t.items() if k != "_id"})
+
+        rounds = self._rounds_by_league.get(league_normalized, [])
+        if not rounds:
+            return None  # load_league_cache ha il fallback di ricerca lega
+
+        # League stats: stessa media PPG di load_league_cache
+        total_h_ppg = total_a_ppg = count = 0
+        for t in self._data["teams"]:
+            if t.get("league") != league_normalized:
+                continue
+            r = t.get("ranking", {})
+            hs = r.get("homeStats", {}).get("played", 0)
+            as_stat = r.get("awayStats", {}).get("played", 0)
+            if hs > 0:
+                total_h_ppg += (r.get("homePoints", 0) / hs)
+                count += 1
+            if as_stat > 0:
+                total_a_ppg += (r.get("awayPoints", 0) / as_stat)
+        avg_h_l = total_h_ppg / count if count > 0 else 1.60
+        avg_a_l = total_a_ppg / count if count > 0 else 1.10
+
+        # H2H partita: primo match con h2h_data per (home, away) case-insensitive, round più recenti prima,
+        # poi le partite del giorno (se la loro giornata non è tra le ultime caricate)
+        match_h2h_index = {}
+        day_matches = [f["match"] for f in self._data["fixtures"] if f.get("league") == league_normalized]
+        for m in [m for r in rounds for m in r.get("matches", [])] + day_matches:
+            if "h2h_data" in m and m.get("home") and m.get("away"):
+                match_h2h_index.setdefault((m["home"].lower(), m["away"].lower()), m)
+
+        raw_h2h = {key: self._raw_h2h_by_names.get(key)
+                   for key in self.h2h_pairs if key[0] in names or key[1] in names}
+
+        return {
+            "ROSE": rose,
+            "TEAMS": raw_teams,
+            "ALL_ROUNDS": rounds[:rounds_limit],
+            "LEAGUE_STATS": {
+                "league": league_normalized,
+                "avg_home_league": avg_h_l,
+                "avg_away_league": avg_a_l
+            },
+            "_league_normalized": league_normalized,
+            "_MATCH_H2H_INDEX": match_h2h_index,
+            "_RAW_H2H": raw_h2h,
+        }
+
+
+# ==================== COSTRUZIONE ====================
+
+def _day_range(target_date):
+    day = (target_date or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day, day + timedelta(days=1)
+
+
+def _day_fixtures(target_date):
+    """Partite del giorno da h2h_by_round: [{_id, league, match}]."""
+    day, next_day = _day_range(target_date)
+    return list(db["h2h_by_round"].aggregate([
+        {"$unwind": "$matches"},
+        {"$match": {"matches.date_obj": {"$gte": day, "$lt": next_day}}},
+        {"$project": {"league": 1, "match": "$matches"}}
+    ]))
+
+
+def data_version(target_date=None, fixtures=None):
+    """
+    Versione dei dati letti dallo snapshot: impronta completa delle partite del giorno
+    (quote, h2h_data, risultati: gli scraper di quote e calculate_h2h_v2 non toccano
+    last_updated) più conteggio e last_updated massimo delle altre collection sorgente.
+    """
+    if fixtures is None:
+        fixtures = _day_fixtures(target_date)
+    digest = hashlib.sha1()
+    for doc in sorted(fixtures, key=lambda f: (str(f.get("_id")), str(f["match"].get("home")),
+                                               str(f["match"].get("away")))):
+        digest.update(repr(sorted(doc["match"].items())).encode())
+    parts = [digest.hexdigest()]
+    for coll in _VERSIONED_COLLECTIONS:
+        last = db[coll].find_one({"last_updated": {"$exists": True}}, {"last_updated": 1},
+                                 sort=[("last_updated", -1)])
+        parts.append(f"{coll}:{db[coll].estimated_document_count()}:{(last or {}).get('last_updated')}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def build_snapshot(target_date=None):
+    """Legge da Mongo tutti i dati delle leghe con partite nel giorno target."""
+    t_start = time.time()
+    day, next_day = _day_range(target_date)
+    date_str = day.strftime("%Y-%m-%d")
+    n_queries = 0
+
+    # 1. Partite del giorno → leghe, squadre, coppie
+    fixtures = _day_fixtures(target_date)
+    n_queries += 1
+    version = data_version(target_date, fixtures=fixtures)
+    n_queries += 2 * len(_VERSIONED_COLLECTIONS)
+
+    leagues, team_names, h2h_pairs, tm_pairs = set(), set(), set(), set()
+    for doc in fixtures:
+        m = doc["match"]
+        home = m.get("home", m.get("home_team", ""))
+        away = m.get("away", m.get("away_team", ""))
+        leagues.add(doc.get("league", "Unknown"))
+        team_names.update((home, away))
+        h2h_pairs.add(_pair_key(home, away))
+        try:
+            if m.get("home_tm_id") and m.get("away_tm_id"):
+                tm_pairs.add(_pair_key(int(m["home_tm_id"]), int(m["away_tm_id"])))
+        except (TypeError, ValueError):
+            pass
+
+    league_list = sorted(leagues)
+    name_list = sorted(team_names)
+
+    # 2. Teams: squadre del giorno (nome/alias) + tutte le squadre delle leghe (league stats)
+    teams = list(db["teams"].find({"$or": [
+        {"league": {"$in": league_list}},
+        {"name": {"$in": name_list}},
+        {"aliases": {"$in": name_list}},
+        {"aliases_transfermarkt": {"$in": name_list}},
+    ]}))
+    n_queries += 1
+
+    # 3. Rose FBref (4 collection)
+    player_query = {"team_name_fbref": {"$in": name_list}, "league_name": {"$in": league_list}}
+    players = {}
+    for role in _ROLES:
+        players[role] = list(db[f"players_stats_fbref_{role.lower()}"].find(player_query, {"_id": 0}))
+        n_queries += 1
+
+    # 4. h2h_by_round: ultime ROUNDS_PER_LEAGUE giornate complete per lega (Lucifero, H2H partita)
+    #    e solo i campi dei risultati per tutta la stagione (strisce)
+    rounds = []
+    for league in league_list:
+        rounds += list(db["h2h_by_round"].find({"league": league})
+                       .sort("last_updated", -1).limit(ROUNDS_PER_LEAGUE))
+        n_queries += 1
+    results = list(db["h2h_by_round"].find(
+        {"league": {"$in": league_list}},
+        {"league": 1, "matches.home": 1, "matches.away": 1, "matches.real_score": 1, "matches.date_obj": 1}))
+    n_queries += 1
+
+    # 5. Statistiche stagionali (nomi partita + nomi canonici dei teams)
+    seasonal_names = set(name_list)
+    for t in teams:
+        if t.get("name") in team_names or any(a in team_names for a in
+                                                _as_list(t.get("aliases")) + _as_list(t.get("aliases_transfermarkt"))):
+            seasonal_names.add(t.get("name"))
+    seasonal_names.discard(None)
+    seasonal_stats = list(db["team_seasonal_stats"].find({"team": {"$in": sorted(seasonal_names)}}))
+    n_queries += 1
+
+    # 6. Media gol per lega
+    league_stats = list(db["league_stats"].find({"_id": {"$in": league_list}}))
+    n_queries += 1
+
+    # 7. Scontri diretti (per nome e per tm_id, in una query)
+    or_clauses = []
+    for a, b in h2h_pairs:
+        or_clauses += [{"team_a": a, "team_b": b}, {"team_a": b, "team_b": a}]
+    for a, b in tm_pairs:
+        or_clauses += [{"tm_id_a": a, "tm_id_b": b}, {"tm_id_a": b, "tm_id_b": a}]
+    raw_h2h = list(db["raw_h2h_data_v2"].find({"$or": or_clauses})) if or_clauses else []
+    n_queries += 1
+
+    snap = DaySnapshot(date_str, {
+        "leagues": leagues,
+        "team_names": team_names,
+        "h2h_pairs": h2h_pairs,
+        "tm_pairs": tm_pairs,
+        "seasonal_names": seasonal_names,
+        "teams": teams,
+        "players": players,
+        "fixtures": fixtures,
+        "rounds": rounds,
+        "results": results,
+        "seasonal_stats": seasonal_stats,
+        "league_stats": league_stats,
+        "raw_h2h": raw_h2h,
+    }, version=version)
+
+    print(f"📦 [SNAPSHOT] {date_str}: {len(leagues)} leghe, {len(team_names)} squadre, "
+          f"{len(rounds)}/{len(results)} round, {len(raw_h2h)} H2H — {n_queries} query in {time.time() - t_start:.1f}s",
+          file=sys.stderr)
+    return snap
+
+
+# ==================== CACHE (MEMORIA + FILE) ====================
+
+def _snapshot_path(date_str):
+    return os.path.join(SNAPSHOT_DIR, f"snapshot_{date_str}.pkl")
+
+
+def _is_fresh(snap, max_age_minutes):
+    return (datetime.now() - snap.built_at) <= timedelta(minutes=max_age_minutes)
+
+
+def save_snapshot(snap):
+    """Salva su file (scrittura atomica: i sistemi in parallelo non leggono file a metà)."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _snapshot_path(snap.date_str)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"date_str": snap.date_str, "built_at": snap.built_at, "version": snap.version,
+                     "data": snap._data},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_snapshot(date_str):
+    """Snapshot da file, o None."""
+    path = _snapshot_path(date_str)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            raw = pickle.load(f)
+        return DaySnapshot(raw["date_str"], raw["data"], built_at=raw["built_at"], version=raw.get("version"))
+    except Exception as e:
+        print(f"⚠️ [SNAPSHOT] File illeggibile ({path}): {e}", file=sys.stderr)
+        return None
+
+
+def get_snapshot(target_date=None, max_age_minutes=SNAPSHOT_MAX_AGE_MINUTES, refresh=True):
+    """
+    Snapshot del giorno. Con refresh=True (default dei run A/S/C) viene ricostruito da Mongo.
+    Con refresh=False: memoria → file → costruzione, riusando solo uno snapshot
+    recente con la stessa data_version (altrimenti i sistemi leggerebbero quote,
+    h2h_data e teams di prima degli ultimi scraper).
+    Ritorna None se la costruzione fallisce (i sistemi tornano alle query per partita).
+    """
+    global _CURRENT
+    date_str = _day_range(target_date)[0].strftime("%Y-%m-%d")
+
+    if not refresh:
+        candidates = []
+        if _CURRENT is not None and _CURRENT.date_str == date_str and _is_fresh(_CURRENT, max_age_minutes):
+            candidates.append(("memoria", _CURRENT))
+        else:
+            snap = load_snapshot(date_str)
+            if snap is not None and _is_fresh(snap, max_age_minutes):
+                candidates.append(("file", snap))
+        if candidates:
+            try:
+                version = data_version(target_date)
+            except Exception as e:
+                print(f"⚠️ [SNAPSHOT] Versione dati non leggibile, ricostruisco: {e}", file=sys.stderr)
+                version = None
+            for source, snap in candidates:
+                if version is not None and snap.version == version:
+                    print(f"♻️ [SNAPSHOT] {date_str} da {source} ({snap.built_at.strftime('%H:%M')}, "
+                          f"versione {version})", file=sys.stderr)
+                    _CURRENT = snap
+                    return snap
+
+    try:
+        snap = build_snapshot(target_date)
+    except Exception as e:
+        print(f"⚠️ [SNAPSHOT] Costruzione fallita, query per partita: {e}", file=sys.stderr)
+        return None
+
+    try:
+        save_snapshot(snap)
+    except Exception as e:
+        print(f"⚠️ [SNAPSHOT] Salvataggio su file fallito: {e}", file=sys.stderr)
+    _CURRENT = snap
+    return snap
+
+
+def cleanup_old(days=2):
+    """Rimuove gli snapshot più vecchi di N giorni."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    cutoff = datetime.now() - timedelta(days=days)
+    for fn in os.listdir(SNAPSHOT_DIR):
+        if not (fn.startswith("snapshot_") and fn.endswith(".pkl")):
+            continue
+        try:
+            if datetime.strptime(fn[len("snapshot_"):-len(".pkl")], "%Y-%m-%d") < cutoff:
+                os.remove(os.path.join(SNAPSHOT_DIR, fn))
+        except (ValueError, OSError):
+            continue
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Snapshot dati del giorno per Sistemi A/S/C")
+    parser.add_argument("--date", type=str, help="Data target YYYY-MM-DD (default: oggi)")
+    parser.add_argument("--days", type=int, default=1, help="Giorni da preparare a partire dalla data")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.date, "%Y-%m-%d") if args.date else datetime.now()
+    cleanup_old()
+    for i in range(args.days):
+        get_snapshot(start + timedelta(days=i), refresh=True)
@@ -18,11 +18,14 @@ import os
 import re
 import math
 import json
+import time
 import argparse
 from datetime import datetime, timedelta, timezone
 from copy import deepcopy
+from functools import lru_cache
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pymongo import UpdateOne, UpdateMany, DeleteOne, DeleteMany, InsertOne
 from config import db
 
 # =====================================================
@@ -98,8 +101,12 @@ def _poisson(k, lamb):
     return (math.exp(-lamb) * (lamb ** k)) / math.factorial(k)
 
 
+@lru_cache(maxsize=4096)
 def _calc_lambda(under_25_odds):
-    """Calcola lambda totale dalla quota Under 2.5 (bisection Poisson)."""
+    """
+    Calcola lambda totale dalla quota Under 2.5 (bisection Poisson).
+    Memoizzata: la stessa quota torna in più regole della stessa partita.
+    """
     if not under_25_odds or under_25_odds <= 1.0:
         return None
     p_u25 = (1 / under_25_odds) * 1.06
@@ -3166,6 +3173,238 @@ def _get_combo_detail(markets_by_sys):
     return details
 
 
+# =====================================================
+# PIPELINE REGOLE POST-STAKE (indicizzata per mercato/stake)
+# =====================================================
+class _RuleStats:
+    """Per ogni regola/passo: chiamate, pronostici modificati e tempo cumulato (per tutto il processo)."""
+
+    def __init__(self):
+        self.rows = {}    # nome -> {'calls', 'hits', 'seconds'}
+
+    def record(self, name, calls=0, hits=0, seconds=0.0):
+        row = self.rows.setdefault(name, {'calls': 0, 'hits': 0, 'seconds': 0.0})
+        row['calls'] += calls
+        row['hits'] += hits
+        row['seconds'] += seconds
+
+    def timed(self, name, fn, *args, **kwargs):
+        """Esegue un passo a livello partita (lista intera) misurandone il tempo."""
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.record(name, calls=1, seconds=time.perf_counter() - t0)
+        return out
+
+    def reset(self):
+        self.rows = {}
+
+    def report(self, top=None):
+        """Righe ordinate per tempo cumulato decrescente."""
+        rows = sorted(self.rows.items(), key=lambda kv: kv[1]['seconds'], reverse=True)
+        return rows[:top] if top else rows
+
+    def print_report(self, top=15):
+        rows = self.report(top)
+        if not rows:
+            return
+        print(f"\n  ⏱️ Regole orchestratore (top {len(rows)} per tempo):")
+        for name, row in rows:
+            print(f"    {name:<28} {row['seconds'] * 1000:8.1f} ms  chiamate={row['calls']:<5} modificati={row['hits']}")
+
+
+RULE_STATS = _RuleStats()
+
+
+def _pred_state(p):
+    """Campi che una regola può cambiare: se differiscono dopo la regola, è un 'hit'."""
+    return (p.get('tipo'), p.get('pronostico'), p.get('stake'), p.get('quota'), p.get('routing_rule'))
+
+
+class _Rule:
+    """
+    Regola per-pronostico: funzione _apply_* esistente + i mercati (tipo) e gli
+    stake su cui agisce. stakes=None → qualsiasi stake. needs_odds: la regola
+    non fa nulla senza quote della partita.
+    """
+
+    def __init__(self, name, fn, tipi, stakes=None, needs_odds=False, takes_odds=True):
+        self.name = name
+        self.fn = fn
+        self.tipi = frozenset(tipi)
+        self.stakes = frozenset(stakes) if stakes is not None else None
+        self.needs_odds = needs_odds
+        self.takes_odds = takes_odds
+
+    def matches(self, tipo, stake, has_odds):
+        if self.needs_odds and not has_odds:
+            return False
+        return tipo in self.tipi and (self.stakes is None or stake in self.stakes)
+
+
+class _RulePipeline:
+    """
+    Applica le regole in ordine, come la vecchia catena di _apply_* sulla lista,
+    ma ogni regola vede solo i pronostici del suo (tipo, stake).
+
+    Tabella compilata (una volta per processo): (tipo, stake, quote sì/no) →
+    indici delle regole interessate. Per partita si costruisce una volta l'agenda
+    regola → posizioni; se una regola converte un pronostico (nuovo tipo/stake)
+    lo si toglie dalle regole successive del vecchio gruppo e lo si aggiunge a
+    quelle del nuovo. Le regole agiscono su un pronostico alla volta e girano
+    nello stesso ordine: risultato e log identici alla catena.
+    """
+
+    def __init__(self, rules, stats):
+        self.rules = rules
+        self.stats = stats
+        self._dispatch = {}
+
+    def _rules_for(self, tipo, stake, has_odds):
+        key = (tipo, stake, has_odds)
+        idx = self._dispatch.get(key)
+        if idx is None:
+            idx = self._dispatch[key] = tuple(
+                i for i, rule in enumerate(self.rules) if rule.matches(tipo, stake, has_odds))
+        return idx
+
+    def run(self, unified, odds):
+        has_odds = bool(odds)
+        agenda = {}     # indice regola -> posizioni da processare
+        for pos, p in enumerate(unified):
+            for i in self._rules_for(p.get('tipo'), p.get('stake', 0), has_odds):
+                agenda.setdefault(i, set()).add(pos)
+
+        for i, rule in enumerate(self.rules):
+            positions = agenda.pop(i, None)
+            if not positions:
+                continue
+            hits = 0
+            t0 = time.perf_counter()
+            for pos in sorted(positions):
+                p = unified[pos]
+                before = _pred_state(p)
+                old_key = (p.get('tipo'), p.get('stake', 0))
+                out = rule.fn([p], odds) if rule.takes_odds else rule.fn([p])
+                unified[pos] = p = out[0]
+                if _pred_state(p) == before:
+                    continue
+                hits += 1
+                new_key = (p.get('tipo'), p.get('stake', 0))
+                if new_key != old_key:
+                    # tipo/stake cambiati: aggiorna l'agenda delle regole successive
+                    for j in self._rules_for(*old_key, has_odds):
+                        if j > i and j in agenda:
+                            agenda[j].discard(pos)
+                    for j in self._rules_for(*new_key, has_odds):
+                        if j > i:
+                            agenda.setdefault(j, set()).add(pos)
+            self.stats.record(rule.name, calls=len(positions), hits=hits, seconds=time.perf_counter() - t0)
+        return unified
+
+
+_GOL = ('GOL',)
+_SEGNO_DC = ('SEGNO', 'DOPPIA_CHANCE')
+
+# ⚠️ ORDINE IMPORTANTE (vedi orchestrate_date): conversioni prima dei filtri quota
+POST_STAKE_RULES = _RulePipeline([
+    _Rule('goal_quota_conversion', _apply_goal_quota_conversion, _GOL, needs_odds=True),
+    _Rule('gol_low_stake_to_nogoal', _apply_gol_low_stake_to_nogoal, _GOL, {1, 2}, needs_odds=True),
+    _Rule('gol_stake3_filter', _apply_gol_stake3_filter, _GOL, {3, 4, 7}),
+    _Rule('mg23_stake4_to_under25', _apply_mg23_stake4_to_under25, _GOL, {4}, needs_odds=True),   # PRIMA del filtro quota
+    _Rule('gol_stake4_quota_filter', _apply_gol_stake4_quota_filter, _GOL, {4}, takes_odds=False),  # DOPO la conversione MG 2-3
+    _Rule('over15_stake5_low_to_under25', _apply_over15_stake5_low_to_under25, _GOL, {5}, needs_odds=True),
+    _Rule('gol_stake5_q160_to_nogoal', _apply_gol_stake5_q160_to_nogoal, _GOL, {5}, needs_odds=True),
+    _Rule('gol_stake7_filter', _apply_gol_stake7_filter, _GOL, {7}),
+    _Rule('f150_169_trap_filter', _apply_f150_169_trap_filter, ('GOL', 'DOPPIA_CHANCE')),  # DC X2 / U2.5 in 1.50-1.69 -> NO BET (18/04/2026)
+    _Rule('o25_stake6_to_goal', _apply_o25_stake6_to_goal, _GOL, {6}, needs_odds=True),
+    _Rule('segno_low_stake_filter', _apply_segno_low_stake_filter, _SEGNO_DC, {1, 2}, takes_odds=False),
+    _Rule('dc_stake1_to_under25', _apply_dc_stake1_to_under25, ('DOPPIA_CHANCE',), {1}, needs_odds=True),
+    _Rule('dc_stake4_to_nogoal', _apply_dc_stake4_to_nogoal, ('DOPPIA_CHANCE',), {4}, needs_odds=True),
+    _Rule('segno_stake6_conversion', _apply_segno_stake6_conversion, _SEGNO_DC, {6}, needs_odds=True),
+    _Rule('segno_stake9_conversions', _apply_segno_stake9_conversions, _SEGNO_DC, {9}, needs_odds=True),
+    _Rule('se2_stake8_filter', _apply_se2_stake8_filter, ('SEGNO',), {8}, takes_odds=False),
+    _Rule('segno_stake7_cap', _apply_segno_stake7_cap, _SEGNO_DC, {7}, takes_odds=False),
+    _Rule('gol_stake8_cap', _apply_gol_stake8_cap, _GOL, {8}, takes_odds=False),
+], RULE_STATS)
+
+
+# =====================================================
+# SCRITTURE IN BLOCCO (WRITE-BEHIND)
+# =====================================================
+class _WriteBehind:
+    """
+    Raccoglie le scritture di una data e le esegue alla fine con UN bulk_write
+    per collection (ordered: le operazioni sullo stesso documento restano in sequenza).
+    Conta le operazioni per tipo (upsert, no_bet, move, ...) per il riepilogo.
+    """
+
+    def __init__(self):
+        self.ops = {}         # nome collection -> (collection, [operazioni])
+        self.counts = {}      # (nome collection, tipo) -> n operazioni
+        self.round_trips = 0
+
+    def add(self, collection, label, op):
+        name = collection.name
+        if name not in self.ops:
+            self.ops[name] = (collection, [])
+        self.ops[name][1].append(op)
+        self.counts[(name, label)] = self.counts.get((name, label), 0) + 1
+
+    def flush(self):
+        """Esegue le operazioni in coda. Ritorna {collection: {upserted, modified, deleted, inserted}}."""
+        results = {}
+        for name, (collection, ops) in self.ops.items():
+            if not ops:
+                continue
+            res = collection.bulk_write(ops, ordered=True)
+            self.round_trips += 1
+            results[name] = {
+                'upserted': res.upserted_count,
+                'modified': res.modified_count,
+                'deleted': res.deleted_count,
+                'inserted': res.inserted_count,
+            }
+        self.ops = {}
+        return results
+
+    def summary(self):
+        parts = [f"{label}={n}" for (_, label), n in self.counts.items()]
+        return f"Scritture: {', '.join(parts) or 'nessuna'} | {self.round_trips} bulk_write"
+
+
+def _unified_doc_filter(edoc, date_str):
+    """Filtro per un documento unified: per _id se letto dal DB, altrimenti per chiave partita (upsert in coda)."""
+    if edoc.get('_id') is not None:
+        return {'_id': edoc['_id']}
+    return {'date': date_str, 'home': edoc['home'], 'away': edoc['away']}
+
+
+def _lookup_real_dates(pairs):
+    """
+    Data reale (YYYY-MM-DD) da h2h_by_round per più partite (home, away) con UNA query.
+    Come find_one + 'matches.$': vale il primo round trovato e la prima partita che combacia.
+    """
+    wanted = set(pairs)
+    if not wanted:
+        return {}
+    found = {}
+    try:
+        cursor = db['h2h_by_round'].find(
+            {'$or': [{'matches': {'$elemMatch': {'home': h, 'away': a}}} for h, a in wanted]},
+            {'matches.home': 1, 'matches.away': 1, 'matches.date_obj': 1}
+        )
+        for _r in cursor:
+            for _m in _r.get('matches', []):
+                pair = (_m.get('home'), _m.get('away'))
+                if pair in wanted and pair not in found:
+                    found[pair] = _m.get('date_obj')
+            if len(found) == len(wanted):
+                break
+    except Exception:
+        pass
+    return {pair: d.strftime('%Y-%m-%d') for pair, d in found.items() if d}
+
+
 # =====================================================
 # ORCHESTRAZIONE PRINCIPALE
 # =====================================================
@@ -3282,12 +3521,13 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         _a_doc_tc = docs_by_sys['A'].get(match_key) or {}
         _sim_tc = _c_doc_tc.get('simulation_data') or None
         _seg_tc = _a_doc_tc.get('segno_dettaglio') or None
-        unified_pronostici = _apply_toxic_combo_filter(
+        unified_pronostici = RULE_STATS.timed(
+            'toxic_combo_filter', _apply_toxic_combo_filter,
             unified_pronostici, base_doc, sim_data=_sim_tc, seg_det=_seg_tc
         )
 
         # --- POST-PROCESSING: Multi-goal su pronostici deboli ---
-        unified_pronostici = _apply_multigol(unified_pronostici, match_odds)
+        unified_pronostici = RULE_STATS.timed('multigol', _apply_multigol, unified_pronostici, match_odds)
 
         # --- REGOLA B (21/04/2026): scarta Goal in match low-scoring ---
         # Se lambda (totale gol atteso, calcolato da quota Under 2.5) < 1.8,
@@ -3315,7 +3555,7 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         c_doc_for_combo = docs_by_sys['C'].get(match_key)
         if c_doc_for_combo:
             sim_data = c_doc_for_combo.get('simulation_data')
-            unified_pronostici = _apply_combo96_dc_flip(unified_pronostici, match_odds, sim_data)
+            unified_pronostici = RULE_STATS.timed('combo96_dc_flip', _apply_combo96_dc_flip, unified_pronostici, match_odds, sim_data)
             # DISABILITATO 2026-04-18: regole speciali in perdita su 2 mesi live (-95u totali)
             # Sostituiscono SEGNO C che funzionavano (HR 50% vs 52% C originale, PL -34u vs +20u)
             # unified_pronostici = _apply_x_draw_combos(unified_pronostici, match_odds, sim_data)
@@ -3328,11 +3568,12 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         #     unified_pronostici = _apply_gg_conf_dc_downgrade(unified_pronostici, c_doc_for_combo, match_odds=match_odds)
 
         # --- POST-PROCESSING: Scrematura SEGNO per fasce di quota ---
-        unified_pronostici = _apply_segno_scrematura(unified_pronostici, match_odds, base_doc, c_doc=c_doc_for_combo)
+        unified_pronostici = RULE_STATS.timed('segno_scrematura', _apply_segno_scrematura,
+                                              unified_pronostici, match_odds, base_doc, c_doc=c_doc_for_combo)
 
         # --- POST-PROCESSING: Recovery A+S Over 2.5 debole (score < 70) ---
         if c_doc_for_combo:
-            unified_pronostici = _apply_weak_o25_recovery(unified_pronostici, c_doc_for_combo)
+            unified_pronostici = RULE_STATS.timed('weak_o25_recovery', _apply_weak_o25_recovery, unified_pronostici, c_doc_for_combo)
 
         # --- FILTRO Under 2.5: quota >= 1.55 solo se engine_c ha SEGNO ---
         # Fascia 1.35-1.55: HR 78%, emetti sempre
@@ -3551,10 +3792,10 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         if c_doc_for_combo:
             sim_data_mc = c_doc_for_combo.get('simulation_data')
             if sim_data_mc:
-                unified_pronostici = _apply_segno_mc_filter(unified_pronostici, sim_data_mc, match_odds)
+                unified_pronostici = RULE_STATS.timed('segno_mc_filter', _apply_segno_mc_filter, unified_pronostici, sim_data_mc, match_odds)
 
         # --- DEDUP GOL CORRELATI: rimuove ridondanze/conflitti tra pronostici GOL ---
-        unified_pronostici = _dedup_gol_correlati(unified_pronostici)
+        unified_pronostici = RULE_STATS.timed('dedup_gol_correlati', _dedup_gol_correlati, unified_pronostici)
 
         # --- DEDUP DC CONTRASTANTI: se c'è sia 1X che X2, tieni la migliore ---
         dc_preds = [p for p in unified_pronostici if p.get('tipo') == 'DOPPIA_CHANCE']
@@ -3597,7 +3838,8 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         # unified_pronostici = _add_exact_score_predictions(unified_pronostici, c_doc_for_combo, match_odds)
 
         # --- DIAMOND RECOVERY: recupera pronostici scartati con pattern ad alta HR ---
-        unified_pronostici = _apply_diamond_recovery(unified_pronostici, docs_by_sys, match_key, match_odds)
+        unified_pronostici = RULE_STATS.timed('diamond_recovery', _apply_diamond_recovery,
+                                              unified_pronostici, docs_by_sys, match_key, match_odds)
 
         if not unified_pronostici:
             continue
@@ -3672,27 +3914,11 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         # ⚠️ ORDINE IMPORTANTE: le conversioni devono girare PRIMA dei filtri quota,
         # perché cambiano il pronostico e la quota (es. MG 2-3 @1.88 → U2.5 @1.55).
         # Se il filtro fascia 1.80-1.89 girasse prima, cancellerebbe tips convertibili.
-        unified_pronostici = _apply_goal_quota_conversion(unified_pronostici, match_odds)
-        unified_pronostici = _apply_gol_low_stake_to_nogoal(unified_pronostici, match_odds)
-        unified_pronostici = _apply_gol_stake3_filter(unified_pronostici, match_odds)
-        unified_pronostici = _apply_mg23_stake4_to_under25(unified_pronostici, match_odds)  # PRIMA del filtro quota
-        unified_pronostici = _apply_gol_stake4_quota_filter(unified_pronostici)             # DOPO la conversione MG 2-3
-        unified_pronostici = _apply_over15_stake5_low_to_under25(unified_pronostici, match_odds)
-        unified_pronostici = _apply_gol_stake5_q160_to_nogoal(unified_pronostici, match_odds)
-        unified_pronostici = _apply_gol_stake7_filter(unified_pronostici, match_odds)
-        unified_pronostici = _apply_f150_169_trap_filter(unified_pronostici, match_odds)  # DC X2 / U2.5 in 1.50-1.69 -> NO BET (18/04/2026)
-        unified_pronostici = _apply_o25_stake6_to_goal(unified_pronostici, match_odds)
-        unified_pronostici = _apply_segno_low_stake_filter(unified_pronostici)
-        unified_pronostici = _apply_dc_stake1_to_under25(unified_pronostici, match_odds)
-        unified_pronostici = _apply_dc_stake4_to_nogoal(unified_pronostici, match_odds)
-        unified_pronostici = _apply_segno_stake6_conversion(unified_pronostici, match_odds)
-        unified_pronostici = _apply_segno_stake9_conversions(unified_pronostici, match_odds)
-        unified_pronostici = _apply_se2_stake8_filter(unified_pronostici)
-        unified_pronostici = _apply_segno_stake7_cap(unified_pronostici)
-        unified_pronostici = _apply_gol_stake8_cap(unified_pronostici)
+        # Sequenza e selettori (tipo, stake) in POST_STAKE_RULES.
+        unified_pronostici = POST_STAKE_RULES.run(unified_pronostici, match_odds)
 
         # --- DEDUP GOL CORRELATI post-conversioni: le conversioni possono creare Over 1.5 + Over 2.5 ---
-        unified_pronostici = _dedup_gol_correlati(unified_pronostici)
+        unified_pronostici = RULE_STATS.timed('dedup_gol_correlati', _dedup_gol_correlati, unified_pronostici)
 
         # --- CONFLITTO Over 2.5 (C) vs Under 2.5 (A): Over 2.5 C vince (73.3% HR vs 65.9%) ---
         o25_c_idx = None
@@ -3835,6 +4061,9 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
     coll = db['daily_predictions_unified']
 
     if not dry_run:
+        # Tutte le scritture della data vengono raccolte e inviate con un bulk_write per collection
+        writer = _WriteBehind()
+
         # Chiavi delle partite generate in questa run (per rilevare quelle non rigenerate)
         generated_keys = set()
         for doc in unified_docs:
@@ -3843,98 +4072,94 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
         today_str = datetime.now().strftime('%Y-%m-%d')
         is_anticipata = (today_str < date_str)
 
-        if preserve_analysis:
-            # Pre-match update: aggiorna solo i campi pronostici, preserva analysis_*
-            for doc in unified_docs:
-                find_filter = {'date': date_str, 'home': doc['home'], 'away': doc['away']}
-                update_fields = {k: v for k, v in doc.items() if k not in ('_id', 'created_at')}
-                update_fields['updated_at'] = datetime.now(timezone.utc)
-                coll.update_one(find_filter, {
-                    '$set': update_fields,
-                    '$setOnInsert': {'created_at': datetime.now(timezone.utc), 'origin_date': today_str, 'anticipata': is_anticipata}
-                }, upsert=True)
-        else:
-            # Pipeline notturna: update_one + upsert (le partite non spariscono mai)
+        # Pipeline notturna: stato della data letto PRIMA degli upsert (una query).
+        # Dopo gli upsert ci sono in più solo partite nuove, tutte in generated_keys.
+        check_existing = not preserve_analysis and not match_time_filter
+        if check_existing:
+            existing_docs = list(coll.find({'date': date_str}, {'home': 1, 'away': 1, 'decision': 1}))
+
+        # Upsert (pre-match con preserve_analysis e notturna): solo $set, i campi analysis_* restano;
+        # le partite non spariscono mai
+        for doc in unified_docs:
+            find_filter = {'date': date_str, 'home': doc['home'], 'away': doc['away']}
+            update_fields = {k: v for k, v in doc.items() if k not in ('_id', 'created_at')}
+            update_fields['updated_at'] = datetime.now(timezone.utc)
+            writer.add(coll, 'upsert', UpdateOne(find_filter, {
+                '$set': update_fields,
+                '$setOnInsert': {'created_at': datetime.now(timezone.utc), 'origin_date': today_str, 'anticipata': is_anticipata}
+            }, upsert=True))
+
+        if check_existing:
+            existing_keys = {f"{e.get('home', '')}||{e.get('away', '')}" for e in existing_docs}
             for doc in unified_docs:
-                find_filter = {'date': date_str, 'home': doc['home'], 'away': doc['away']}
-                update_fields = {k: v for k, v in doc.items() if k not in ('_id', 'created_at')}
-                update_fields['updated_at'] = datetime.now(timezone.utc)
-                coll.update_one(find_filter, {
-                    '$set': update_fields,
-                    '$setOnInsert': {'created_at': datetime.now(timezone.utc), 'origin_date': today_str, 'anticipata': is_anticipata}
-                }, upsert=True)
+                key = f"{doc['home']}||{doc['away']}"
+                if key not in existing_keys:
+                    existing_keys.add(key)
+                    existing_docs.append({'home': doc['home'], 'away': doc['away'], 'decision': doc['decision']})
 
             # Partite già in DB per questa data ma non rigenerate → diventano NO BET
-            if not match_time_filter:
-                existing_docs = list(coll.find({'date': date_str}, {'home': 1, 'away': 1, 'decision': 1}))
-                nobet_count = 0
-                for edoc in existing_docs:
-                    key = f"{edoc['home']}||{edoc['away']}"
-                    if key not in generated_keys and edoc.get('decision') != 'NO_BET':
-                        coll.update_one(
-                            {'_id': edoc['_id']},
-                            {'$set': {
-                                'decision': 'NO_BET',
-                                'pronostici': [{'tipo': 'SEGNO', 'pronostico': 'NO BET', 'confidence': 0}],
-                            }}
-                        )
-                        nobet_count += 1
-                if nobet_count:
-                    print(f"    ⚠️ {nobet_count} partite non rigenerate → NO BET")
-
-                # Controlla se qualche partita ha cambiato data in h2h_by_round
-                # Se la data reale è diversa, sposta il documento alla data giusta
-                moved_count = 0
-                for edoc in existing_docs:
-                    _home = edoc.get('home', '')
-                    _away = edoc.get('away', '')
-
-                    # 1. Controlla nella mappa già costruita
-                    _real = _real_date_map.get((_home, _away))
-
-                    # 2. Se non trovata, cerca direttamente in h2h_by_round
-                    if not _real:
-                        try:
-                            _h2h_match = db['h2h_by_round'].find_one(
-                                {'matches': {'$elemMatch': {'home': _home, 'away': _away}}},
-                                {'matches.$': 1}
-                            )
-                            if _h2h_match and _h2h_match.get('matches'):
-                                _h2h_date = _h2h_match['matches'][0].get('date_obj')
-                                if _h2h_date:
-                                    _real = _h2h_date.strftime('%Y-%m-%d')
-                        except Exception:
-                            pass
-
-                    # 3. Se la data reale è diversa, aggiorna il campo date
-                    if _real and _real != date_str:
-                        # Verifica che non esista già un doc per la stessa partita nella data nuova
-                        _existing_new = coll.find_one({'date': _real, 'home': _home, 'away': _away})
-                        if not _existing_new:
-                            coll.update_one(
-                                {'_id': edoc['_id']},
-                                {'$set': {'date': _real}}
-                            )
-                            moved_count += 1
-                            print(f"    📅 {_home} - {_away}: data corretta {date_str} → {_real}")
-                        else:
-                            # Esiste già nella data nuova, elimina il duplicato vecchio
-                            coll.delete_one({'_id': edoc['_id']})
-                            moved_count += 1
-                            print(f"    📅 {_home} - {_away}: rimosso duplicato da {date_str} (esiste già in {_real})")
-
-                        # Aggiorna anche prediction_versions per la stessa partita
-                        _old_mk = f"{date_str}_{_home.strip().lower().replace(' ', '_')}_{_away.strip().lower().replace(' ', '_')}"
-                        _new_mk = f"{_real}_{_home.strip().lower().replace(' ', '_')}_{_away.strip().lower().replace(' ', '_')}"
-                        _pv_result = db['prediction_versions'].update_many(
-                            {'date': date_str, 'home': _home, 'away': _away},
-                            {'$set': {'date': _real, 'match_key': _new_mk}}
-                        )
-                        if _pv_result.modified_count > 0:
-                            print(f"    📅 {_home} - {_away}: aggiornate {_pv_result.modified_count} versioni in prediction_versions")
-
-                if moved_count:
-                    print(f"    📅 {moved_count} partite con data corretta")
+            nobet_count = 0
+            for edoc in existing_docs:
+                key = f"{edoc['home']}||{edoc['away']}"
+                if key not in generated_keys and edoc.get('decision') != 'NO_BET':
+                    writer.add(coll, 'no_bet', UpdateOne(
+                        _unified_doc_filter(edoc, date_str),
+                        {'$set': {
+                            'decision': 'NO_BET',
+                            'pronostici': [{'tipo': 'SEGNO', 'pronostico': 'NO BET', 'confidence': 0}],
+                        }}
+                    ))
+                    nobet_count += 1
+            if nobet_count:
+                print(f"    ⚠️ {nobet_count} partite non rigenerate → NO BET")
+
+            # Controlla se qualche partita ha cambiato data in h2h_by_round
+            # Se la data reale è diversa, sposta il documento alla data giusta.
+            # 1. Data dalla mappa già costruita, 2. altrimenti UNA query su h2h_by_round per tutte
+            missing_pairs = [(e.get('home', ''), e.get('away', '')) for e in existing_docs
+                             if (e.get('home', ''), e.get('away', '')) not in _real_date_map]
+            fallback_dates = _lookup_real_dates(missing_pairs)
+
+            moves = []
+            for edoc in existing_docs:
+                _home = edoc.get('home', '')
+                _away = edoc.get('away', '')
+                _real = _real_date_map.get((_home, _away)) or fallback_dates.get((_home, _away))
+                if _real and _real != date_str:
+                    moves.append((edoc, _home, _away, _real))
+
+            # Partite già presenti nella data nuova: UNA query per tutte le destinazioni
+            present = set()
+            if moves:
+                for _d in coll.find({'$or': [{'date': r, 'home': h, 'away': a} for _, h, a, r in moves]},
+                                    {'date': 1, 'home': 1, 'away': 1}):
+                    present.add((_d.get('date'), _d.get('home'), _d.get('away')))
+
+            moved_count = 0
+            for edoc, _home, _away, _real in moves:
+                # Verifica che non esista già un doc per la stessa partita nella data nuova
+                if (_real, _home, _away) not in present:
+                    writer.add(coll, 'move', UpdateOne(
+                        _unified_doc_filter(edoc, date_str),
+                        {'$set': {'date': _real}}
+                    ))
+                    present.add((_real, _home, _away))
+                    print(f"    📅 {_home} - {_away}: data corretta {date_str} → {_real}")
+                else:
+                    # Esiste già nella data nuova, elimina il duplicato vecchio
+                    writer.add(coll, 'delete_dup', DeleteOne(_unified_doc_filter(edoc, date_str)))
+                    print(f"    📅 {_home} - {_away}: rimosso duplicato da {date_str} (esiste già in {_real})")
+                moved_count += 1
+
+                # Aggiorna anche prediction_versions per la stessa partita
+                _new_mk = f"{_real}_{_home.strip().lower().replace(' ', '_')}_{_away.strip().lower().replace(' ', '_')}"
+                writer.add(db['prediction_versions'], 'versions', UpdateMany(
+                    {'date': date_str, 'home': _home, 'away': _away},
+                    {'$set': {'date': _real, 'match_key': _new_mk}}
+                ))
+
+            if moved_count:
+                print(f"    📅 {moved_count} partite con data corretta")
 
         # Salva richieste quote RE per lo scraper SNAI
         re_requests = []
@@ -3951,9 +4176,17 @@ def orchestrate_date(date_str, dry_run=False, match_time_filter=None, preserve_a
                         'created_at': datetime.now(timezone.utc),
                     })
         if re_requests:
-            db['re_quota_requests'].delete_many({'date': date_str})
-            db['re_quota_requests'].insert_many(re_requests)
+            writer.add(db['re_quota_requests'], 're_reset', DeleteMany({'date': date_str}))
+            for req in re_requests:
+                writer.add(db['re_quota_requests'], 're_request', InsertOne(req))
+
+        results = writer.flush()
+        if re_requests:
             print(f"    RE quota requests: {len(re_requests)} salvate")
+        pv = results.get('prediction_versions')
+        if pv and pv['modified']:
+            print(f"    📅 aggiornate {pv['modified']} versioni in prediction_versions")
+        print(f"    💾 {writer.summary()}")
 
     if dry_run:
         return unified_docs
@@ -4044,6 +4277,7 @@ def main():
                 print(f"  {date_str}: {count} partite {status}")
             print(f"\n  Totale: {total} partite su 7 giorni")
 
+    RULE_STATS.print_report()
     print()
 
 
@@ -37,6 +37,7 @@ from config import db
 from run_daily_predictions import run_daily_predictions as run_system_a
 from run_daily_predictions_sandbox import run_daily_predictions as run_system_s
 from run_daily_predictions_engine_c import run_engine_c as run_system_c
+from calculators import daily_snapshot  # stesso modulo dei sistemi (sentinella MISS condivisa)
 from orchestrate_experts import orchestrate_date as run_orchestrator
 from snapshot_nightly import normalize_match_key, get_all_matches
 from tag_elite import get_matched_patterns
@@ -714,14 +715,17 @@ def run_full_cycle(date_str, target_date, block_times, run_label):
                 tip_pre_1h[mk] = active_tips
 
     # 1. Esegui i 4 sistemi con filtro orario
+    # Snapshot dati ricostruito a ogni ciclo (quote/H2H aggiornati dagli scraper) e condiviso da A, S e C
+    snapshot = daily_snapshot.get_snapshot(target_date, refresh=True)
+
     print(f"\n--- Sistema A ---")
-    run_system_a(target_date=target_date, match_time_filter=effective_times)
+    run_system_a(target_date=target_date, match_time_filter=effective_times, snapshot=snapshot)
 
     print(f"\n--- Sistema S ---")
-    run_system_s(target_date=target_date, match_time_filter=effective_times)
+    run_system_s(target_date=target_date, match_time_filter=effective_times, snapshot=snapshot)
 
     print(f"\n--- Sistema C ---")
-    run_system_c(target_date=target_date, match_time_filter=effective_times)
+    run_system_c(target_date=target_date, match_time_filter=effective_times, snapshot=snapshot)
 
     print(f"\n--- Orchestratore MoE ---")
     run_orchestrator(date_str, dry_run=False, match_time_filter=effective_times, preserve_analysis=True)
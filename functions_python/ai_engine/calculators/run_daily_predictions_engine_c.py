@@ -13,12 +13,23 @@ import sys
 import json
 import time
 import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from collections import Counter
+import numpy as np
 
 # ==================== TUNING ====================
 SIMULATION_CYCLES = 100          # Cicli MC per partita
 ALGO_MODE = 6                    # Master/Ensemble
+PARALLEL_WORKERS = 1             # Processi per le simulazioni (1 = seriale, 0 = tutti i core)
+
+# MC adattivo (--tolerance): cicli a blocchi finché 1X2, O/U 2.5 e GG/NG non si stabilizzano
+ADAPTIVE_TOLERANCE = None        # Semi-ampiezza IC95 max in punti % (None = cicli fissi)
+ADAPTIVE_BATCH = 50              # Cicli per blocco
+ADAPTIVE_MAX_CYCLES = 500        # Tetto per le partite incerte
+
+# Cache risultati (engine/sim_cache.py): stessi input + stesso tuning → distribuzione già calcolata
+SIM_CACHE_ENABLED = True
 
 # Soglie (da calibrare dopo i test — per ora emette tutto)
 MIN_CONFIDENCE = 0               # 0 = emette tutto, calibrare dopo
@@ -43,12 +54,15 @@ while not os.path.isdir(os.path.join(_log_root, 'log')):
         break
     _log_root = _p
 _log_path = os.path.join(_log_root, 'log', 'pronostici-engine-c.txt')
-sys.stdout = _TeeOutput(_log_path)
-sys.stderr = sys.stdout
-print(f"{'='*50}")
-print(f"SISTEMA C — AVVIO: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-print(f"Cicli MC: {SIMULATION_CYCLES} | Algoritmo: Master (mode {ALGO_MODE})")
-print(f"{'='*50}\n")
+# Nei processi worker (parallelo) il modulo viene reimportato: niente tee, o il log verrebbe troncato.
+# Idem nelle esecuzioni offline (tools/benchmark_suite.py): il log resta quello della notte.
+if multiprocessing.parent_process() is None and not os.environ.get('AI_ENGINE_OFFLINE'):
+    sys.stdout = _TeeOutput(_log_path)
+    sys.stderr = sys.stdout
+    print(f"{'='*50}")
+    print(f"SISTEMA C — AVVIO: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    print(f"Cicli MC: {SIMULATION_CYCLES} | Algoritmo: Master (mode {ALGO_MODE})")
+    print(f"{'='*50}\n")
 
 # ==================== PATH SETUP ====================
 current_path = os.path.dirname(os.path.abspath(__file__))
@@ -66,10 +80,15 @@ ENGINE_DIR = os.path.join(current_path, 'engine')
 sys.path.insert(0, ENGINE_DIR)
 sys.path.insert(0, current_path)
 
-from engine.engine_core import predict_match, preload_match_data
-from engine.goals_converter import calculate_goals_from_engine, load_tuning
+from engine.engine_core import get_match_raw, preload_match_data, WEIGHTS_CACHE
+from engine.goals_converter import calculate_goals_batch, load_tuning, get_team_fbref_data
+from engine.rng_streams import make_rng, seed_from_key
+from engine import sim_cache
+from engine.score_accumulator import ScoreAccumulator
 import ai_engine.calculators.bulk_manager as bulk_manager
 import ai_engine.calculators.bulk_manager_c as bulk_manager_c
+from calculators import daily_snapshot
+from tracing import trace_run, traced, annotate, span, stages
 
 # ==================== COLLECTIONS ====================
 h2h_collection = db['h2h_by_round']
@@ -149,64 +168,128 @@ def build_preloaded(home, away, league, bulk_cache=None):
 
 # ==================== FASE 3: MONTE CARLO ====================
 
-def run_monte_carlo(preloaded_data, home, away, cycles=SIMULATION_CYCLES):
+def _simulate_batch(preloaded_data, home, away, n, settings_in_ram, rng):
+    """Un blocco di n cicli: raw della partita → calculate_goals_batch → array (gh, ga)."""
+    with suppress_stdout():
+        r_h, r_a = get_match_raw(preloaded_data)
+
+        is_cup = preloaded_data.get('is_cup', False)
+        return calculate_goals_batch(
+            r_h, r_a, n,
+            algo_mode=ALGO_MODE,
+            home_name=home,
+            away_name=away,
+            settings_cache=settings_in_ram,
+            is_cup=is_cup,
+            rng=rng
+        )[:2]
+
+
+def _mc_halfwidth(acc):
+    """Semi-ampiezza IC95 (punti %) più larga tra 1, X, 2, Over 2.5 e GG (dall'istogramma)."""
+    n = acc.n
+    markets = acc.market_counts()
+    counts = np.array([markets['1'], markets['X'], markets['2'], markets['O2.5'], markets['GG']])
+    # Agresti-Coull (+2/+4): con 0 eventi l'intervallo non collassa a zero
+    p = (counts + 2) / (n + 4)
+    return float(1.96 * np.sqrt(p * (1 - p) / (n + 4)).max() * 100)
+
+
+def simulation_fingerprint(preloaded_data, home, away, settings_in_ram, cycles, seed, tolerance, max_cycles):
+    """
+    Impronta di tutto ciò che run_monte_carlo legge: raw delle due squadre, H2H, base_val,
+    volumi FBref (goals_converter), tuning (goals_converter + pesi engine_core), modo e cicli.
+    'h2h_score' è escluso dai raw: lo scrive get_match_raw dai valori h2h già in chiave.
+    """
+    def _raw(raw):
+        return {k: v for k, v in raw.items() if k != 'h2h_score'}
+
+    return sim_cache.fingerprint(
+        home=home, away=away,
+        home_raw=_raw(preloaded_data['home_raw']), away_raw=_raw(preloaded_data['away_raw']),
+        h2h=(preloaded_data.get('h2h_h', 0), preloaded_data.get('h2h_a', 0)),
+        base_val=preloaded_data.get('base_val', 2.5),
+        is_cup=preloaded_data.get('is_cup', False),
+        fbref=(get_team_fbref_data(home), get_team_fbref_data(away)),
+        tuning=settings_in_ram, weights=WEIGHTS_CACHE, algo_mode=ALGO_MODE,
+        cycles=cycles, seed=seed,
+        adaptive=(tolerance, max_cycles, ADAPTIVE_BATCH) if tolerance is not None else None,
+    )
+
+
+def run_monte_carlo(preloaded_data, home, away, cycles=SIMULATION_CYCLES, seed=None,
+                    tolerance=None, max_cycles=None, use_cache=False):
     """
     Esegue N cicli di simulazione Monte Carlo.
-    Ogni ciclo: predict_match → goals_converter → risultato (gh, ga).
-    Ritorna distribuzione completa.
+    Tutti i cicli in un colpo: raw della partita → calculate_goals_batch → array (gh, ga).
+    Con seed fissato la distribuzione è riproducibile (Generator dedicato, nessuno stato globale).
+
+    Con tolerance (punti %) la simulazione è adattiva: blocchi da ADAPTIVE_BATCH cicli finché
+    la stima di 1X2, O/U 2.5 e GG/NG non ha IC95 entro ±tolerance, o fino a max_cycles.
+    Le partite nette si chiudono in pochi blocchi, quelle incerte usano il budget liberato.
+    Con use_cache la distribuzione viene cercata in sim_cache per impronta degli input:
+    se nulla è cambiato dall'ultima simulazione (stesso seed/cicli) non si risimula
+    ('cache_hit' = True nella distribuzione restituita).
+    Ritorna distribuzione completa ('valid_cycles' = cicli realmente usati).
     """
     settings_in_ram = load_tuning(ALGO_MODE)
-    results = []
-    valid = 0
-
-    for i in range(cycles):
-        with suppress_stdout():
-            out = predict_match(home, away, mode=ALGO_MODE, preloaded_data=preloaded_data)
-            if out is None or out[0] is None:
-                continue
-            s_h, s_a, r_h, r_a = out
-
-            is_cup = preloaded_data.get('is_cup', False)
-            goal_result = calculate_goals_from_engine(
-                s_h, s_a, r_h, r_a,
-                algo_mode=ALGO_MODE,
-                home_name=home,
-                away_name=away,
-                settings_cache=settings_in_ram,
-                debug_mode=False,
-                is_cup=is_cup
-            )
-            gh, ga = int(goal_result[0]), int(goal_result[1])
-            results.append((gh, ga))
-            valid += 1
-
+    rng = make_rng(seed) if seed is not None else None
+    if max_cycles is None:
+        max_cycles = ADAPTIVE_MAX_CYCLES
+
+    cache_key = None
+    if use_cache:
+        cache_key = simulation_fingerprint(preloaded_data, home, away, settings_in_ram,
+                                           cycles, seed, tolerance, max_cycles)
+        cached = sim_cache.get_cache().get(cache_key)
+        if cached is not None:
+            cached['cache_hit'] = True
+            return cached
+
+    # I cicli finiscono in un istogramma dei gol (memoria costante, niente array concatenati)
+    acc = ScoreAccumulator()
+    converged = None
+    if tolerance is None:
+        acc.add_batch(*_simulate_batch(preloaded_data, home, away, cycles, settings_in_ram, rng))
+    else:
+        done = 0
+        converged = False
+        while done < max_cycles:
+            n = min(ADAPTIVE_BATCH, max_cycles - done)
+            acc.add_batch(*_simulate_batch(preloaded_data, home, away, n, settings_in_ram, rng))
+            done += n
+            # Almeno 2 blocchi prima di fidarsi della stima
+            if done >= 2 * ADAPTIVE_BATCH and _mc_halfwidth(acc) <= tolerance:
+                converged = True
+                break
+
+    valid = acc.n
     if valid == 0:
         return None
 
     # Calcola distribuzione
-    home_wins = sum(1 for g in results if g[0] > g[1])
-    draws = sum(1 for g in results if g[0] == g[1])
-    away_wins = sum(1 for g in results if g[0] < g[1])
+    markets = acc.market_counts()
+    home_wins = markets['1']
+    draws = markets['X']
+    away_wins = markets['2']
 
     # Over/Under per tutte le linee (1.5, 2.5, 3.5)
-    over_15 = sum(1 for g in results if g[0] + g[1] > 1)
-    under_15 = sum(1 for g in results if g[0] + g[1] <= 1)
-    over_25 = sum(1 for g in results if g[0] + g[1] > 2)
-    under_25 = sum(1 for g in results if g[0] + g[1] <= 2)
-    over_35 = sum(1 for g in results if g[0] + g[1] > 3)
-    under_35 = sum(1 for g in results if g[0] + g[1] <= 3)
+    over_15 = markets['O1.5']
+    under_15 = valid - over_15
+    over_25 = markets['O2.5']
+    under_25 = valid - over_25
+    over_35 = markets['O3.5']
+    under_35 = valid - over_35
 
-    gg = sum(1 for g in results if g[0] > 0 and g[1] > 0)
-    ng = sum(1 for g in results if g[0] == 0 or g[1] == 0)
+    gg = markets['GG']
+    ng = valid - gg
 
-    n = len(results)
-    scores = [f"{g[0]}-{g[1]}" for g in results]
-    top_scores = Counter(scores).most_common(5)
+    n = valid
+    top_scores = acc.most_common(5)      # pareggi per prima comparsa, come Counter(scores)
 
-    avg_gh = sum(g[0] for g in results) / n
-    avg_ga = sum(g[1] for g in results) / n
+    avg_gh, avg_ga = acc.mean_goals()
 
-    return {
+    dist = {
         'home_win_pct': round(home_wins / n * 100, 1),
         'draw_pct': round(draws / n * 100, 1),
         'away_win_pct': round(away_wins / n * 100, 1),
@@ -223,8 +306,13 @@ def run_monte_carlo(preloaded_data, home, away, cycles=SIMULATION_CYCLES):
         'total_avg_goals': round(avg_gh + avg_ga, 2),
         'top_scores': top_scores,
         'valid_cycles': valid,
+        'converged': converged,
         'predicted_score': top_scores[0][0] if top_scores else '0-0',
+        'cache_hit': False,
     }
+    if cache_key is not None:
+        sim_cache.get_cache().put(cache_key, dist)
+    return dist
 
 
 # ==================== FASE 4: CONVERSIONE → PRONOSTICI ====================
@@ -1031,6 +1119,8 @@ def build_document(match, pronostici, dist, target_str):
         'source': 'engine_c',
         'simulation_data': {
             'cycles': dist['valid_cycles'],
+            'converged': dist.get('converged'),
+            'cache_hit': dist.get('cache_hit', False),
             'home_win_pct': dist['home_win_pct'],
             'draw_pct': dist['draw_pct'],
             'away_win_pct': dist['away_win_pct'],
@@ -1052,15 +1142,119 @@ def build_document(match, pronostici, dist, target_str):
     return doc
 
 
+# ==================== FASE 6b: ESECUZIONE PER PARTITA (SERIALE / PARALLELA) ====================
+
+# Cache di lega del processo corrente: nei worker arriva UNA volta dall'initializer,
+# non viene serializzata a ogni partita.
+_WORKER_LEAGUE_CACHES = {}
+
+
+def match_seed(base_seed, target_str, home, away):
+    """Seed deterministico per partita: non dipende dall'ordine né dal processo che la simula."""
+    if base_seed is None:
+        return None
+    return seed_from_key(target_str, home, away, base_seed=base_seed)
+
+
+def _init_worker(league_caches):
+    global _WORKER_LEAGUE_CACHES
+    _WORKER_LEAGUE_CACHES = league_caches
+
+
+@traced("match", attrs=lambda m, league, *a, **k: {
+    'match': f"{m.get('home', m.get('home_team', ''))} vs {m.get('away', m.get('away_team', ''))}",
+    'league': league, 'algo': ALGO_MODE})
+def process_match(m, league, league_cache, target_str, cycles=SIMULATION_CYCLES, seed=None,
+                  tolerance=None, max_cycles=None, use_cache=False):
+    """
+    Pipeline completa di UNA partita: cache partita → preload → MC → pronostici → documento.
+    Ritorna (documento o None, riga di log).
+    """
+    home = m.get('home', m.get('home_team', ''))
+    away = m.get('away', m.get('away_team', ''))
+    t_match = time.time()
+    st = stages()
+
+    # Costruisci bulk_cache per questa partita (solo MASTER_DATA + H2H, no query pesanti)
+    st.next("bulk_cache")
+    with suppress_stdout():
+        bulk_cache = bulk_manager_c.build_match_cache(league_cache, home, away)
+
+    # Ponte dati
+    st.next("preload")
+    with suppress_stdout():
+        preloaded = build_preloaded(home, away, league, bulk_cache=bulk_cache)
+    if not preloaded:
+        return None, f"  ⏭️ Skip (preload fallito): {home} vs {away}"
+
+    # Monte Carlo
+    st.next("monte_carlo")
+    dist = run_monte_carlo(preloaded, home, away, cycles=cycles, seed=seed,
+                           tolerance=tolerance, max_cycles=max_cycles, use_cache=use_cache)
+    if not dist:
+        return None, f"  ⚠️ MC fallito: {home} vs {away}"
+    annotate(cycles=dist['valid_cycles'], cache_hit=dist['cache_hit'])
+
+    # Conversione → pronostici
+    st.next("predictions")
+    odds = m.get('odds', {})
+    pronostici = convert_to_predictions(dist, odds)
+
+    # Kelly/Stake + 5 Modificatori
+    apply_kelly(pronostici, dist, odds)
+
+    # Build documento
+    st.next("document")
+    doc = build_document(m, pronostici, dist, target_str)
+    st.done()
+
+    # Log
+    elapsed = time.time() - t_match
+    segno_str = next((p['pronostico'] for p in pronostici if p['tipo'] in ('SEGNO', 'DOPPIA_CHANCE')), '-')
+    gol_str = ', '.join(p['pronostico'] for p in pronostici if p['tipo'] == 'GOL') or '-'
+    log_line = (f"  ✅ {home} vs {away} | {dist['predicted_score']} | "
+                f"1:{dist['home_win_pct']}% X:{dist['draw_pct']}% 2:{dist['away_win_pct']}% | "
+                f"SEGNO={segno_str} GOL={gol_str} | {dist['valid_cycles']} cicli"
+                f"{' (cache)' if dist['cache_hit'] else ''} | {elapsed:.1f}s")
+    return doc, log_line
+
+
+def _process_match_task(task):
+    m, league, target_str, cycles, seed, tolerance, max_cycles, use_cache = task
+    return process_match(m, league, _WORKER_LEAGUE_CACHES[league], target_str,
+                         cycles=cycles, seed=seed, tolerance=tolerance, max_cycles=max_cycles,
+                         use_cache=use_cache)
+
+
 # ==================== FASE 7: MAIN ====================
 
-def run_engine_c(target_date=None, match_time_filter=None):
+@trace_run("daily_predictions_C", report="stdout")
+def run_engine_c(target_date=None, match_time_filter=None, workers=None, seed=None, cycles=None,
+                 tolerance=None, max_cycles=None, use_cache=None, snapshot=None):
     """Entry point principale Sistema C.
 
     Args:
         target_date: data target (default: oggi)
         match_time_filter: lista di orari per filtrare solo i match di quel gruppo orario.
+        workers: processi per le simulazioni (default PARALLEL_WORKERS; 0 = tutti i core)
+        seed: seed base; ogni partita riceve un seed derivato (riproducibile)
+        cycles: cicli MC per partita (default SIMULATION_CYCLES)
+        tolerance: MC adattivo, IC95 max in punti % (default ADAPTIVE_TOLERANCE; None = cicli fissi)
+        max_cycles: tetto cicli in modalità adattiva (default ADAPTIVE_MAX_CYCLES)
+        use_cache: riusa le distribuzioni già simulate con input identici (default SIM_CACHE_ENABLED)
+        snapshot: DaySnapshot già costruito per questo ciclo (pre_match_update);
+                  se None viene ricostruito da Mongo.
     """
+    if workers is None:
+        workers = PARALLEL_WORKERS
+    if cycles is None:
+        cycles = SIMULATION_CYCLES
+    if tolerance is None:
+        tolerance = ADAPTIVE_TOLERANCE
+    if max_cycles is None:
+        max_cycles = ADAPTIVE_MAX_CYCLES
+    if use_cache is None:
+        use_cache = SIM_CACHE_ENABLED
     t_start = time.time()
 
     if target_date:
@@ -1068,11 +1262,15 @@ def run_engine_c(target_date=None, match_time_filter=None):
     else:
         target_str = datetime.now().strftime('%Y-%m-%d')
         target_date = datetime.now()
+    annotate(date=target_str, algo=ALGO_MODE)
 
     print(f"\n🚀 SISTEMA C — Generazione pronostici per {target_str}")
     if match_time_filter:
         print(f"   ⏰ Filtro orario: {match_time_filter}")
-    print(f"   Cicli: {SIMULATION_CYCLES} | Algo: Master (mode {ALGO_MODE})\n")
+    if tolerance is None:
+        print(f"   Cicli: {cycles} | Algo: Master (mode {ALGO_MODE})\n")
+    else:
+        print(f"   Cicli: adattivi (±{tolerance}%, max {max_cycles}) | Algo: Master (mode {ALGO_MODE})\n")
 
     # 1. Raccolta partite
     matches = get_today_matches(target_date)
@@ -1098,6 +1296,13 @@ def run_engine_c(target_date=None, match_time_filter=None):
     skipped = 0
     total = len(matches)
 
+    # Snapshot del giorno condiviso con Sistema A/S (None → query per lega come prima)
+    if snapshot is None:
+        snapshot = daily_snapshot.get_snapshot(target_date)
+
+    # Carica cache lega UNA volta per lega (seriale: sono le query Mongo)
+    league_caches = {}
+    tasks = []
     for league, league_matches in leagues.items():
         print(f"\n📂 {league} ({len(league_matches)} partite)")
 
@@ -1110,8 +1315,8 @@ def run_engine_c(target_date=None, match_time_filter=None):
 
         # Carica cache lega UNA volta (tutte le squadre + rounds limit 12)
         try:
-            with suppress_stdout():
-                league_cache = bulk_manager_c.load_league_cache(all_teams, league)
+            with span("league_cache", league=league, teams=len(all_teams)), suppress_stdout():
+                league_caches[league] = bulk_manager_c.load_league_cache(all_teams, league, snapshot=snapshot)
         except Exception as e:
             print(f"  ⚠️ Bulk cache fallito per {league}: {e}")
             skipped += len(league_matches)
@@ -1120,46 +1325,32 @@ def run_engine_c(target_date=None, match_time_filter=None):
         for m in league_matches:
             home = m.get('home', m.get('home_team', ''))
             away = m.get('away', m.get('away_team', ''))
-            t_match = time.time()
-
-            # Costruisci bulk_cache per questa partita (solo MASTER_DATA + H2H, no query pesanti)
-            with suppress_stdout():
-                bulk_cache = bulk_manager_c.build_match_cache(league_cache, home, away)
-
-            # Ponte dati
-            with suppress_stdout():
-                preloaded = build_preloaded(home, away, league, bulk_cache=bulk_cache)
-            if not preloaded:
-                print(f"  ⏭️ Skip (preload fallito): {home} vs {away}")
-                skipped += 1
-                continue
-
-            # Monte Carlo
-            dist = run_monte_carlo(preloaded, home, away)
-            if not dist:
-                print(f"  ⚠️ MC fallito: {home} vs {away}")
-                skipped += 1
-                continue
-
-            # Conversione → pronostici
-            odds = m.get('odds', {})
-            pronostici = convert_to_predictions(dist, odds)
-
-            # Kelly/Stake + 5 Modificatori
-            apply_kelly(pronostici, dist, odds)
-
-            # Build documento
-            doc = build_document(m, pronostici, dist, target_str)
+            tasks.append((m, league, target_str, cycles, match_seed(seed, target_str, home, away),
+                          tolerance, max_cycles, use_cache))
+
+    # Simulazioni: seriale o su più processi (stesso ordine, stessi seed → stessi documenti)
+    n_workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+    n_workers = min(n_workers, max(1, len(tasks)))
+    # Con più processi gli span per partita restano nei worker (nessuna run attiva lì): solo il totale
+    sim_span = span("simulations", workers=n_workers, matches=len(tasks)).start()
+    if n_workers > 1:
+        print(f"\n⚡ Simulazioni in parallelo: {len(tasks)} partite su {n_workers} processi")
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(league_caches,)) as pool:
+            outcomes = list(pool.map(_process_match_task, tasks))
+    else:
+        _init_worker(league_caches)
+        outcomes = [_process_match_task(t) for t in tasks]
+    sim_span.finish()
+
+    for doc, log_line in outcomes:
+        print(log_line)
+        if doc is None:
+            skipped += 1
+        else:
             documents.append(doc)
 
-            # Log
-            elapsed = time.time() - t_match
-            segno_str = next((p['pronostico'] for p in pronostici if p['tipo'] in ('SEGNO', 'DOPPIA_CHANCE')), '-')
-            gol_str = ', '.join(p['pronostico'] for p in pronostici if p['tipo'] == 'GOL') or '-'
-            print(f"  ✅ {home} vs {away} | {dist['predicted_score']} | "
-                  f"1:{dist['home_win_pct']}% X:{dist['draw_pct']}% 2:{dist['away_win_pct']}% | "
-                  f"SEGNO={segno_str} GOL={gol_str} | {elapsed:.1f}s")
-
     # 3. Salva in DB
     if documents:
         # Rimuovi vecchi pronostici per la stessa data (filtrati per orario se richiesto)
@@ -1182,6 +1373,14 @@ def run_engine_c(target_date=None, match_time_filter=None):
     print(f"  Partite totali: {total}")
     print(f"  Pronostici generati: {len(documents)}")
     print(f"  Skippate: {skipped}")
+    if tolerance is not None and documents:
+        used = sum(d['simulation_data']['cycles'] for d in documents)
+        n_conv = sum(1 for d in documents if d['simulation_data']['converged'])
+        print(f"  Cicli MC usati: {used} (media {used / len(documents):.0f}/partita, "
+              f"{n_conv}/{len(documents)} convergenti)")
+    if use_cache and documents:
+        n_hit = sum(1 for d in documents if d['simulation_data']['cache_hit'])
+        print(f"  Cache simulazioni: {n_hit} hit / {len(documents) - n_hit} miss")
     print(f"  Tempo totale: {elapsed_total:.1f}s")
     print(f"{'='*50}")
 
@@ -1194,19 +1393,28 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Sistema C — Pronostici Monte Carlo')
     parser.add_argument('--date', type=str, help='Data target YYYY-MM-DD (default: oggi)')
     parser.add_argument('--cycles', type=int, default=SIMULATION_CYCLES, help='Cicli MC per partita')
+    parser.add_argument('--workers', type=int, default=PARALLEL_WORKERS, help='Processi per le simulazioni (1 = seriale, 0 = tutti i core)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed base per run riproducibili')
+    parser.add_argument('--tolerance', type=float, default=ADAPTIVE_TOLERANCE,
+                        help='MC adattivo: IC95 max in punti %% su 1X2, O/U 2.5, GG/NG (default: cicli fissi)')
+    parser.add_argument('--max-cycles', type=int, default=ADAPTIVE_MAX_CYCLES, help='Tetto cicli in modalità adattiva')
+    parser.add_argument('--no-cache', action='store_true', help='Risimula tutto (ignora la cache risultati)')
     args = parser.parse_args()
 
     if args.cycles != SIMULATION_CYCLES:
         SIMULATION_CYCLES = args.cycles
         print(f"⚙️ Cicli MC override: {SIMULATION_CYCLES}")
 
+    run_kwargs = {'workers': args.workers, 'seed': args.seed, 'cycles': args.cycles, 'tolerance': args.tolerance, 'max_cycles': args.max_cycles,
+                  'use_cache': not args.no_cache}
+
     if args.date:
         target = datetime.strptime(args.date, '%Y-%m-%d')
-        run_engine_c(target)
+        run_engine_c(target, **run_kwargs)
     else:
         for i in range(7):  # 0=oggi, 1=domani, 2=dopodomani, ... 6=tra 6 giorni
             target = datetime.now() + timedelta(days=i)
             print("\n" + "=" * 70)
             print(f"📅 ELABORAZIONE: {target.strftime('%Y-%m-%d')}")
             print("=" * 70)
-            run_engine_c(target)
+            run_engine_c(target, **run_kwargs)
@@ -46,6 +46,8 @@ while not os.path.exists(os.path.join(current_path, 'config.py')):
 sys.path.append(current_path)
 
 from config import db
+from calculators import daily_snapshot
+from tracing import trace_run, traced, annotate, iter_spans
 import json
 import random
 
@@ -175,6 +177,7 @@ LEGHE_ALTA_X = {
 }
 THRESHOLD_X_FACTOR = 55
 
+@traced(attrs=lambda m, *a, **k: {'match': f"{m.get('home')} vs {m.get('away')}"})
 def calculate_x_factor(match):
     """Calcola la probabilità di pareggio (X) per una partita."""
     h2h = match.get('h2h_data', {}) or {}
@@ -438,6 +441,7 @@ def _safe_float_es(val, default=None):
         return default
 
 
+@traced(attrs=lambda m, *a, **k: {'match': f"{m.get('home')} vs {m.get('away')}"})
 def calculate_exact_score(match):
     """
     Algoritmo Risultato Esatto — profili storici (4294 partite) + segnali engine.
@@ -639,7 +643,10 @@ def calculate_stars(score):
 _streak_cache = {}            # {team_name: {total: {...}, home: {...}, away: {...}}}
 _streak_cache_leagues = set()  # leghe già processate
 
+_snapshot = None  # DaySnapshot del giorno (daily_snapshot), impostato da run_daily_predictions
 
+
+@traced(attrs=lambda league_name: {'league': league_name})
 def build_streak_cache(league_name):
     """Costruisce la cache strisce per tutte le squadre di una lega.
     Esegue 1 query MongoDB per lega, poi calcola tutte le strisce."""
@@ -663,8 +670,13 @@ def build_streak_cache(league_name):
     ]
 
     # Raggruppa per squadra
+    # Snapshot del giorno: stesse partite della pipeline, senza query
+    played = _snapshot.played_matches(league_name) if _snapshot is not None else daily_snapshot.MISS
+    if played is daily_snapshot.MISS:
+        played = h2h_collection.aggregate(pipeline)
+
     team_matches = {}
-    for doc in h2h_collection.aggregate(pipeline):
+    for doc in played:
         home = doc.get('home', '')
         away = doc.get('away', '')
         score = doc.get('real_score', '')
@@ -862,6 +874,7 @@ def get_match_streak_data(home_name, away_name):
 
 # ==================== FASE 1: RACCOLTA DATI ====================
 
+@traced()
 def get_today_matches(target_date=None):
     """Recupera tutte le partite del giorno da h2h_by_round (aggregation pipeline)."""
     if target_date:
@@ -892,6 +905,7 @@ def get_today_matches(target_date=None):
     return matches
 
 
+@traced()
 def get_today_cup_matches(target_date=None):
     """Recupera partite UCL/UEL del giorno dalle collections coppe."""
     if target_date:
@@ -1511,8 +1525,13 @@ def analyze_cup_gol(match, league_name):
     }
 
 
+@traced()
 def get_team_data(team_name):
     """Recupera tutti i dati di una squadra dalla collection teams."""
+    if _snapshot is not None:
+        team = _snapshot.team(team_name)
+        if team is not daily_snapshot.MISS:
+            return team
     team = teams_collection.find_one({
         "$or": [
             {"name": team_name},
@@ -1525,6 +1544,10 @@ def get_team_data(team_name):
 
 def get_seasonal_stats(team_name, league_name):
     """Recupera xG e volume gol medio da team_seasonal_stats."""
+    if _snapshot is not None:
+        doc = _snapshot.seasonal_stats(team_name, league_name)
+        if doc is not daily_snapshot.MISS:
+            return doc
     doc = seasonal_stats_collection.find_one({
         "team": team_name,
         "league": league_name
@@ -1537,7 +1560,9 @@ def get_seasonal_stats(team_name, league_name):
 
 def get_league_avg_goals(league_name):
     """Recupera media gol del campionato da league_stats."""
-    doc = league_stats_collection.find_one({"_id": league_name})
+    doc = _snapshot.league_avg_goals(league_name) if _snapshot is not None else daily_snapshot.MISS
+    if doc is daily_snapshot.MISS:
+        doc = league_stats_collection.find_one({"_id": league_name})
     if doc:
         return doc.get('avg_goals', 2.5)
     return 2.5  # Default
@@ -1548,12 +1573,14 @@ def get_h2h_goal_patterns(home_name, away_name, home_tm_id, away_tm_id):
     Analizza i pattern gol dagli scontri diretti (raw_h2h_data_v2).
     Restituisce: % over 2.5, % entrambe segnano, media gol totali
     """
-    doc = raw_h2h_collection.find_one({
-        "$or": [
-            {"tm_id_a": int(home_tm_id), "tm_id_b": int(away_tm_id)},
-            {"tm_id_a": int(away_tm_id), "tm_id_b": int(home_tm_id)}
-        ]
-    })
+    doc = _snapshot.raw_h2h_by_tm_ids(int(home_tm_id), int(away_tm_id)) if _snapshot is not None else daily_snapshot.MISS
+    if doc is daily_snapshot.MISS:
+        doc = raw_h2h_collection.find_one({
+            "$or": [
+                {"tm_id_a": int(home_tm_id), "tm_id_b": int(away_tm_id)},
+                {"tm_id_a": int(away_tm_id), "tm_id_b": int(home_tm_id)}
+            ]
+        })
 
     if not doc or not doc.get('matches'):
         return {'over25_pct': 50.0, 'btts_pct': 50.0, 'avg_goals': 2.5, 'total_matches': 0}
@@ -1901,6 +1928,7 @@ def calculate_doppia_chance(q_a, q_b):
         return 0
 
 
+@traced()
 def analyze_segno(match_data, home_team_doc, away_team_doc):
     """
     FASE 2: Calcola punteggio complessivo SEGNO (0-100) e determina quale segno.
@@ -2335,6 +2363,7 @@ def score_dna_off_def(match_data):
     return round(max(0, min(100, score)), 1), direction
 
 
+@traced()
 def analyze_gol(match_data, home_team_doc, away_team_doc, league_name):
     """
     FASE 3: Calcola punteggio complessivo GOL (0-100) e determina tipo pronostico.
@@ -2787,6 +2816,7 @@ def calcola_stake_kelly(quota, probabilita_stimata, tipo='GOL'):
 
 # ==================== FASE 4: DECISIONE FINALE ====================
 
+@traced()
 def make_decision(segno_result, gol_result, is_cup=False):
     """
     Decide: SEGNO, GOL, SEGNO+GOL, o SCARTA.
@@ -2959,6 +2989,7 @@ def make_decision(segno_result, gol_result, is_cup=False):
     }
 
 
+@traced()
 def analyze_bomba(match_data, home_team_doc, away_team_doc):
     """
     Analizza le partite scartate per trovare possibili sorprese.
@@ -3089,6 +3120,7 @@ def analyze_bomba(match_data, home_team_doc, away_team_doc):
 
 # ==================== FASE 5: GENERAZIONE COMMENTO ====================
 
+@traced()
 def generate_comment(match_data, segno_result, gol_result, decision_result):
     """
     Genera commenti professionali per ogni pronostico usando il pool JSON.
@@ -3265,16 +3297,21 @@ def generate_bomba_comment(match_data, bomba_result, home_team_doc, away_team_do
 
 # ==================== MAIN ====================
 
-def run_daily_predictions(target_date=None, match_time_filter=None):
+@trace_run("daily_predictions_sandbox", report="stdout")
+def run_daily_predictions(target_date=None, match_time_filter=None, snapshot=None):
     """Esegue l'intero processo di previsione giornaliera (SANDBOX).
 
     Args:
         target_date: data target (default: oggi)
         match_time_filter: lista di orari per filtrare solo i match di quel gruppo orario.
+        snapshot: DaySnapshot già costruito per questo ciclo (pre_match_update);
+                  se None viene ricostruito da Mongo.
     """
+    global _snapshot
 
     # Definisci la data target subito
     target_str = (target_date or datetime.now()).strftime('%Y-%m-%d')
+    annotate(date=target_str)
 
     print("\n" + "=" * 70)
     print(f"🧪 DAILY PREDICTIONS SANDBOX - {target_str}")
@@ -3325,7 +3362,8 @@ def run_daily_predictions(target_date=None, match_time_filter=None):
     if finished_keys:
         print(f"   ✅ Partite già finite: {len(finished_keys)} — verranno saltate")
 
-    # 1c. Costruisci cache strisce per tutte le leghe delle partite di oggi
+    # 1c. Snapshot del giorno (condiviso con gli altri sistemi) + cache strisce per le leghe di oggi
+    _snapshot = snapshot if snapshot is not None else daily_snapshot.get_snapshot(target_date)
     leagues_today = set(m.get('_league', '') for m in matches if m.get('_league'))
     for league in leagues_today:
         build_streak_cache(league)
@@ -3336,7 +3374,8 @@ def run_daily_predictions(target_date=None, match_time_filter=None):
     scartate = 0
     bombs = []
 
-    for match in matches:
+    for match in iter_spans(matches, "match", lambda m: {
+            'match': f"{m.get('home', '???')} vs {m.get('away', '???')}", 'league': m.get('_league', 'Unknown')}):
         home = match.get('home', '???')
         away = match.get('away', '???')
         league = match.get('_league', 'Unknown')
@@ -58,32 +58,49 @@ if not MONGO_URI:
 
 debug_print(" Connessione MongoDB...")
 
-try:
-    # Connessione a MongoDB
-    client = pymongo.MongoClient(MONGO_URI)
+# Record/replay delle query (db_replay.py): AI_ENGINE_DB_MODE=record | replay
+DB_MODE = os.getenv('AI_ENGINE_DB_MODE', '').strip().lower()
+
+if DB_MODE == 'replay':
+    # Nessuna connessione: le letture arrivano dal nastro registrato
+    from db_replay import install as _install_db_replay
+    client = None
+    db_name = 'replay'
+    db = _install_db_replay('replay', tape_path=os.getenv('AI_ENGINE_DB_TAPE'),
+                            strict=os.getenv('AI_ENGINE_DB_STRICT') == '1')
+    debug_print(f" DB REPLAY dal nastro: {db.tape_path}")
+else:
+    try:
+        # Connessione a MongoDB
+        client = pymongo.MongoClient(MONGO_URI)
     
-    # Estrae il nome del database dalla URI
-    db_name = MONGO_URI.rsplit('/', 1)[-1].split('?', 1)[0]
-    db = client[db_name]
+        # Estrae il nome del database dalla URI
+        db_name = MONGO_URI.rsplit('/', 1)[-1].split('?', 1)[0]
+        db = client[db_name]
     
-    # Test connessione
-    client.admin.command('ping')
-    debug_print(f" Connesso a MongoDB: {db_name}")
+        # Test connessione
+        client.admin.command('ping')
+        debug_print(f" Connesso a MongoDB: {db_name}")
     
-except Exception as e:
-    debug_print(f" Errore connessione MongoDB: {e}")
-    debug_print("  Assicurati che MongoDB sia in esecuzione!")
-    raise
+    except Exception as e:
+        debug_print(f" Errore connessione MongoDB: {e}")
+        debug_print("  Assicurati che MongoDB sia in esecuzione!")
+        raise
 
-# Conta documenti nelle collezioni principali
-debug_print(f" Database: {db_name}")
+    # Conta documenti nelle collezioni principali
+    debug_print(f" Database: {db_name}")
 
-collections_to_check = ['teams', 'matches_history_betexplorer', 'raw_h2h_data_v2', 'h2h_by_round']
-for collection in collections_to_check:
-    if collection in db.list_collection_names():
-        count = db[collection].count_documents({})
-        debug_print(f"    {collection}: {count} documenti")
-    else:
-        debug_print(f"     {collection}: collezione non trovata")
+    collections_to_check = ['teams', 'matches_history_betexplorer', 'raw_h2h_data_v2', 'h2h_by_round']
+    for collection in collections_to_check:
+        if collection in db.list_collection_names():
+            count = db[collection].count_documents({})
+            debug_print(f"    {collection}: {count} documenti")
+        else:
+            debug_print(f"     {collection}: collezione non trovata")
+
+    if DB_MODE == 'record':
+        from db_replay import install as _install_db_replay
+        db = _install_db_replay('record', real_db=db, tape_path=os.getenv('AI_ENGINE_DB_TAPE'))
+        debug_print(f" DB RECORD sul nastro: {db.tape_path}")
 
 debug_print(" Configurazione completata con successo")
\ No newline at end of file
@@ -18,7 +18,6 @@ import json
 import math
 import time
 from datetime import datetime
-import collections
 
 # --- CONFIGURAZIONE PERCORSI ---
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))  # cups_engine
@@ -462,7 +461,7 @@ def run_cup_simulation(competition, home_team, away_team, algo_id, cycles):
             },
             "simulations": {
                 "total_runs": len(sim_list),
-                "score_distribution": dict(collections.Counter(sim_list).most_common(10))
+                "score_distribution": dict(sim_list.most_common(10))
             }
         }
         
@@ -478,10 +477,28 @@ def run_cup_simulation(competition, home_team, away_team, algo_id, cycles):
         }
 
 
+def simulate_request(main_mode, competition, home_team, away_team, algo_id, cycles):
+    """Esegue una richiesta web e ritorna il dict finale (lo stesso che main() stampa in JSON)."""
+    start_time = datetime.now()
+
+    if main_mode != 4:
+        result = {
+            "success": False,
+            "error": "Solo modalità Singola (4) supportata per coppe"
+        }
+    else:
+        result = run_cup_simulation(competition, home_team, away_team, algo_id, cycles)
+
+    return {
+        "success": result.get("success", False),
+        "timestamp": datetime.now().isoformat(),
+        "execution_time": (datetime.now() - start_time).total_seconds(),
+        **{k: v for k, v in result.items() if k != "success"}
+    }
+
+
 def main():
     """Entry point per chiamata da web"""
-    start_time = datetime.now()
-    
     try:
         if len(sys.argv) < 9:
             print(json.dumps({
@@ -500,21 +517,8 @@ def main():
         algo_id = int(sys.argv[7])
         cycles = int(sys.argv[8])
         
-        if main_mode != 4:
-            result = {
-                "success": False,
-                "error": "Solo modalità Singola (4) supportata per coppe"
-            }
-        else:
-            result = run_cup_simulation(competition, home_team, away_team, algo_id, cycles)
-        
         # Output JSON
-        final_output = {
-            "success": result.get("success", False),
-            "timestamp": datetime.now().isoformat(),
-            "execution_time": (datetime.now() - start_time).total_seconds(),
-            **{k: v for k, v in result.items() if k != "success"}
-        }
+        final_output = simulate_request(main_mode, competition, home_team, away_team, algo_id, cycles)
         
         print(json.dumps(final_output, ensure_ascii=False), flush=True)
         
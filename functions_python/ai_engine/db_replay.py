@@ -0,0 +1,620 @@
+"""
+DB REPLAY - Registrazione e replay delle query Mongo del handle config.db
+=========================================================================
+run_daily_predictions, run_engine_c, orchestrate_date e generate_bollette_2
+parlano con Mongo direttamente tramite config.db: senza il DB di produzione
+non si possono né profilare né caricare. Qui il handle viene sostituito.
+
+Modalità (variabile d'ambiente AI_ENGINE_DB_MODE, letta da config.py):
+  record  → db reale avvolto: ogni query e il suo risultato (e ogni scrittura
+            con il suo esito) finiscono nel nastro, una riga JSON per chiamata
+  replay  → nessuna connessione: le letture sono servite dal nastro in modo
+            deterministico, le scritture sono contate e scartate
+
+Nastro: AI_ENGINE_DB_TAPE (default _db_tapes/<oggi>.<script>.tape.jsonl.gz, uno
+per script: update_manager lancia gli script notturni come processi separati,
+anche in parallelo, e ognuno registra sul proprio nastro). I processi worker
+(ProcessPoolExecutor) scrivono su <nastro>.<pid>, il replay li legge tutti.
+Una nuova registrazione dello stesso script riparte da zero: il nastro e i file
+dei worker della sessione precedente sullo stesso percorso vengono sostituiti. Il gzip viene
+scaricato ogni TAPE_FLUSH_EVERY righe: dopo un crash il replay legge il nastro
+fino all'ultimo blocco completo e ignora la coda troncata.
+
+Replay: a ogni chiamata si cerca la stessa query (collection, operazione,
+argomenti, sort/limit...) nell'ordine in cui è stata registrata; se gli
+argomenti cambiano (es. datetime.now() nel filtro) vale la chiamata n-esima
+dallo stesso punto del codice. Nessuna corrispondenza → risultato vuoto
+(o errore con AI_ENGINE_DB_STRICT=1).
+
+In entrambe le modalità si contano query per collection/operazione e per
+punto di chiamata (file:riga:funzione), con il tempo speso; il riepilogo
+viene stampato a fine processo e salvato in <nastro>.report.json.
+
+Usage:
+    AI_ENGINE_DB_MODE=record python calculators/run_daily_predictions_engine_c.py
+    AI_ENGINE_DB_MODE=replay python calculators/run_daily_predictions_engine_c.py
+
+    from db_replay import ReplayDatabase
+    db = ReplayDatabase("_db_tapes/2026-10-17.run_daily_predictions_engine_c.tape.jsonl.gz")
+    ...
+    db.stats.print_report()
+"""
+
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+
+from bson import json_util
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TAPES_DIR = os.path.join(BASE_DIR, "_db_tapes")
+
+READ_OPS = ("find", "find_one", "aggregate", "count_documents", "estimated_document_count",
+            "distinct", "find_one_and_update", "find_one_and_replace", "find_one_and_delete")
+WRITE_OPS = ("insert_one", "insert_many", "update_one", "update_many", "replace_one",
+             "delete_one", "delete_many", "bulk_write", "create_index", "drop")
+# Modificatori del cursore che non cambiano il risultato: fuori dalla chiave
+NEUTRAL_MODIFIERS = ("batch_size", "max_time_ms", "hint", "allow_disk_use", "comment")
+WRITE_RESULT_FIELDS = ("inserted_id", "inserted_ids", "inserted_count", "matched_count",
+                       "modified_count", "deleted_count", "upserted_id", "upserted_count")
+REPORT_TOP_SITES = 15
+TAPE_FLUSH_EVERY = 50       # righe tra due flush del gzip (quanto si perde al massimo in un crash)
+
+
+def session_name():
+    """Nome dello script in esecuzione (stesso nei worker: multiprocessing ripassa sys.argv)."""
+    script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else ""
+    name = os.path.splitext(script)[0]
+    return name if name and name != "-c" else "interactive"
+
+
+def default_tape_path(date_str=None, session=None):
+    day = date_str or datetime.now().strftime('%Y-%m-%d')
+    return os.path.join(TAPES_DIR, f"{day}.{session or session_name()}.tape.jsonl.gz")
+
+
+def _dumps(value):
+    """JSON esteso (ObjectId, datetime...); oggetti non BSON (UpdateOne...) come repr."""
+    return json_util.dumps(value, default=repr)
+
+
+def _call_key(coll, op, args, kwargs, modifiers=()):
+    mods = [m for m in modifiers if m[0] not in NEUTRAL_MODIFIERS]
+    payload = _dumps([coll, op, list(args), kwargs, mods])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _call_site():
+    """Primo frame fuori da db_replay/pymongo: 'percorso:riga:funzione'."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != __file__ and "pymongo" not in filename:
+            break
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    try:
+        path = os.path.relpath(frame.f_code.co_filename, BASE_DIR)
+    except ValueError:
+        path = frame.f_code.co_filename
+    return f"{path}:{frame.f_lineno}:{frame.f_code.co_name}"
+
+
+def _write_summary(result):
+    """Esito di una scrittura pymongo → dict (solo i campi disponibili)."""
+    if result is None or isinstance(result, (str, int, float, dict, list)):
+        return result
+    out = {}
+    for field in WRITE_RESULT_FIELDS:
+        try:
+            out[field] = getattr(result, field)
+        except Exception:
+            continue
+    return out
+
+
+class _ReplayWriteResult:
+    """Stand-in di InsertOneResult/UpdateResult/BulkWriteResult... con i valori registrati."""
+
+    def __init__(self, summary=None):
+        self.acknowledged = True
+        self.inserted_id = None
+        self.inserted_ids = []
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_id = None
+        self.upserted_count = 0
+        for field, value in (summary or {}).items():
+            setattr(self, field, value)
+        self.bulk_api_result = {
+            "nInserted": self.inserted_count, "nMatched": self.matched_count,
+            "nModified": self.modified_count, "nRemoved": self.deleted_count,
+            "nUpserted": self.upserted_count,
+        }
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# CONTEGGI
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+class QueryStats:
+    """Query per collection/operazione e per punto di chiamata, con tempi."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.by_collection = defaultdict(Counter)     # coll -> {op: n}
+        self.ms_by_collection = Counter()
+        self.by_site = Counter()                      # "file:riga:funz coll.op" -> n
+        self.ms_by_site = Counter()
+        self.docs_returned = Counter()                # coll -> documenti letti
+        self.served = Counter()                       # replay: exact / repeat / site / miss
+        self.misses = []
+        self._lock = threading.Lock()
+
+    def record(self, coll, op, site, ms, n_docs=0, served=None):
+        label = f"{site} {coll}.{op}"
+        with self._lock:
+            self.by_collection[coll][op] += 1
+            self.ms_by_collection[coll] += ms
+            self.by_site[label] += 1
+            self.ms_by_site[label] += ms
+            self.docs_returned[coll] += n_docs
+            if served:
+                self.served[served] += 1
+                if served == "miss" and len(self.misses) < 200:
+                    self.misses.append(label)
+
+    @property
+    def total(self):
+        return sum(sum(ops.values()) for ops in self.by_collection.values())
+
+    def report(self):
+        return {
+            "mode": self.mode,
+            "total_queries": self.total,
+            "by_collection": {c: dict(ops) for c, ops in sorted(self.by_collection.items())},
+            "ms_by_collection": {c: round(ms, 1) for c, ms in self.ms_by_collection.most_common()},
+            "docs_returned": dict(self.docs_returned),
+            "by_site": [{"site": s, "calls": n, "ms": round(self.ms_by_site[s], 1)}
+                        for s, n in self.by_site.most_common()],
+            "served": dict(self.served),
+            "misses": self.misses,
+        }
+
+    def print_report(self, file=None):
+        file = file or sys.stderr
+        print(f"\n{'━' * 70}", file=file)
+        print(f"🗄️  DB {self.mode.upper()} — {self.total} query", file=file)
+        print(f"{'━' * 70}", file=file)
+        for coll, ops in sorted(self.by_collection.items(), key=lambda kv: -sum(kv[1].values())):
+            ops_str = ", ".join(f"{op} {n}" for op, n in ops.most_common())
+            print(f"   {coll:<32} {sum(ops.values()):>6}  ({ops_str})  {self.ms_by_collection[coll]:.0f}ms",
+                  file=file)
+        print("   Punti di chiamata più attivi:", file=file)
+        for site, n in self.by_site.most_common(REPORT_TOP_SITES):
+            print(f"   {n:>6}× {self.ms_by_site[site]:>8.0f}ms  {site}", file=file)
+        if self.served:
+            print(f"   Replay: {dict(self.served)}", file=file)
+        print(f"{'━' * 70}", file=file)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# REGISTRAZIONE
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+class _TapeWriter:
+    """Nastro in scrittura: una riga JSON per chiamata, gzip troncato all'apertura e scaricato a blocchi."""
+
+    def __init__(self, path):
+        if multiprocessing.parent_process() is not None:
+            path = f"{path}.{os.getpid()}"      # worker: file proprio, niente righe intrecciate
+        else:
+            _remove_worker_tapes(path)          # nuova sessione: niente nastri dei worker precedenti
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def write(self, entry):
+        with self._lock:
+            entry["seq"] = self._seq
+            self._seq += 1
+            self._file.write(_dumps(entry) + "\n")
+            if self._seq % TAPE_FLUSH_EVERY == 0:
+                self._file.flush()              # Z_SYNC_FLUSH: quanto scritto finora è leggibile
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def _remove_worker_tapes(path):
+    for p in glob.glob(f"{glob.escape(path)}.*"):
+        if p.endswith(".report.json"):
+            continue
+        try:
+            os.remove(p)
+        except OSError as e:
+            print(f"⚠️ [DB REPLAY] Nastro worker non rimosso {p}: {e}", file=sys.stderr)
+
+
+class _RecordingCursor:
+    """Cursore pigro: raccoglie sort/limit/skip..., alla prima iterazione esegue, registra e scorre."""
+
+    def __init__(self, coll, args, kwargs):
+        self._coll = coll
+        self._args = args
+        self._kwargs = kwargs
+        self._modifiers = []
+        self._site = _call_site()       # dove è stata chiamata find(), come nel replay
+        self._docs = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def modifier(*args, **kwargs):
+            self._modifiers.append((name, list(args), kwargs))
+            return self
+        return modifier
+
+    def _run(self):
+        if self._docs is None:
+            owner = self._coll
+            key = _call_key(owner._name, "find", self._args, self._kwargs, self._modifiers)
+            t0 = time.perf_counter()
+            cursor = owner._real.find(*self._args, **self._kwargs)
+            for name, args, kwargs in self._modifiers:
+                cursor = getattr(cursor, name)(*args, **kwargs)
+            docs = list(cursor)
+            owner._db._log(owner._name, "find", key, docs, self._site, t0, n_docs=len(docs))
+            self._docs = iter(docs)
+        return self._docs
+
+    def __iter__(self):
+        return self._run()
+
+    def __next__(self):
+        return next(self._run())
+
+    def close(self):
+        pass
+
+
+class _RecordingCollection:
+    def __init__(self, db, name, real):
+        self._db = db
+        self._name = name
+        self._real = real
+
+    @property
+    def name(self):
+        return self._name
+
+    def find(self, *args, **kwargs):
+        return _RecordingCursor(self, args, kwargs)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        site = _call_site()
+        key = _call_key(self._name, "aggregate", (pipeline,) + args, kwargs)
+        t0 = time.perf_counter()
+        docs = list(self._real.aggregate(pipeline, *args, **kwargs))
+        self._db._log(self._name, "aggregate", key, docs, site, t0, n_docs=len(docs))
+        return iter(docs)
+
+    def _call(self, op, args, kwargs):
+        site = _call_site()
+        key = _call_key(self._name, op, args, kwargs)      # prima della chiamata: il driver può toccare gli argomenti
+        t0 = time.perf_counter()
+        result = getattr(self._real, op)(*args, **kwargs)
+        if op in READ_OPS:
+            n_docs = len(result) if isinstance(result, list) else int(isinstance(result, dict))
+            self._db._log(self._name, op, key, result, site, t0, n_docs=n_docs)
+        else:
+            self._db._log(self._name, op, key, _write_summary(result), site, t0)
+        return result
+
+    def __getattr__(self, op):
+        if op.startswith("_"):
+            raise AttributeError(op)
+        if op in READ_OPS or op in WRITE_OPS:
+            return lambda *args, **kwargs: self._call(op, args, kwargs)
+        return getattr(self._real, op)         # resto dell'API pymongo: passa diretto, non registrato
+
+    def __getitem__(self, sub):
+        return self._db[f"{self._name}.{sub}"]
+
+
+class RecordingDatabase:
+    """Avvolge un pymongo Database: stesso uso (db['x'], db.x), ogni chiamata finisce nel nastro."""
+
+    def __init__(self, real_db, tape_path=None):
+        self._real = real_db
+        self._tape = _TapeWriter(tape_path or default_tape_path())
+        self._collections = {}
+        self.stats = QueryStats("record")
+
+    @property
+    def name(self):
+        return self._real.name
+
+    @property
+    def client(self):
+        return self._real.client
+
+    @property
+    def tape_path(self):
+        return self._tape.path
+
+    def __getitem__(self, name):
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections[name] = _RecordingCollection(self, name, self._real[name])
+        return coll
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self, *args, **kwargs):
+        site = _call_site()
+        key = _call_key("$db", "list_collection_names", args, kwargs)
+        t0 = time.perf_counter()
+        names = self._real.list_collection_names(*args, **kwargs)
+        self._log("$db", "list_collection_names", key, names, site, t0)
+        return names
+
+    def command(self, *args, **kwargs):
+        site = _call_site()
+        key = _call_key("$db", "command", args, kwargs)
+        t0 = time.perf_counter()
+        result = self._real.command(*args, **kwargs)
+        self._log("$db", "command", key, result, site, t0)
+        return result
+
+    def _log(self, coll, op, key, result, site, t0, n_docs=0):
+        ms = (time.perf_counter() - t0) * 1000
+        self.stats.record(coll, op, site, ms, n_docs=n_docs)
+        self._tape.write({
+            "coll": coll, "op": op, "key": key,
+            "site": site, "ms": round(ms, 3), "result": result,
+        })
+
+    def close(self):
+        self._tape.close()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# REPLAY
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+class _Tape:
+    """Nastro in lettura, indicizzato per chiave esatta e per (collection, op, punto di chiamata)."""
+
+    def __init__(self, path):
+        paths = [p for p in [path] + sorted(glob.glob(f"{glob.escape(path)}.*"))
+                 if os.path.exists(p) and not p.endswith(".report.json")]
+        if not paths:
+            raise FileNotFoundError(f"Nastro DB non trovato: {path}")
+        self.paths = paths
+        self._blobs = []                            # risultati serializzati: ogni replay ne riceve una copia
+        self._by_key = defaultdict(deque)
+        self._by_site = defaultdict(deque)
+        self._last_by_key = {}
+        self._used = []
+        self._lock = threading.Lock()
+        for p in paths:
+            for entry in self._read_entries(p):
+                idx = len(self._blobs)
+                self._blobs.append(pickle.dumps(entry.get("result"), protocol=pickle.HIGHEST_PROTOCOL))
+                self._used.append(False)
+                self._by_key[entry["key"]].append(idx)
+                self._by_site[(entry["coll"], entry["op"], entry["site"])].append(idx)
+
+    @staticmethod
+    def _read_entries(path):
+        """Righe del nastro; un nastro troncato (processo interrotto) si legge fino all'ultima riga intera."""
+        n = 0
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        raise EOFError("riga incompleta")
+                    if not line.strip():
+                        continue
+                    entry = json_util.loads(line)
+                    n += 1
+                    yield entry
+        except (EOFError, zlib.error, gzip.BadGzipFile, ValueError) as e:
+            print(f"⚠️ [DB REPLAY] Nastro troncato {os.path.basename(path)} dopo {n} righe: {e}",
+                  file=sys.stderr)
+
+    def __len__(self):
+        return len(self._blobs)
+
+    @staticmethod
+    def _pop_unused(queue, used):
+        while queue and used[queue[0]]:
+            queue.popleft()
+        return queue.popleft() if queue else None
+
+    def take(self, key, coll, op, site):
+        """(risultato, come è stato servito): exact / repeat / site / miss."""
+        with self._lock:
+            idx = self._pop_unused(self._by_key.get(key, deque()), self._used)
+            served = "exact"
+            if idx is None and key in self._last_by_key:
+                idx, served = self._last_by_key[key], "repeat"     # chiamata ripetuta oltre il registrato
+            if idx is None:
+                idx = self._pop_unused(self._by_site.get((coll, op, site), deque()), self._used)
+                served = "site"
+            if idx is None:
+                return None, "miss"
+            self._used[idx] = True
+            self._last_by_key[key] = idx
+            return pickle.loads(self._blobs[idx]), served
+
+
+class _ReplayCursor:
+    def __init__(self, coll, args, kwargs):
+        self._coll = coll
+        self._args = args
+        self._kwargs = kwargs
+        self._modifiers = []
+        self._site = _call_site()
+        self._docs = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def modifier(*args, **kwargs):
+            self._modifiers.append((name, list(args), kwargs))
+            return self
+        return modifier
+
+    def _run(self):
+        if self._docs is None:
+            docs = self._coll._db._serve(self._coll._name, "find", self._args, self._kwargs,
+                                         self._modifiers, self._site, default=[])
+            self._docs = iter(docs or [])
+        return self._docs
+
+    def __iter__(self):
+        return self._run()
+
+    def __next__(self):
+        return next(self._run())
+
+    def close(self):
+        pass
+
+
+class _ReplayCollection:
+    _DEFAULTS = {"find_one": None, "aggregate": [], "count_documents": 0,
+                 "estimated_document_count": 0, "distinct": []}
+
+    def __init__(self, db, name):
+        self._db = db
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    def find(self, *args, **kwargs):
+        return _ReplayCursor(self, args, kwargs)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        docs = self._db._serve(self._name, "aggregate", (pipeline,) + args, kwargs, (), _call_site(), default=[])
+        return iter(docs or [])
+
+    def _call(self, op, args, kwargs):
+        site = _call_site()
+        if op in READ_OPS:
+            return self._db._serve(self._name, op, args, kwargs, (), site, default=self._DEFAULTS.get(op))
+        # Scrittura: contata e scartata, esito registrato se presente
+        summary = self._db._serve(self._name, op, args, kwargs, (), site, default=None, write=True)
+        if op == "create_index":
+            return summary if isinstance(summary, str) else "replay_index"
+        return _ReplayWriteResult(summary if isinstance(summary, dict) else None)
+
+    def __getattr__(self, op):
+        if op.startswith("_"):
+            raise AttributeError(op)
+        if op in READ_OPS or op in WRITE_OPS:
+            return lambda *args, **kwargs: self._call(op, args, kwargs)
+        raise AttributeError(f"DB replay: '{op}' non supportato su {self._name}")
+
+    def __getitem__(self, sub):
+        return self._db[f"{self._name}.{sub}"]
+
+
+class ReplayDatabase:
+    """Serve le query dal nastro registrato; stesso uso di un pymongo Database."""
+
+    def __init__(self, tape_path=None, strict=False):
+        self._tape = _Tape(tape_path or default_tape_path())
+        self.tape_path = self._tape.paths[0]
+        self.strict = strict
+        self._collections = {}
+        self.stats = QueryStats("replay")
+
+    name = "replay"
+    client = None
+
+    def __getitem__(self, name):
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections[name] = _ReplayCollection(self, name)
+        return coll
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self, *args, **kwargs):
+        return self._serve("$db", "list_collection_names", args, kwargs, (), _call_site(), default=[])
+
+    def command(self, *args, **kwargs):
+        return self._serve("$db", "command", args, kwargs, (), _call_site(), default={"ok": 1.0})
+
+    def _serve(self, coll, op, args, kwargs, modifiers, site, default=None, write=False):
+        t0 = time.perf_counter()
+        result, served = self._tape.take(_call_key(coll, op, args, kwargs, modifiers), coll, op, site)
+        if served == "miss":
+            if self.strict and not write:
+                raise LookupError(f"DB replay: query non registrata {coll}.{op} da {site}")
+            result = default
+        n_docs = len(result) if isinstance(result, list) else int(isinstance(result, dict))
+        self.stats.record(coll, op, site, (time.perf_counter() - t0) * 1000,
+                          n_docs=0 if write else n_docs, served=served)
+        return result
+
+    def close(self):
+        pass
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# AGGANCIO A config.py
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+def _finish(db):
+    db.close()
+    db.stats.print_report()
+    report_path = f"{db.tape_path}.report.json"
+    try:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(db.stats.report(), f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️ [DB REPLAY] Report non salvato: {e}", file=sys.stderr)
+
+
+def install(mode, real_db=None, tape_path=None, strict=False):
+    """
+    Handle per config.db secondo la modalità: 'record' avvolge real_db,
+    'replay' non richiede connessione. Riepilogo query a fine processo.
+    """
+    tape_path = tape_path or default_tape_path()
+    if mode == "record":
+        db = RecordingDatabase(real_db, tape_path)
+    elif mode == "replay":
+        db = ReplayDatabase(tape_path, strict=strict)
+    else:
+        raise ValueError(f"AI_ENGINE_DB_MODE sconosciuto: {mode!r} (record | replay)")
+    atexit.register(_finish, db)
+    return db
@@ -17,6 +17,7 @@ USAGE:
     for cycle in range(500):
         gh, ga = simulate()
         analyzer.add_result(algo_id=2, home_goals=gh, away_goals=ga)
+    # oppure in blocco: analyzer.add_results(...) / analyzer.add_accumulator(algo_id, acc)
     
     analyzer.end_match()
     analyzer.save_report("report.csv", "report.html", "report.json")
@@ -30,6 +31,53 @@ from collections import Counter
 from datetime import datetime
 from .confidence_analyzer import ConfidenceCalculator
 from .confidence_html_builder import ConfidenceHTMLBuilder
+from .engine.score_accumulator import ScoreAccumulator
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 📐 MATRICE POISSON 7x7 - griglia e maschere mercati (calcolate una volta)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+POISSON_MAX_GOALS = 7
+_GOALS = np.arange(POISSON_MAX_GOALS)
+_GOALS_FACT = np.array([float(np.prod(np.arange(1, k + 1))) for k in _GOALS])
+_GH, _GA = np.meshgrid(_GOALS, _GOALS, indexing="ij")
+_TOT = _GH + _GA
+
+# Chiavi "gh-ga" nello stesso ordine della matrice appiattita (riga = gol casa)
+SCORE_KEYS = [f"{gh}-{ga}" for gh in range(POISSON_MAX_GOALS) for ga in range(POISSON_MAX_GOALS)]
+UO_THRESHOLDS = [0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5]
+
+# Solo i mercati letti da calculate_deep_stats (NG e Over sono i complementi)
+MARKET_MASKS = {
+    "1": _GH > _GA,
+    "X": _GH == _GA,
+    "2": _GH < _GA,
+    "GG": (_GH > 0) & (_GA > 0),
+}
+for _th in UO_THRESHOLDS:
+    MARKET_MASKS[f"U{_th}"] = _TOT < _th
+# Una riga per mercato sulla matrice appiattita: tutte le probabilità con un solo prodotto
+_MARKET_KEYS = list(MARKET_MASKS)
+_MARKET_MATRIX = np.array([MARKET_MASKS[k].ravel() for k in _MARKET_KEYS], dtype=float)
+
+
+def poisson_pmf_vector(lam):
+    """P(X=k) per k = 0..POISSON_MAX_GOALS-1 (equivale a scipy poisson.pmf, senza overhead per cella)"""
+    lam = float(lam)
+    return np.exp(-lam) * np.power(lam, _GOALS) / _GOALS_FACT
+
+
+def poisson_score_matrix(lambda_h, lambda_a):
+    """Matrice 7x7 normalizzata: prodotto esterno delle due marginali Poisson"""
+    matrix = np.outer(poisson_pmf_vector(lambda_h), poisson_pmf_vector(lambda_a))
+    return matrix / matrix.sum()
+
+
+def market_probabilities(prob_matrix):
+    """Probabilità di ogni mercato in MARKET_MASKS (1X2, GG, Under)"""
+    probs = _MARKET_MATRIX @ np.asarray(prob_matrix, dtype=float).ravel()
+    return dict(zip(_MARKET_KEYS, probs.tolist()))
+
 
 class DeepAnalyzer:
     """Analizzatore profondo per simulazioni Monte Carlo"""
@@ -59,62 +107,70 @@ class DeepAnalyzer:
             'algorithms': {}
         }
     
-    def add_result(self, algo_id, home_goals, away_goals, lambda_h=None, lambda_a=None, 
-                   odds_real=None, odds_qt=None, team_scores=None, h2h_stats=None):
-        """Aggiunge un risultato di simulazione"""
+    def _algo_accumulator(self, algo_id):
+        """Accumulatore (istogramma gol + momenti lambda) dell'algoritmo nella partita corrente"""
         if self.current_match is None:
             raise ValueError("Devi chiamare start_match() prima!")
-        
+
         if algo_id not in self.current_match['algorithms']:
             self.current_match['algorithms'][algo_id] = {
-                'results': [],
-                'lambdas': [],
+                'accumulator': ScoreAccumulator(),
                 'total_simulations': 0
             }
-        
-        if lambda_h is not None and lambda_a is not None:
-            self.current_match['algorithms'][algo_id]['lambdas'].append((lambda_h, lambda_a))
-            # ✅ AGGIUNGI QUI:
-          #  print(f"💾 Lambda salvati: algo={algo_id}, tot={len(self.current_match['algorithms'][algo_id]['lambdas'])}", file=sys.stderr)
+        return self.current_match['algorithms'][algo_id]['accumulator']
 
-        # SEMPRE salva i results
-        self.current_match['algorithms'][algo_id]['results'].append((home_goals, away_goals))
-        # ✅ AGGIUNGI QUI:
-       # print(f"⚽ Results salvati: algo={algo_id}, tot={len(self.current_match['algorithms'][algo_id]['results'])}", file=sys.stderr)
+    def add_result(self, algo_id, home_goals, away_goals, lambda_h=None, lambda_a=None, 
+                   odds_real=None, odds_qt=None, team_scores=None, h2h_stats=None):
+        """Aggiunge un risultato di simulazione (O(1), niente liste per ciclo)"""
+        self._algo_accumulator(algo_id).add(home_goals, away_goals, lambda_h=lambda_h, lambda_a=lambda_a)
     
+    def add_results(self, algo_id, home_goals, away_goals, lambda_h=None, lambda_a=None):
+        """Versione batch di add_result: N risultati (array/liste) con le stesse lambda"""
+        self._algo_accumulator(algo_id).add_batch(home_goals, away_goals, lambda_h=lambda_h, lambda_a=lambda_a)
+
+    def add_accumulator(self, algo_id, accumulator):
+        """Fonde un ScoreAccumulator già riempito (universal_simulator, worker)"""
+        self._algo_accumulator(algo_id).merge(accumulator)
+
     def end_match(self):
         print(f"🏁 end_match() CHIAMATO!", file=sys.stderr)
         
         if self.current_match is None:
             return
         
+        algorithms = self.current_match['algorithms']
+        
         # Calcola stats per ogni algoritmo (2,3,4,5)
-        for algo_id, data in self.current_match['algorithms'].items():
+        for algo_id, data in algorithms.items():
             data['stats'] = self._calculate_stats(data, ...)
         
         # ✅ AGGIUNGI QUESTO: Crea stats aggregate per algo 6
-        if len(self.current_match['algorithms']) == 4:  # Se hai 2,3,4,5
-            # Aggrega tutti i lambda
-            all_lambdas = []
+        if len(algorithms) == 4:  # Se hai 2,3,4,5
+            # Aggrega tutti gli accumulatori (lambda + istogramma)
+            merged = ScoreAccumulator()
             for aid in [2, 3, 4, 5]:
-                if aid in self.current_match['algorithms']:
-                    all_lambdas.extend(self.current_match['algorithms'][aid]['lambdas'])
+                if aid in algorithms:
+                    merged.merge(algorithms[aid]['accumulator'])
+            n_lambdas = merged.lambdas.n
             
             # Crea algo 6 con tutti i lambda aggregati
-            self.current_match['algorithms'][6] = {
-                'lambdas': all_lambdas,
-                'results': [],
-                'total_simulations': len(all_lambdas)
+            algorithms[6] = {
+                'accumulator': merged,
+                'total_simulations': n_lambdas
             }
             
             # Calcola stats per algo 6
-            self.current_match['algorithms'][6]['stats'] = self._calculate_stats(
-                self.current_match['algorithms'][6],
+            algorithms[6]['stats'] = self._calculate_stats(
+                algorithms[6],
                 self.current_match['real_gh'],
                 self.current_match['real_ga']
             )
             
-            print(f"✅ Creato algo 6 aggregato con {len(all_lambdas)} lambda", file=sys.stderr)
+            print(f"✅ Creato algo 6 aggregato con {n_lambdas} lambda", file=sys.stderr)
+        
+        # Nel report resta solo il riepilogo compatto dell'istogramma (serializzabile in JSON)
+        for data in algorithms.values():
+            data['histogram'] = data.pop('accumulator').to_dict()
             # ✅ AGGIUNGI QUESTE 2 RIGHE ALLA FINE:
         self.matches.append(self.current_match)
         self.current_match = None
@@ -122,11 +178,15 @@ class DeepAnalyzer:
     
     def _calculate_stats(self, algo_data, real_gh=None, real_ga=None):
         """Calcola statistiche usando lambda teorici O risultati empirici"""
+        acc = algo_data.get('accumulator')
+        if acc is None:
+            return {}
         
-        if 'lambdas' in algo_data and algo_data['lambdas']:
-            return self._calculate_stats_theoretical(algo_data['lambdas'], real_gh, real_ga)
-        elif 'results' in algo_data and algo_data['results']:
-            return self._calculate_stats_empirical(algo_data['results'], real_gh, real_ga)
+        lambda_stats = acc.lambda_stats()
+        if lambda_stats:
+            return self._calculate_stats_theoretical(lambda_stats, real_gh, real_ga)
+        elif acc.n:
+            return self._calculate_stats_empirical(acc.expand_pairs(), real_gh, real_ga)
         
         return {}
     
@@ -136,53 +196,41 @@ class DeepAnalyzer:
         if total == 0:
             return {}
         
-    def _calculate_stats_theoretical(self, lambdas_list, real_gh=None, real_ga=None, 
+    def _calculate_stats_theoretical(self, lambda_stats, real_gh=None, real_ga=None, 
                                      odds_real=None, odds_qt=None, team_scores=None, h2h_stats=None):
         """
         Calcola probabilità teoriche usando Poisson dai lambda medi
         + BLENDING con quote reali, quote teoriche, power e storico H2H
+        lambda_stats: ScoreAccumulator.lambda_stats() (n, medie e std correnti)
         """
-        from scipy.stats import poisson
-        import numpy as np
-        
-        total_simulations = len(lambdas_list)
+        total_simulations = lambda_stats['n'] if lambda_stats else 0
         if total_simulations == 0:
             return {}
         
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 1️⃣ CALCOLA LAMBDA MEDI
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        lambda_h_list = [lh for lh, la in lambdas_list]
-        lambda_a_list = [la for lh, la in lambdas_list]
-        
-        lambda_h_medio = np.mean(lambda_h_list)
-        lambda_a_medio = np.mean(lambda_a_list)
+        lambda_h_medio = lambda_stats['mean_h']
+        lambda_a_medio = lambda_stats['mean_a']
         
-        std_lambda_h = np.std(lambda_h_list) if len(lambda_h_list) > 1 else 0.0
-        std_lambda_a = np.std(lambda_a_list) if len(lambda_a_list) > 1 else 0.0
+        std_lambda_h = lambda_stats['std_h']
+        std_lambda_a = lambda_stats['std_a']
         
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 2️⃣ GENERA MATRICE POISSON TEORICA (7x7)
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        prob_matrix = {}
-        for gh in range(7):
-            for ga in range(7):
-                p_home = poisson.pmf(gh, lambda_h_medio)
-                p_away = poisson.pmf(ga, lambda_a_medio)
-                prob_matrix[f"{gh}-{ga}"] = p_home * p_away
-        
-        total_prob = sum(prob_matrix.values())
-        prob_matrix = {k: v/total_prob for k, v in prob_matrix.items()}
+        pmf_home = poisson_pmf_vector(lambda_h_medio)
+        pmf_away = poisson_pmf_vector(lambda_a_medio)
+        score_matrix = poisson_score_matrix(lambda_h_medio, lambda_a_medio)
+        score_probs = score_matrix.ravel()      # allineato a SCORE_KEYS
+        market_mc = market_probabilities(score_matrix)
         
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 3️⃣ CALCOLA SEGNI 1X2 DA MONTE CARLO (Poisson puro)
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        sign_1_mc = sum(prob for score, prob in prob_matrix.items() 
-                        if int(score.split('-')[0]) > int(score.split('-')[1]))
-        sign_x_mc = sum(prob for score, prob in prob_matrix.items() 
-                        if int(score.split('-')[0]) == int(score.split('-')[1]))
-        sign_2_mc = sum(prob for score, prob in prob_matrix.items() 
-                        if int(score.split('-')[0]) < int(score.split('-')[1]))
+        sign_1_mc = market_mc["1"]
+        sign_x_mc = market_mc["X"]
+        sign_2_mc = market_mc["2"]
         
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 🔥 BLENDING 1X2: Monte Carlo + Quote Reali + Quote Teoriche
@@ -242,8 +290,7 @@ class DeepAnalyzer:
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 4️⃣ CALCOLA GG/NG DA MONTE CARLO
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        gg_mc = sum(prob for score, prob in prob_matrix.items() 
-                    if int(score.split('-')[0]) > 0 and int(score.split('-')[1]) > 0)
+        gg_mc = market_mc["GG"]
         ng_mc = 1 - gg_mc
         
         sources_ggng = [(gg_mc, ng_mc)]
@@ -290,12 +337,10 @@ class DeepAnalyzer:
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 5️⃣ CALCOLA UNDER/OVER DA MONTE CARLO
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        thresholds = [0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5]
         under_over = {}
         
-        for th in thresholds:
-            under_mc = sum(prob for score, prob in prob_matrix.items() 
-                        if sum(map(int, score.split('-'))) < th)
+        for th in UO_THRESHOLDS:
+            under_mc = market_mc[f"U{th}"]
             over_mc = 1 - under_mc
             
             sources_uo = [(under_mc, over_mc)]
@@ -345,7 +390,9 @@ class DeepAnalyzer:
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 6️⃣ TOP 10 RISULTATI ESATTI
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        sorted_scores = sorted(prob_matrix.items(), key=lambda x: x[1], reverse=True)
+        # argsort stabile: a parità di probabilità resta l'ordine di SCORE_KEYS
+        score_order = np.argsort(-score_probs, kind="stable")
+        sorted_scores = [(SCORE_KEYS[i], float(score_probs[i])) for i in score_order]
         top_10_scores = [(score, int(prob * total_simulations)) for score, prob in sorted_scores[:10]]
         
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -354,11 +401,11 @@ class DeepAnalyzer:
         home_goals_dist = {}
         away_goals_dist = {}
         
-        for gh in range(7):
-            home_goals_dist[gh] = int(poisson.pmf(gh, lambda_h_medio) * total_simulations)
+        for gh in range(POISSON_MAX_GOALS):
+            home_goals_dist[gh] = int(pmf_home[gh] * total_simulations)
         
-        for ga in range(7):
-            away_goals_dist[ga] = int(poisson.pmf(ga, lambda_a_medio) * total_simulations)
+        for ga in range(POISSON_MAX_GOALS):
+            away_goals_dist[ga] = int(pmf_away[ga] * total_simulations)
         
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 8️⃣ MEDIE GOL
@@ -369,8 +416,8 @@ class DeepAnalyzer:
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
         # 9️⃣ STATISTICHE CASA/TRASFERTA
         # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        home_scored_prob = 1 - poisson.pmf(0, lambda_h_medio)
-        away_scored_prob = 1 - poisson.pmf(0, lambda_a_medio)
+        home_scored_prob = 1 - pmf_home[0]
+        away_scored_prob = 1 - pmf_away[0]
         
         home_scored = int(home_scored_prob * total_simulations)
         away_scored = int(away_scored_prob * total_simulations)
@@ -381,7 +428,7 @@ class DeepAnalyzer:
         confidence_home = max(0, min(100, 100 - (std_lambda_h * 25)))
         confidence_away = max(0, min(100, 100 - (std_lambda_a * 25)))
         
-        total_std = np.std([lh + la for lh, la in lambdas_list]) if total_simulations > 1 else 0.0
+        total_std = lambda_stats['std_total']
         confidence_total = max(0, min(100, 100 - (total_std * 15)))
         
         global_confidence = (confidence_home + confidence_away + confidence_total) / 3
@@ -392,7 +439,8 @@ class DeepAnalyzer:
         accuracy = None
         if real_gh is not None and real_ga is not None:
             real_score_str = f"{real_gh}-{real_ga}"
-            real_score_prob = prob_matrix.get(real_score_str, 0)
+            in_grid = 0 <= real_gh < POISSON_MAX_GOALS and 0 <= real_ga < POISSON_MAX_GOALS
+            real_score_prob = float(score_matrix[real_gh, real_ga]) if in_grid else 0
             
             real_score_rank = None
             for rank, (score, _) in enumerate(sorted_scores, 1):
@@ -433,7 +481,7 @@ class DeepAnalyzer:
             'total_simulations': total_simulations,
             'home_goals_distribution': home_goals_dist,
             'away_goals_distribution': away_goals_dist,
-            'exact_scores': {score: int(prob * total_simulations) for score, prob in prob_matrix.items()},
+            'exact_scores': {score: int(prob * total_simulations) for score, prob in zip(SCORE_KEYS, score_probs.tolist())},
             'top_10_scores': top_10_scores,
             'sign_1': {'count': int(sign_1_final * total_simulations), 'pct': round(sign_1_final * 100, 2)},
             'sign_x': {'count': int(sign_x_final * total_simulations), 'pct': round(sign_x_final * 100, 2)},
@@ -1,7 +1,7 @@
 import os
 import sys
 import json
-import random
+from collections import OrderedDict
 import numpy as np
 import time
 
@@ -29,6 +29,11 @@ try:
 except ImportError:
     bulk_manager = None
 
+try:
+    from engine.rng_streams import get_rng
+except ImportError:
+    from rng_streams import get_rng
+
 try: import ai_engine.calculators.calculate_team_rating as rating_lib
 except: rating_lib = None
 try: import ai_engine.calculators.calculator_affidabilità as reliability_lib
@@ -75,16 +80,18 @@ def load_tuning_db():
     
     return {}
 
-RAW_DB = load_tuning_db()
+def load_algo_c_db(raw_db):
+    """Carica ALGO_C da documento MongoDB dedicato (separato da main_config)"""
+    try:
+        _algo_c_doc = db['tuning_settings'].find_one({"_id": "algo_c_config"})
+        if _algo_c_doc and "config" in _algo_c_doc and "ALGO_C" in _algo_c_doc["config"]:
+            raw_db["ALGO_C"] = _algo_c_doc["config"]["ALGO_C"]
+            print("✅ [ENGINE] ALGO_C caricato da documento dedicato (algo_c_config)")
+    except Exception:
+        pass  # fallback: usa ALGO_C da main_config se presente
+    return raw_db
 
-# Carica ALGO_C da documento MongoDB dedicato (separato da main_config)
-try:
-    _algo_c_doc = db['tuning_settings'].find_one({"_id": "algo_c_config"})
-    if _algo_c_doc and "config" in _algo_c_doc and "ALGO_C" in _algo_c_doc["config"]:
-        RAW_DB["ALGO_C"] = _algo_c_doc["config"]["ALGO_C"]
-        print("✅ [ENGINE] ALGO_C caricato da documento dedicato (algo_c_config)")
-except Exception:
-    pass  # fallback: usa ALGO_C da main_config se presente
+RAW_DB = load_algo_c_db(load_tuning_db())
 
 JSON_KEYS_MAP = {
     1: "ALGO_1",
@@ -130,8 +137,49 @@ WEIGHTS_CACHE = {
     for algo_id in [1, 2, 3, 4, 5, 6]
 }
 
+# Componenti del bonus in ordine di colonna: (chiave in home_raw/away_raw, default, chiave peso).
+# La prima colonna (H2H) arriva da h2h_scores, non dal raw.
+BONUS_FEATURES = (
+    (None, 0.0, "H2H"),
+    ('motivation', 10.0, "MOTIVATION"),
+    ('rating', 5.0, "RATING"),
+    ('strength_score', 5.0, "ROSA_VAL"),
+    ('reliability', 5.0, "RELIABILITY"),
+    ('bvs', 0.0, "BVS"),
+    ('field_factor', 3.5, "FIELD"),
+    ('lucifero', 0.0, "LUCIFERO"),
+    ('streak', 0.0, "STREAK"),
+)
+
+def build_weights_matrix():
+    """Matrice pesi (6 modi x componenti bonus): riga i = WEIGHTS_CACHE[i + 1]."""
+    return np.array([
+        [WEIGHTS_CACHE[algo_id][w_key] for _, _, w_key in BONUS_FEATURES]
+        for algo_id in [1, 2, 3, 4, 5, 6]
+    ], dtype=float)
+
+WEIGHTS_MATRIX = build_weights_matrix()
+# Incrementato da reload_tuning: invalida i MatchContext compilati con i pesi vecchi
+WEIGHTS_VERSION = 0
+
 print(f"🎛️ [ENGINE] Tuning Granulare Caricato: {len(WEIGHTS_CACHE)} profili attivi.")
 
+def reload_tuning():
+    """
+    Ricarica tuning e pesi da MongoDB senza reimportare il modulo.
+    Serve ai processi che restano caldi tra più richieste (worker web):
+    un salvataggio dal mixer deve valere dalla simulazione successiva.
+    """
+    global RAW_DB, WEIGHTS_MATRIX, WEIGHTS_VERSION
+    RAW_DB = load_algo_c_db(load_tuning_db())
+    WEIGHTS_CACHE.update({
+        algo_id: build_weights_compartment(algo_id)
+        for algo_id in [1, 2, 3, 4, 5, 6]
+    })
+    WEIGHTS_MATRIX = build_weights_matrix()
+    WEIGHTS_VERSION += 1
+    return WEIGHTS_CACHE
+
 ALGO_MODE = 5
 ALGO_NAMES = {
     1: "STATISTICA PURA",
@@ -400,14 +448,14 @@ def get_dynamic_rating(team_name, preloaded_data=None, bulk_cache=None):
             print(f"⚠️ Errore calcolo rating {team_name}: {e}")
         return 12.5, {}
 
-def apply_randomness(value):
+def apply_randomness(value, rng=None):
     if value == 0:
         return 0, 0
-    fluctuation = random.uniform(-0.15, 0.15)
+    fluctuation = float(get_rng(rng).uniform(-0.15, 0.15))
     adjusted = value * (1 + fluctuation)
     return round(adjusted, 4), fluctuation
 
-def calculate_match_score(home_raw, away_raw, h2h_scores, base_val, algo_mode):
+def calculate_match_score(home_raw, away_raw, h2h_scores, base_val, algo_mode, rng=None):
     safe_mode = algo_mode if algo_mode in WEIGHTS_CACHE else 5
     W = WEIGHTS_CACHE[safe_mode]
 
@@ -435,12 +483,12 @@ def calculate_match_score(home_raw, away_raw, h2h_scores, base_val, algo_mode):
     a_streak = away_raw.get('streak', 0.0)
 
     if algo_mode == 4:
-        h_power, _ = apply_randomness(h_power)
-        a_power, _ = apply_randomness(a_power)
-        h_motiv, _ = apply_randomness(h_motiv)
-        a_motiv, _ = apply_randomness(a_motiv)
-        h_rating, _ = apply_randomness(h_rating)
-        a_rating, _ = apply_randomness(a_rating)
+        h_power, _ = apply_randomness(h_power, rng)
+        a_power, _ = apply_randomness(a_power, rng)
+        h_motiv, _ = apply_randomness(h_motiv, rng)
+        a_motiv, _ = apply_randomness(a_motiv, rng)
+        h_rating, _ = apply_randomness(h_rating, rng)
+        a_rating, _ = apply_randomness(a_rating, rng)
 
     bonus_h = (
         (h_h2h_val * W["H2H"]) +
@@ -494,17 +542,222 @@ def calculate_match_score(home_raw, away_raw, h2h_scores, base_val, algo_mode):
     final_away = (a_power_total + net_base_away + net_dyn_away) / 3
 
     if algo_mode in [2, 3]:
-        final_home, _ = apply_randomness(final_home)
-        final_away, _ = apply_randomness(final_away)
+        final_home, _ = apply_randomness(final_home, rng)
+        final_away, _ = apply_randomness(final_away, rng)
+
+    return final_home, final_away
+
+# --- CONTESTO PARTITA COMPILATO (PESI COME MATRICE) ---
 
+def _combine_scores(h_power_total, a_power_total, base_val, h_att, h_def, a_att, a_def):
+    """Parte finale di calculate_match_score (freni base/dinamico + media), scalari o array."""
+    net_base_home = np.maximum(0, base_val + h_power_total - a_def)
+    net_base_away = np.maximum(0, base_val + a_power_total - h_def)
+    net_dyn_home = np.maximum(0, base_val + h_power_total - (a_def + (a_def - a_att)))
+    net_dyn_away = np.maximum(0, base_val + a_power_total - (h_def + (h_def - h_att)))
+    final_home = (h_power_total + net_base_home + net_dyn_home) / 3
+    final_away = (a_power_total + net_base_away + net_dyn_away) / 3
     return final_home, final_away
 
+# Campi dei raw letti da calculate_match_score (oltre a quelli di BONUS_FEATURES)
+_SCORE_RAW_KEYS = ('power', 'attack', 'defense') + tuple(k for k, _, _ in BONUS_FEATURES[1:])
+
+def match_context_key(home_raw, away_raw, h2h_scores, base_val):
+    """
+    Impronta per valore degli input di calculate_match_score (+ versione pesi).
+    Per valore e non per identità: i raw vengono modificati sul posto (h2h_score, coppe).
+    """
+    return (WEIGHTS_VERSION, base_val, tuple(h2h_scores),
+            tuple(home_raw.get(k) for k in _SCORE_RAW_KEYS),
+            tuple(away_raw.get(k) for k in _SCORE_RAW_KEYS))
+
+class MatchContext:
+    """
+    calculate_match_score "compilato" per una partita.
+    Le componenti di bonus dei due lati diventano un vettore fisso e i pesi dei
+    6 modi una matrice: un solo prodotto dà i bonus di tutti i modi. I finali
+    dei modi senza rumore sugli input (1, 2, 3, 5, 6) si calcolano qui una volta;
+    a ogni ciclo restano solo le perturbazioni (modi 2/3 sul finale, 4 sugli input).
+    Estrazioni dall'rng nello stesso ordine di calculate_match_score (score/ensemble);
+    score_batch/ensemble_batch fanno N cicli in un colpo, un array per estrazione.
+    """
+    __slots__ = ("h2h_scores", "base_val",
+                 "h_att", "h_def", "a_att", "a_def", "h_power", "a_power",
+                 "h_motiv", "a_motiv", "h_rating", "a_rating",
+                 "bonus_h", "bonus_a", "finals_h", "finals_a", "finals_h_arr", "finals_a_arr")
+
+    def __init__(self, home_raw, away_raw, h2h_scores, base_val):
+        self.h2h_scores, self.base_val = h2h_scores, base_val
+
+        self.h_power, self.a_power = home_raw['power'], away_raw['power']
+        self.h_att, self.h_def = home_raw['attack'], home_raw['defense']
+        self.a_att, self.a_def = away_raw['attack'], away_raw['defense']
+        self.h_motiv = home_raw.get('motivation', 10.0)
+        self.a_motiv = away_raw.get('motivation', 10.0)
+        self.h_rating = home_raw.get('rating', 5.0)
+        self.a_rating = away_raw.get('rating', 5.0)
+
+        features = np.array([
+            [h2h_scores[side]] + [raw.get(key, default) for key, default, _ in BONUS_FEATURES[1:]]
+            for side, raw in ((0, home_raw), (1, away_raw))
+        ], dtype=float)
+        bonus = features @ WEIGHTS_MATRIX.T        # (2 lati x 6 modi)
+        self.bonus_h, self.bonus_a = bonus[0], bonus[1]
+
+        finals_h, finals_a = _combine_scores(
+            self.h_power + self.bonus_h, self.a_power + self.bonus_a,
+            base_val, self.h_att, self.h_def, self.a_att, self.a_def)
+        self.finals_h_arr, self.finals_a_arr = finals_h, finals_a
+        self.finals_h, self.finals_a = finals_h.tolist(), finals_a.tolist()
+
+    def _score_chaos(self, row, rng):
+        """Modo 4: rumore su power/motivazione/rating, bonus corretto con i delta."""
+        W = WEIGHTS_MATRIX[row]
+        h_power, _ = apply_randomness(self.h_power, rng)
+        a_power, _ = apply_randomness(self.a_power, rng)
+        h_motiv, _ = apply_randomness(self.h_motiv, rng)
+        a_motiv, _ = apply_randomness(self.a_motiv, rng)
+        h_rating, _ = apply_randomness(self.h_rating, rng)
+        a_rating, _ = apply_randomness(self.a_rating, rng)
+        bonus_h = self.bonus_h[row] + (h_motiv - self.h_motiv) * W[1] + (h_rating - self.h_rating) * W[2]
+        bonus_a = self.bonus_a[row] + (a_motiv - self.a_motiv) * W[1] + (a_rating - self.a_rating) * W[2]
+        final_home, final_away = _combine_scores(
+            h_power + bonus_h, a_power + bonus_a,
+            self.base_val, self.h_att, self.h_def, self.a_att, self.a_def)
+        return float(final_home), float(final_away)
+
+    def score(self, algo_mode, rng=None):
+        """Equivalente di calculate_match_score(..., algo_mode, rng)."""
+        row = (algo_mode if algo_mode in WEIGHTS_CACHE else 5) - 1
+        if algo_mode == 4:
+            return self._score_chaos(row, rng)
+        final_home, final_away = self.finals_h[row], self.finals_a[row]
+        if algo_mode in [2, 3]:
+            final_home, _ = apply_randomness(final_home, rng)
+            final_away, _ = apply_randomness(final_away, rng)
+        return final_home, final_away
+
+    def ensemble(self, rng=None):
+        """Media dei modi 1-5 (come il ramo mode == 5 di predict_match, prima del rumore finale)."""
+        sum_h = sum_a = 0.0
+        for algo_mode in range(1, 6):
+            nh, na = self.score(algo_mode, rng)
+            sum_h += nh
+            sum_a += na
+        return sum_h / 5, sum_a / 5
+
+    def _score_chaos_batch(self, row, n, rng):
+        """Modo 4 su N cicli: power, motivazione e rating perturbati come array."""
+        W = WEIGHTS_MATRIX[row]
+        h_power = apply_randomness_batch(self.h_power, n, rng)
+        a_power = apply_randomness_batch(self.a_power, n, rng)
+        h_motiv = apply_randomness_batch(self.h_motiv, n, rng)
+        a_motiv = apply_randomness_batch(self.a_motiv, n, rng)
+        h_rating = apply_randomness_batch(self.h_rating, n, rng)
+        a_rating = apply_randomness_batch(self.a_rating, n, rng)
+        bonus_h = self.bonus_h[row] + (h_motiv - self.h_motiv) * W[1] + (h_rating - self.h_rating) * W[2]
+        bonus_a = self.bonus_a[row] + (a_motiv - self.a_motiv) * W[1] + (a_rating - self.a_rating) * W[2]
+        return _combine_scores(h_power + bonus_h, a_power + bonus_a,
+                               self.base_val, self.h_att, self.h_def, self.a_att, self.a_def)
+
+    def score_batch(self, algo_mode, n, rng=None):
+        """Come score() su N cicli: array (final_home, final_away)."""
+        row = (algo_mode if algo_mode in WEIGHTS_CACHE else 5) - 1
+        if algo_mode == 4:
+            return self._score_chaos_batch(row, n, rng)
+        final_home = np.full(n, self.finals_h_arr[row])
+        final_away = np.full(n, self.finals_a_arr[row])
+        if algo_mode in [2, 3]:
+            final_home = apply_randomness_batch(final_home, n, rng)
+            final_away = apply_randomness_batch(final_away, n, rng)
+        return final_home, final_away
+
+    def ensemble_batch(self, n, rng=None):
+        """Media dei modi 1-5 su N cicli (ramo mode == 5 di predict_match_batch, prima del rumore finale)."""
+        sum_h = np.zeros(n)
+        sum_a = np.zeros(n)
+        for algo_mode in range(1, 6):
+            nh, na = self.score_batch(algo_mode, n, rng)
+            sum_h += nh
+            sum_a += na
+        return sum_h / 5, sum_a / 5
+
+# Contesti compilati per impronta degli input: fuori da preloaded_data, che resta
+# un dict di soli dati (serializzabile, copiabile, condiviso tra worker)
+_MATCH_CTX_CACHE = OrderedDict()
+_MATCH_CTX_CACHE_SIZE = 64
+
+def get_match_context(home_raw, away_raw, h2h_scores, base_val):
+    """MatchContext della partita, compilato alla prima chiamata e riusato finché gli input non cambiano."""
+    key = match_context_key(home_raw, away_raw, h2h_scores, base_val)
+    ctx = _MATCH_CTX_CACHE.get(key)
+    if ctx is None:
+        ctx = MatchContext(home_raw, away_raw, h2h_scores, base_val)
+        _MATCH_CTX_CACHE[key] = ctx
+        if len(_MATCH_CTX_CACHE) > _MATCH_CTX_CACHE_SIZE:
+            _MATCH_CTX_CACHE.popitem(last=False)
+    else:
+        _MATCH_CTX_CACHE.move_to_end(key)
+    return ctx
+
+def clear_match_contexts():
+    """Svuota la cache dei MatchContext (benchmark a freddo, test)."""
+    _MATCH_CTX_CACHE.clear()
+
+# --- VERSIONE BATCH (N CICLI IN UN COLPO, NUMPY) ---
+
+def apply_randomness_batch(value, n, rng=None):
+    """Come apply_randomness ma su N cicli: ritorna un array di N valori perturbati (±15%)."""
+    fluctuation = get_rng(rng).uniform(-0.15, 0.15, size=n)
+    return np.round(np.asarray(value, dtype=float) * (1 + fluctuation), 4)
+
+def get_match_raw(preloaded_data):
+    """
+    (home_raw, away_raw) pronti per il goals_converter, con 'h2h_score' scritto come in
+    predict_match. Per i Monte Carlo che usano solo i raw: niente punteggi engine
+    calcolati e scartati, nessuna estrazione dall'rng.
+    """
+    home_raw = preloaded_data['home_raw']
+    away_raw = preloaded_data['away_raw']
+    if isinstance(home_raw, dict):
+        home_raw['h2h_score'] = preloaded_data.get('h2h_h', 0)
+        away_raw['h2h_score'] = preloaded_data.get('h2h_a', 0)
+    return home_raw, away_raw
+
+def predict_match_batch(home_team, away_team, n, mode=ALGO_MODE, preloaded_data=None, rng=None):
+    """
+    Esegue N cicli di predict_match in un colpo solo (solo con preloaded_data).
+    Ritorna (array_home, array_away, home_raw, away_raw): i raw sono gli stessi
+    dizionari che predict_match passa al goals_converter.
+    Se servono solo i raw usare get_match_raw.
+    """
+    if not preloaded_data:
+        raise ValueError("predict_match_batch richiede preloaded_data")
+
+    home_raw, away_raw = get_match_raw(preloaded_data)
+    h2h_h = preloaded_data.get('h2h_h', 0)
+    h2h_a = preloaded_data.get('h2h_a', 0)
+    base_val = preloaded_data.get('base_val', 2.5)
+
+    # Pesi e componenti compilati una volta per partita (come predict_match)
+    ctx = get_match_context(home_raw, away_raw, (h2h_h, h2h_a), base_val)
+
+    if mode == 5:
+        avg_h, avg_a = ctx.ensemble_batch(n, rng)
+        net_home = apply_randomness_batch(avg_h, n, rng)
+        net_away = apply_randomness_batch(avg_a, n, rng)
+    else:
+        net_home, net_away = ctx.score_batch(mode, n, rng)
+
+    return net_home, net_away, home_raw, away_raw
+
 # --- MOTORE PRINCIPALE (MODIFICATO PER PRELOAD) ---
 
-def predict_match(home_team, away_team, mode=ALGO_MODE, preloaded_data=None):
+def predict_match(home_team, away_team, mode=ALGO_MODE, preloaded_data=None, rng=None):
     """
     NUOVO PARAMETRO: preloaded_data
     Se passato, SALTA il caricamento DB e usa i dati pronti.
+    rng: Generator numpy (rng_streams) per cicli riproducibili; None = rng di default.
     """
     bulk_cache = preloaded_data.get('bulk_cache') if preloaded_data else None
 
@@ -654,30 +907,20 @@ def predict_match(home_team, away_team, mode=ALGO_MODE, preloaded_data=None):
         home_raw['h2h_avg_goals'] = h2h_extra.get('avg_goals_home', 1.2)
         away_raw['h2h_avg_goals'] = h2h_extra.get('avg_goals_away', 1.0)
 
+    # Pesi e componenti compilati una volta per partita (riusati da tutti i cicli)
+    ctx = get_match_context(home_raw, away_raw, (h2h_h, h2h_a), base_val)
+
     if mode == 5:
         if not preloaded_data:
             print("✨ Esecuzione ENSEMBLE (1-4 + GLOBAL)...")
-        
-        results_h = []
-        results_a = []
-        
-        for i in range(1, 5):
-            nh, na = calculate_match_score(home_raw, away_raw, (h2h_h, h2h_a), base_val, i)
-            results_h.append(nh)
-            results_a.append(na)
-            
-        nh_global, na_global = calculate_match_score(home_raw, away_raw, (h2h_h, h2h_a), base_val, 5)
-        results_h.append(nh_global)
-        results_a.append(na_global)
-        
-        avg_h = sum(results_h) / 5
-        avg_a = sum(results_a) / 5
-        
-        final_h, r_h = apply_randomness(avg_h)
-        final_a, r_a = apply_randomness(avg_a)
+
+        avg_h, avg_a = ctx.ensemble(rng)
+
+        final_h, r_h = apply_randomness(avg_h, rng)
+        final_a, r_a = apply_randomness(avg_a, rng)
         net_home, net_away = final_h, final_a
     else:
-        net_home, net_away = calculate_match_score(home_raw, away_raw, (h2h_h, h2h_a), base_val, mode)
+        net_home, net_away = ctx.score(mode, rng)
 
     if not preloaded_data:
         MAX_THEORETICAL_SCORE = 131.00
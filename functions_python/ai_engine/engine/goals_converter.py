@@ -4,6 +4,12 @@ import os
 import sys
 import json
 
+try:
+    from engine.rng_streams import get_rng
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from rng_streams import get_rng
+
 # (** TRADUTTORE FINALE: CONVERTE I PUNTEGGI NUMERICI ASTRATTI (POWER) IN GOL REALI (0-0, 2-1) **)
 # ( GESTISCE LA LOGICA DI "ARROTONDAMENTO INTELLIGENTE" PER EVITARE RISULTATI IMPOSSIBILI (ES. 2.5 GOL) )
 # ( CONTIENE LE TABELLE DI CONVERSIONE E LE PROBABILITÀ PER I RISULTATI ESATTI )
@@ -213,10 +219,11 @@ def get_team_fbref_data(team_name):
  #   S = load_tuning(algo_mode)   ---
 
 # 1. Nella riga qui sotto ho aggiunto ', settings_cache=None' alla fine
-def calculate_goals_from_engine(home_score, away_score, home_data, away_data, algo_mode=5, league_name="Unknown", home_name="Home", away_name="Away", debug_mode=True, settings_cache=None, is_cup=False):
+def calculate_goals_from_engine(home_score, away_score, home_data, away_data, algo_mode=5, league_name="Unknown", home_name="Home", away_name="Away", debug_mode=True, settings_cache=None, is_cup=False, rng=None):
     """
     MOTORE V11: PESI CONDIVISI MA RUOLI DIVERSI
     I pesi lavorano su entrambi i motori (Win & Gol) dove ha senso.
+    rng: Generator numpy (rng_streams) per estrazioni riproducibili; None = rng di default.
     """
 
     # ⚡ CARICAMENTO DINAMICO DEI PESI (MODIFICA RAM) ⚡
@@ -458,8 +465,9 @@ def calculate_goals_from_engine(home_score, away_score, home_data, away_data, al
 
     # --- E. GENERAZIONE RISULTATO (POISSON) ---
     # Simulazione Monte Carlo basata sulle aspettative finali
-    gh = np.random.poisson(final_lambda_h)
-    ga = np.random.poisson(final_lambda_a)
+    _rng = get_rng(rng)
+    gh = int(_rng.poisson(final_lambda_h))
+    ga = int(_rng.poisson(final_lambda_a))
     
     # Stringa di debug per vedere i valori calcolati (xG previsti)
     xg_info = f"{final_lambda_h:.2f}-{final_lambda_a:.2f}"
@@ -534,3 +542,33 @@ def calculate_goals_from_engine(home_score, away_score, home_data, away_data, al
     
     # RETURN con dati completi
     return gh, ga, final_lambda_h, final_lambda_a, xg_info, pesi_dettagliati, parametri, scontrino_casa, scontrino_ospite
+
+
+# --- 5. VERSIONE BATCH (MONTE CARLO VETTORIALE) ---
+
+def calculate_goals_batch(home_data, away_data, n, algo_mode=5, home_name="Home", away_name="Away", settings_cache=None, is_cup=False, rng=None):
+    """
+    Esegue N cicli di calculate_goals_from_engine in un colpo solo.
+
+    Le lambda dipendono solo da home_data/away_data e dai pesi (non dai punteggi
+    perturbati del motore), quindi si calcolano UNA volta e si estraggono N gol
+    Poisson vettoriali: stessa distribuzione del ciclo scalare, senza il costo Python.
+
+    Ritorna: (array_gh, array_ga, lambda_h, lambda_a, pesi_dettagliati, parametri, scontrino_casa, scontrino_ospite)
+    """
+    _, _, lambda_h, lambda_a, _, pesi_dettagliati, parametri, scontrino_casa, scontrino_ospite = calculate_goals_from_engine(
+        0, 0, home_data, away_data,
+        algo_mode=algo_mode,
+        home_name=home_name,
+        away_name=away_name,
+        debug_mode=False,
+        settings_cache=settings_cache,
+        is_cup=is_cup,
+        rng=rng
+    )
+
+    _rng = get_rng(rng)
+    gh = _rng.poisson(lambda_h, size=n)
+    ga = _rng.poisson(lambda_a, size=n)
+
+    return gh, ga, lambda_h, lambda_a, pesi_dettagliati, parametri, scontrino_casa, scontrino_ospite
@@ -0,0 +1,50 @@
+"""
+RNG STREAMS - Generatori casuali espliciti e riproducibili per il motore
+=========================================================================
+Il motore (apply_randomness, goals_converter, Monte Carlo) riceve un oggetto
+`rng` (numpy Generator) invece di usare lo stato globale di `random`/`np.random`.
+Stesso seed → stessa simulazione; ogni partita/worker ha il suo flusso.
+
+Usage:
+    from rng_streams import match_rng, spawn_streams
+
+    rng = match_rng("Inter", "Milan", "2026-10-18", base_seed=42)
+    s_h, s_a, r_h, r_a = predict_match("Inter", "Milan", mode=5, preloaded_data=pre, rng=rng)
+
+    worker_rngs = spawn_streams(42, n_workers)   # flussi indipendenti per worker
+"""
+
+import hashlib
+import numpy as np
+
+# Generatore di default (non seminato) per chi non passa un rng: comportamento "casuale" come prima
+_DEFAULT_RNG = np.random.default_rng()
+
+
+def get_rng(rng=None):
+    """Ritorna l'rng passato o quello di default del processo."""
+    return rng if rng is not None else _DEFAULT_RNG
+
+
+def make_rng(seed=None):
+    """Nuovo Generator: seminato se seed è dato, altrimenti da entropia di sistema."""
+    return np.random.default_rng(seed)
+
+
+def seed_from_key(*parts, base_seed=None):
+    """
+    Seed intero stabile da una chiave (es. home, away, data).
+    Usa sha256, non hash(): stesso valore su ogni processo e ogni run.
+    """
+    key = "|".join(str(p) for p in (base_seed, *parts)).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "little")
+
+
+def match_rng(home, away, date_str, base_seed=None):
+    """Generator dedicato a una partita (chiave partita + data, opzionale seed base del run)."""
+    return make_rng(seed_from_key(home, away, date_str, base_seed=base_seed))
+
+
+def spawn_streams(seed, n):
+    """N flussi statisticamente indipendenti (SeedSequence.spawn), uno per worker."""
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n)]
@@ -0,0 +1,305 @@
+"""
+SCORE ACCUMULATOR - Accumulatore in streaming dei risultati Monte Carlo
+=======================================================================
+Invece di tenere una stringa "gh-ga" per ciclo (liste da decine di migliaia
+di elementi, poi ricontate con Counter) i risultati finiscono in un
+istogramma 2D dei gol (casa x ospite) di dimensione fissa e piccola, più
+somme correnti di lambda e pesi. Memoria costante, aggiornamento O(1),
+due accumulatori si fondono con merge() (es. blocchi adattivi, worker).
+
+L'istogramma ricorda anche l'ordine di prima comparsa di ogni risultato:
+most_common() restituisce gli stessi pareggi di Counter(lista).most_common()
+e score_counts() lo stesso dict di Counter(lista), senza materializzare la lista.
+
+Usage:
+    from score_accumulator import ScoreAccumulator
+
+    acc = ScoreAccumulator()
+    acc.add_batch(gh_arr, ga_arr, lambda_h=lh, lambda_a=la)
+    acc.add(2, 1)                          # singolo ciclo
+    acc.merge(acc_worker)                  # fusione
+    ScoreAccumulator.from_score_counts({"1-0": 80, "1-1": 84})   # da frequenze salvate
+    acc.most_common(3)                     # [("1-1", 84), ("1-0", 80), ...]
+    acc.market_counts()["O2.5"]            # cicli con più di 2.5 gol
+    acc.lambda_stats()                     # medie e std dei lambda
+"""
+
+import numpy as np
+
+DEFAULT_MAX_GOALS = 10      # Istogramma 11x11; si allarga da solo se serve
+UO_LINES = (0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5)
+
+
+class _RunningMoments:
+    """Media e varianza correnti (Welford/Chan) di più grandezze insieme."""
+
+    def __init__(self, width):
+        self.n = 0
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+
+    def add(self, values, count=1):
+        """count osservazioni tutte uguali a values (caso tipico: lambda costanti sui cicli)."""
+        self._combine(count, np.asarray(values, dtype=np.float64), 0.0)
+
+    def add_array(self, values):
+        """values: matrice (osservazioni x grandezze)."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = values.mean(axis=0)
+        self._combine(len(values), mean, ((values - mean) ** 2).sum(axis=0))
+
+    def merge(self, other):
+        if other.n:
+            self._combine(other.n, other.mean, other.m2)
+
+    def _combine(self, n_b, mean_b, m2_b):
+        if n_b <= 0:
+            return
+        n_a = self.n
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta ** 2 * (n_a * n_b / n)
+        self.n = n
+
+    def std(self):
+        """Deviazione standard di popolazione (come np.std)."""
+        if self.n < 2:
+            return np.zeros_like(self.mean)
+        return np.sqrt(np.maximum(self.m2 / self.n, 0.0))
+
+
+class ScoreAccumulator:
+    """Istogramma 2D dei risultati + momenti dei lambda + somme dei pesi."""
+
+    def __init__(self, max_goals=DEFAULT_MAX_GOALS):
+        size = max_goals + 1
+        self.counts = np.zeros((size, size), dtype=np.int64)
+        # Indice del primo ciclo in cui è uscito il risultato (-1 = mai): ordine dei pareggi come Counter
+        self.first_seen = np.full((size, size), -1, dtype=np.int64)
+        self.n = 0
+        self.lambdas = _RunningMoments(3)      # lambda casa, lambda ospite, somma
+        self.weight_sums = {}
+        self.weight_n = 0
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # AGGIORNAMENTO
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    @property
+    def size(self):
+        return self.counts.shape[0]
+
+    def _grow(self, max_goal):
+        """Allarga l'istogramma (caso raro: partita con più di max_goals gol per squadra)."""
+        size = max(max_goal + 1, self.size * 2)
+        pad = size - self.size
+        self.counts = np.pad(self.counts, ((0, pad), (0, pad)))
+        self.first_seen = np.pad(self.first_seen, ((0, pad), (0, pad)), constant_values=-1)
+
+    def add(self, gh, ga, lambda_h=None, lambda_a=None):
+        """Un ciclo. O(1)."""
+        gh, ga = int(gh), int(ga)
+        if max(gh, ga) >= self.size:
+            self._grow(max(gh, ga))
+        if self.first_seen[gh, ga] < 0:
+            self.first_seen[gh, ga] = self.n
+        self.counts[gh, ga] += 1
+        self.n += 1
+        if lambda_h is not None and lambda_a is not None:
+            self.lambdas.add((lambda_h, lambda_a, lambda_h + lambda_a))
+
+    def add_batch(self, gh_arr, ga_arr, lambda_h=None, lambda_a=None):
+        """
+        N cicli da array numpy. lambda_h/lambda_a: scalari (costanti sul batch,
+        caso di calculate_goals_batch) o array lunghi N.
+        """
+        gh_arr = np.asarray(gh_arr, dtype=np.int64)
+        ga_arr = np.asarray(ga_arr, dtype=np.int64)
+        batch = len(gh_arr)
+        if batch == 0:
+            return
+        top = int(max(gh_arr.max(), ga_arr.max()))
+        if top >= self.size:
+            self._grow(top)
+
+        flat = gh_arr * self.size + ga_arr
+        cells, first_idx = np.unique(flat, return_index=True)
+        first_flat = self.first_seen.reshape(-1)
+        new = first_flat[cells] < 0
+        first_flat[cells[new]] = self.n + first_idx[new]
+        self.counts += np.bincount(flat, minlength=self.size * self.size).reshape(self.size, self.size)
+        self.n += batch
+
+        if lambda_h is not None and lambda_a is not None:
+            if np.ndim(lambda_h) == 0 and np.ndim(lambda_a) == 0:
+                self.lambdas.add((lambda_h, lambda_a, lambda_h + lambda_a), count=batch)
+            else:
+                lh = np.broadcast_to(np.asarray(lambda_h, dtype=np.float64), (batch,))
+                la = np.broadcast_to(np.asarray(lambda_a, dtype=np.float64), (batch,))
+                self.lambdas.add_array(np.column_stack((lh, la, lh + la)))
+
+    @classmethod
+    def from_score_counts(cls, counts):
+        """
+        Accumulatore da {"gh-ga": conteggio} (es. exact_scores di DeepAnalyzer).
+        L'ordine del dict diventa l'ordine di prima comparsa.
+        """
+        acc = cls()
+        for score, count in (counts or {}).items():
+            count = int(count)
+            if count <= 0:
+                continue
+            gh, ga = map(int, str(score).split("-"))
+            if max(gh, ga) >= acc.size:
+                acc._grow(max(gh, ga))
+            if acc.first_seen[gh, ga] < 0:
+                acc.first_seen[gh, ga] = acc.n
+            acc.counts[gh, ga] += count
+            acc.n += count
+        return acc
+
+    def add_weights(self, weights, count=1):
+        """Somme correnti dei pesi ({nome: valore}) su count cicli."""
+        for name, value in (weights or {}).items():
+            self.weight_sums[name] = self.weight_sums.get(name, 0.0) + float(value) * count
+        self.weight_n += count
+
+    def merge(self, other):
+        """Fonde un altro accumulatore (i suoi cicli vengono dopo i nostri). Ritorna self."""
+        if other.size > self.size:
+            self._grow(other.size - 1)
+        size = other.size
+        seen_other = other.first_seen >= 0
+        mine = self.first_seen[:size, :size]
+        take = seen_other & (mine < 0)
+        mine[take] = other.first_seen[take] + self.n
+        self.counts[:size, :size] += other.counts
+        self.n += other.n
+        self.lambdas.merge(other.lambdas)
+        for name, value in other.weight_sums.items():
+            self.weight_sums[name] = self.weight_sums.get(name, 0.0) + value
+        self.weight_n += other.weight_n
+        return self
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # LETTURA
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def __len__(self):
+        return self.n
+
+    def _ordered_cells(self, ties="first"):
+        """
+        Celle non vuote ordinate per frequenza decrescente.
+        ties="first": a parità conta la prima comparsa (= Counter.most_common)
+        ties="score": a parità conta il risultato (gh, ga) crescente
+        """
+        flat_counts = self.counts.reshape(-1)
+        cells = np.flatnonzero(flat_counts)
+        if ties == "first":
+            order = np.lexsort((self.first_seen.reshape(-1)[cells], -flat_counts[cells]))
+        else:
+            order = np.argsort(-flat_counts[cells], kind="stable")
+        return cells[order]
+
+    def most_common(self, k=None, ties="first"):
+        """[("gh-ga", conteggio), ...] come Counter.most_common(k)."""
+        cells = self._ordered_cells(ties)
+        if k is not None:
+            cells = cells[:k]
+        flat_counts = self.counts.reshape(-1)
+        return [(f"{c // self.size}-{c % self.size}", int(flat_counts[c])) for c in cells]
+
+    def score_counts(self):
+        """{"gh-ga": conteggio} in ordine di prima comparsa (come dict(Counter(lista)))."""
+        flat_counts = self.counts.reshape(-1)
+        cells = np.flatnonzero(flat_counts)
+        cells = cells[np.argsort(self.first_seen.reshape(-1)[cells], kind="stable")]
+        return {f"{c // self.size}-{c % self.size}": int(flat_counts[c]) for c in cells}
+
+    def expand(self):
+        """
+        Lista "gh-ga" equivalente per chi si aspetta ancora una lista (len, Counter...).
+        Una stringa per risultato distinto, ripetuta: stesso Counter della lista originale.
+        """
+        out = []
+        for score, count in self.score_counts().items():
+            out.extend([score] * count)
+        return out
+
+    def expand_pairs(self):
+        """Come expand() ma con tuple (gh, ga) intere."""
+        out = []
+        for score, count in self.score_counts().items():
+            gh, ga = map(int, score.split("-"))
+            out.extend([(gh, ga)] * count)
+        return out
+
+    def goal_grid(self):
+        """Gol casa e ospite di ogni cella (per maschere di mercato)."""
+        return np.meshgrid(np.arange(self.size), np.arange(self.size), indexing="ij")
+
+    def market_counts(self):
+        """Cicli favorevoli per 1X2, DC, GG/NG, Under/Over 0.5-6.5 e gol segnati."""
+        gh, ga = self.goal_grid()
+        tot = gh + ga
+        c = self.counts
+        out = {
+            "1": int(c[gh > ga].sum()),
+            "X": int(c[gh == ga].sum()),
+            "2": int(c[gh < ga].sum()),
+            "GG": int(c[(gh > 0) & (ga > 0)].sum()),
+            "home_scored": int(c[gh > 0].sum()),
+            "away_scored": int(c[ga > 0].sum()),
+        }
+        out["1X"] = out["1"] + out["X"]
+        out["X2"] = out["X"] + out["2"]
+        out["12"] = out["1"] + out["2"]
+        out["NG"] = self.n - out["GG"]
+        for line in UO_LINES:
+            over = int(c[tot > line].sum())
+            out[f"O{line}"] = over
+            out[f"U{line}"] = self.n - over
+        return out
+
+    def goal_sums(self):
+        """(gol casa totali, gol ospite totali)."""
+        gh, ga = self.goal_grid()
+        return int((self.counts * gh).sum()), int((self.counts * ga).sum())
+
+    def mean_goals(self):
+        if self.n == 0:
+            return 0.0, 0.0
+        sum_h, sum_a = self.goal_sums()
+        return sum_h / self.n, sum_a / self.n
+
+    def lambda_stats(self):
+        """Medie e std (popolazione) di lambda casa, ospite e totale; None senza lambda."""
+        if self.lambdas.n == 0:
+            return None
+        mean = self.lambdas.mean
+        std = self.lambdas.std()
+        return {
+            "n": self.lambdas.n,
+            "mean_h": float(mean[0]), "mean_a": float(mean[1]),
+            "std_h": float(std[0]), "std_a": float(std[1]), "std_total": float(std[2]),
+        }
+
+    def weight_means(self):
+        """Media corrente di ogni peso registrato con add_weights."""
+        if self.weight_n == 0:
+            return {}
+        return {name: value / self.weight_n for name, value in self.weight_sums.items()}
+
+    def to_dict(self):
+        """Forma compatta serializzabile in JSON (report)."""
+        lam = self.lambda_stats()
+        return {
+            "total": self.n,
+            "score_counts": self.score_counts(),
+            "lambda_stats": lam,
+            "weight_means": self.weight_means(),
+        }
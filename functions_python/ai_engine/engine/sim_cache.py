@@ -0,0 +1,192 @@
+"""
+SIM CACHE - Cache dei risultati di simulazione per impronta degli input
+=======================================================================
+La stessa partita viene simulata più volte con gli stessi dati: nightly
+(Sistema C), di nuovo da pre_match_update.run_full_cycle per ogni finestra
+oraria. Se non cambiano né i dati squadra né il tuning, la distribuzione
+salvata è già la risposta.
+
+Chiave = sha256 degli input che il motore legge davvero (raw preloaded,
+base_val, tuning, modo algoritmo, cicli, seed...). Qualunque variazione
+→ chiave diversa → nuova simulazione. Le voci scadono dopo il TTL e,
+oltre il tetto di voci, si scartano le meno usate di recente (LRU).
+
+Due livelli: memoria del processo (LRU) + file su disco condivisi tra
+processi/run (_cache_sim/<chiave>.pkl, mtime = ultimo uso).
+
+Usage:
+    from sim_cache import fingerprint, get_cache
+
+    key = fingerprint(raw=(home_raw, away_raw), tuning=settings, cycles=100, seed=seed)
+    dist = get_cache().get(key)
+    if dist is None:
+        dist = simula(...)
+        get_cache().put(key, dist)
+    print(get_cache().stats())   # {'hits': .., 'misses': .., ...}
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Incrementare quando cambia la formula del motore: invalida tutte le voci
+SIM_CACHE_VERSION = 3
+
+SIM_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "_cache_sim")
+SIM_CACHE_TTL_HOURS = 24         # Oltre, la voce è scaduta anche se la chiave coincide
+SIM_CACHE_MAX_ENTRIES = 5000     # Tetto voci (memoria e disco), poi LRU
+SIM_CACHE_MEMORY_ENTRIES = 512   # Voci tenute in RAM per processo
+
+
+def _json_default(value):
+    """Tipi non JSON negli input (numpy, datetime, ObjectId...) → forma stabile."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def fingerprint(**parts):
+    """Impronta sha256 degli input (chiavi ordinate: l'ordine dei kwargs non conta)."""
+    payload = json.dumps({"_v": SIM_CACHE_VERSION, **parts}, sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SimulationCache:
+    """Cache LRU con TTL: RAM del processo + file su disco."""
+
+    def __init__(self, cache_dir=SIM_CACHE_DIR, ttl_hours=SIM_CACHE_TTL_HOURS,
+                 max_entries=SIM_CACHE_MAX_ENTRIES, memory_entries=SIM_CACHE_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours is not None else None
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()    # key -> (created_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _is_expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Valore salvato (copia) o None se assente/scaduto."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        else:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    entry = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                entry = None
+            if entry is not None:
+                try:
+                    os.utime(path)      # mtime = ultimo uso (per l'LRU su disco)
+                except OSError:
+                    pass
+
+        if entry is not None and self._is_expired(entry[0]):
+            self.expired += 1
+            self.invalidate(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, entry)
+        return copy.deepcopy(entry[1])
+
+    def put(self, key, value):
+        """Salva il valore (RAM + disco, scrittura atomica)."""
+        entry = (time.time(), copy.deepcopy(value))
+        self._remember(key, entry)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            print(f"⚠️ [SIM CACHE] Scrittura fallita: {e}")
+            return
+        self._evict_disk()
+
+    def invalidate(self, key):
+        self._memory.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Svuota RAM e disco."""
+        self._memory.clear()
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pkl"):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def _evict_disk(self):
+        """Oltre max_entries: elimina i file usati meno di recente (mtime più vecchio)."""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".pkl")]
+        except OSError:
+            return
+        excess = len(names) - self.max_entries
+        if excess <= 0:
+            return
+        paths = [os.path.join(self.cache_dir, n) for n in names]
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in paths[:excess]:
+            try:
+                os.remove(path)
+                self.evicted += 1
+            except OSError:
+                pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+_DEFAULT_CACHE = None
+
+
+def get_cache():
+    """Cache condivisa del processo (creata alla prima chiamata)."""
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = SimulationCache()
+    return _DEFAULT_CACHE
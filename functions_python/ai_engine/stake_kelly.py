@@ -7,6 +7,9 @@ Architettura:
   restituisce la probabilita calibrata leggendo da MongoDB
   `calibration_table._id='current'`. Shrinkage con fallback a mercato×bin
   se N<30, fallback a `prob_dichiarata` se la cella e completamente assente.
+  La tabella e cachata in-process con le celle gia indicizzate per
+  (gruppo, mercato, bin): rivalidazione su `updated_at` ogni
+  CACHE_TTL_SECONDS, `invalidate_cache()` dopo refresh_calibration_table.
 - `compute_stake_kelly(prob_calibrata, quota, kelly_fraction=0.25)`
   implementa Kelly frazionario puro. Nessun cap, nessun fattore quota.
 - `kelly_unified(prob_dichiarata, quota, source, mercato)`
@@ -34,6 +37,7 @@ Campi del documento calibration_table (creato da refresh_calibration_table.py):
 """
 from __future__ import annotations
 
+import time
 from typing import Optional
 
 try:
@@ -48,6 +52,10 @@ VALID_MERCATI = ('SEGNO', 'DOPPIA_CHANCE', 'GOL')
 
 SHRINK_MIN_N = 30
 
+# Finestra di rivalidazione della cache: entro questo tempo nessuna query,
+# dopo solo `updated_at` (il documento completo si rilegge se è cambiato)
+CACHE_TTL_SECONDS = 300
+
 
 def _bin_label(prob_pct: float) -> Optional[str]:
     """Restituisce l'etichetta del bin per una probabilita in [0, 100]."""
@@ -76,23 +84,71 @@ def _load_calibration_table(db) -> Optional[dict]:
         return None
 
 
-# Cache in-process (invalida quando `updated_at` cambia)
-_CAL_CACHE = {'doc': None, 'updated_at': None}
+# Cache in-process: documento + lookup precalcolato, rivalidati ogni CACHE_TTL_SECONDS
+_CAL_CACHE = {'doc': None, 'updated_at': None, 'checked_at': None, 'lookup': None}
 
 
-def _get_table(db) -> Optional[dict]:
-    """Accesso cachato alla tabella. Invalida se `updated_at` cambia."""
-    doc = _load_calibration_table(db)
-    if doc is None:
+def _parse_cell(cell: Optional[dict]) -> Optional[tuple]:
+    """Cella del documento → (n, hr) con hr=None se assente (si usera prob_dichiarata)."""
+    if cell is None:
         return None
-    cached_ts = _CAL_CACHE.get('updated_at')
-    doc_ts = doc.get('updated_at')
-    if cached_ts is None or cached_ts != doc_ts:
-        _CAL_CACHE['doc'] = doc
-        _CAL_CACHE['updated_at'] = doc_ts
+    hr = cell.get('hr')
+    return int(cell.get('n', 0)), (float(hr) if hr is not None else None)
+
+
+def _build_lookup(doc: dict) -> dict:
+    """Precalcola le celle per chiave tupla: (gruppo, mercato, bin) e (mercato, bin)."""
+    cells = {}
+    for key, cell in (doc.get('cells') or {}).items():
+        parts = key.split('|')
+        if len(parts) == 3:
+            cells[tuple(parts)] = _parse_cell(cell)
+    fallback = {}
+    for key, fb in (doc.get('fallback_mercato_bin') or {}).items():
+        parts = key.split('|')
+        if len(parts) == 2:
+            fallback[tuple(parts)] = _parse_cell(fb)
+    return {'cells': cells, 'fallback': fallback}
+
+
+def _get_table(db) -> Optional[dict]:
+    """Accesso cachato alla tabella (vedi _get_lookup)."""
+    _get_lookup(db)
     return _CAL_CACHE['doc']
 
 
+def _get_lookup(db) -> Optional[dict]:
+    """
+    Lookup precalcolato della tabella corrente.
+    Entro CACHE_TTL_SECONDS dall'ultimo controllo: nessun accesso al DB.
+    Poi legge solo `updated_at`; il documento completo solo se è cambiato.
+    Se il DB non risponde si continua con la copia in cache.
+    """
+    now = time.monotonic()
+    checked_at = _CAL_CACHE['checked_at']
+    if checked_at is not None and now - checked_at < CACHE_TTL_SECONDS:
+        return _CAL_CACHE['lookup']
+
+    if db is None:
+        return _CAL_CACHE['lookup']
+    try:
+        head = db['calibration_table'].find_one({'_id': 'current'}, {'updated_at': 1})
+    except Exception:
+        return _CAL_CACHE['lookup']
+
+    if head is None:
+        _CAL_CACHE.update(doc=None, updated_at=None, lookup=None, checked_at=now)
+        return None
+
+    if _CAL_CACHE['lookup'] is None or head.get('updated_at') != _CAL_CACHE['updated_at']:
+        doc = _load_calibration_table(db)
+        if doc is None:
+            return _CAL_CACHE['lookup']
+        _CAL_CACHE.update(doc=doc, updated_at=doc.get('updated_at'), lookup=_build_lookup(doc))
+    _CAL_CACHE['checked_at'] = now
+    return _CAL_CACHE['lookup']
+
+
 def get_calibrated_probability(
     db,
     source_group: str,
@@ -122,34 +178,29 @@ def get_calibrated_probability(
     if bin_lab is None:
         return p_in
 
-    table = _get_table(db)
-    if not table:
+    lookup = _get_lookup(db)
+    if not lookup:
         return p_in
 
-    cells = table.get('cells') or {}
-    fb_map = table.get('fallback_mercato_bin') or {}
-
-    cell_key = f"{source_group}|{mercato}|{bin_lab}"
-    fb_key = f"{mercato}|{bin_lab}"
-
-    cell = cells.get(cell_key)
-    fb = fb_map.get(fb_key)
+    cell = lookup['cells'].get((source_group, mercato, bin_lab))
+    fb = lookup['fallback'].get((mercato, bin_lab))
 
     if cell is None:
         if fb is None:
             return p_in
-        return float(fb.get('hr', p_in))
+        return fb[1] if fb[1] is not None else p_in
 
-    n_cell = int(cell.get('n', 0))
-    hr_cell = float(cell.get('hr', p_in))
+    n_cell, hr_cell = cell
+    if hr_cell is None:
+        hr_cell = p_in
 
     if n_cell >= SHRINK_MIN_N:
         return hr_cell
 
-    if fb is None or fb.get('n', 0) == 0:
+    if fb is None or fb[0] == 0:
         return hr_cell
 
-    hr_fb = float(fb.get('hr', p_in))
+    hr_fb = fb[1] if fb[1] is not None else p_in
     w_cell = n_cell
     w_fb = SHRINK_MIN_N - n_cell
     denom = w_cell + w_fb
@@ -221,6 +272,8 @@ def kelly_unified(
 
 
 def invalidate_cache():
-    """Forza il reload alla prossima chiamata. Utile nei test."""
+    """Forza il reload alla prossima chiamata (refresh_calibration_table, test)."""
     _CAL_CACHE['doc'] = None
     _CAL_CACHE['updated_at'] = None
+    _CAL_CACHE['checked_at'] = None
+    _CAL_CACHE['lookup'] = None
@@ -0,0 +1,70 @@
+"""
+Controllo db_replay: due script registrano uno dopo l'altro (come i processi
+lanciati da update_manager) e ognuno rigioca poi il proprio nastro.
+Serve mongomock (requirements-dev.txt) al posto del DB reale.
+
+Uso (da functions_python/ai_engine):
+    python tests/test_db_replay.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import db_replay
+
+# Script "notturno" minimo: registra le sue query sul nastro di default, poi il replay le rilegge
+SCRIPT = '''
+import sys, mongomock
+sys.path.insert(0, {parent_dir!r})
+import db_replay
+db_replay.TAPES_DIR = {tapes_dir!r}
+real = mongomock.MongoClient()["x"]
+real.teams.insert_many([{{"name": "{name}", "i": i}} for i in range(3)])
+mode = sys.argv[1]
+if mode == "record":
+    db = db_replay.RecordingDatabase(real)
+else:
+    db = db_replay.ReplayDatabase(strict=True)
+names = [d["name"] for d in db.teams.find({{"i": {{"$lt": 2}}}})]
+n = db.teams.count_documents({{}})
+db.close()
+assert names == ["{name}", "{name}"] and n == 3, (names, n)
+print(db.tape_path if mode == "record" else db.stats.served)
+'''
+
+
+def run_script(path, mode):
+    out = subprocess.run([sys.executable, path, mode], capture_output=True, text=True)
+    if out.returncode != 0:
+        raise SystemExit(f"❌ {os.path.basename(path)} {mode}:\n{out.stderr}")
+    return out.stdout.strip().splitlines()[-1]
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    tapes_dir = os.path.join(tmp, "_db_tapes")
+    scripts = []
+    for name in ("script_a", "script_b"):
+        path = os.path.join(tmp, f"{name}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(SCRIPT.format(parent_dir=parent_dir, tapes_dir=tapes_dir, name=name))
+        scripts.append(path)
+
+    # Registrazioni in sequenza: la seconda non deve toccare il nastro della prima
+    tapes = [run_script(path, "record") for path in scripts]
+    assert len(set(tapes)) == 2, tapes
+    for tape in tapes:
+        assert len(db_replay._Tape(tape)) == 2, tape
+        print(f"✅ {os.path.basename(tape)}: 2 query registrate")
+
+    for path in scripts:
+        print(f"✅ replay {os.path.basename(path)}: {run_script(path, 'replay')}")
+
+
+if __name__ == "__main__":
+    main()
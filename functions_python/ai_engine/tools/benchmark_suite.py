@@ -0,0 +1,544 @@
+"""
+BENCHMARK SUITE — Prestazioni dello stack pronostici da fixture congelate
+=========================================================================
+massive_benchmark.py, benchmark_convergenza.py e mc_tuning_tester.py sono
+interattivi e vogliono il Mongo di produzione. Qui invece tutto gira da file:
+una giornata viene "congelata" una volta (--capture) e poi i percorsi caldi si
+misurano offline, sempre sugli stessi input, contro una baseline salvata.
+
+Fixture (tools/bench_fixtures/<data>/):
+  - collections.json  documenti delle collection lette dal motore (tuning,
+                      league_stats, calibrazione, pronostici A/S/C del giorno,
+                      h2h_by_round delle leghe...) → caricati in un DB mongomock
+                      che prende il posto di config.db
+  - matches.pkl       partite del giorno + preloaded_data/bulk_cache per
+                      partita + league_cache di Sistema C per lega
+  - pattern_pool.pkl  campione del dataset Pattern Match + target
+  - meta.json         riepilogo della cattura
+  - baseline.json     tempi e memoria di riferimento (--save-baseline)
+
+Stadi misurati:
+  predict_match        engine_core.predict_match (preloaded) per partita
+  calculate_goals      goals_converter.calculate_goals_from_engine per partita
+  mc_match             Sistema C process_match: preload → MC → pronostici → documento
+  orchestrate_date     orchestrate_experts.orchestrate_date (dry run) sulla giornata
+  pattern_compute_pool pattern_match.compute_pool per target
+
+Per ogni stadio: miglior tempo su --repeat giri (perf_counter), throughput,
+picco di memoria (tracemalloc, in un giro separato per non falsare i tempi).
+Uno stadio più lento/pesante della baseline oltre la tolleranza è una
+regressione: exit code 1, da lanciare prima del nightly.
+
+Il DB offline usa mongomock, dipendenza di sviluppo (non va in produzione):
+    pip install -r functions_python/requirements-dev.txt
+
+Uso (da functions_python/ai_engine):
+    python tools/benchmark_suite.py --capture 2026-10-17       # una volta, col DB
+    python tools/benchmark_suite.py                            # fixture più recente
+    python tools/benchmark_suite.py --save-baseline            # fissa la baseline
+    python tools/benchmark_suite.py --only predict_match,mc_match --repeat 5
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import types
+import pickle
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+import tracemalloc
+from datetime import datetime
+
+# Esecuzione offline: i runner non devono troncare i log della notte
+os.environ.setdefault('AI_ENGINE_OFFLINE', '1')
+
+# Setup path
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))          # functions_python/ai_engine
+FUNCTIONS_ROOT = os.path.dirname(BASE)                                     # functions_python (package ai_engine)
+PROJECT_ROOT = os.path.dirname(FUNCTIONS_ROOT)
+ROOT_AI_ENGINE = os.path.join(PROJECT_ROOT, 'ai_engine')                   # pattern_match vive qui
+for p in [FUNCTIONS_ROOT, BASE]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_fixtures')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+COLLECTIONS_FILE = 'collections.json'
+MATCHES_FILE = 'matches.pkl'
+PATTERN_FILE = 'pattern_pool.pkl'
+META_FILE = 'meta.json'
+BASELINE_FILE = 'baseline.json'
+
+BENCH_SEED = 20260401            # Seed fisso: stessi cicli MC a ogni giro
+DEFAULT_REPEAT = 3
+TIME_TOLERANCE = 0.20            # +20% sul miglior tempo = regressione
+MEMORY_TOLERANCE = 0.25          # +25% sul picco di memoria = regressione
+DEFAULT_MAX_MATCHES = 40
+DEFAULT_PATTERN_SIZE = 5000      # Partite storiche nel campione Pattern Match
+DEFAULT_PATTERN_TARGETS = 50
+
+STAGES = ['predict_match', 'calculate_goals', 'mc_match', 'orchestrate_date', 'pattern_compute_pool']
+
+
+# ==================== SUPPRESS STDOUT ====================
+@contextlib.contextmanager
+def suppress_stdout():
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        old_out = sys.stdout
+        old_err = sys.stderr
+        sys.stdout = devnull
+        sys.stderr = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = old_out
+            sys.stderr = old_err
+
+
+def _import_pattern_match():
+    """
+    match_engine sta nell'albero ai_engine/ della root, che ha lo stesso nome di
+    package di functions_python/ai_engine: si aggiunge la root al __path__ del
+    package già importato invece di averne due in conflitto.
+    """
+    import ai_engine
+    if ROOT_AI_ENGINE not in ai_engine.__path__:
+        ai_engine.__path__.append(ROOT_AI_ENGINE)
+    from ai_engine.pattern_match import match_engine
+    return match_engine
+
+
+def _latest_fixture():
+    if not os.path.isdir(FIXTURES_DIR):
+        return None
+    names = sorted(n for n in os.listdir(FIXTURES_DIR)
+                   if os.path.exists(os.path.join(FIXTURES_DIR, n, META_FILE)))
+    return names[-1] if names else None
+
+
+# ==================== CATTURA (DB LIVE) ====================
+
+def _collection_queries(date_str, teams, leagues):
+    """Collection (e filtri) che i cinque stadi leggono da config.db."""
+    return {
+        'tuning_settings': {},
+        'league_stats': {},
+        'calibration_table': {'_id': 'current'},
+        'team_seasonal_stats': {'team': {'$in': sorted(teams)}},
+        'daily_predictions': {'date': date_str},
+        'daily_predictions_sandbox': {'date': date_str},
+        'daily_predictions_engine_c': {'date': date_str},
+        'h2h_by_round': {'league': {'$in': sorted(leagues)}},
+    }
+
+
+def capture(date_str, max_matches=DEFAULT_MAX_MATCHES, pattern_size=DEFAULT_PATTERN_SIZE,
+            pattern_targets=DEFAULT_PATTERN_TARGETS):
+    """Congela una giornata dal DB di produzione in tools/bench_fixtures/<data>/."""
+    from bson import json_util
+    from config import db
+    import calculators.run_daily_predictions_engine_c as engine_c
+    import ai_engine.calculators.bulk_manager_c as bulk_manager_c
+    from calculators import daily_snapshot
+
+    target_date = datetime.strptime(date_str, '%Y-%m-%d')
+    out_dir = os.path.join(FIXTURES_DIR, date_str)
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"\n📸 CATTURA FIXTURE {date_str} → {out_dir}")
+
+    # 1. Partite del giorno + cache di lega (stessa strada di run_engine_c)
+    with suppress_stdout():
+        matches = engine_c.get_today_matches(target_date)[:max_matches]
+        snapshot = daily_snapshot.get_snapshot(target_date)
+    by_league = {}
+    for m in matches:
+        by_league.setdefault(m.get('_league', 'Unknown'), []).append(m)
+
+    league_caches = {}
+    cases = []
+    for league, league_matches in by_league.items():
+        teams = list({m.get('home', m.get('home_team', '')) for m in league_matches} |
+                     {m.get('away', m.get('away_team', '')) for m in league_matches})
+        try:
+            with suppress_stdout():
+                league_caches[league] = bulk_manager_c.load_league_cache(teams, league, snapshot=snapshot)
+        except Exception as e:
+            print(f"  ⚠️ League cache fallita per {league}: {e}")
+            continue
+        for m in league_matches:
+            home = m.get('home', m.get('home_team', ''))
+            away = m.get('away', m.get('away_team', ''))
+            with suppress_stdout():
+                bulk_cache = bulk_manager_c.build_match_cache(league_caches[league], home, away)
+                preloaded = engine_c.build_preloaded(home, away, league, bulk_cache=bulk_cache)
+            if preloaded:
+                cases.append({'match': m, 'league': league, 'home': home, 'away': away,
+                              'preloaded': preloaded})
+    print(f"   ⚽ Partite: {len(cases)} su {len(matches)} ({len(league_caches)} leghe)")
+
+    with open(os.path.join(out_dir, MATCHES_FILE), 'wb') as f:
+        pickle.dump({'date': date_str, 'cases': cases, 'league_caches': league_caches},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # 2. Documenti delle collection lette dal motore
+    teams = {c['home'] for c in cases} | {c['away'] for c in cases}
+    leagues = set(league_caches)
+    for coll_name in ('daily_predictions', 'daily_predictions_sandbox', 'daily_predictions_engine_c'):
+        leagues |= {d['league'] for d in db[coll_name].find({'date': date_str}, {'league': 1}) if d.get('league')}
+    collections = {}
+    for coll_name, query in _collection_queries(date_str, teams, leagues).items():
+        collections[coll_name] = list(db[coll_name].find(query))
+        print(f"   🗂️  {coll_name:<28} {len(collections[coll_name]):>6} doc")
+    with open(os.path.join(out_dir, COLLECTIONS_FILE), 'w', encoding='utf-8') as f:
+        f.write(json_util.dumps(collections))
+
+    # 3. Campione Pattern Match (dataset esteso + target esclusi dal proprio pool)
+    me = _import_pattern_match()
+    with suppress_stdout():
+        dataset = me.load_dataset_extended()
+    rnd = random.Random(BENCH_SEED)
+    sample = rnd.sample(dataset, min(pattern_size, len(dataset)))
+    targets = [(e['match_uid'], e['fv_extended']) for e in sample[:pattern_targets]]
+    with open(os.path.join(out_dir, PATTERN_FILE), 'wb') as f:
+        pickle.dump({'dataset': sample, 'targets': targets}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"   🧩 Pattern Match: {len(sample)} partite, {len(targets)} target")
+
+    meta = {
+        'date': date_str,
+        'captured_at': datetime.now().isoformat(timespec='seconds'),
+        'n_matches': len(cases),
+        'leagues': sorted(league_caches),
+        'collections': {k: len(v) for k, v in collections.items()},
+        'pattern_dataset': len(sample),
+        'pattern_targets': len(targets),
+    }
+    with open(os.path.join(out_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    print(f"✅ Fixture salvate in {out_dir}")
+    return out_dir
+
+
+# ==================== FIXTURE OFFLINE ====================
+
+class _Fixture:
+    """Una giornata congelata: DB offline + input dei cinque stadi."""
+
+    def __init__(self, name):
+        self.name = name
+        self.dir = os.path.join(FIXTURES_DIR, name)
+        with open(os.path.join(self.dir, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.date_str = self.meta['date']
+        self._matches = None
+        self._pattern = None
+
+    def install_db(self):
+        """
+        Carica collections.json in un DB mongomock e lo espone come modulo 'config':
+        va fatto prima di importare qualunque modulo del motore (from config import db).
+        """
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("❌ mongomock non installato (pip install -r requirements-dev.txt): serve per il DB offline")
+        from bson import json_util
+
+        client = mongomock.MongoClient()
+        fixture_db = client['bench_' + self.name.replace('-', '_')]
+        with open(os.path.join(self.dir, COLLECTIONS_FILE), encoding='utf-8') as f:
+            collections = json_util.loads(f.read())
+        for coll_name, docs in collections.items():
+            if docs:
+                fixture_db[coll_name].insert_many(docs)
+
+        config = types.ModuleType('config')
+        config.client = client
+        config.db = fixture_db
+        config.MONGO_URI = f"mongomock://{self.name}"
+        sys.modules['config'] = config
+        return fixture_db
+
+    @property
+    def matches(self):
+        if self._matches is None:
+            with open(os.path.join(self.dir, MATCHES_FILE), 'rb') as f:
+                self._matches = pickle.load(f)
+        return self._matches
+
+    @property
+    def pattern(self):
+        if self._pattern is None:
+            with open(os.path.join(self.dir, PATTERN_FILE), 'rb') as f:
+                self._pattern = pickle.load(f)
+        return self._pattern
+
+    def baseline_path(self):
+        return os.path.join(self.dir, BASELINE_FILE)
+
+
+# ==================== STADI ====================
+# Ogni stadio prepara gli input (fuori dal tempo misurato) e ritorna
+# (funzione da cronometrare, numero di elementi per giro).
+
+def _stage_predict_match(fx):
+    from engine.engine_core import predict_match, clear_match_contexts
+    from engine.rng_streams import make_rng
+    cases = fx.matches['cases']
+
+    def run():
+        # Ogni giro parte a freddo: senza i MatchContext compilati dal giro precedente
+        # si misurerebbe solo il percorso caldo (una chiamata per partita, come in produzione)
+        clear_match_contexts()
+        rng = make_rng(BENCH_SEED)
+        for c in cases:
+            predict_match(c['home'], c['away'], preloaded_data=c['preloaded'], rng=rng)
+    return run, len(cases)
+
+
+def _stage_calculate_goals(fx):
+    from engine.engine_core import predict_match, ALGO_MODE
+    from engine.goals_converter import calculate_goals_from_engine, load_tuning
+    from engine.rng_streams import make_rng
+    settings = load_tuning(ALGO_MODE)
+    rng = make_rng(BENCH_SEED)
+    inputs = []
+    for c in fx.matches['cases']:
+        s_h, s_a, r_h, r_a = predict_match(c['home'], c['away'], preloaded_data=c['preloaded'], rng=rng)
+        inputs.append((s_h, s_a, r_h, r_a, c))
+
+    def run():
+        rng = make_rng(BENCH_SEED)
+        for s_h, s_a, r_h, r_a, c in inputs:
+            calculate_goals_from_engine(
+                s_h, s_a, r_h, r_a, algo_mode=ALGO_MODE, league_name=c['league'],
+                home_name=c['home'], away_name=c['away'], debug_mode=False,
+                settings_cache=settings, is_cup=c['preloaded'].get('is_cup', False), rng=rng)
+    return run, len(inputs)
+
+
+def _stage_mc_match(fx):
+    import calculators.run_daily_predictions_engine_c as engine_c
+    cases = fx.matches['cases']
+    league_caches = fx.matches['league_caches']
+    date_str = fx.date_str
+
+    def run():
+        for c in cases:
+            seed = engine_c.match_seed(BENCH_SEED, date_str, c['home'], c['away'])
+            engine_c.process_match(c['match'], c['league'], league_caches[c['league']], date_str,
+                                   cycles=engine_c.SIMULATION_CYCLES, seed=seed, use_cache=False)
+    return run, len(cases)
+
+
+def _stage_orchestrate_date(fx):
+    import calculators.orchestrate_experts as orchestrate
+    n_docs = fx.meta['collections'].get('daily_predictions', 0) or fx.meta['n_matches']
+
+    def run():
+        # A freddo a ogni giro: niente lambda memoizzati dal giro precedente
+        orchestrate._calc_lambda.cache_clear()
+        orchestrate.RULE_STATS.reset()
+        orchestrate.orchestrate_date(fx.date_str, dry_run=True)
+    return run, n_docs
+
+
+def _stage_pattern_compute_pool(fx):
+    me = _import_pattern_match()
+    dataset = fx.pattern['dataset']
+    targets = fx.pattern['targets']
+    matrix = me.build_feature_matrix(dataset)
+
+    def run():
+        for uid, target_ext in targets:
+            me.compute_pool(target_ext, dataset, exclude_uid=uid, matrix=matrix)
+    return run, len(targets)
+
+
+STAGE_BUILDERS = {
+    'predict_match': _stage_predict_match,
+    'calculate_goals': _stage_calculate_goals,
+    'mc_match': _stage_mc_match,
+    'orchestrate_date': _stage_orchestrate_date,
+    'pattern_compute_pool': _stage_pattern_compute_pool,
+}
+
+
+# ==================== MISURA ====================
+
+def measure(run, n_items, repeat=DEFAULT_REPEAT):
+    """Miglior tempo e mediana su repeat giri, poi un giro sotto tracemalloc per il picco."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        with suppress_stdout():
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with suppress_stdout():
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(times)
+    return {
+        'items': n_items,
+        'best_s': round(best, 6),
+        'median_s': round(statistics.median(times), 6),
+        'items_per_s': round(n_items / best, 2) if best > 0 else None,
+        'ms_per_item': round(best * 1000 / n_items, 3) if n_items else None,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, time_tol=TIME_TOLERANCE, mem_tol=MEMORY_TOLERANCE):
+    """Aggiunge a ogni stadio i rapporti con la baseline. Ritorna gli stadi in regressione."""
+    regressions = []
+    base_stages = (baseline or {}).get('stages', {})
+    for name, res in results.items():
+        if 'error' in res:
+            continue
+        base = base_stages.get(name)
+        if not base or not base.get('best_s'):
+            res['status'] = 'NEW'
+            continue
+        # Confronto per elemento: la baseline può essere su una fixture di dimensione diversa
+        time_ratio = (res['best_s'] / res['items']) / (base['best_s'] / base['items'])
+        mem_ratio = res['peak_kb'] / base['peak_kb'] if base.get('peak_kb') else 1.0
+        res['time_ratio'] = round(time_ratio, 3)
+        res['mem_ratio'] = round(mem_ratio, 3)
+        if time_ratio > 1 + time_tol or mem_ratio > 1 + mem_tol:
+            res['status'] = 'REGRESSION'
+            regressions.append(name)
+        elif time_ratio < 1 - time_tol:
+            res['status'] = 'FASTER'
+        else:
+            res['status'] = 'OK'
+    return regressions
+
+
+def print_report(results, baseline):
+    icons = {'OK': '✅', 'FASTER': '🚀', 'REGRESSION': '🔴', 'NEW': '🆕', 'ERROR': '❌'}
+    print(f"\n{'━' * 96}")
+    print(f"{'Stadio':<22}{'elem':>6}{'best s':>10}{'elem/s':>11}{'ms/elem':>10}{'picco KB':>11}"
+          f"{'Δ tempo':>10}{'Δ mem':>9}   stato")
+    print(f"{'━' * 96}")
+    for name, res in results.items():
+        if 'error' in res:
+            print(f"{name:<22}{'':>67}   {icons['ERROR']} {res['error']}")
+            continue
+        dt = f"{(res['time_ratio'] - 1) * 100:+.0f}%" if 'time_ratio' in res else '-'
+        dm = f"{(res['mem_ratio'] - 1) * 100:+.0f}%" if 'mem_ratio' in res else '-'
+        print(f"{name:<22}{res['items']:>6}{res['best_s']:>10.3f}{res['items_per_s'] or 0:>11.1f}"
+              f"{res['ms_per_item'] or 0:>10.2f}{res['peak_kb']:>11.0f}{dt:>10}{dm:>9}"
+              f"   {icons.get(res['status'], '')} {res['status']}")
+    print(f"{'━' * 96}")
+    if baseline:
+        env = baseline.get('env', {})
+        print(f"   Baseline del {baseline.get('created_at', '?')} su {env.get('machine', '?')} "
+              f"(Python {env.get('python', '?')})")
+        if env.get('machine') != platform.node():
+            print("   ⚠️ Baseline registrata su un'altra macchina: i rapporti sono indicativi")
+
+
+def _env_info():
+    return {'machine': platform.node(), 'python': platform.python_version(),
+            'processor': platform.processor() or platform.machine()}
+
+
+def run_suite(fixture_name, stages=None, repeat=DEFAULT_REPEAT, save_baseline=False,
+              time_tol=TIME_TOLERANCE, mem_tol=MEMORY_TOLERANCE):
+    """Esegue gli stadi sulla fixture; ritorna (risultati, stadi in regressione)."""
+    fx = _Fixture(fixture_name)
+    print(f"\n⏱️  BENCHMARK SUITE — fixture {fx.name} ({fx.meta['n_matches']} partite, repeat {repeat})")
+    with suppress_stdout():
+        fx.install_db()
+
+    results = {}
+    for name in stages or STAGES:
+        try:
+            with suppress_stdout():
+                run, n_items = STAGE_BUILDERS[name](fx)
+            if not n_items:
+                raise ValueError("fixture senza elementi per questo stadio")
+            results[name] = measure(run, n_items, repeat=repeat)
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}", 'status': 'ERROR'}
+        print(f"   {'❌' if 'error' in results[name] else '✔️ '} {name}")
+
+    baseline = None
+    if os.path.exists(fx.baseline_path()):
+        with open(fx.baseline_path(), encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, time_tol, mem_tol)
+    print_report(results, baseline)
+
+    report = {'fixture': fx.name, 'created_at': datetime.now().isoformat(timespec='seconds'),
+              'repeat': repeat, 'env': _env_info(), 'stages': results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"benchmark_{fx.name}_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Risultati: {out_path}")
+
+    if save_baseline:
+        # Gli stadi non rieseguiti (--only) restano quelli della baseline precedente
+        merged = dict((baseline or {}).get('stages', {}))
+        merged.update({k: v for k, v in results.items() if 'error' not in v})
+        report['stages'] = merged
+        with open(fx.baseline_path(), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📌 Baseline aggiornata: {fx.baseline_path()}")
+    elif regressions:
+        print(f"\n🔴 REGRESSIONI: {', '.join(regressions)}")
+    return results, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline dello stack pronostici')
+    parser.add_argument('--capture', metavar='YYYY-MM-DD', help='Congela la giornata dal DB di produzione')
+    parser.add_argument('--max-matches', type=int, default=DEFAULT_MAX_MATCHES)
+    parser.add_argument('--pattern-size', type=int, default=DEFAULT_PATTERN_SIZE)
+    parser.add_argument('--pattern-targets', type=int, default=DEFAULT_PATTERN_TARGETS)
+    parser.add_argument('--fixture', help='Nome fixture in bench_fixtures/ (default: la più recente)')
+    parser.add_argument('--only', help=f"Stadi separati da virgola ({', '.join(STAGES)})")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--tolerance', type=float, default=TIME_TOLERANCE,
+                        help='Rallentamento ammesso sul tempo per elemento (0.20 = +20%%)')
+    parser.add_argument('--mem-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true', help='Salva i risultati come nuova baseline')
+    args = parser.parse_args()
+
+    if args.capture:
+        capture(args.capture, max_matches=args.max_matches, pattern_size=args.pattern_size,
+                pattern_targets=args.pattern_targets)
+        return 0
+
+    fixture = args.fixture or _latest_fixture()
+    if not fixture:
+        print(f"❌ Nessuna fixture in {FIXTURES_DIR}: eseguire prima --capture YYYY-MM-DD")
+        return 2
+    stages = None
+    if args.only:
+        stages = [s.strip() for s in args.only.split(',') if s.strip()]
+        unknown = [s for s in stages if s not in STAGE_BUILDERS]
+        if unknown:
+            print(f"❌ Stadi sconosciuti: {', '.join(unknown)}")
+            return 2
+    _, regressions = run_suite(fixture, stages=stages, repeat=args.repeat, save_baseline=args.save_baseline,
+                               time_tol=args.tolerance, mem_tol=args.mem_tolerance)
+    return 1 if regressions and not args.save_baseline else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
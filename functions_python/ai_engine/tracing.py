@@ -0,0 +1,406 @@
+"""
+TRACING - Span annidati per fase, una riga JSON per span, riepilogo per run
+===========================================================================
+Una run (richiesta web, runner notturno) è la radice; dentro, span annidati
+con attributi (match, league, algo, cycles...). A fine run gli span vengono
+scritti in _traces/<data>.jsonl (una riga per span + una riga "summary")
+e viene stampato il riepilogo: fasi più lente e partite più lente.
+
+Campionamento: AI_ENGINE_TRACE_SAMPLE (0..1, default 0.05 = una run su venti;
+1 = ogni run, 0 = spento). Una run non campionata non registra nulla: span(),
+traced() e iter_spans() si riducono a una lettura di contextvar e a un oggetto
+no-op condiviso. I file in _traces/ più vecchi di AI_ENGINE_TRACE_RETENTION_DAYS
+giorni (default 14) vengono cancellati alla prima scrittura del processo.
+
+Usage:
+    from tracing import trace_run, span, traced, annotate, iter_spans, stages
+
+    @trace_run("daily_predictions_A", report="stdout")
+    def run_daily(...):
+        annotate(date=target_str)
+        for match in iter_spans(matches, "match", lambda m: {"match": ..., "league": ...}):
+            with span("analisi", algo=5):
+                ...
+
+    @traced("analyze_segno")
+    def analyze_segno(...): ...
+
+    st = stages()              # fasi in sequenza (senza rientrare il codice)
+    st.next("alias")
+    st.next("h2h")
+    st.done()
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+TRACE_SAMPLE_RATE = float(os.getenv('AI_ENGINE_TRACE_SAMPLE', '0.05'))
+TRACE_RETENTION_DAYS = int(os.getenv('AI_ENGINE_TRACE_RETENTION_DAYS', '14'))
+TRACE_DIR = os.getenv('AI_ENGINE_TRACE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '_traces')
+SUMMARY_TOP_STAGES = 8
+SUMMARY_TOP_MATCHES = 5
+
+_CURRENT = contextvars.ContextVar('ai_engine_trace_span', default=None)
+_WRITE_LOCK = threading.Lock()
+_PRUNED = False
+
+
+class _NoopSpan:
+    """Span spento: tutte le operazioni sono no-op (run non campionata o nessuna run)."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def start(self):
+        return self
+
+    def finish(self, error=None):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'parent', 'run', 'span_id', 't0', 't1')
+
+    def __init__(self, name, attrs, parent, run):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.run = run
+        self.span_id = next(run._ids) if run is not None else 0
+        self.t0 = None
+        self.t1 = None
+
+    @property
+    def ms(self):
+        end = self.t1 if self.t1 is not None else time.perf_counter()
+        return (end - self.t0) * 1000 if self.t0 is not None else 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        self.run._open[self.span_id] = self
+        _CURRENT.set(self)
+        return self
+
+    def finish(self, error=None):
+        if self.t1 is not None:
+            return
+        current = _CURRENT.get()
+        if current is not self and isinstance(current, Span):
+            _close_children(self, current)
+        self.t1 = time.perf_counter()
+        if error is not None:
+            self.attrs['error'] = f"{type(error).__name__}: {error}"
+        self.run._open.pop(self.span_id, None)
+        self.run.spans.append(self)
+        if _CURRENT.get() is self:
+            _CURRENT.set(self.parent)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(exc)
+        return False
+
+
+def _close_children(span_, current):
+    """Figli ancora aperti sotto span_ (es. stages() con un return anticipato): chiusi con lui."""
+    chain = []
+    while current is not None and current is not span_:
+        chain.append(current)
+        current = current.parent
+    if current is span_:
+        for child in chain:
+            child.finish()
+
+
+class _Run(Span):
+    """Radice: raccoglie gli span, a fine run li scrive e stampa il riepilogo."""
+    __slots__ = ('spans', 'run_id', 'started_at', 'report', '_ids', '_open', '_token')
+
+    def __init__(self, name, attrs, report):
+        self._ids = itertools.count(1)
+        super().__init__(name, attrs, None, self)
+        self.span_id = 0
+        self.spans = []
+        self._open = {}
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = None
+        self.report = report
+        self._token = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        self.t0 = time.perf_counter()
+        self._token = _CURRENT.set(self)
+        return self
+
+    def finish(self, error=None):
+        if self.t1 is not None:
+            return
+        # Span lasciati aperti (eccezione a metà di una fase): chiusi con la run
+        for s in sorted(self._open.values(), key=lambda s: -s.span_id):
+            s.attrs['unfinished'] = True
+            s.finish()
+        self.t1 = time.perf_counter()
+        if error is not None:
+            self.attrs['error'] = f"{type(error).__name__}: {error}"
+        _CURRENT.reset(self._token)
+        summary = self.summary()
+        try:
+            _write_run(self, summary)
+        except OSError as e:
+            print(f"⚠️ [TRACE] Scrittura fallita: {e}", file=sys.stderr)
+        if self.report:
+            print_summary(summary, file=sys.stdout if self.report == 'stdout' else sys.stderr)
+
+    def summary(self):
+        total_ms = self.ms
+        by_stage = defaultdict(lambda: [0, 0.0, 0.0])      # nome -> [chiamate, ms totali, ms max]
+        by_match = defaultdict(lambda: [0.0, None])        # match -> [ms, attributi]
+        for s in self.spans:
+            agg = by_stage[s.name]
+            agg[0] += 1
+            agg[1] += s.ms
+            agg[2] = max(agg[2], s.ms)
+            # Partita = span più esterno con l'attributo 'match' (il resto è già dentro)
+            match = s.attrs.get('match')
+            if match is not None and (s.parent is None or s.parent.attrs.get('match') != match):
+                entry = by_match[match]
+                entry[0] += s.ms
+                if entry[1] is None:
+                    entry[1] = {k: v for k, v in s.attrs.items() if k != 'match'}
+        if 'match' in self.attrs:
+            by_match[self.attrs['match']] = [total_ms, {k: v for k, v in self.attrs.items() if k != 'match'}]
+
+        stages_sorted = sorted(by_stage.items(), key=lambda kv: -kv[1][1])[:SUMMARY_TOP_STAGES]
+        matches_sorted = sorted(by_match.items(), key=lambda kv: -kv[1][0])[:SUMMARY_TOP_MATCHES]
+        return {
+            'type': 'summary', 'run': self.run_id, 'name': self.name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'ms': round(total_ms, 1), 'n_spans': len(self.spans), 'attrs': self.attrs,
+            'slowest_stages': [
+                {'stage': name, 'calls': n, 'ms': round(tot, 1), 'max_ms': round(mx, 1),
+                 'pct': round(tot / total_ms * 100, 1) if total_ms else 0.0}
+                for name, (n, tot, mx) in stages_sorted
+            ],
+            'slowest_matches': [
+                {'match': match, 'ms': round(ms, 1), **(attrs or {})}
+                for match, (ms, attrs) in matches_sorted
+            ],
+        }
+
+
+def _prune_traces(today):
+    """Cancella i <data>.jsonl più vecchi di TRACE_RETENTION_DAYS (una volta per processo)."""
+    global _PRUNED
+    if _PRUNED or TRACE_RETENTION_DAYS <= 0:
+        return
+    _PRUNED = True
+    for name in os.listdir(TRACE_DIR):
+        if not name.endswith('.jsonl'):
+            continue
+        try:
+            day = datetime.strptime(name[:-len('.jsonl')], '%Y-%m-%d')
+        except ValueError:
+            continue
+        if (today - day).days > TRACE_RETENTION_DAYS:
+            try:
+                os.remove(os.path.join(TRACE_DIR, name))
+            except OSError:
+                pass
+
+
+def _write_run(run, summary):
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    path = os.path.join(TRACE_DIR, f"{run.started_at.strftime('%Y-%m-%d')}.jsonl")
+    lines = []
+    for s in run.spans:
+        lines.append(json.dumps({
+            'type': 'span', 'run': run.run_id, 'run_name': run.name, 'id': s.span_id,
+            'parent': s.parent.span_id if s.parent is not None else None, 'name': s.name,
+            'start_ms': round((s.t0 - run.t0) * 1000, 3), 'ms': round(s.ms, 3), 'attrs': s.attrs,
+        }, ensure_ascii=False, default=str))
+    lines.append(json.dumps(summary, ensure_ascii=False, default=str))
+    with _WRITE_LOCK:
+        _prune_traces(datetime.combine(run.started_at.date(), datetime.min.time()))
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def print_summary(summary, file=None):
+    file = file or sys.stderr
+    print(f"\n⏱️  [TRACE] {summary['name']} — {summary['ms'] / 1000:.2f}s, {summary['n_spans']} span", file=file)
+    for st in summary['slowest_stages']:
+        print(f"   {st['stage']:<28} {st['ms'] / 1000:>8.2f}s {st['pct']:>5.1f}%  "
+              f"({st['calls']}×, max {st['max_ms'] / 1000:.2f}s)", file=file)
+    if summary['slowest_matches']:
+        print("   Partite più lente:", file=file)
+        for m in summary['slowest_matches']:
+            extra = ", ".join(f"{k}={v}" for k, v in m.items() if k not in ('match', 'ms'))
+            print(f"   {m['ms'] / 1000:>8.2f}s  {m['match']}" + (f"  ({extra})" if extra else ""), file=file)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# API
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+class _RunContext:
+    """trace_run: context manager o decoratore. Dentro una run già attiva diventa uno span figlio."""
+
+    def __init__(self, name, report, attrs):
+        self.name = name
+        self.report = report
+        self.attrs = attrs
+        self._active = threading.local()
+
+    def _open(self):
+        current = _CURRENT.get()
+        if current is _NOOP:
+            return _NOOP
+        if current is not None:
+            return Span(self.name, dict(self.attrs), current, current.run).start()
+        if TRACE_SAMPLE_RATE < 1 and random.random() >= TRACE_SAMPLE_RATE:
+            return _SuppressedRun()
+        return _Run(self.name, dict(self.attrs), self.report).start()
+
+    def __enter__(self):
+        stack = getattr(self._active, 'stack', None)
+        if stack is None:
+            stack = self._active.stack = []
+        sp = self._open()
+        stack.append(sp)
+        return sp
+
+    def __exit__(self, exc_type, exc, tb):
+        self._active.stack.pop().finish(exc)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class _SuppressedRun(_NoopSpan):
+    """Run non campionata: per tutta la sua durata gli span annidati sono no-op."""
+    __slots__ = ('_token',)
+
+    def __init__(self):
+        self._token = _CURRENT.set(_NOOP)
+
+    def finish(self, error=None):
+        if self._token is not None:
+            _CURRENT.reset(self._token)
+            self._token = None
+
+
+def trace_run(name, report='stderr', **attrs):
+    """Radice di una run (report: 'stdout' | 'stderr' | None per il riepilogo stampato)."""
+    return _RunContext(name, report, attrs)
+
+
+def span(name, **attrs):
+    """Span figlio dello span corrente (no-op se non c'è una run campionata)."""
+    parent = _CURRENT.get()
+    if parent is None or parent is _NOOP:
+        return _NOOP
+    return Span(name, attrs, parent, parent.run)
+
+
+def current_span():
+    sp = _CURRENT.get()
+    return _NOOP if sp is None else sp
+
+
+def annotate(**attrs):
+    """Attributi sullo span corrente (es. annotate(date=...) appena noti)."""
+    current_span().set(**attrs)
+
+
+def traced(name=None, attrs=None):
+    """Decoratore: ogni chiamata è uno span. attrs: funzione(*args, **kwargs) -> dict."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _CURRENT.get()
+            if parent is None or parent is _NOOP:
+                return fn(*args, **kwargs)
+            with Span(span_name, attrs(*args, **kwargs) if attrs else {}, parent, parent.run):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def iter_spans(items, name, attrs=None):
+    """
+    Itera items aprendo uno span per elemento (chiuso alla richiesta del successivo):
+    un ciclo for esistente diventa tracciato senza rientrarne il corpo; 'continue' va bene.
+    """
+    parent = _CURRENT.get()
+    if parent is None or parent is _NOOP:
+        yield from items
+        return
+    sp = None
+    try:
+        for item in items:
+            sp = Span(name, attrs(item) if attrs else {}, parent, parent.run).start()
+            yield item
+            sp.finish()
+            sp = None
+    finally:
+        if sp is not None:
+            sp.finish()
+        if _CURRENT.get() is not parent and parent.t1 is None:
+            _CURRENT.set(parent)
+
+
+class _Stages:
+    """Fasi in sequenza: next() chiude la fase aperta e ne apre un'altra allo stesso livello."""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.current = None
+
+    def next(self, name, **attrs):
+        self.done()
+        if self.parent is not None:
+            self.current = Span(name, attrs, self.parent, self.parent.run).start()
+        return self.current
+
+    def done(self):
+        if self.current is not None:
+            self.current.finish()
+            self.current = None
+
+
+def stages():
+    parent = _CURRENT.get()
+    return _Stages(None if parent is _NOOP else parent)
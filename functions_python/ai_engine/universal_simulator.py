@@ -7,7 +7,6 @@ from datetime import datetime, date
 from collections import Counter
 import statistics
 import contextlib
-import random
 
 # --- 1. HARD FIX PERCORSI (CRITICO) ---
 current_script_path = os.path.abspath(__file__)
@@ -45,12 +44,16 @@ try:
 
     try:
         from engine import engine_core  # type: ignore
-        from engine.engine_core import predict_match, preload_match_data  # type: ignore
-        from engine.goals_converter import calculate_goals_from_engine, load_tuning  # type: ignore
+        from engine.engine_core import predict_match, get_match_raw, preload_match_data  # type: ignore
+        from engine.goals_converter import calculate_goals_from_engine, calculate_goals_batch, load_tuning  # type: ignore
+        from engine.rng_streams import get_rng  # type: ignore
+        from engine.score_accumulator import ScoreAccumulator  # type: ignore
     except ImportError:
         import engine_core  # type: ignore
-        from engine_core import predict_match, preload_match_data  # type: ignore
-        from goals_converter import calculate_goals_from_engine, load_tuning  # type: ignore
+        from engine_core import predict_match, get_match_raw, preload_match_data  # type: ignore
+        from goals_converter import calculate_goals_from_engine, calculate_goals_batch, load_tuning  # type: ignore
+        from rng_streams import get_rng  # type: ignore
+        from score_accumulator import ScoreAccumulator  # type: ignore
 
 except ImportError as e:
     print(json.dumps({"success": False, "error": f"Errore Import Critico: {e}"}))
@@ -139,9 +142,9 @@ def analyze_odds(match):
         return f"{s1} | {sx} | {s2}", fav_sign, True
     except:
         return '<span class="text-muted">Err</span>', None, False
-def run_single_algo(algo_id, preloaded_data, home_name="Home", away_name="Away", settings_cache=None, debug_mode=False):
+def run_single_algo(algo_id, preloaded_data, home_name="Home", away_name="Away", settings_cache=None, debug_mode=False, rng=None):
     """Esegue una singola simulazione (Ora supporta Turbo e Silenziatore)"""
-    s_h, s_a, r_h, r_a = predict_match("", "", mode=algo_id, preloaded_data=preloaded_data)
+    s_h, s_a, r_h, r_a = predict_match("", "", mode=algo_id, preloaded_data=preloaded_data, rng=rng)
     if s_h is None:
         return 0, 0
 
@@ -155,81 +158,71 @@ def run_single_algo(algo_id, preloaded_data, home_name="Home", away_name="Away",
         away_name=away_name,
         settings_cache=settings_cache,
         debug_mode=debug_mode,
-        is_cup=is_cup
+        is_cup=is_cup,
+        rng=rng
     )
     
     # ✅ RITORNA TUTTI I 9 VALORI (non scartare i lambda!)
     return result
 
-def run_single_algo_montecarlo(algo_id, preloaded_data, home_team, away_team, cycles=500, analyzer=None, settings_cache=None):
-    """MonteCarlo per SINGOLO algoritmo"""
-    local_results = []
-    valid_cycles = 0
-    
+def run_single_algo_montecarlo(algo_id, preloaded_data, home_team, away_team, cycles=500, analyzer=None, settings_cache=None, rng=None, accumulator=None):
+    """
+    MonteCarlo per SINGOLO algoritmo (tutti i cicli in batch numpy). rng: Generator per run riproducibili.
+    accumulator: ScoreAccumulator in cui fondere i cicli (es. più chiamate/worker sulla stessa partita).
+    Ritorna (gh, ga, top3, acc): acc è lo ScoreAccumulator dei cicli, memoria costante sui cicli.
+    """
     settings_in_ram = settings_cache if settings_cache else load_tuning(algo_id)
 
-    for cycle_idx in range(cycles):
-        with suppress_stdout():
-            s_h, s_a, r_h, r_a = predict_match(home_team, away_team, mode=algo_id, preloaded_data=preloaded_data)
-            if s_h is None:
-                continue
-            
-            # ✅ Controlla se è una coppa
-            is_cup = preloaded_data.get('is_cup', False) if preloaded_data else False
-            
-            result = calculate_goals_from_engine(
-                s_h, s_a, r_h, r_a, 
-                algo_mode=algo_id, 
-                home_name=home_team, 
-                away_name=away_team,
-                settings_cache=settings_in_ram,
-                debug_mode=False,
-                is_cup=is_cup
-            )
-            
-            # ✅ ESTRAI I LAMBDA (posizione 2 e 3)
-            if len(result) >= 4:
-                gh, ga, lambda_h, lambda_a = result[0], result[1], result[2], result[3]
-                
-                # ✅ PASSA I LAMBDA ALL'ANALYZER
-                if analyzer:
-                    analyzer.add_result(algo_id=algo_id, home_goals=gh, away_goals=ga, 
-                                      lambda_h=lambda_h, lambda_a=lambda_a)
-            else:
-                gh, ga = result[0], result[1]
-                if analyzer:
-                    analyzer.add_result(algo_id=algo_id, home_goals=gh, away_goals=ga)
-            
-            score = f"{gh}-{ga}"
-            local_results.append(score)
-            valid_cycles += 1
-        
-        if cycle_idx % max(1, cycles // 10) == 0 or cycle_idx == cycles - 1:
-            pct = (cycle_idx + 1) / cycles * 100
-    
-    if not local_results:
-        return 0, 0, []
-    
-    from collections import Counter
-    top3 = Counter(local_results).most_common(3)
+    with suppress_stdout():
+        r_h, r_a = get_match_raw(preloaded_data)
+
+        # ✅ Controlla se è una coppa
+        is_cup = preloaded_data.get('is_cup', False) if preloaded_data else False
+
+        gh_arr, ga_arr, lambda_h, lambda_a = calculate_goals_batch(
+            r_h, r_a, cycles,
+            algo_mode=algo_id,
+            home_name=home_team,
+            away_name=away_team,
+            settings_cache=settings_in_ram,
+            is_cup=is_cup,
+            rng=rng
+        )[:4]
+
+    acc = ScoreAccumulator()
+    acc.add_batch(gh_arr, ga_arr, lambda_h=lambda_h, lambda_a=lambda_a)
+
+    # ✅ PASSA I LAMBDA ALL'ANALYZER
+    if analyzer:
+        analyzer.add_accumulator(algo_id, acc)
+    if accumulator is not None:
+        accumulator.merge(acc)
+
+    if not acc.n:
+        return 0, 0, [], acc
+
+    top3 = acc.most_common(3)
     final_score = top3[0][0]
     gh, ga = map(int, final_score.split("-"))
-    
-    return gh, ga, top3, local_results
-def run_monte_carlo_verdict_detailed(preloaded_data, home_team, away_team, analyzer=None, cycles=None, algo_id=None, **kwargs):
+
+    # Istogramma ai chiamanti (len, most_common, market_counts): niente lista per ciclo
+    return gh, ga, top3, acc
+def run_monte_carlo_verdict_detailed(preloaded_data, home_team, away_team, analyzer=None, cycles=None, algo_id=None, rng=None, **kwargs):
     """
     Versione SILENZIOSA con statistiche pesi aggregate.
     
     ✅ PARAMETRI NUOVI:
     - cycles: Numero di cicli totali da eseguire
     - algo_id: ID algoritmo da usare (se specificato, usa SOLO quello invece di tutti e 4)
+    - rng: Generator numpy (rng_streams) per run riproducibili; None = rng di default
+    - accumulator: ScoreAccumulator in cui fondere i cicli di tutti gli algoritmi
     """
     
-    bulk_cache = kwargs.get('bulk_cache', None)
+    accumulator = kwargs.get('accumulator', None)
     
     nominees = []
     algos_stats = {}
-    algos_full_results = {}
+    algos_full_results = {}     # aid -> ScoreAccumulator (istogramma, non lista per ciclo)
     algos_weights_tracking = {}
     algos_scontrini_tracking = {}
     
@@ -253,140 +246,69 @@ def run_monte_carlo_verdict_detailed(preloaded_data, home_team, away_team, analy
     _total_calc_start = _time.time()
 
     for aid in algos:
-        local_results = []
-        weights_sum = {}
-        params_sum = {}
-        scontrini_sum = {'casa': {}, 'ospite': {}}
-        valid_cycles = 0
-
         settings_in_ram = load_tuning(aid)
         _algo_calc_start = _time.time()
 
-        for cycle_idx in range(cycles_per_algo):
-            with suppress_stdout():
-                s_h, s_a, r_h, r_a = predict_match(home_team, away_team, mode=aid, preloaded_data=preloaded_data)
-                if s_h is None:
-                    continue
-                
-                # ✅ ESTRAI TUTTI I 9 VALORI (inclusi lambda_h e lambda_a)
-                # ✅ Controlla se è una coppa
-                is_cup = preloaded_data.get('is_cup', False) if preloaded_data else False
-                
-                result = calculate_goals_from_engine(
-                    s_h, s_a, r_h, r_a, 
-                    algo_mode=aid, 
-                    home_name=home_team, 
-                    away_name=away_team,
-                    settings_cache=settings_in_ram,
-                    debug_mode=False,
-                    is_cup=is_cup
-                )
-                
-                gh, ga, lambda_h, lambda_a, xg_info, pesi_dettagliati, parametri, scontrino_casa, scontrino_ospite = result
-                
-                score = f"{gh}-{ga}"
-                local_results.append(score)
-                valid_cycles += 1
-                
-                # ✅ PASSA I LAMBDA ALL'ANALYZER
-                if analyzer:
-                    h2h_data = kwargs.get('h2h_data', {})
-                    odds = bulk_cache.get('MATCH_H2H', {}).get('odds') if bulk_cache else None
-                    
-                    analyzer.add_result(
-                        algo_id=aid,
-                        home_goals=gh,
-                        away_goals=ga,
-                        lambda_h=lambda_h,
-                        lambda_a=lambda_a,
-                        odds_real=odds,
-                        odds_qt={'1': h2h_data.get('qt_1'), 'X': h2h_data.get('qt_X'), '2': h2h_data.get('qt_2')},
-                        team_scores={
-                            'home': bulk_cache.get('MASTER_DATA', {}).get(home_team, {}) if bulk_cache else {},
-                            'away': bulk_cache.get('MASTER_DATA', {}).get(away_team, {}) if bulk_cache else {}
-                        },
-                        h2h_stats=bulk_cache.get('H2H_HISTORICAL') if bulk_cache else None
-                    )
-                
-                if pesi_dettagliati:
-                    for nome_peso, info in pesi_dettagliati.items():
-                        if nome_peso not in weights_sum:
-                            weights_sum[nome_peso] = {
-                                'base_sum': 0,
-                                'multiplier_sum': 0,
-                                'final_sum': 0,
-                                'disabled_count': 0,
-                                'count': 0
-                            }
-                        
-                        weights_sum[nome_peso]['base_sum'] += info['weight_base']
-                        weights_sum[nome_peso]['multiplier_sum'] += info['multiplier']
-                        weights_sum[nome_peso]['final_sum'] += info['weight_final']
-                        weights_sum[nome_peso]['disabled_count'] += (1 if info['is_disabled'] else 0)
-                        weights_sum[nome_peso]['count'] += 1
-                
-                if parametri:
-                    for nome_param, valore in parametri.items():
-                        if nome_param not in params_sum:
-                            params_sum[nome_param] = {'sum': 0, 'count': 0}
-                        params_sum[nome_param]['sum'] += valore
-                        params_sum[nome_param]['count'] += 1
-                
-                if scontrino_casa:
-                    for voce, dati in scontrino_casa.items():
-                        if voce not in scontrini_sum['casa']:
-                            scontrini_sum['casa'][voce] = {'valore_sum': 0, 'peso_sum': 0, 'punti_sum': 0}
-                        scontrini_sum['casa'][voce]['valore_sum'] += dati.get('valore', 0)
-                        scontrini_sum['casa'][voce]['peso_sum'] += dati.get('peso', 0)
-                        scontrini_sum['casa'][voce]['punti_sum'] += dati.get('punti', 0)
-                
-                if scontrino_ospite:
-                    for voce, dati in scontrino_ospite.items():
-                        if voce not in scontrini_sum['ospite']:
-                            scontrini_sum['ospite'][voce] = {'valore_sum': 0, 'peso_sum': 0, 'punti_sum': 0}
-                        scontrini_sum['ospite'][voce]['valore_sum'] += dati.get('valore', 0)
-                        scontrini_sum['ospite'][voce]['peso_sum'] += dati.get('peso', 0)
-                        scontrini_sum['ospite'][voce]['punti_sum'] += dati.get('punti', 0)
-            
-            if cycle_idx % max(1, cycles_per_algo // 10) == 0 or cycle_idx == cycles_per_algo - 1:
-                pct = (cycle_idx + 1) / cycles_per_algo * 100
-                bar_len = int(pct / 5)
-                bar = "█" * bar_len + "░" * (20 - bar_len)
-        
-        if not local_results:
+        with suppress_stdout():
+            r_h, r_a = get_match_raw(preloaded_data)
+
+            # ✅ Controlla se è una coppa
+            is_cup = preloaded_data.get('is_cup', False) if preloaded_data else False
+
+            # ✅ TUTTI I CICLI IN UN COLPO (lambda, pesi e scontrini sono costanti sui cicli)
+            gh_arr, ga_arr, lambda_h, lambda_a, pesi_dettagliati, parametri, scontrino_casa, scontrino_ospite = calculate_goals_batch(
+                r_h, r_a, cycles_per_algo,
+                algo_mode=aid,
+                home_name=home_team,
+                away_name=away_team,
+                settings_cache=settings_in_ram,
+                is_cup=is_cup,
+                rng=rng
+            )
+
+        acc = ScoreAccumulator()
+        acc.add_batch(gh_arr, ga_arr, lambda_h=lambda_h, lambda_a=lambda_a)
+        valid_cycles = acc.n
+
+        # ✅ PASSA I LAMBDA ALL'ANALYZER
+        if analyzer:
+            analyzer.add_accumulator(aid, acc)
+        if accumulator is not None:
+            accumulator.merge(acc)
+
+        if not valid_cycles:
             continue
-        
-        if valid_cycles > 0:
-            weights_avg = {}
-            for nome_peso, dati in weights_sum.items():
-                weights_avg[nome_peso] = {
-                    'base': round(dati['base_sum'] / dati['count'], 3),
-                    'multiplier': round(dati['multiplier_sum'] / dati['count'], 2),
-                    'final': round(dati['final_sum'] / dati['count'], 3),
-                    'disabled_pct': round((dati['disabled_count'] / dati['count']) * 100, 1)
+
+        weights_avg = {}
+        for nome_peso, info in (pesi_dettagliati or {}).items():
+            weights_avg[nome_peso] = {
+                'base': round(info['weight_base'], 3),
+                'multiplier': round(info['multiplier'], 2),
+                'final': round(info['weight_final'], 3),
+                'disabled_pct': 100.0 if info['is_disabled'] else 0.0
+            }
+
+        params_avg = {}
+        for nome_param, valore in (parametri or {}).items():
+            params_avg[nome_param] = round(valore, 2)
+
+        algos_weights_tracking[aid] = {'pesi': weights_avg, 'parametri': params_avg}
+
+        scontrini_avg = {'casa': {}, 'ospite': {}}
+        for team, scontrino in (('casa', scontrino_casa), ('ospite', scontrino_ospite)):
+            for voce, dati in (scontrino or {}).items():
+                scontrini_avg[team][voce] = {
+                    'valore': round(dati.get('valore', 0), 2),
+                    'peso': round(dati.get('peso', 0), 2),
+                    'punti': round(dati.get('punti', 0), 2)
                 }
-            
-            params_avg = {}
-            for nome_param, dati in params_sum.items():
-                params_avg[nome_param] = round(dati['sum'] / dati['count'], 2)
-            
-            algos_weights_tracking[aid] = {'pesi': weights_avg, 'parametri': params_avg}
-            
-            scontrini_avg = {'casa': {}, 'ospite': {}}
-            for team in ['casa', 'ospite']:
-                for voce, dati in scontrini_sum[team].items():
-                    scontrini_avg[team][voce] = {
-                        'valore': round(dati['valore_sum'] / valid_cycles, 2),
-                        'peso': round(dati['peso_sum'] / valid_cycles, 2),
-                        'punti': round(dati['punti_sum'] / valid_cycles, 2)
-                    }
-            algos_scontrini_tracking[aid] = scontrini_avg
-        
+        algos_scontrini_tracking[aid] = scontrini_avg
+
         _algo_calc_elapsed = _time.time() - _algo_calc_start
         print(f"⏱️ Algo {algo_names.get(aid, aid)}: {valid_cycles} cicli in {_algo_calc_elapsed:.2f}s ({valid_cycles / max(_algo_calc_elapsed, 0.001):.0f} cicli/s)", file=sys.stderr)
 
-        algos_full_results[aid] = local_results.copy()
-        top_3 = Counter(local_results).most_common(3)
+        algos_full_results[aid] = acc
+        top_3 = acc.most_common(3)
         algos_stats[aid] = top_3
 
         preview = ", ".join([f"{sc}({freq})" for sc, freq in top_3[:3]])
@@ -400,7 +322,7 @@ def run_monte_carlo_verdict_detailed(preloaded_data, home_team, away_team, analy
     if not nominees:
         return (0, 0), {}, [], {}, {}, 0
     
-    final_verdict = random.choice(nominees)
+    final_verdict = str(get_rng(rng).choice(nominees))
     gh, ga = map(int, final_verdict.split("-"))
     global_top3 = Counter(nominees).most_common(3)
     
@@ -420,12 +342,11 @@ def run_monte_carlo_verdict_detailed(preloaded_data, home_team, away_team, analy
         
         for aid in algos:
             if aid in algos_full_results:
-                all_results = algos_full_results[aid]
-                freq_counter = Counter(all_results)
+                algo_acc = algos_full_results[aid]
                 
                 debug_data['algoritmi'][algo_names.get(aid, f'Algo{aid}')] = {
-                    'totale_simulazioni': len(all_results),
-                    'top_10': freq_counter.most_common(10),
+                    'totale_simulazioni': algo_acc.n,
+                    'top_10': algo_acc.most_common(10),
                     'top_3_usati': algos_stats.get(aid, []),
                     'pesi_medi': algos_weights_tracking.get(aid, {}),
                     'scontrino_medio': algos_scontrini_tracking.get(aid, {})
@@ -32,12 +32,14 @@ try:
         get_round_number,
         has_valid_results,
         load_tuning,
-        run_single_algo_montecarlo
+        run_single_algo_montecarlo,
+        ScoreAccumulator
     )
     from ai_engine.calculators.bulk_manager import get_all_data_bulk
     from config import db
     from ai_engine.deep_analysis import DeepAnalyzer
     from betting_logic import analyze_betting_data
+    from tracing import trace_run, annotate, stages
 except ImportError as e:
     print(json.dumps({"success": False, "error": f"Import Error: {e}"}), flush=True)
     sys.exit(1)
@@ -1602,6 +1604,7 @@ def calcola_sostituzioni():
 def genera_match_report_completo(gh, ga, h2h_data, team_h, team_a, simulazioni_raw, deep_stats, bulkcache):
     """
     TUTTI i dati stats da BULK CACHE. Cronaca/report invariati.
+    simulazioni_raw: ScoreAccumulator dei cicli (istogramma dei risultati).
     """
     # =====================================================
     # ESTRAZIONE TOTALE DA BULK CACHE (PRIORITÀ MASSIMA)
@@ -1732,14 +1735,12 @@ def genera_match_report_completo(gh, ga, h2h_data, team_h, team_a, simulazioni_r
     cronaca = genera_cronaca_live_densa(gh, ga, team_h, team_a, h2h_data)
     
     tot = len(simulazioni_raw)
-    v_h = sum(1 for r in simulazioni_raw if int(str(r).split('-')[0]) > int(str(r).split('-')[1]))
-    par = sum(1 for r in simulazioni_raw if int(str(r).split('-')[0]) == int(str(r).split('-')[1]))
-    v_a = sum(1 for r in simulazioni_raw if int(str(r).split('-')[0]) < int(str(r).split('-')[1]))
-    over = sum(1 for r in simulazioni_raw if sum(map(int, str(r).split('-'))) > 2.5)
-    gg = sum(1 for r in simulazioni_raw if all(int(x) > 0 for x in str(r).split('-')))
+    mkt = simulazioni_raw.market_counts()
+    v_h, par, v_a = mkt["1"], mkt["X"], mkt["2"]
+    over = mkt["O2.5"]
+    gg = mkt["GG"]
     
-    from collections import Counter
-    top5 = Counter(simulazioni_raw).most_common(5)
+    top5 = simulazioni_raw.most_common(5)
     
     uo = deep_stats.get('under_over', {})
     conf = deep_stats.get('confidence', {})
@@ -1778,10 +1779,9 @@ def genera_match_report_completo(gh, ga, h2h_data, team_h, team_a, simulazioni_r
 def genera_anatomia_partita(gh, ga, h2h_match_data, team_h_doc, sim_list, bulkcache):
     """
     TUTTI i dati da BULK CACHE all'inizio. Modifica parametri con bulkcache.
-    Fallback h2h_data → default.
+    Fallback h2h_data → default. sim_list: ScoreAccumulator dei cicli.
     """
     import random
-    from collections import Counter
     
     h2h_data = h2h_match_data.get('h2h_data', {}) if h2h_match_data else {}
     
@@ -1902,11 +1902,11 @@ def genera_anatomia_partita(gh, ga, h2h_match_data, team_h_doc, sim_list, bulkca
     
     # Report betting (invariato, da sim_list)
     tot = len(sim_list) or 1
-    v_h = sum(1 for r in sim_list if int(str(r).split('-')[0]) > int(str(r).split('-')[1]))
-    par = sum(1 for r in sim_list if int(str(r).split('-')[0]) == int(str(r).split('-')[1]))
+    mkt = sim_list.market_counts()
+    v_h, par = mkt["1"], mkt["X"]
     v_a = tot - v_h - par
-    over = sum(1 for r in sim_list if sum(map(int, str(r).split('-'))) > 2.5)
-    gg = sum(1 for r in sim_list if all(int(x) > 0 for x in str(r).split('-')))
+    over = mkt["O2.5"]
+    gg = mkt["GG"]
     
     report_bet = {
         "Bookmaker": {
@@ -1923,7 +1923,7 @@ def genera_anatomia_partita(gh, ga, h2h_match_data, team_h_doc, sim_list, bulkca
         },
         "risultati_esatti_piu_probabili": [
             {"score": s, "pct": f"{round(f/tot*100, 1)}%"}
-            for s, f in Counter(sim_list).most_common(5)
+            for s, f in sim_list.most_common(5)
         ]
     }
     
@@ -1932,6 +1932,7 @@ def genera_anatomia_partita(gh, ga, h2h_match_data, team_h_doc, sim_list, bulkca
 
 
 
+@trace_run("web_simulation")
 def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles: int, league: str, main_mode: int, bulk_cache=None) -> dict:
     """Esegue la simulazione e arricchisce il risultato con i dati del DB."""
     
@@ -1939,7 +1940,7 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
     start_full_process = time.time()
     start_time = datetime.now()
     
-    sim_list = []
+    sim_list = ScoreAccumulator()      # istogramma dei cicli, non una stringa per ciclo
     quote_match = {"1": 2.5, "X": 3.0, "2": 2.8}
     report_pro = None
     cronaca = []
@@ -1967,11 +1968,16 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         """Helper per loggare sia su stderr che nella lista"""
         print(msg, file=sys.stderr)
         debug_logs.append(msg)
+
+    # Tracing: una run per richiesta, uno span per fase (riepilogo su stderr)
+    annotate(match=f"{home_team} vs {away_team}", league=league, algo=algo_id, cycles=cycles)
+    st = stages()
     
     try:
         # ═══════════════════════════════════════════════════════════
         # 1. INIZIALIZZAZIONE ANALYZER
         # ═══════════════════════════════════════════════════════════
+        st.next("init")
         t_init = time.time()
         #log_debug("🔍 [DEBUG 1] Importazione DeepAnalyzer...")
         from ai_engine.deep_analysis import DeepAnalyzer
@@ -1987,6 +1993,7 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         # ═══════════════════════════════════════════════════════════
         # 2. RISOLUZIONE ALIAS SQUADRE
         # ═══════════════════════════════════════════════════════════
+        st.next("alias")
         t_alias = time.time()
         #log_debug("🔍 [DEBUG 4] Query MongoDB per team_h_doc...")
         
@@ -2022,6 +2029,7 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         # ═══════════════════════════════════════════════════════════
         # 3. RICERCA MATCH NEL DATABASE (H2H)
         # ═══════════════════════════════════════════════════════════
+        st.next("h2h")
         t_h2h = time.time()
         ##log_debug("🔍 [DEBUG 8] Pulizia nome lega...")
         
@@ -2139,6 +2147,7 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         # ═══════════════════════════════════════════════════════════
         # 4. PRELOAD DATI E BULK_CACHE
         # ═══════════════════════════════════════════════════════════
+        st.next("preload", cached=bulk_cache is not None)
         t_preload = time.time()
        # log_debug("🔍 [DEBUG 16] Verifica bulk_cache...")
         
@@ -2168,6 +2177,7 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         # ═══════════════════════════════════════════════════════════
         # 5. ESECUZIONE ALGORITMO
         # ═══════════════════════════════════════════════════════════
+        st.next("exec", algo=algo_id, cycles=cycles)
         t_exec_start = time.time()
         #log_debug(f"🎯 SIMULAZIONE: Algo {algo_id}, Cicli {cycles}")
         
@@ -2218,13 +2228,15 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
             actual_cycles_executed = res[5] if len(res) > 5 else cycles
             
             if len(res) > 4 and isinstance(res[4], dict):
-                for algo_res_list in res[4].values():
-                    if isinstance(algo_res_list, list):
-                        sim_list.extend(algo_res_list)
+                # aid -> ScoreAccumulator: fusione degli istogrammi
+                for algo_acc in res[4].values():
+                    if isinstance(algo_acc, ScoreAccumulator):
+                        sim_list.merge(algo_acc)
             elif len(res) > 4 and isinstance(res[4], list):
-                sim_list = [f"{r[0]}-{r[1]}" for r in res[4]]
+                for r in res[4]:
+                    sim_list.add(r[0], r[1])
             else:
-                sim_list = [f"{gh}-{ga}"] * cycles
+                sim_list = ScoreAccumulator.from_score_counts({f"{gh}-{ga}": cycles})
             
             top3 = [x[0] for x in res[2]] if len(res) > 2 else []
             cronaca = res[1] if len(res) > 1 else []
@@ -2286,10 +2298,12 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
             #log_debug(f"✅ ALGORITMO {algo_id}: {cycles} cicli, risultato {gh}-{ga}")
         
         #log_debug(f"⏱️ [5. EXEC] Simulazione completata in: {time.time() - t_exec_start:.3f}s")
+        annotate(actual_cycles=actual_cycles_executed)
 
         # ═══════════════════════════════════════════════════════════
         # 6. CHIUSURA ANALYZER E ESTRAZIONE DEEP_STATS
         # ═══════════════════════════════════════════════════════════
+        st.next("final")
         t_final = time.time()
         analyzer.end_match()
         #log_debug(f"🔍 [AFTER end_match] analyzer.matches length: {len(analyzer.matches) if analyzer.matches else 0}")
@@ -2372,11 +2386,10 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         # ✅ AGGIUNGI QUESTO PRIMA DI analyze_betting_data():
         if algo_id == 6:
             # Per MonteCarlo: estrai results dagli algoritmi 2,3,4,5
-            sim_list = []
+            sim_list = ScoreAccumulator()
             if deep_stats and 'exact_scores' in deep_stats:
-                # Ricostruisci sim_list dalle frequenze
-                for score, count in deep_stats['exact_scores'].items():
-                    sim_list.extend([score] * count)
+                # Istogramma dalle frequenze (senza ricostruire la lista dei cicli)
+                sim_list = ScoreAccumulator.from_score_counts(deep_stats['exact_scores'])
             
             log_debug(f"🎲 sim_list creato per MonteCarlo: {len(sim_list)} risultati")
         else:
@@ -2394,6 +2407,7 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
         # ═══════════════════════════════════════════════════════════
         # 8. COSTRUZIONE RISULTATO FINALE
         # ═══════════════════════════════════════════════════════════
+        st.next("result")
         debug_info = {
             "1_league_ricevuta": league,
             "2_league_pulita": league_clean,
@@ -2485,14 +2499,16 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
             }
         }
 
-        #log_debug(f"🏁 [FINISH] Processo completato in: {time.time() - start_full_process:.3f}s\n")
-        return sanitize_data(raw_result)
+        raw_result = sanitize_data(raw_result)
+        st.done()
+        return raw_result
 
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         log_debug(f"❌ ERRORE CRITICO: {str(e)}")
         log_debug(tb)
+        annotate(error=str(e))
         return {
             "success": False, 
             "error": str(e),
@@ -2502,8 +2518,24 @@ def run_single_simulation(home_team: str, away_team: str, algo_id: int, cycles:
             "execution_time": time.time() - t_inizio_funzione
         }
 
-def main():
+def simulate_request(main_mode: int, league: str, home_team: str, away_team: str, algo_id: int, cycles: int) -> dict:
+    """Esegue una richiesta web e ritorna il dict finale (lo stesso che main() stampa in JSON)."""
     start_time = datetime.now()
+
+    if main_mode == 4 and home_team != "null":
+        bulk_cache = get_all_data_bulk(home_team, away_team, league)
+        result = run_single_simulation(home_team, away_team, algo_id, cycles, league, main_mode, bulk_cache=bulk_cache)
+    else:
+        result = {"success": False, "error": "Solo modalità Singola (4) supportata"}
+
+    return {
+        "success": result.get("success", False),
+        "timestamp": datetime.now().isoformat(),
+        "execution_time": (datetime.now() - start_time).total_seconds(),
+        **{k: v for k, v in result.items() if k != "success"} 
+    }
+
+def main():
     try:
         if len(sys.argv) < 9:
             print(json.dumps({"success": False, "error": "Parametri insufficienti"}), flush=True)
@@ -2516,18 +2548,7 @@ def main():
         algo_id = int(sys.argv[7])
         cycles = int(sys.argv[8])
 
-        if main_mode == 4 and home_team != "null":
-            bulk_cache = get_all_data_bulk(home_team, away_team, league)
-            result = run_single_simulation(home_team, away_team, algo_id, cycles, league, main_mode, bulk_cache=bulk_cache)
-        else:
-            result = {"success": False, "error": "Solo modalità Singola (4) supportata"}
-
-        final_output = {
-            "success": result.get("success", False),
-            "timestamp": datetime.now().isoformat(),
-            "execution_time": (datetime.now() - start_time).total_seconds(),
-            **{k: v for k, v in result.items() if k != "success"} 
-        }
+        final_output = simulate_request(main_mode, league, home_team, away_team, algo_id, cycles)
         
         print(json.dumps(final_output, ensure_ascii=False), flush=True)
 
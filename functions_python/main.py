@@ -3,6 +3,7 @@ import os
 import json
 import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from firebase_functions import https_fn, options
 from firebase_admin import initialize_app
 
@@ -19,6 +20,12 @@ ai_engine_dir = os.path.join(current_dir, "ai_engine")
 if os.path.exists(ai_engine_dir):
     sys.path.insert(0, ai_engine_dir)
 
+# Tempo massimo per una simulazione, uguale per worker caldo e subprocess
+SIMULATION_TIMEOUT = 300
+
+# Il worker caldo gira in un thread: così anche lui ha un timeout come il subprocess
+_WARM_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
 @https_fn.on_request(
     memory=options.MemoryOption.GB_2,     # <--- 2GB RAM
     timeout_sec=540,                     # <--- 9 Minuti Tempo
@@ -58,6 +65,33 @@ def run_simulation(request: https_fn.Request) -> https_fn.Response:
         # 1. CASO SIMULAZIONE SINGOLA (Frontend/API)
         # ---------------------------------------------------------
         if payload and (payload.get('home') or payload.get('match_id') or payload.get('main_mode')):
+
+            # ✅ ESECUZIONE CALDA (default): motore, Mongo e tuning restano in RAM tra le richieste.
+            # SIMULATION_MODE=subprocess riattiva il vecchio lancio "python -m" per ogni chiamata.
+            if os.environ.get("SIMULATION_MODE", "warm") != "subprocess":
+                try:
+                    import simulation_worker
+                    future = _WARM_EXECUTOR.submit(simulation_worker.run_request, payload)
+                    json_response = future.result(timeout=SIMULATION_TIMEOUT)
+                    return https_fn.Response(
+                        json.dumps(json_response, ensure_ascii=False),
+                        mimetype="application/json",
+                        headers=headers
+                    )
+                except FutureTimeoutError:
+                    err_resp = {
+                        "success": False,
+                        "error": "Subprocess timeout",
+                        "details": f"Simulation timed out after {SIMULATION_TIMEOUT} seconds"
+                    }
+                    return https_fn.Response(
+                        json.dumps(err_resp, ensure_ascii=False),
+                        status=504,
+                        mimetype="application/json",
+                        headers=headers
+                    )
+                except ImportError as ex:
+                    print(f"⚠️ Worker caldo non disponibile, uso subprocess: {ex}", file=sys.stderr)
     
             league = payload.get('league') or payload.get('bulk_cache', {}).get('league') or 'Serie A'
             
@@ -95,7 +129,7 @@ def run_simulation(request: https_fn.Request) -> https_fn.Response:
                     encoding='utf-8',
                     errors='replace',
                     env=env,
-                    timeout=300  # timeout aumentato per simulazioni lunghe
+                    timeout=SIMULATION_TIMEOUT  # timeout aumentato per simulazioni lunghe
                 )
             except subprocess.TimeoutExpired as te:
                 err_resp = {
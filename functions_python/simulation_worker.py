@@ -0,0 +1,97 @@
+"""
+SIMULATION WORKER - Esecuzione "calda" delle simulazioni web
+==============================================================
+Invece di lanciare `python -m ai_engine.web_simulator_A` (o CUPS) per ogni
+richiesta, importa i moduli del motore UNA volta per istanza e li riusa:
+connessione Mongo (config.py), tuning, librerie e moduli restano in RAM
+tra una richiesta e l'altra. Il risultato torna come dict (niente parsing stdout).
+
+Usage (da main.py):
+    import simulation_worker
+    result = simulation_worker.run_request(payload)
+
+Il tuning viene ricaricato a ogni richiesta (2 find_one), così un salvataggio
+dal mixer vale subito anche con il worker caldo.
+"""
+
+import sys
+import time
+import threading
+
+# Il motore usa stato globale (sys.stdout in suppress_stdout, cache per squadra):
+# le simulazioni nella stessa istanza vanno eseguite una alla volta.
+_LOCK = threading.Lock()
+
+_MODULES = {}
+STATS = {"requests": 0, "warm_hits": 0, "load_time": 0.0}
+
+
+def _load(is_cup):
+    """Importa (una volta sola) il simulatore richiesto e il motore."""
+    key = "cups" if is_cup else "league"
+    if key in _MODULES:
+        STATS["warm_hits"] += 1
+        return _MODULES[key]
+
+    t0 = time.time()
+    try:
+        if is_cup:
+            from ai_engine.cups.cups_engine import web_simulator_CUPS as simulator
+        else:
+            from ai_engine import web_simulator_A as simulator
+    except SystemExit as e:
+        # I simulatori fanno sys.exit(1) se un import fallisce: qui non deve uccidere l'istanza
+        raise ImportError(f"Import simulatore fallito ({key})") from e
+
+    _MODULES[key] = simulator
+    STATS["load_time"] += time.time() - t0
+    print(f"🔥 [WORKER] Simulatore '{key}' caricato in {time.time() - t0:.2f}s", file=sys.stderr)
+    return simulator
+
+
+def _refresh_engine_state():
+    """Riallinea lo stato del motore a quello di un processo nuovo (tuning + cache per squadra)."""
+    engine_core = sys.modules.get("engine.engine_core")
+    goals_converter = sys.modules.get("engine.goals_converter")
+
+    if engine_core is not None:
+        engine_core.reload_tuning()
+        engine_core._streak_b_cache.clear()
+    if goals_converter is not None:
+        goals_converter.FBREF_CACHE.clear()
+
+
+def build_args(payload):
+    """Normalizza il payload HTTP negli stessi argomenti passati prima alla riga di comando."""
+    league = payload.get('league') or payload.get('bulk_cache', {}).get('league') or 'Serie A'
+    is_cup = league in ['UCL', 'UEL'] or payload.get('is_cup', False)
+
+    return is_cup, {
+        "main_mode": int(payload.get('main_mode', 4)),
+        "league": league,
+        "home_team": payload.get('home', 'null'),
+        "away_team": payload.get('away', 'null'),
+        "algo_id": int(payload.get('algo_id', 5)),
+        "cycles": int(payload.get('cycles', 20)),
+    }
+
+
+def run_request(payload):
+    """Esegue una simulazione nel processo corrente e ritorna il dict di risposta."""
+    is_cup, args = build_args(payload)
+
+    with _LOCK:
+        simulator = _load(is_cup)
+        _refresh_engine_state()
+        STATS["requests"] += 1
+
+        try:
+            if is_cup:
+                return simulator.simulate_request(
+                    args["main_mode"], args["league"], args["home_team"], args["away_team"],
+                    args["algo_id"], args["cycles"]
+                )
+            return simulator.simulate_request(**args)
+        except Exception as e:
+            # Stesso contratto del main() dei simulatori: errore come JSON, non come eccezione
+            return {"success": False, "error": f"Critico: {str(e)}"}